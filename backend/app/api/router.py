@@ -18,6 +18,7 @@ from app.api.v1.endpoints.export import router as export_router
 from app.api.v1.endpoints.admin_config import router as admin_config_router
 from app.api.v1.endpoints.ws import router as ws_router
 from app.api.v1.endpoints.layout import router as layout_router
+from app.api.v1.endpoints.rule_checks import router as rule_checks_router
 
 api_router = APIRouter(prefix="/api/v1")
 api_router.include_router(health_router)
@@ -38,3 +39,4 @@ api_router.include_router(export_router)
 api_router.include_router(admin_config_router)
 api_router.include_router(ws_router)
 api_router.include_router(layout_router)
+api_router.include_router(rule_checks_router)
@@ -1,15 +1,19 @@
 """Device endpoints."""
 
 from fastapi import APIRouter, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 
 from app.api.deps import CurrentUser, DBSession
 from app.schemas.device import DeviceBulkCreate, DeviceBulkResponse, DeviceCreate, DeviceResponse, DeviceUpdate
-from app.services.area import get_area_by_name
+from app.services.area import get_area_by_name, get_area_name_map
 from app.services.device import (
+    build_device,
     create_device,
+    create_devices_bulk,
     delete_device,
     get_device_by_id,
     get_device_by_name,
+    get_device_name_map,
     get_devices,
     parse_device_color,
     update_device,
@@ -173,13 +177,18 @@ async def bulk_create_devices(
     """Bulk create devices."""
     await _verify_project_access(db, project_id, current_user.id)
 
+    # Preload index 1 lần, validate in-memory, insert trong 1 transaction.
+    area_by_name = await get_area_name_map(db, project_id)
+    device_by_name = await get_device_name_map(db, project_id)
+
     created = []
     errors = []
+    pending = []
 
     for row, device_data in enumerate(data.devices):
         try:
             # Check area
-            area = await get_area_by_name(db, project_id, device_data.area_name)
+            area = area_by_name.get(device_data.area_name)
             if not area:
                 errors.append({
                     "entity": "device",
@@ -191,8 +200,7 @@ async def bulk_create_devices(
                 continue
 
             # Check duplicate
-            existing = await get_device_by_name(db, project_id, device_data.name)
-            if existing:
+            if device_data.name in device_by_name:
                 errors.append({
                     "entity": "device",
                     "row": row,
@@ -202,8 +210,9 @@ async def bulk_create_devices(
                 })
                 continue
 
-            device = await create_device(db, project_id, area, device_data)
-            created.append({"id": device.id, "name": device.name, "row": row})
+            device = build_device(project_id, area, device_data)
+            device_by_name[device.name] = device
+            pending.append((row, device))
         except Exception as e:
             errors.append({
                 "entity": "device",
@@ -212,6 +221,23 @@ async def bulk_create_devices(
                 "message": str(e),
             })
 
+    try:
+        await create_devices_bulk(db, [device for _, device in pending])
+    except IntegrityError as e:
+        await db.rollback()
+        errors.extend(
+            {
+                "entity": "device",
+                "row": row,
+                "code": "BULK_INTEGRITY_ERROR",
+                "message": f"Lô bị hủy do vi phạm ràng buộc dữ liệu: {e.orig}",
+            }
+            for row, _ in pending
+        )
+        pending = []
+    for row, device in pending:
+        created.append({"id": device.id, "name": device.name, "row": row})
+
     return DeviceBulkResponse(
         success_count=len(created),
         error_count=len(errors),
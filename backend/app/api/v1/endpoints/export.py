@@ -1,13 +1,20 @@
 """API endpoints cho export jobs."""
 
+import asyncio
+import mimetypes
+import os
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, get_db
+from app.core.config import EXPORT_ACCEL_REDIRECT_PREFIX, EXPORTS_DIR
 from app.db.models import User
 from app.schemas.export_job import ExportJobResponse, ExportRequest
+from app.services import export_download
+from app.services.export_events import export_event_publisher
 from app.services import export_job as export_job_service
 from app.services import project as project_service
 
@@ -16,9 +23,13 @@ router = APIRouter(prefix="/projects/{project_id}/export", tags=["export"])
 
 def _build_options(export_type: str, data: ExportRequest | None) -> dict:
     options = data.model_dump(exclude_none=True) if data else {}
+    if export_type != "bundle":
+        options.pop("artifacts", None)
     if "format" not in options:
         if export_type in {"device_file", "master_file"}:
             options["format"] = "xlsx"
+        elif export_type == "bundle":
+            options["format"] = "zip"
         else:
             options["format"] = "pptx"
     return options
@@ -27,6 +38,8 @@ def _build_options(export_type: str, data: ExportRequest | None) -> dict:
 def _build_response(job) -> ExportJobResponse:
     response = ExportJobResponse.model_validate(job)
     response.options = export_job_service.parse_options(job.options_json)
+    if job.status == "completed" and job.file_path:
+        response.download_url = f"/api/v1/projects/{job.project_id}/export/jobs/{job.id}/download"
     return response
 
 
@@ -49,19 +62,35 @@ async def _ensure_export_data(db: AsyncSession, project_id: str) -> None:
         )
 
 
+async def _create_export_job(
+    db: AsyncSession,
+    project_id: str,
+    export_type: str,
+    data: ExportRequest | None,
+    response: Response,
+) -> ExportJobResponse:
+    """Tạo job; nếu trùng nội dung với job đang chạy/đã xong thì trả về job đó (200)."""
+    options = _build_options(export_type, data)
+    job, created = await export_job_service.get_or_create_job(db, project_id, export_type, options)
+    if created:
+        export_event_publisher.poke(project_id)
+    else:
+        response.status_code = status.HTTP_200_OK
+    return _build_response(job)
+
+
 @router.post("/l1-diagram", response_model=ExportJobResponse, status_code=status.HTTP_201_CREATED)
 async def export_l1_diagram(
     project_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(get_current_user)],
+    response: Response,
     data: ExportRequest | None = None,
 ):
     """Tạo export job L1 diagram."""
     await _ensure_project_access(db, project_id, current_user)
     await _ensure_export_data(db, project_id)
-    options = _build_options("l1_diagram", data)
-    job = await export_job_service.create_job(db, project_id, "l1_diagram", options)
-    return _build_response(job)
+    return await _create_export_job(db, project_id, "l1_diagram", data, response)
 
 
 @router.post("/l2-diagram", response_model=ExportJobResponse, status_code=status.HTTP_201_CREATED)
@@ -69,14 +98,13 @@ async def export_l2_diagram(
     project_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(get_current_user)],
+    response: Response,
     data: ExportRequest | None = None,
 ):
     """Tạo export job L2 diagram."""
     await _ensure_project_access(db, project_id, current_user)
     await _ensure_export_data(db, project_id)
-    options = _build_options("l2_diagram", data)
-    job = await export_job_service.create_job(db, project_id, "l2_diagram", options)
-    return _build_response(job)
+    return await _create_export_job(db, project_id, "l2_diagram", data, response)
 
 
 @router.post("/l3-diagram", response_model=ExportJobResponse, status_code=status.HTTP_201_CREATED)
@@ -84,14 +112,13 @@ async def export_l3_diagram(
     project_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(get_current_user)],
+    response: Response,
     data: ExportRequest | None = None,
 ):
     """Tạo export job L3 diagram."""
     await _ensure_project_access(db, project_id, current_user)
     await _ensure_export_data(db, project_id)
-    options = _build_options("l3_diagram", data)
-    job = await export_job_service.create_job(db, project_id, "l3_diagram", options)
-    return _build_response(job)
+    return await _create_export_job(db, project_id, "l3_diagram", data, response)
 
 
 @router.post("/device-file", response_model=ExportJobResponse, status_code=status.HTTP_201_CREATED)
@@ -99,14 +126,13 @@ async def export_device_file(
     project_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(get_current_user)],
+    response: Response,
     data: ExportRequest | None = None,
 ):
     """Tạo export job device file."""
     await _ensure_project_access(db, project_id, current_user)
     await _ensure_export_data(db, project_id)
-    options = _build_options("device_file", data)
-    job = await export_job_service.create_job(db, project_id, "device_file", options)
-    return _build_response(job)
+    return await _create_export_job(db, project_id, "device_file", data, response)
 
 
 @router.post("/master-file", response_model=ExportJobResponse, status_code=status.HTTP_201_CREATED)
@@ -114,14 +140,27 @@ async def export_master_file(
     project_id: str,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(get_current_user)],
+    response: Response,
     data: ExportRequest | None = None,
 ):
     """Tạo export job master file."""
     await _ensure_project_access(db, project_id, current_user)
     await _ensure_export_data(db, project_id)
-    options = _build_options("master_file", data)
-    job = await export_job_service.create_job(db, project_id, "master_file", options)
-    return _build_response(job)
+    return await _create_export_job(db, project_id, "master_file", data, response)
+
+
+@router.post("/bundle", response_model=ExportJobResponse, status_code=status.HTTP_201_CREATED)
+async def export_bundle(
+    project_id: str,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    response: Response,
+    data: ExportRequest | None = None,
+):
+    """Tạo export job gói nhiều artifact (ZIP)."""
+    await _ensure_project_access(db, project_id, current_user)
+    await _ensure_export_data(db, project_id)
+    return await _create_export_job(db, project_id, "bundle", data, response)
 
 
 @router.get("/jobs", response_model=list[ExportJobResponse])
@@ -151,3 +190,46 @@ async def get_export_job(
     if not job or job.project_id != project_id:
         raise HTTPException(status_code=404, detail="Export job không tồn tại")
     return _build_response(job)
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_export_job(
+    project_id: str,
+    job_id: str,
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    """Tải file export (hỗ trợ Range, ETag/If-None-Match)."""
+    await _ensure_project_access(db, project_id, current_user)
+    job = await export_job_service.get_job(db, job_id)
+    if not job or job.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Export job không tồn tại")
+    if job.status != "completed" or not job.file_path:
+        raise HTTPException(status_code=409, detail="Export job chưa hoàn thành")
+    path = job.file_path
+    try:
+        stat_result = await asyncio.to_thread(os.stat, path)
+    except OSError:
+        raise HTTPException(status_code=410, detail="File export không còn tồn tại")
+
+    file_name = job.file_name or path.rsplit("/", 1)[-1]
+    etag = export_download.build_etag(job.id, stat_result)
+    headers = {"etag": etag, "cache-control": "private, no-cache"}
+    if export_download.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    media_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+    accel_uri = export_download.accel_redirect_uri(path, EXPORTS_DIR, EXPORT_ACCEL_REDIRECT_PREFIX)
+    if accel_uri:
+        # nginx đọc file bằng sendfile và tự xử lý Range.
+        headers["x-accel-redirect"] = accel_uri
+        headers["content-disposition"] = export_download.content_disposition(file_name)
+        return Response(media_type=media_type, headers=headers)
+    return FileResponse(
+        path,
+        filename=file_name,
+        media_type=media_type,
+        headers=headers,
+        stat_result=stat_result,
+    )
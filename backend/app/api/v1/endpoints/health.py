@@ -2,6 +2,7 @@ from fastapi import APIRouter
 from sqlalchemy import text
 
 from app.db.session import engine
+from app.services.ws_manager import ws_manager
 
 router = APIRouter(tags=["health"])
 
@@ -22,4 +23,5 @@ async def health_check() -> dict:
         "status": status,
         "database": db_status,
         "version": "0.1.0",
+        "websocket": ws_manager.get_metrics(),
     }
@@ -3,6 +3,7 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, get_db
@@ -14,16 +15,19 @@ from app.schemas.l2_assignment import (
     InterfaceL2AssignmentResponse,
     InterfaceL2AssignmentUpdate,
 )
+from app.schemas.rule_check import RuleCheckResponse
+from app.services import device as device_service
 from app.services import l2_assignment as assignment_service
 from app.services import l2_segment as segment_service
 from app.services import project as project_service
+from app.services.trunk_check import run_trunk_check
 
 router = APIRouter(prefix="/projects/{project_id}/l2/assignments", tags=["l2-assignments"])
 
 
 def build_assignment_response(assignment, device_name=None, segment_name=None, vlan_id=None):
     """Build response với thông tin bổ sung."""
-    allowed_vlans = assignment_service.parse_allowed_vlans(assignment.allowed_vlans_json)
+    allowed_vlans = assignment_service.assignment_allowed_vlans(assignment)
     return InterfaceL2AssignmentResponse(
         id=assignment.id,
         project_id=assignment.project_id,
@@ -77,6 +81,23 @@ async def list_assignments(
     return result
 
 
+@router.get("/trunk-check", response_model=RuleCheckResponse)
+async def check_trunk_consistency(
+    project_id: str,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    """So mode/allowed VLAN/native VLAN giữa 2 đầu mọi L1 link (RB-501..504)."""
+    project = await project_service.get_project_by_id(db, project_id, current_user.id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project không tồn tại")
+    if project.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Không có quyền truy cập project")
+
+    report = await run_trunk_check(db, project_id)
+    return RuleCheckResponse(**report.to_dict())
+
+
 @router.get("/{assignment_id}", response_model=InterfaceL2AssignmentResponse)
 async def get_assignment(
     project_id: str,
@@ -173,14 +194,18 @@ async def bulk_create_assignments(
     if project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Không có quyền truy cập project")
 
+    # Preload index 1 lần, validate in-memory, insert trong 1 transaction.
+    device_by_name = await device_service.get_device_name_map(db, project_id)
+    segment_by_id = await segment_service.get_segment_map(db, project_id)
+    assignment_keys = await assignment_service.get_assignment_keys(db, project_id)
+
     created = []
     errors = []
+    pending = []
 
     for idx, assign_data in enumerate(data.assignments):
         try:
-            device = await assignment_service.get_device_by_name(
-                db, project_id, assign_data.device_name
-            )
+            device = device_by_name.get(assign_data.device_name)
             if not device:
                 errors.append({
                     "index": idx,
@@ -189,8 +214,8 @@ async def bulk_create_assignments(
                 })
                 continue
 
-            segment = await segment_service.get_segment(db, assign_data.l2_segment_id)
-            if not segment or segment.project_id != project_id:
+            segment = segment_by_id.get(assign_data.l2_segment_id)
+            if not segment:
                 errors.append({
                     "index": idx,
                     "data": assign_data.model_dump(),
@@ -198,10 +223,8 @@ async def bulk_create_assignments(
                 })
                 continue
 
-            existing = await assignment_service.get_assignment_by_interface(
-                db, project_id, device.id, assign_data.interface_name
-            )
-            if existing:
+            key = (device.id, assign_data.interface_name)
+            if key in assignment_keys:
                 errors.append({
                     "index": idx,
                     "data": assign_data.model_dump(),
@@ -209,15 +232,9 @@ async def bulk_create_assignments(
                 })
                 continue
 
-            assignment = await assignment_service.create_assignment(
-                db, project_id, device.id, assign_data
-            )
-            created.append({
-                "id": assignment.id,
-                "device_name": device.name,
-                "interface_name": assignment.interface_name,
-                "vlan_id": segment.vlan_id,
-            })
+            assignment = assignment_service.build_assignment(project_id, device.id, assign_data)
+            assignment_keys.add(key)
+            pending.append((idx, assign_data, device, segment, assignment))
         except Exception as e:
             errors.append({
                 "index": idx,
@@ -225,6 +242,27 @@ async def bulk_create_assignments(
                 "error": str(e),
             })
 
+    try:
+        await assignment_service.create_assignments_bulk(db, [a for *_, a in pending])
+    except IntegrityError as e:
+        await db.rollback()
+        errors.extend(
+            {
+                "index": idx,
+                "data": assign_data.model_dump(),
+                "error": f"Lô bị hủy do vi phạm ràng buộc dữ liệu: {e.orig}",
+            }
+            for idx, assign_data, *_ in pending
+        )
+        pending = []
+    for _, _, device, segment, assignment in pending:
+        created.append({
+            "id": assignment.id,
+            "device_name": device.name,
+            "interface_name": assignment.interface_name,
+            "vlan_id": segment.vlan_id,
+        })
+
     return InterfaceL2AssignmentBulkResponse(
         success_count=len(created),
         error_count=len(errors),
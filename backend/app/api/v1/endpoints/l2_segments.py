@@ -8,13 +8,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.deps import get_current_user, get_db
 from app.db.models import User
 from app.schemas.l2_segment import (
+    L2BroadcastDomainsResponse,
     L2SegmentBulkCreate,
     L2SegmentBulkResponse,
     L2SegmentCreate,
     L2SegmentResponse,
     L2SegmentUpdate,
+    L2VlanDomains,
 )
 from app.services import l2_segment as segment_service
+from app.services.l2_domains import get_broadcast_domains
 from app.services import project as project_service
 
 router = APIRouter(prefix="/projects/{project_id}/l2/segments", tags=["l2-segments"])
@@ -39,6 +42,35 @@ async def list_segments(
     return [L2SegmentResponse.model_validate(s) for s in segments]
 
 
+@router.get("/broadcast-domains", response_model=L2BroadcastDomainsResponse)
+async def get_segment_broadcast_domains(
+    project_id: str,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    """Broadcast domain theo VLAN (union-find trên L1 link cùng mang VLAN) và các đảo bị tách."""
+    project = await project_service.get_project_by_id(db, project_id, current_user.id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project không tồn tại")
+    if project.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Không có quyền truy cập project")
+
+    domains = await get_broadcast_domains(db, project_id)
+    return L2BroadcastDomainsResponse(
+        revision=domains.revision,
+        split_vlans=domains.split_vlans,
+        vlans=[
+            L2VlanDomains(
+                vlan_id=vlan_id,
+                name=domains.names.get(vlan_id),
+                components=components,
+                island_count=len(components) - 1,
+            )
+            for vlan_id, components in domains.vlans.items()
+        ],
+    )
+
+
 @router.get("/{segment_id}", response_model=L2SegmentResponse)
 async def get_segment(
     project_id: str,
@@ -1,8 +1,9 @@
 """API endpoints cho L3 Addresses."""
 
-from typing import Annotated
+from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, get_db
@@ -14,12 +15,38 @@ from app.schemas.l3_address import (
     L3AddressResponse,
     L3AddressUpdate,
 )
+from app.schemas.rule_check import RuleCheckResponse
+from app.services import device as device_service
+from app.services import ip_index
 from app.services import l3_address as address_service
 from app.services import project as project_service
 
 router = APIRouter(prefix="/projects/{project_id}/l3/addresses", tags=["l3-addresses"])
 
 
+async def _validate_address_conflict(
+    db: AsyncSession,
+    project_id: str,
+    device_id: str,
+    interface_name: str,
+    ip_address: str,
+    prefix_length: int,
+    address_id: Optional[str] = None,
+) -> None:
+    """Chặn trùng IP / chồng subnet: chỉ đọc các địa chỉ có thể xung đột (O(log n) qua index)."""
+    try:
+        parsed = ip_index.parse_address(ip_address, prefix_length, address_id, device_id, interface_name)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Prefix length {prefix_length} không hợp lệ cho địa chỉ '{ip_address}'",
+        )
+    index = await ip_index.load_address_index(db, project_id, parsed)
+    violation = index.check(parsed)
+    if violation:
+        raise HTTPException(status_code=400, detail=violation[1])
+
+
 def build_address_response(address, device_name=None):
     """Build response với thông tin bổ sung."""
     return L3AddressResponse(
@@ -65,6 +92,23 @@ async def list_addresses(
     return result
 
 
+@router.get("/conflicts", response_model=RuleCheckResponse)
+async def get_address_conflicts(
+    project_id: str,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    """Báo cáo xung đột địa chỉ: trùng IP, subnet chồng lấn, thiếu gateway (RB-401..405)."""
+    project = await project_service.get_project_by_id(db, project_id, current_user.id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project không tồn tại")
+    if project.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Không có quyền truy cập project")
+
+    report = await ip_index.run_address_conflict_report(db, project_id)
+    return RuleCheckResponse(**report.to_dict())
+
+
 @router.get("/{address_id}", response_model=L3AddressResponse)
 async def get_address(
     project_id: str,
@@ -113,6 +157,10 @@ async def create_address(
             detail=f"Device '{data.device_name}' không tồn tại trong project",
         )
 
+    await _validate_address_conflict(
+        db, project_id, device.id, data.interface_name, data.ip_address, data.prefix_length
+    )
+
     address = await address_service.create_address(db, project_id, device.id, data)
     return build_address_response(address, device_name=device.name)
 
@@ -131,14 +179,17 @@ async def bulk_create_addresses(
     if project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Không có quyền truy cập project")
 
+    # Preload index 1 lần, validate in-memory, insert trong 1 transaction.
+    device_by_name = await device_service.get_device_name_map(db, project_id)
+    address_index = await ip_index.load_address_index(db, project_id)
+
     created = []
     errors = []
+    pending = []
 
     for idx, addr_data in enumerate(data.addresses):
         try:
-            device = await address_service.get_device_by_name(
-                db, project_id, addr_data.device_name
-            )
+            device = device_by_name.get(addr_data.device_name)
             if not device:
                 errors.append({
                     "index": idx,
@@ -147,16 +198,25 @@ async def bulk_create_addresses(
                 })
                 continue
 
-            address = await address_service.create_address(
-                db, project_id, device.id, addr_data
+            parsed = ip_index.parse_address(
+                addr_data.ip_address,
+                addr_data.prefix_length,
+                device_id=device.id,
+                interface_name=addr_data.interface_name,
+                device_name=device.name,
             )
-            created.append({
-                "id": address.id,
-                "device_name": device.name,
-                "interface_name": address.interface_name,
-                "ip_address": address.ip_address,
-                "prefix_length": address.prefix_length,
-            })
+            violation = address_index.check(parsed)
+            if violation:
+                errors.append({
+                    "index": idx,
+                    "data": addr_data.model_dump(),
+                    "error": violation[1],
+                })
+                continue
+
+            address = address_service.build_address(project_id, device.id, addr_data)
+            pending.append((idx, addr_data, device, address))
+            address_index.add(parsed)
         except Exception as e:
             errors.append({
                 "index": idx,
@@ -164,6 +224,28 @@ async def bulk_create_addresses(
                 "error": str(e),
             })
 
+    try:
+        await address_service.create_addresses_bulk(db, [a for *_, a in pending])
+    except IntegrityError as e:
+        await db.rollback()
+        errors.extend(
+            {
+                "index": idx,
+                "data": addr_data.model_dump(),
+                "error": f"Lô bị hủy do vi phạm ràng buộc dữ liệu: {e.orig}",
+            }
+            for idx, addr_data, *_ in pending
+        )
+        pending = []
+    for _, _, device, address in pending:
+        created.append({
+            "id": address.id,
+            "device_name": device.name,
+            "interface_name": address.interface_name,
+            "ip_address": address.ip_address,
+            "prefix_length": address.prefix_length,
+        })
+
     return L3AddressBulkResponse(
         success_count=len(created),
         error_count=len(errors),
@@ -211,6 +293,17 @@ async def update_address(
         device = device_result.scalar_one_or_none()
         device_name = device.name if device else None
 
+    if {"device_name", "interface_name", "ip_address", "prefix_length"} & data.model_fields_set:
+        await _validate_address_conflict(
+            db,
+            project_id,
+            device_id or address.device_id,
+            data.interface_name or address.interface_name,
+            data.ip_address or address.ip_address,
+            address.prefix_length if data.prefix_length is None else data.prefix_length,
+            address_id=address.id,
+        )
+
     address = await address_service.update_address(db, address, data, device_id)
     return build_address_response(address, device_name=device_name)
 
@@ -9,10 +9,12 @@ from app.db.session import get_db
 from app.services import device as device_service
 from app.services import link as link_service
 from app.services import area as area_service
+from app.services import entity_events
 from app.services.admin_config import get_admin_config
 from app.services.layout_models import LayoutConfig
 from app.services.simple_layer_layout import simple_layer_layout
 from app.services.layout_cache import get_cache
+from app.services.l2_domains import get_broadcast_domains
 from app.services.device_sizing import (
     compute_device_port_counts,
     auto_resize_devices_by_ports,
@@ -60,6 +62,13 @@ async def compute_auto_layout(
         raise HTTPException(status_code=404, detail="No links found in project")
     links = links or []
 
+    # Snapshot hình học trước khi ghi để phát event layout.applied chỉ với phần thay đổi.
+    if options.apply_to_db:
+        devices_before = {d.id: entity_events.device_geometry(d) for d in devices}
+        areas_before = {
+            a.id: entity_events.area_geometry(a) for a in await area_service.get_areas(db, project_id)
+        }
+
     # Auto-resize devices based on port count (if enabled)
     if options.auto_resize_devices and options.apply_to_db:
         port_stats = await compute_device_port_counts(db, project_id)
@@ -99,6 +108,7 @@ async def compute_auto_layout(
 
         if not l2_assignments:
             raise HTTPException(status_code=404, detail="No L2 assignments found in project")
+        l2_domains = await get_broadcast_domains(db, project_id)
     elif view_mode == "L3":
         from app.db.models import L3Address
         from sqlalchemy import select
@@ -235,7 +245,9 @@ async def compute_auto_layout(
                     "stats": LayoutStats(**layout_result.stats),
                 }
         elif view_mode == "L2":
-            response = compute_layout_l2(devices, links, l2_assignments, l2_segments, config, layout_tuning)
+            response = compute_layout_l2(
+                devices, links, l2_assignments, l2_segments, config, layout_tuning, domains=l2_domains
+            )
             response["areas"] = None
             response["subnet_groups"] = None
         elif view_mode == "L3":
@@ -302,6 +314,17 @@ async def compute_auto_layout(
                     )
             await db.commit()
 
+        devices_after = await device_service.get_devices(db, project_id)
+        areas_after = await area_service.get_areas(db, project_id)
+        event = entity_events.build_layout_event(
+            view_mode,
+            devices_before,
+            {d.id: entity_events.device_geometry(d) for d in devices_after},
+            areas_before,
+            {a.id: entity_events.area_geometry(a) for a in areas_after},
+        )
+        await entity_events.publish(project_id, event["event"], event["data"])
+
     return LayoutResult(**response)
 
 
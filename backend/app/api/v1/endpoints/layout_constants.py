@@ -4,6 +4,30 @@ Layout constants and keyword dictionaries.
 
 import re
 
+# Kích thước hiển thị dùng chung với renderer export (re-export cho code layout cũ).
+from app.services.diagram_metrics import (  # noqa: F401
+    UNIT_PX,
+    LABEL_CHAR_WIDTH_PX,
+    LABEL_PADDING_PX,
+    LABEL_MIN_WIDTH_PX,
+    LABEL_HEIGHT_PX,
+    DEFAULT_DEVICE_WIDTH,
+    DEFAULT_DEVICE_HEIGHT,
+    PORT_CELL_MIN_WIDTH_PX,
+    PORT_CELL_HEIGHT_PX,
+    PORT_CELL_GAP_PX,
+    PORT_BAND_PADDING_X_PX,
+    PORT_BAND_PADDING_Y_PX,
+    PORT_FONT_SIZE_PX,
+    PORT_CELL_TEXT_PADDING_PX,
+    DEVICE_LABEL_FONT_SIZE_PX,
+    DEVICE_BODY_VERTICAL_PADDING_PX,
+    DEVICE_BODY_MIN_HEIGHT_PX,
+    DEVICE_STANDARD_TOTAL_HEIGHT_PX,
+    DEVICE_LABEL_MIN_HEIGHT_PX,
+    DEVICE_MIN_WIDTH_PX,
+)
+
 AREA_PREFIX_RE = re.compile(r"^([A-Za-z0-9]{2,6})(\s*-\s*)")
 SECURITY_AREA_KEYWORDS = ["security", "firewall", "fw", "ids", "ips", "soc"]
 SERVER_AREA_KEYWORDS = ["server", "servers", "storage", "nas", "san"]
@@ -30,33 +54,6 @@ PROJECT_AREA_KEYWORDS = ["project", "proj"]
 IT_AREA_KEYWORDS = ["it"]
 HO_AREA_KEYWORDS = ["head office", "hq", "office", "headquarter", "headquarters"]
 
-# UI uses 120px per logical unit (inch) when mapping to canvas.
-UNIT_PX = 120.0
-LABEL_CHAR_WIDTH_PX = 6.0
-LABEL_PADDING_PX = 8.0
-LABEL_MIN_WIDTH_PX = 24.0
-LABEL_HEIGHT_PX = 16.0
-DEFAULT_DEVICE_WIDTH = 1.2
-DEFAULT_DEVICE_HEIGHT = 0.8
-
-# Port band dimensions – mirror frontend CanvasStage.vue constants
-PORT_CELL_MIN_WIDTH_PX = 30.0
-PORT_CELL_HEIGHT_PX = 18.0
-PORT_CELL_GAP_PX = 2.0
-PORT_BAND_PADDING_X_PX = 6.0
-PORT_BAND_PADDING_Y_PX = 4.0
-PORT_FONT_SIZE_PX = 10.0
-PORT_CELL_TEXT_PADDING_PX = 10.0
-DEVICE_LABEL_FONT_SIZE_PX = 13.0
-DEVICE_BODY_VERTICAL_PADDING_PX = 6.0
-DEVICE_BODY_MIN_HEIGHT_PX = 24.0
-DEVICE_STANDARD_TOTAL_HEIGHT_PX = 76.0
-DEVICE_LABEL_MIN_HEIGHT_PX = max(
-    DEVICE_BODY_MIN_HEIGHT_PX,
-    DEVICE_LABEL_FONT_SIZE_PX + DEVICE_BODY_VERTICAL_PADDING_PX * 2,
-)
-DEVICE_MIN_WIDTH_PX = 96.0
-
 
 def normalize_text(text: str | None) -> str:
     """Normalize text for classification (lowercase, strip)."""
@@ -2,10 +2,12 @@
 Database application functions for layout results.
 """
 
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.layout import DeviceLayout, AreaLayout
 from .layout_constants import DEFAULT_DEVICE_WIDTH, DEFAULT_DEVICE_HEIGHT
+from app.services.geometry import group_bounds, rect_bounds
 from app.services.grid_sync import sync_area_grid_from_geometry, sync_device_grid_from_geometry
 
 
@@ -27,10 +29,10 @@ async def apply_layout_to_db(
     """
     from app.db.models import Device, Area
     from sqlalchemy import select
-    from collections import defaultdict
 
     # Update device positions
-    area_devices = defaultdict(list)
+    placed_rects: list[tuple[float, float, float, float]] = []
+    placed_areas: list[str] = []
 
     for layout in device_layouts:
         device_id = layout["id"]
@@ -61,26 +63,21 @@ async def apply_layout_to_db(
 
             # Track devices by area for bounds calculation
             if device.area_id:
-                area_devices[device.area_id].append({
-                    "x": x,
-                    "y": y,
-                    "width": device.width or DEFAULT_DEVICE_WIDTH,
-                    "height": device.height or DEFAULT_DEVICE_HEIGHT
-                })
+                placed_rects.append(rect_bounds(
+                    x,
+                    y,
+                    device.width or DEFAULT_DEVICE_WIDTH,
+                    device.height or DEFAULT_DEVICE_HEIGHT,
+                ))
+                placed_areas.append(device.area_id)
 
     # Update area positions based on device bounds
     AREA_PADDING = 0.35  # Padding around devices in inches
 
-    for area_id, devices in area_devices.items():
-        if not devices:
-            continue
-
-        # Calculate bounds
-        min_x = min(d["x"] for d in devices)
-        min_y = min(d["y"] for d in devices)
-        max_x = max(d["x"] + d["width"] for d in devices)
-        max_y = max(d["y"] + d["height"] for d in devices)
+    # Calculate bounds (1 lượt cho mọi area)
+    area_bounds = group_bounds(np.asarray(placed_rects, dtype=np.float64).reshape(-1, 4), placed_areas)
 
+    for area_id, (min_x, min_y, max_x, max_y) in area_bounds.items():
         # Apply padding
         area_x = min_x - AREA_PADDING
         area_y = min_y - AREA_PADDING
@@ -4,6 +4,7 @@ L1 layout computation: area-based with tier-aware packing.
 
 import re
 
+from app.services.geometry import bounds, rects_from_xywh
 from app.services.layout_models import LayoutConfig
 from app.services.simple_layer_layout import simple_layer_layout
 from app.schemas.layout import DeviceLayout, AreaLayout, LayoutStats
@@ -19,6 +20,17 @@ from .layout_geometry import (
 from .device_classifier import is_distribution_switch
 
 
+def _node_bounds(nodes: list[dict], node_width: float, node_height: float) -> tuple[float, float, float, float]:
+    """Bao ngoài các node cùng kích thước (x, y là góc trên-trái)."""
+    rects = rects_from_xywh(
+        (n["x"] for n in nodes),
+        (n["y"] for n in nodes),
+        [node_width] * len(nodes),
+        [node_height] * len(nodes),
+    )
+    return bounds(rects)
+
+
 def compute_layout_l1(
     devices: list,
     links: list,
@@ -386,10 +398,9 @@ def compute_layout_l1(
         layout_result = simple_layer_layout(area_devices, area_links, area_micro_config)
 
         if layout_result.devices:
-            min_x = min(d["x"] for d in layout_result.devices)
-            min_y = min(d["y"] for d in layout_result.devices)
-            max_x = max(d["x"] for d in layout_result.devices) + area_micro_config.node_width
-            max_y = max(d["y"] for d in layout_result.devices) + area_micro_config.node_height
+            min_x, min_y, max_x, max_y = _node_bounds(
+                layout_result.devices, area_micro_config.node_width, area_micro_config.node_height
+            )
         else:
             min_x = min_y = 0.0
             max_x = area_micro_config.node_width
@@ -743,14 +754,9 @@ def compute_layout_l1(
         span_x = max(0.0, (area_width - padding * 2) - node_width)
         span_y = max(0.0, (area_height - LABEL_BAND - padding * 2) - node_height)
 
-        layout_span_x = max(
-            node_width,
-            max((d["x"] - min_x) for d in layout_result.devices) + node_width
-        )
-        layout_span_y = max(
-            node_height,
-            max((d["y"] - min_y) for d in layout_result.devices) + node_height
-        )
+        _, _, max_x, max_y = _node_bounds(layout_result.devices, node_width, node_height)
+        layout_span_x = max(node_width, max_x - min_x)
+        layout_span_y = max(node_height, max_y - min_y)
 
         scale_x = 1.0
         if layout_span_x > node_width and span_x > 0:
@@ -2,6 +2,7 @@
 L2 layout computation: VLAN grouping boxes.
 """
 
+from app.services.l2_domains import BroadcastDomains, domains_from_models
 from app.services.layout_models import LayoutConfig
 from app.services.simple_layer_layout import simple_layer_layout
 from app.schemas.layout import DeviceLayout, VlanGroupLayout, LayoutStats
@@ -17,8 +18,13 @@ def compute_layout_l2(
     l2_segments: list,
     config: LayoutConfig,
     layout_tuning: dict | None = None,
+    domains: BroadcastDomains | None = None,
 ) -> dict:
-    """Compute L2 layout: VLAN grouping boxes (NS-like L2 view)."""
+    """Compute L2 layout: VLAN grouping boxes (NS-like L2 view).
+
+    Mỗi VLAN bị tách thành nhiều broadcast domain (xem l2_domains) có 1 box riêng
+    cho từng domain; domains=None thì tính trực tiếp từ assignments/links.
+    """
     tuning = layout_tuning or {}
     GROUP_MIN_WIDTH = 3.0
     GROUP_MIN_HEIGHT = 1.5
@@ -43,8 +49,17 @@ def compute_layout_l2(
         vlan_id = segment["vlan_id"]
         vlan_devices.setdefault(vlan_id, set()).add(assignment.device_id)
 
-    # Convert sets to lists
-    vlan_device_lists = {vlan_id: list(dev_set) for vlan_id, dev_set in vlan_devices.items()}
+    # Split each VLAN by broadcast domain (devices not linked at L2 get their own box)
+    if domains is None:
+        domains = domains_from_models(l2_assignments, links, l2_segments)
+    vlan_device_lists: list[tuple[int, int, int, list[str]]] = []
+    for vlan_id, dev_set in vlan_devices.items():
+        component_index = domains.component_index(vlan_id)
+        parts: dict[int, list[str]] = {}
+        for device_id in dev_set:
+            parts.setdefault(component_index.get(device_id, len(component_index)), []).append(device_id)
+        for domain_index, key in enumerate(sorted(parts)):
+            vlan_device_lists.append((vlan_id, domain_index, len(parts), parts[key]))
 
     # Layout devices within each VLAN group
     vlan_group_layouts: list[dict] = []
@@ -53,7 +68,7 @@ def compute_layout_l2(
     stats_crossings = []
     stats_times = []
 
-    for vlan_id, device_ids in vlan_device_lists.items():
+    for vlan_id, domain_index, domain_count, device_ids in vlan_device_lists:
         if not device_ids:
             continue
 
@@ -103,9 +118,13 @@ def compute_layout_l2(
             (seg["name"] for seg in vlan_map.values() if seg["vlan_id"] == vlan_id),
             f"VLAN {vlan_id}"
         )
+        if domain_count > 1:
+            vlan_name = f"{vlan_name} ({domain_index + 1}/{domain_count})"
 
         vlan_group_layouts.append({
             "vlan_id": vlan_id,
+            "domain_index": domain_index,
+            "domain_count": domain_count,
             "name": vlan_name,
             "width": group_width,
             "height": group_height,
@@ -120,7 +139,7 @@ def compute_layout_l2(
         stats_times.append(layout_result.stats["execution_time_ms"])
 
     # Pack VLAN groups (simple grid packing)
-    vlan_group_layouts.sort(key=lambda g: g["vlan_id"])
+    vlan_group_layouts.sort(key=lambda g: (g["vlan_id"], g["domain_index"]))
 
     max_row_width = 15.0
     current_x = 0.0
@@ -158,6 +177,8 @@ def compute_layout_l2(
             width=group_width,
             height=group_height,
             device_ids=group["device_ids"],
+            domain_index=group["domain_index"],
+            domain_count=group["domain_count"],
         ))
 
         current_x += group_width + GROUP_GAP
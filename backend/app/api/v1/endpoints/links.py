@@ -1,173 +1,40 @@
 """L1 Link endpoints."""
 
-import re
-
 from fastapi import APIRouter, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 
 from app.api.deps import CurrentUser, DBSession
-from app.schemas.link import L1LinkBulkCreate, L1LinkBulkResponse, L1LinkCreate, L1LinkResponse, L1LinkUpdate
-from app.services.device import get_device_by_name
-from app.services.device_port import get_port_by_name
+from app.schemas.link import (
+    L1LinkBulkCreate,
+    L1LinkBulkResponse,
+    L1LinkCleanupRequest,
+    L1LinkCleanupResponse,
+    L1LinkCreate,
+    L1LinkResponse,
+    L1LinkUpdate,
+    L1RedundancyResponse,
+)
+from app.services.device import get_device_by_name, get_device_name_map
+from app.services.device_port import get_port_by_name, get_port_keys
 from app.services.link import (
-    check_link_exists,
-    check_port_in_use,
+    build_link,
     create_link,
+    create_links_bulk,
     delete_link,
     get_link_by_id,
     get_links,
+    load_link_index,
     parse_link_color,
     update_link,
 )
+from app.services.link_cleanup import cleanup_links
 from app.services.link_palette import get_link_color_rgb
+from app.services.link_rules import device_roles, link_violation
 from app.services.project import get_project_by_id
+from app.services.redundancy import get_redundancy_report
 
 router = APIRouter(tags=["links"])
 
-ENDPOINT_TYPES = {"PC", "AP"}
-ENDPOINT_NAME_RE = re.compile(r"\b(PC|PRN|PRINTER|CAM|CCTV|PHONE|IPPHONE|ENDPOINT|CLIENT|TERMINAL)\b", re.IGNORECASE)
-CORE_NAME_RE = re.compile(r"\bCORE\b|SW-CORE|CORE-SW", re.IGNORECASE)
-DIST_NAME_RE = re.compile(r"\bDIST\b|DISTR", re.IGNORECASE)
-SERVER_NAME_RE = re.compile(r"\b(SERVER|SRV|APP|WEB|DB|NAS|SAN|STORAGE|BACKUP)\b", re.IGNORECASE)
-SERVER_SWITCH_RE = re.compile(r"\b(SW|SWITCH)\b", re.IGNORECASE)
-SERVER_AREA_RE = re.compile(r"\bSERVER|STORAGE\b", re.IGNORECASE)
-BUSINESS_AREA_RE = re.compile(r"\b(HEAD\s*OFFICE|HQ|HO|DEPARTMENT|DEPT|PROJECT|IT)\b", re.IGNORECASE)
-ACCESS_NAME_RE = re.compile(r"\bACCESS\b|\bACC\b", re.IGNORECASE)
-
-
-def _is_endpoint_device(device) -> bool:
-    dtype = (getattr(device, "device_type", "") or "").upper()
-    if dtype in ENDPOINT_TYPES:
-        return True
-    return bool(ENDPOINT_NAME_RE.search(getattr(device, "name", "") or ""))
-
-
-def _is_core_or_dist_device(device) -> bool:
-    name = getattr(device, "name", "") or ""
-    dtype = (getattr(device, "device_type", "") or "").upper()
-    if dtype == "SWITCH" and (CORE_NAME_RE.search(name) or DIST_NAME_RE.search(name)):
-        return True
-    return bool(CORE_NAME_RE.search(name) or DIST_NAME_RE.search(name))
-
-
-def _is_switch_device(device) -> bool:
-    dtype = (getattr(device, "device_type", "") or "").upper()
-    return dtype == "SWITCH"
-
-
-def _area_name(device) -> str:
-    return getattr(getattr(device, "area", None), "name", "") or ""
-
-
-def _is_business_area_device(device) -> bool:
-    return bool(BUSINESS_AREA_RE.search(_area_name(device)))
-
-
-def _is_access_switch(device) -> bool:
-    name = getattr(device, "name", "") or ""
-    return _is_switch_device(device) and bool(ACCESS_NAME_RE.search(name))
-
-
-def _is_distribution_switch(device) -> bool:
-    name = getattr(device, "name", "") or ""
-    return _is_switch_device(device) and bool(DIST_NAME_RE.search(name) or CORE_NAME_RE.search(name))
-
-
-def _is_server_device(device) -> bool:
-    dtype = (getattr(device, "device_type", "") or "").upper()
-    if dtype in {"SERVER", "STORAGE"}:
-        return True
-    return bool(SERVER_NAME_RE.search(getattr(device, "name", "") or ""))
-
-
-def _is_server_distribution_switch(device) -> bool:
-    dtype = (getattr(device, "device_type", "") or "").upper()
-    name = getattr(device, "name", "") or ""
-    area_name = getattr(getattr(device, "area", None), "name", "") or ""
-    if dtype != "SWITCH":
-        return False
-    if SERVER_NAME_RE.search(name) and SERVER_SWITCH_RE.search(name):
-        return True
-    if SERVER_AREA_RE.search(area_name):
-        return True
-    if DIST_NAME_RE.search(name) and SERVER_NAME_RE.search(name):
-        return True
-    return False
-
-
-def _is_server_switch(device) -> bool:
-    return _is_server_distribution_switch(device)
-
-
-def _endpoint_uplink_violation(from_device, to_device) -> bool:
-    return (_is_endpoint_device(from_device) and _is_core_or_dist_device(to_device)) or (
-        _is_endpoint_device(to_device) and _is_core_or_dist_device(from_device)
-    )
-
-
-def _server_uplink_violation(from_device, to_device) -> bool:
-    if _is_server_device(from_device) and not _is_server_distribution_switch(to_device):
-        return True
-    if _is_server_device(to_device) and not _is_server_distribution_switch(from_device):
-        return True
-    return False
-
-
-def _device_link_count(links: list, device_id: str, exclude_link_id: str | None = None) -> int:
-    count = 0
-    for link in links:
-        if exclude_link_id and getattr(link, "id", None) == exclude_link_id:
-            continue
-        if link.from_device_id == device_id or link.to_device_id == device_id:
-            count += 1
-    return count
-
-
-def _business_area_link_violation(
-    from_device,
-    to_device,
-    link_count_fn,
-) -> tuple[str, str] | None:
-    for device, other in ((from_device, to_device), (to_device, from_device)):
-        if _is_business_area_device(device) and not _is_access_switch(device):
-            same_area = getattr(device, "area_id", None) == getattr(other, "area_id", None)
-            if not (_is_access_switch(other) and same_area):
-                return (
-                    "BUSINESS_AREA_UPLINK_INVALID",
-                    "Thiết bị trong Area HO/IT/Department/Project chỉ được kết nối đến Access Switch cùng Area.",
-                )
-            if link_count_fn(device.id) >= 1:
-                return (
-                    "BUSINESS_AREA_SINGLE_UPLINK",
-                    "Thiết bị trong Area HO/IT/Department/Project chỉ được có 1 uplink lên Access Switch.",
-                )
-    return None
-
-
-def _access_switch_link_violation(from_device, to_device) -> tuple[str, str] | None:
-    for device, other in ((from_device, to_device), (to_device, from_device)):
-        if _is_access_switch(device):
-            if _is_switch_device(other):
-                if not _is_distribution_switch(other):
-                    return ("ACCESS_UPLINK_INVALID", "Access Switch chỉ được uplink lên Distribution Switch.")
-            else:
-                same_area = getattr(device, "area_id", None) == getattr(other, "area_id", None)
-                if not same_area:
-                    return ("ACCESS_DOWNLINK_INVALID", "Access Switch chỉ được kết nối thiết bị cùng Area.")
-    return None
-
-
-def _server_switch_link_violation(from_device, to_device) -> tuple[str, str] | None:
-    for device, other in ((from_device, to_device), (to_device, from_device)):
-        if _is_server_switch(device):
-            if _is_switch_device(other):
-                if not _is_distribution_switch(other):
-                    return ("SERVER_SWITCH_UPLINK_INVALID", "Server Switch chỉ được uplink lên Distribution Switch.")
-            else:
-                if not _is_server_device(other):
-                    return ("SERVER_SWITCH_DOWNLINK_INVALID", "Server Switch chỉ được kết nối tới thiết bị Server/Storage.")
-    return None
-
-
 async def _verify_project_access(db: DBSession, project_id: str, user_id: str):
     """Verify user có quyền truy cập project."""
     project = await get_project_by_id(db, project_id, user_id)
@@ -241,66 +108,54 @@ async def create_new_link(
     await _validate_port_defined(db, project_id, from_device, data.from_port, "from_port")
     await _validate_port_defined(db, project_id, to_device, data.to_port, "to_port")
 
+    # Link hiện có của 2 device: 1 query, không phụ thuộc kích thước project.
+    link_index = await load_link_index(db, project_id, device_ids=[from_device.id, to_device.id])
+
     # Check duplicate link
-    if await check_link_exists(db, project_id, from_device.id, data.from_port, to_device.id, data.to_port):
+    if link_index.has_link(from_device.id, data.from_port, to_device.id, data.to_port):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Link đã tồn tại",
         )
 
     # Check port already in use
-    if await check_port_in_use(db, project_id, from_device.id, data.from_port):
+    if link_index.port_in_use(from_device.id, data.from_port):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Port '{data.from_port}' trên device '{data.from_device}' đã được sử dụng",
         )
 
-    if await check_port_in_use(db, project_id, to_device.id, data.to_port):
+    if link_index.port_in_use(to_device.id, data.to_port):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Port '{data.to_port}' trên device '{data.to_device}' đã được sử dụng",
         )
 
-    existing_links = await get_links(db, project_id)
-
-    if _endpoint_uplink_violation(from_device, to_device):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Endpoint không được kết nối trực tiếp lên Distribution/Core (phải qua Access).",
-        )
-    violation = _business_area_link_violation(
-        from_device,
-        to_device,
-        lambda device_id: _device_link_count(existing_links, device_id),
-    )
-    if violation:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=violation[1],
-        )
-    violation = _access_switch_link_violation(from_device, to_device)
-    if violation:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=violation[1],
-        )
-    violation = _server_switch_link_violation(from_device, to_device)
+    violation = link_violation(device_roles(from_device), device_roles(to_device), link_index.link_count)
     if violation:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=violation[1],
         )
-    if _server_uplink_violation(from_device, to_device):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Server chỉ được kết nối lên Server Distribution Switch.",
-        )
 
     link = await create_link(db, project_id, from_device, to_device, data)
     link = await get_link_by_id(db, link.id)
     return _link_to_response(link)
 
 
+@router.get("/projects/{project_id}/links/redundancy", response_model=L1RedundancyResponse)
+async def get_link_redundancy(
+    project_id: str,
+    current_user: CurrentUser,
+    db: DBSession,
+    collapse_port_channels: bool = True,
+) -> L1RedundancyResponse:
+    """Articulation device, bridge link và biconnected component của đồ thị L1."""
+    await _verify_project_access(db, project_id, current_user.id)
+    report = await get_redundancy_report(db, project_id, collapse_port_channels)
+    return L1RedundancyResponse(collapse_port_channels=collapse_port_channels, **report.to_dict())
+
+
 @router.get("/projects/{project_id}/links/{link_id}", response_model=L1LinkResponse)
 async def get_link(
     project_id: str,
@@ -365,75 +220,33 @@ async def update_existing_link(
         await _validate_port_defined(db, project_id, effective_from, effective_from_port, "from_port")
     if effective_to and effective_to_port:
         await _validate_port_defined(db, project_id, effective_to, effective_to_port, "to_port")
-    existing_links = await get_links(db, project_id)
-    if effective_from and effective_to and _endpoint_uplink_violation(effective_from, effective_to):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Endpoint không được kết nối trực tiếp lên Distribution/Core (phải qua Access).",
-        )
+    link_index = None
     if effective_from and effective_to:
-        violation = _business_area_link_violation(
-            effective_from,
-            effective_to,
-            lambda device_id: _device_link_count(existing_links, device_id, exclude_link_id=link.id),
+        link_index = await load_link_index(
+            db, project_id, device_ids=[effective_from.id, effective_to.id], exclude_link_id=link.id
         )
+    if effective_from and effective_to:
+        violation = link_violation(device_roles(effective_from), device_roles(effective_to), link_index.link_count)
         if violation:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=violation[1],
             )
-        violation = _access_switch_link_violation(effective_from, effective_to)
-        if violation:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=violation[1],
-            )
-        violation = _server_switch_link_violation(effective_from, effective_to)
-        if violation:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=violation[1],
-            )
-    if effective_from and effective_to and _server_uplink_violation(effective_from, effective_to):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Server chỉ được kết nối lên Server Distribution Switch.",
-        )
 
     if effective_from and effective_to:
-        if await check_link_exists(
-            db,
-            project_id,
-            effective_from.id,
-            effective_from_port,
-            effective_to.id,
-            effective_to_port,
-            exclude_link_id=link.id,
-        ):
+        if link_index.has_link(effective_from.id, effective_from_port, effective_to.id, effective_to_port):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Link đã tồn tại",
             )
 
-        if await check_port_in_use(
-            db,
-            project_id,
-            effective_from.id,
-            effective_from_port,
-            exclude_link_id=link.id,
-        ):
+        if link_index.port_in_use(effective_from.id, effective_from_port):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Port '{effective_from_port}' trên device '{effective_from.name}' đã được sử dụng",
             )
 
-        if await check_port_in_use(
-            db,
-            project_id,
-            effective_to.id,
-            effective_to_port,
-            exclude_link_id=link.id,
-        ):
+        if link_index.port_in_use(effective_to.id, effective_to_port):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Port '{effective_to_port}' trên device '{effective_to.name}' đã được sử dụng",
@@ -473,19 +286,25 @@ async def bulk_create_links(
     """Bulk create links."""
     await _verify_project_access(db, project_id, current_user.id)
 
-    existing_links = await get_links(db, project_id)
-    link_counts: dict[str, int] = {}
-    for link in existing_links:
-        link_counts[link.from_device_id] = link_counts.get(link.from_device_id, 0) + 1
-        link_counts[link.to_device_id] = link_counts.get(link.to_device_id, 0) + 1
+    # Preload index 1 lần, validate in-memory, insert trong 1 transaction.
+    device_by_name = await get_device_name_map(db, project_id)
+    port_keys = await get_port_keys(db, project_id)
+    link_index = await load_link_index(db, project_id)
+    roles_cache = {}
+
+    def roles_for(device):
+        if device.id not in roles_cache:
+            roles_cache[device.id] = device_roles(device)
+        return roles_cache[device.id]
 
     created = []
     errors = []
+    pending = []
 
     for row, link_data in enumerate(data.links):
         try:
             # Check from_device
-            from_device = await get_device_by_name(db, project_id, link_data.from_device)
+            from_device = device_by_name.get(link_data.from_device)
             if not from_device:
                 errors.append({
                     "entity": "link",
@@ -497,7 +316,7 @@ async def bulk_create_links(
                 continue
 
             # Check to_device
-            to_device = await get_device_by_name(db, project_id, link_data.to_device)
+            to_device = device_by_name.get(link_data.to_device)
             if not to_device:
                 errors.append({
                     "entity": "link",
@@ -508,8 +327,7 @@ async def bulk_create_links(
                 })
                 continue
 
-            from_port = await get_port_by_name(db, project_id, from_device.id, link_data.from_port)
-            if not from_port:
+            if (from_device.id, link_data.from_port.strip()) not in port_keys:
                 errors.append({
                     "entity": "link",
                     "row": row,
@@ -519,8 +337,7 @@ async def bulk_create_links(
                 })
                 continue
 
-            to_port = await get_port_by_name(db, project_id, to_device.id, link_data.to_port)
-            if not to_port:
+            if (to_device.id, link_data.to_port.strip()) not in port_keys:
                 errors.append({
                     "entity": "link",
                     "row": row,
@@ -531,7 +348,7 @@ async def bulk_create_links(
                 continue
 
             # Check duplicate
-            if await check_link_exists(db, project_id, from_device.id, link_data.from_port, to_device.id, link_data.to_port):
+            if link_index.has_link(from_device.id, link_data.from_port, to_device.id, link_data.to_port):
                 errors.append({
                     "entity": "link",
                     "row": row,
@@ -540,37 +357,7 @@ async def bulk_create_links(
                 })
                 continue
 
-            if _endpoint_uplink_violation(from_device, to_device):
-                errors.append({
-                    "entity": "link",
-                    "row": row,
-                    "code": "ENDPOINT_UPLINK_INVALID",
-                    "message": "Endpoint không được kết nối trực tiếp lên Distribution/Core (phải qua Access).",
-                })
-                continue
-            violation = _business_area_link_violation(
-                from_device,
-                to_device,
-                lambda device_id: link_counts.get(device_id, 0),
-            )
-            if violation:
-                errors.append({
-                    "entity": "link",
-                    "row": row,
-                    "code": violation[0],
-                    "message": violation[1],
-                })
-                continue
-            violation = _access_switch_link_violation(from_device, to_device)
-            if violation:
-                errors.append({
-                    "entity": "link",
-                    "row": row,
-                    "code": violation[0],
-                    "message": violation[1],
-                })
-                continue
-            violation = _server_switch_link_violation(from_device, to_device)
+            violation = link_violation(roles_for(from_device), roles_for(to_device), link_index.link_count)
             if violation:
                 errors.append({
                     "entity": "link",
@@ -579,23 +366,10 @@ async def bulk_create_links(
                     "message": violation[1],
                 })
                 continue
-            if _server_uplink_violation(from_device, to_device):
-                errors.append({
-                    "entity": "link",
-                    "row": row,
-                    "code": "SERVER_UPLINK_INVALID",
-                    "message": "Server chỉ được kết nối lên Server Distribution Switch.",
-                })
-                continue
 
-            link = await create_link(db, project_id, from_device, to_device, link_data)
-            created.append({
-                "id": link.id,
-                "name": f"{link_data.from_device}:{link_data.from_port} -> {link_data.to_device}:{link_data.to_port}",
-                "row": row,
-            })
-            link_counts[from_device.id] = link_counts.get(from_device.id, 0) + 1
-            link_counts[to_device.id] = link_counts.get(to_device.id, 0) + 1
+            link = build_link(project_id, from_device, to_device, link_data)
+            pending.append((row, link_data, link))
+            link_index.add(from_device.id, link_data.from_port, to_device.id, link_data.to_port)
         except Exception as e:
             errors.append({
                 "entity": "link",
@@ -604,9 +378,49 @@ async def bulk_create_links(
                 "message": str(e),
             })
 
+    try:
+        await create_links_bulk(db, [link for _, _, link in pending])
+    except IntegrityError as e:
+        await db.rollback()
+        errors.extend(
+            {
+                "entity": "link",
+                "row": row,
+                "code": "BULK_INTEGRITY_ERROR",
+                "message": f"Lô bị hủy do vi phạm ràng buộc dữ liệu: {e.orig}",
+            }
+            for row, _, _ in pending
+        )
+        pending = []
+    for row, link_data, link in pending:
+        created.append({
+            "id": link.id,
+            "name": f"{link_data.from_device}:{link_data.from_port} -> {link_data.to_device}:{link_data.to_port}",
+            "row": row,
+        })
+
     return L1LinkBulkResponse(
         success_count=len(created),
         error_count=len(errors),
         created=created,
         errors=errors,
     )
+
+
+@router.post("/projects/{project_id}/links/cleanup", response_model=L1LinkCleanupResponse)
+async def cleanup_invalid_links(
+    project_id: str,
+    data: L1LinkCleanupRequest,
+    current_user: CurrentUser,
+    db: DBSession,
+) -> L1LinkCleanupResponse:
+    """Tìm (dry_run) hoặc xóa theo lô các link vi phạm rule tạo link."""
+    await _verify_project_access(db, project_id, current_user.id)
+    plan = await cleanup_links(
+        db,
+        project_id,
+        dry_run=data.dry_run,
+        codes=set(data.codes) if data.codes is not None else None,
+        link_ids=set(data.link_ids) if data.link_ids is not None else None,
+    )
+    return L1LinkCleanupResponse(dry_run=data.dry_run, **plan.to_dict())
@@ -3,6 +3,7 @@
 from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, get_db
@@ -14,6 +15,7 @@ from app.schemas.port_channel import (
     PortChannelResponse,
     PortChannelUpdate,
 )
+from app.services import device as device_service
 from app.services import port_channel as port_channel_service
 from app.services import project as project_service
 
@@ -168,14 +170,17 @@ async def bulk_create_port_channels(
     if project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Không có quyền truy cập project")
 
+    # Preload index 1 lần, validate in-memory, insert trong 1 transaction.
+    device_by_name = await device_service.get_device_name_map(db, project_id)
+    name_keys, number_keys = await port_channel_service.get_port_channel_keys(db, project_id)
+
     created = []
     errors = []
+    pending = []
 
     for idx, pc_data in enumerate(data.port_channels):
         try:
-            device = await port_channel_service.get_device_by_name(
-                db, project_id, pc_data.device_name
-            )
+            device = device_by_name.get(pc_data.device_name)
             if not device:
                 errors.append({
                     "index": idx,
@@ -209,10 +214,7 @@ async def bulk_create_port_channels(
                     })
                     continue
 
-            existing_by_name = await port_channel_service.get_port_channel_by_name(
-                db, project_id, device.id, pc_data.name
-            )
-            if existing_by_name:
+            if (device.id, pc_data.name) in name_keys:
                 errors.append({
                     "index": idx,
                     "data": pc_data.model_dump(),
@@ -220,10 +222,7 @@ async def bulk_create_port_channels(
                 })
                 continue
 
-            existing_by_number = await port_channel_service.get_port_channel_by_number(
-                db, project_id, device.id, channel_number
-            )
-            if existing_by_number:
+            if (device.id, channel_number) in number_keys:
                 errors.append({
                     "index": idx,
                     "data": pc_data.model_dump(),
@@ -231,15 +230,12 @@ async def bulk_create_port_channels(
                 })
                 continue
 
-            port_channel = await port_channel_service.create_port_channel(
-                db, project_id, device.id, pc_data, channel_number
+            port_channel = port_channel_service.build_port_channel(
+                project_id, device.id, pc_data, channel_number
             )
-            created.append({
-                "id": port_channel.id,
-                "device_name": device.name,
-                "name": port_channel.name,
-                "channel_number": port_channel.channel_number,
-            })
+            name_keys.add((device.id, pc_data.name))
+            number_keys.add((device.id, channel_number))
+            pending.append((idx, pc_data, device, port_channel))
         except Exception as e:
             errors.append({
                 "index": idx,
@@ -247,6 +243,27 @@ async def bulk_create_port_channels(
                 "error": str(e),
             })
 
+    try:
+        await port_channel_service.create_port_channels_bulk(db, [pc for *_, pc in pending])
+    except IntegrityError as e:
+        await db.rollback()
+        errors.extend(
+            {
+                "index": idx,
+                "data": pc_data.model_dump(),
+                "error": f"Lô bị hủy do vi phạm ràng buộc dữ liệu: {e.orig}",
+            }
+            for idx, pc_data, *_ in pending
+        )
+        pending = []
+    for _, _, device, port_channel in pending:
+        created.append({
+            "id": port_channel.id,
+            "device_name": device.name,
+            "name": port_channel.name,
+            "channel_number": port_channel.channel_number,
+        })
+
     return PortChannelBulkResponse(
         success_count=len(created),
         error_count=len(errors),
@@ -0,0 +1,27 @@
+"""Rule check endpoints."""
+
+from fastapi import APIRouter, HTTPException, status
+
+from app.api.deps import CurrentUser, DBSession
+from app.schemas.rule_check import RuleCheckResponse
+from app.services.project import get_project_by_id
+from app.services.rule_check import run_rule_checks
+
+router = APIRouter(tags=["rule-checks"])
+
+
+@router.get("/projects/{project_id}/rule-checks", response_model=RuleCheckResponse)
+async def check_project_rules(
+    project_id: str,
+    current_user: CurrentUser,
+    db: DBSession,
+) -> RuleCheckResponse:
+    """Chạy rule check (layout & logic) cho cả project; ERROR chặn export."""
+    project = await get_project_by_id(db, project_id, current_user.id)
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project không tồn tại",
+        )
+    report = await run_rule_checks(db, project_id)
+    return RuleCheckResponse(**report.to_dict())
@@ -2,23 +2,17 @@
 Waypoint area creation and management for inter-area links.
 """
 
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.layout import AreaLayout
+from app.services import geometry
+from app.services.geometry import point_in_rect
 from app.services.grid_sync import sync_area_grid_from_geometry
 
 
 def rect_bounds(layout: AreaLayout) -> tuple[float, float, float, float]:
-    left = layout.x
-    top = layout.y
-    right = layout.x + layout.width
-    bottom = layout.y + layout.height
-    return left, top, right, bottom
-
-
-def point_in_rect(px: float, py: float, rect: tuple[float, float, float, float]) -> bool:
-    left, top, right, bottom = rect
-    return left <= px <= right and top <= py <= bottom
+    return geometry.rect_bounds(layout.x, layout.y, layout.width, layout.height)
 
 
 def compute_waypoint_center(
@@ -31,10 +25,12 @@ def compute_waypoint_center(
     left_a, top_a, right_a, bottom_a = rect_bounds(la)
     left_b, top_b, right_b, bottom_b = rect_bounds(lb)
 
-    overlap_x = min(right_a, right_b) - max(left_a, left_b)
-    overlap_y = min(bottom_a, bottom_b) - max(top_a, top_b)
-    horizontal_gap = max(0.0, max(left_a, left_b) - min(right_a, right_b))
-    vertical_gap = max(0.0, max(top_a, top_b) - min(bottom_a, bottom_b))
+    _, overlaps_x, overlaps_y = geometry.box_gaps(
+        np.array([rect_bounds(la)]), np.array([rect_bounds(lb)])
+    )
+    overlap_x, overlap_y = float(overlaps_x[0]), float(overlaps_y[0])
+    horizontal_gap = max(0.0, -overlap_x)
+    vertical_gap = max(0.0, -overlap_y)
 
     if right_a <= left_b:
         cx = (right_a + left_b) / 2
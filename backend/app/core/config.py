@@ -23,6 +23,30 @@ DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 EXPORTS_DIR = os.getenv("EXPORTS_DIR", "./exports")
+# Prefix location internal của nginx cho EXPORTS_DIR: tải file qua X-Accel-Redirect ("" = backend tự stream).
+EXPORT_ACCEL_REDIRECT_PREFIX = os.getenv("EXPORT_ACCEL_REDIRECT_PREFIX", "")
+# Prefix Unix datagram socket để API đánh thức export worker ngay khi có job mới ("" = tắt);
+# mỗi worker bind "<prefix>.<pid>-<uuid8>" riêng.
+EXPORT_WAKEUP_SOCKET = os.getenv("EXPORT_WAKEUP_SOCKET", "./data/export_worker.sock")
+# Lease của job đang chạy: worker gia hạn định kỳ, hết hạn thì job được requeue (tối đa N lần).
+EXPORT_LEASE_SECONDS = float(os.getenv("EXPORT_LEASE_SECONDS", "60"))
+EXPORT_MAX_ATTEMPTS = int(os.getenv("EXPORT_MAX_ATTEMPTS", "3"))
+# Dọn file export (0 = không giới hạn tiêu chí đó).
+EXPORT_RETENTION_DAYS = float(os.getenv("EXPORT_RETENTION_DAYS", "30"))
+EXPORT_KEEP_LAST = int(os.getenv("EXPORT_KEEP_LAST", "50"))
+EXPORT_PROJECT_QUOTA_MB = int(os.getenv("EXPORT_PROJECT_QUOTA_MB", "0"))
+EXPORT_TOTAL_QUOTA_MB = int(os.getenv("EXPORT_TOTAL_QUOTA_MB", "0"))
+EXPORT_GC_INTERVAL = float(os.getenv("EXPORT_GC_INTERVAL", "300"))
+# Nhịp đọc trạng thái export job cho WebSocket (1 lần/project, không theo số kết nối).
+WS_EXPORT_POLL_INTERVAL = float(os.getenv("WS_EXPORT_POLL_INTERVAL", "2"))
+# Hàng đợi gửi mỗi WebSocket: đầy thì bỏ message cũ; bỏ quá N liên tiếp hoặc gửi quá timeout thì ngắt.
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+WS_MAX_DROPS = int(os.getenv("WS_MAX_DROPS", "32"))
+# Gom broadcast của 1 project trong cửa sổ N ms thành 1 frame (0 = gửi ngay).
+WS_COALESCE_MS = float(os.getenv("WS_COALESCE_MS", "30"))
+# Chuyển broadcast WebSocket giữa các process API: "local" (1 process) hoặc "unix:<thư mục socket>".
+WS_BROKER = os.getenv("WS_BROKER", "local")
 ALLOW_SELF_REGISTER = os.getenv("ALLOW_SELF_REGISTER", "false").lower() == "true"
 
 _frontend_urls = os.getenv("FRONTEND_URLS", "").split(",")
@@ -2,6 +2,7 @@
 
 import uuid
 from datetime import datetime
+from itertools import chain
 from typing import Optional
 
 from sqlalchemy import (
@@ -10,12 +11,17 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     String,
     Text,
     UniqueConstraint,
+    event,
+    text,
+    update,
 )
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
 
 from app.db.base import Base
 
@@ -60,6 +66,7 @@ class Project(Base):
     description: Mapped[Optional[str]] = mapped_column(Text)
     owner_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), nullable=False)
     layout_mode: Mapped[str] = mapped_column(String(20), default="standard")  # one-style
+    revision: Mapped[int] = mapped_column(Integer, default=0)  # Tăng mỗi lần dữ liệu project thay đổi
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
@@ -193,6 +200,11 @@ LINE_STYLES = ["solid", "dashed", "dotted"]
 
 class L1Link(Base):
     __tablename__ = "l1_links"
+    __table_args__ = (
+        # Validate link đơn chỉ đọc link của 2 device liên quan.
+        Index("ix_l1_links_from_device_port", "from_device_id", "from_port"),
+        Index("ix_l1_links_to_device_port", "to_device_id", "to_port"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
     project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id"), nullable=False)
@@ -316,6 +328,8 @@ class InterfaceL2Assignment(Base):
     port_mode: Mapped[str] = mapped_column(String(10), nullable=False)  # access | trunk
     native_vlan: Mapped[Optional[int]] = mapped_column(Integer)
     allowed_vlans_json: Mapped[Optional[str]] = mapped_column(Text)  # [10, 20, 30]
+    # Bitset 4096 bit packed (xem services/vlan_bitset.py); None = cho phép mọi VLAN.
+    allowed_vlans_bitmap: Mapped[Optional[bytes]] = mapped_column(LargeBinary(512))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -329,6 +343,11 @@ class InterfaceL2Assignment(Base):
 
 class L3Address(Base):
     __tablename__ = "l3_addresses"
+    __table_args__ = (
+        # Kiểm tra trùng IP / chồng subnet khi tạo chỉ tra index, không đọc cả project.
+        Index("ix_l3_addresses_project_ip_key", "project_id", "ip_key"),
+        Index("ix_l3_addresses_project_network_key", "project_id", "network_key"),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
     project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id"), nullable=False)
@@ -338,6 +357,9 @@ class L3Address(Base):
     prefix_length: Mapped[int] = mapped_column(Integer, nullable=False)
     is_secondary: Mapped[bool] = mapped_column(Boolean, default=False)
     description: Mapped[Optional[str]] = mapped_column(String(255))
+    # Số nguyên của IP / network dạng "<version><hex cố định>" (xem services/ip_index.py).
+    ip_key: Mapped[Optional[str]] = mapped_column(String(33))
+    network_key: Mapped[Optional[str]] = mapped_column(String(33))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -355,11 +377,29 @@ EXPORT_TYPES = ["l1_diagram", "l2_diagram", "l3_diagram", "device_file", "master
 
 class ExportJob(Base):
     __tablename__ = "export_jobs"
+    __table_args__ = (
+        Index("ix_export_jobs_project_created", "project_id", "created_at"),
+        Index("ix_export_jobs_status_lease", "status", "lease_expires_at"),
+        # Con trỏ retention duyệt job đã kết thúc từ mới tới cũ theo (completed_at, id).
+        Index("ix_export_jobs_completed", "completed_at", "id"),
+        # Mỗi dedup_key chỉ có tối đa 1 job đang chờ/chạy.
+        Index(
+            "uq_export_jobs_active_dedup_key",
+            "dedup_key",
+            unique=True,
+            sqlite_where=text("status IN ('pending', 'processing')"),
+        ),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
     project_id: Mapped[str] = mapped_column(String(36), ForeignKey("projects.id"), nullable=False)
     export_type: Mapped[str] = mapped_column(String(20), nullable=False)
     status: Mapped[str] = mapped_column(String(20), default="pending")
+    priority: Mapped[int] = mapped_column(Integer, default=0)  # Cao hơn được claim trước
+    attempts: Mapped[int] = mapped_column(Integer, default=0)  # Số lần đã claim
+    worker_id: Mapped[Optional[str]] = mapped_column(String(100))  # Worker đang giữ lease
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     progress: Mapped[int] = mapped_column(Integer, default=0)
     message: Mapped[Optional[str]] = mapped_column(String(255))
     file_path: Mapped[Optional[str]] = mapped_column(String(500))
@@ -367,6 +407,8 @@ class ExportJob(Base):
     file_size: Mapped[Optional[int]] = mapped_column(Integer)
     error_message: Mapped[Optional[str]] = mapped_column(Text)
     options_json: Mapped[Optional[str]] = mapped_column(Text)  # Export options as JSON
+    project_revision: Mapped[Optional[int]] = mapped_column(Integer)  # Revision project lúc tạo job
+    dedup_key: Mapped[Optional[str]] = mapped_column(String(64), index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     started_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
@@ -387,3 +429,42 @@ class AdminConfig(Base):
     config_key: Mapped[str] = mapped_column(String(50), unique=True, default="global")
     config_json: Mapped[str] = mapped_column(Text, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ============================================================================
+# Project revision
+# ============================================================================
+
+# Model thuộc project mà thay đổi làm output export/phân tích khác đi.
+PROJECT_SCOPED_MODELS = (
+    Area,
+    Device,
+    DevicePort,
+    L1Link,
+    PortAnchorOverride,
+    PortChannel,
+    VirtualPort,
+    L2Segment,
+    InterfaceL2Assignment,
+    L3Address,
+)
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_project_revision(session: Session, flush_context, instances) -> None:
+    """Tăng Project.revision cho mọi project có dữ liệu được thêm/sửa/xóa trong flush."""
+    project_ids: set[str] = set()
+    modified = (obj for obj in session.dirty if session.is_modified(obj))
+    for obj in chain(session.new, session.deleted, modified):
+        if isinstance(obj, PROJECT_SCOPED_MODELS):
+            if obj.project_id:
+                project_ids.add(obj.project_id)
+        elif isinstance(obj, Project) and obj.id and obj not in session.new and obj not in session.deleted:
+            project_ids.add(obj.id)
+    if project_ids:
+        session.execute(
+            update(Project)
+            .where(Project.id.in_(project_ids))
+            .values(revision=Project.revision + 1)
+            .execution_options(synchronize_session="fetch")
+        )
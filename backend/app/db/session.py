@@ -3,6 +3,8 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 
 from app.db.models import generate_uuid
 from app.services.grid_excel import GRID_CELL_UNITS, parse_excel_range, rect_units_to_excel_range
+from app.services.ip_index import address_keys
+from app.services.vlan_bitset import bitmap_from_json
 
 from app.core.config import DATABASE_URL
 from app.db.base import Base
@@ -138,6 +140,41 @@ async def _backfill_grid_ranges(conn) -> None:
         )
 
 
+async def _backfill_address_keys(conn) -> None:
+    rows = (
+        await conn.execute(
+            text("SELECT id, ip_address, prefix_length FROM l3_addresses WHERE ip_key IS NULL")
+        )
+    ).fetchall()
+    for address_id, ip_address, prefix_length in rows:
+        ip_key, network_key = address_keys(str(ip_address or ""), int(prefix_length or 0))
+        if ip_key is None:
+            continue
+        await conn.execute(
+            text("UPDATE l3_addresses SET ip_key = :ip_key, network_key = :network_key WHERE id = :id"),
+            {"id": address_id, "ip_key": ip_key, "network_key": network_key},
+        )
+
+
+async def _backfill_vlan_bitmaps(conn) -> None:
+    rows = (
+        await conn.execute(
+            text(
+                "SELECT id, allowed_vlans_json FROM interface_l2_assignments "
+                "WHERE allowed_vlans_bitmap IS NULL AND allowed_vlans_json IS NOT NULL"
+            )
+        )
+    ).fetchall()
+    for assignment_id, allowed_vlans_json in rows:
+        bitmap = bitmap_from_json(allowed_vlans_json)
+        if bitmap is None:
+            continue
+        await conn.execute(
+            text("UPDATE interface_l2_assignments SET allowed_vlans_bitmap = :bitmap WHERE id = :id"),
+            {"id": assignment_id, "bitmap": bitmap},
+        )
+
+
 async def init_db() -> None:
     async with engine.begin() as conn:
         await conn.execute(text("PRAGMA journal_mode=WAL"))
@@ -147,8 +184,52 @@ async def init_db() -> None:
         await _ensure_column(conn, "areas", "grid_range", "TEXT")
         await _ensure_column(conn, "devices", "grid_range", "TEXT")
         await _ensure_column(conn, "l1_links", "color_rgb_json", "TEXT")
+        await _ensure_column(conn, "export_jobs", "priority", "INTEGER DEFAULT 0")
+        await _ensure_column(conn, "projects", "revision", "INTEGER DEFAULT 0")
+        await _ensure_column(conn, "export_jobs", "project_revision", "INTEGER")
+        await _ensure_column(conn, "export_jobs", "dedup_key", "VARCHAR(64)")
+        await _ensure_column(conn, "export_jobs", "attempts", "INTEGER DEFAULT 0")
+        await _ensure_column(conn, "export_jobs", "worker_id", "VARCHAR(100)")
+        await _ensure_column(conn, "export_jobs", "heartbeat_at", "DATETIME")
+        await _ensure_column(conn, "export_jobs", "lease_expires_at", "DATETIME")
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_export_jobs_dedup_key ON export_jobs (dedup_key)"))
+        await conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_export_jobs_status_lease ON export_jobs (status, lease_expires_at)")
+        )
+        await conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_export_jobs_project_created ON export_jobs (project_id, created_at)")
+        )
+        await conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_export_jobs_completed ON export_jobs (completed_at, id)")
+        )
+        await conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_l1_links_from_device_port ON l1_links (from_device_id, from_port)")
+        )
+        await conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_l1_links_to_device_port ON l1_links (to_device_id, to_port)")
+        )
+        await _ensure_column(conn, "interface_l2_assignments", "allowed_vlans_bitmap", "BLOB")
+        await _ensure_column(conn, "l3_addresses", "ip_key", "VARCHAR(33)")
+        await _ensure_column(conn, "l3_addresses", "network_key", "VARCHAR(33)")
+        await conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_l3_addresses_project_ip_key ON l3_addresses (project_id, ip_key)")
+        )
+        await conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_l3_addresses_project_network_key "
+                "ON l3_addresses (project_id, network_key)"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_export_jobs_active_dedup_key ON export_jobs (dedup_key) "
+                "WHERE status IN ('pending', 'processing')"
+            )
+        )
         await _backfill_grid_ranges(conn)
         await _backfill_device_ports(conn)
+        await _backfill_address_keys(conn)
+        await _backfill_vlan_bitmaps(conn)
 
 
 async def get_db() -> AsyncSession:
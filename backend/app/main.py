@@ -4,6 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.router import api_router
 from app.core.config import FRONTEND_URLS
 from app.db.session import init_db
+from app.services.ws_manager import ws_manager
 
 app = FastAPI(title="BSV Network Sketcher API", version="0.1.0")
 app.add_middleware(
@@ -19,3 +20,9 @@ app.include_router(api_router)
 @app.on_event("startup")
 async def on_startup() -> None:
     await init_db()
+    await ws_manager.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await ws_manager.stop()
@@ -11,9 +11,18 @@ ExportType = Literal[
     "l3_diagram",
     "device_file",
     "master_file",
+    "bundle",
 ]
 
-ExportFormat = Literal["pptx", "pdf", "png", "xlsx"]
+BundleArtifact = Literal[
+    "l1_diagram",
+    "l2_diagram",
+    "l3_diagram",
+    "device_file",
+    "master_file",
+]
+
+ExportFormat = Literal["pptx", "pdf", "png", "xlsx", "zip"]
 ExportMode = Literal["all_areas", "per_area"]
 ExportTheme = Literal["default", "contrast", "dark", "light"]
 
@@ -34,6 +43,7 @@ class ExportRequest(BaseModel):
     theme: ExportTheme = "default"
     format: Optional[ExportFormat] = None
     version_id: Optional[str] = None
+    artifacts: Optional[list[BundleArtifact]] = Field(default=None, min_length=1)  # Chỉ dùng cho bundle
 
 
 class ExportJobResponse(BaseModel):
@@ -43,12 +53,16 @@ class ExportJobResponse(BaseModel):
     project_id: str
     export_type: ExportType
     status: str
+    priority: int = 0
+    attempts: int = 0
     progress: int = 0
     message: Optional[str] = None
     file_name: Optional[str] = None
     file_size: Optional[int] = None
+    download_url: Optional[str] = None
     error_message: Optional[str] = None
     options: Optional[dict[str, Any]] = None
+    project_revision: Optional[int] = None
     created_at: datetime
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
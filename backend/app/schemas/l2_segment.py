@@ -49,3 +49,20 @@ class L2SegmentBulkResponse(BaseModel):
     error_count: int
     created: list[dict]
     errors: list[dict]
+
+
+class L2VlanDomains(BaseModel):
+    """Broadcast domain của 1 VLAN: component lớn nhất đứng đầu, phần còn lại là đảo bị tách."""
+
+    vlan_id: int
+    name: Optional[str] = None
+    components: list[list[str]]
+    island_count: int
+
+
+class L2BroadcastDomainsResponse(BaseModel):
+    """Broadcast domain L2 toàn project."""
+
+    revision: Optional[int] = None
+    split_vlans: list[int]
+    vlans: list[L2VlanDomains]
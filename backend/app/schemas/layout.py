@@ -129,6 +129,8 @@ class VlanGroupLayout(BaseModel):
     width: float = Field(description="Width (inches)")
     height: float = Field(description="Height (inches)")
     device_ids: list[str] = Field(description="List of device IDs in this VLAN")
+    domain_index: int = Field(default=0, description="Index of the broadcast domain within the VLAN (0 = largest)")
+    domain_count: int = Field(default=1, description="Number of broadcast domains the VLAN is split into")
 
     class Config:
         json_schema_extra = {
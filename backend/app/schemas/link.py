@@ -105,3 +105,67 @@ class L1LinkBulkResponse(BaseModel):
     error_count: int
     created: list[dict]
     errors: list[dict]
+
+
+class L1LinkCleanupRequest(BaseModel):
+    """Request dọn link vi phạm rule."""
+
+    dry_run: bool = True
+    codes: Optional[list[str]] = Field(default=None, description="Chỉ xử lý các code vi phạm này")
+    link_ids: Optional[list[str]] = Field(default=None, description="Chỉ xóa các link này (diff đã duyệt)")
+
+
+class L1LinkCleanupItem(BaseModel):
+    """Link sẽ bị (hoặc đã bị) xóa."""
+
+    id: str
+    from_device: str
+    from_port: str
+    to_device: str
+    to_port: str
+    code: str
+    message: str
+
+
+class L1LinkCleanupResponse(BaseModel):
+    """Kết quả dọn link."""
+
+    dry_run: bool
+    total_links: int
+    delete_count: int
+    items: list[L1LinkCleanupItem]
+
+
+class L1ArticulationPoint(BaseModel):
+    """Device là điểm chết đơn lẻ."""
+
+    device_id: str
+    device_name: Optional[str] = None
+    split_count: int = Field(description="Số mảnh topology tách thêm khi mất device này")
+
+
+class L1Bridge(BaseModel):
+    """Cạnh (link hoặc bundle PortChannel) mà mất đi thì topology bị tách."""
+
+    from_device_id: str
+    to_device_id: str
+    link_ids: list[str]
+    port_channels: list[str]
+
+
+class L1BiconnectedComponent(BaseModel):
+    """Nhóm device/link không có điểm chết đơn lẻ bên trong."""
+
+    device_ids: list[str]
+    link_ids: list[str]
+
+
+class L1RedundancyResponse(BaseModel):
+    """Phân tích dự phòng trên đồ thị L1."""
+
+    revision: Optional[int] = None
+    collapse_port_channels: bool
+    checked: dict[str, int]
+    articulation_points: list[L1ArticulationPoint]
+    bridges: list[L1Bridge]
+    biconnected_components: list[L1BiconnectedComponent]
@@ -0,0 +1,26 @@
+"""Schemas cho Rule Check."""
+
+from typing import Literal
+
+from pydantic import BaseModel
+
+Severity = Literal["ERROR", "WARN", "INFO"]
+
+
+class RuleCheckFinding(BaseModel):
+    """Một vi phạm rule."""
+
+    rule: str
+    severity: Severity
+    entity_type: str
+    entity_ids: list[str]
+    message: str
+
+
+class RuleCheckResponse(BaseModel):
+    """Kết quả rule check toàn project."""
+
+    summary: dict[str, int]
+    export_blocked: bool
+    checked: dict[str, int]
+    findings: list[RuleCheckFinding]
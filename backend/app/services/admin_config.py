@@ -45,7 +45,8 @@ DEFAULT_ADMIN_CONFIG: Dict[str, Any] = {
 
 
 def _merge_defaults(config: Dict[str, Any]) -> Dict[str, Any]:
-    merged = dict(DEFAULT_ADMIN_CONFIG)
+    # Giữ các nhánh khác (vd validation.layout_checks) để rule check đọc được.
+    merged = {**DEFAULT_ADMIN_CONFIG, **config}
     merged_layout = dict(DEFAULT_ADMIN_CONFIG.get("layout_tuning", {}))
     merged_render = dict(DEFAULT_ADMIN_CONFIG.get("render_tuning", {}))
 
@@ -6,8 +6,10 @@ from typing import Optional
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.models import Area
+from app.db.models import Area, Device
 from app.schemas.area import AreaCreate, AreaStyle, AreaUpdate
+from app.services import entity_events
+from app.services.link import delete_links_of_devices
 from app.services.grid_excel import (
     GRID_CELL_UNITS,
     excel_range_to_rect_units,
@@ -49,6 +51,12 @@ async def get_area_by_name(db: AsyncSession, project_id: str, name: str) -> Opti
     return result.scalar_one_or_none()
 
 
+async def get_area_name_map(db: AsyncSession, project_id: str) -> dict[str, Area]:
+    """Lấy map name -> area của project (1 query, dùng cho bulk)."""
+    areas = await get_areas(db, project_id)
+    return {area.name: area for area in areas}
+
+
 async def create_area(db: AsyncSession, project_id: str, data: AreaCreate) -> Area:
     """Tạo area mới."""
     style_json = None
@@ -92,11 +100,13 @@ async def create_area(db: AsyncSession, project_id: str, data: AreaCreate) -> Ar
     db.add(area)
     await db.commit()
     await db.refresh(area)
+    await entity_events.publish_created(project_id, "area", [entity_events.area_snapshot(area)])
     return area
 
 
 async def update_area(db: AsyncSession, area: Area, data: AreaUpdate) -> Area:
     """Cập nhật area."""
+    before = entity_events.area_snapshot(area)
     update_data = data.model_dump(exclude_unset=True)
 
     if "style" in update_data and update_data["style"]:
@@ -138,13 +148,23 @@ async def update_area(db: AsyncSession, area: Area, data: AreaUpdate) -> Area:
 
     await db.commit()
     await db.refresh(area)
+    await entity_events.publish_updated(area.project_id, "area", before, entity_events.area_snapshot(area))
     return area
 
 
 async def delete_area(db: AsyncSession, area: Area) -> None:
-    """Xóa area."""
+    """Xóa area cùng các device bên trong và link nối vào các device đó."""
+    project_id, area_id = area.project_id, area.id
+    devices = list((await db.execute(select(Device).where(Device.area_id == area_id))).scalars())
+    device_ids = [device.id for device in devices]
+    link_ids = await delete_links_of_devices(db, device_ids)
+    for device in devices:
+        await db.delete(device)
     await db.delete(area)
     await db.commit()
+    await entity_events.publish_deleted(project_id, "link", link_ids)
+    await entity_events.publish_deleted(project_id, "device", device_ids)
+    await entity_events.publish_deleted(project_id, "area", [area_id])
 
 
 def parse_area_style(area: Area) -> Optional[AreaStyle]:
@@ -9,6 +9,8 @@ from sqlalchemy.orm import selectinload
 
 from app.db.models import Area, Device
 from app.schemas.device import DeviceCreate, DeviceUpdate
+from app.services import entity_events
+from app.services.link import delete_links_of_devices
 from app.services.grid_excel import (
     GRID_CELL_UNITS,
     excel_range_to_rect_units,
@@ -46,13 +48,14 @@ async def get_device_by_name(db: AsyncSession, project_id: str, name: str) -> Op
     return result.scalar_one_or_none()
 
 
-async def create_device(
-    db: AsyncSession,
-    project_id: str,
-    area: Area,
-    data: DeviceCreate,
-) -> Device:
-    """Tạo device mới."""
+async def get_device_name_map(db: AsyncSession, project_id: str) -> dict[str, Device]:
+    """Lấy map name -> device của project (1 query, dùng cho bulk)."""
+    devices = await get_devices(db, project_id)
+    return {device.name: device for device in devices}
+
+
+def build_device(project_id: str, area: Area, data: DeviceCreate) -> Device:
+    """Dựng Device từ payload (chưa add/commit)."""
     color_rgb_json = None
     if data.color_rgb:
         color_rgb_json = json.dumps(data.color_rgb)
@@ -75,7 +78,7 @@ async def create_device(
         fallback_y = position_y if position_y is not None else (max(1, int(area.grid_row)) - 1) * GRID_CELL_UNITS
         grid_range = rect_units_to_excel_range(fallback_x, fallback_y, width, height)
 
-    device = Device(
+    return Device(
         project_id=project_id,
         area_id=area.id,
         name=data.name,
@@ -87,12 +90,35 @@ async def create_device(
         height=height,
         color_rgb_json=color_rgb_json,
     )
+
+
+async def create_device(
+    db: AsyncSession,
+    project_id: str,
+    area: Area,
+    data: DeviceCreate,
+) -> Device:
+    """Tạo device mới."""
+    device = build_device(project_id, area, data)
     db.add(device)
     await db.commit()
     await db.refresh(device)
+    await entity_events.publish_created(project_id, "device", [entity_events.device_snapshot(device)])
     return device
 
 
+async def create_devices_bulk(db: AsyncSession, devices: list[Device]) -> list[Device]:
+    """Insert nhiều device trong 1 transaction."""
+    if not devices:
+        return devices
+    db.add_all(devices)
+    await db.commit()
+    await entity_events.publish_created(
+        devices[0].project_id, "device", [entity_events.device_snapshot(device) for device in devices]
+    )
+    return devices
+
+
 async def update_device(
     db: AsyncSession,
     device: Device,
@@ -100,6 +126,7 @@ async def update_device(
     area: Optional[Area] = None,
 ) -> Device:
     """Cập nhật device."""
+    before = entity_events.device_snapshot(device)
     update_data = data.model_dump(exclude_unset=True)
 
     # Handle area_name -> area_id
@@ -136,13 +163,18 @@ async def update_device(
 
     await db.commit()
     await db.refresh(device)
+    await entity_events.publish_updated(device.project_id, "device", before, entity_events.device_snapshot(device))
     return device
 
 
 async def delete_device(db: AsyncSession, device: Device) -> None:
-    """Xóa device."""
+    """Xóa device cùng các link nối vào nó."""
+    project_id, device_id = device.project_id, device.id
+    link_ids = await delete_links_of_devices(db, [device_id])
     await db.delete(device)
     await db.commit()
+    await entity_events.publish_deleted(project_id, "link", link_ids)
+    await entity_events.publish_deleted(project_id, "device", [device_id])
 
 
 def parse_device_color(device: Device) -> Optional[list[int]]:
@@ -0,0 +1,35 @@
+"""Bảng màu thiết bị theo prefix tên (DIAGRAM_STYLE_SPEC §6.3)."""
+
+from __future__ import annotations
+
+import re
+from typing import Tuple
+
+DEFAULT_DEVICE_COLOR_RGB: Tuple[int, int, int] = (128, 128, 128)
+
+# Thứ tự quan trọng: prefix cụ thể hơn đứng trước.
+DEVICE_PREFIX_COLORS_RGB: list[tuple[re.Pattern[str], Tuple[int, int, int]]] = [
+    (re.compile(r"^(ROUTER|RTR|ISP)"), (70, 130, 180)),
+    (re.compile(r"^(FW|FIREWALL|VPN)"), (220, 80, 80)),
+    (re.compile(r"^(CORE)"), (34, 139, 34)),
+    (re.compile(r"^(DIST)"), (60, 179, 113)),
+    (re.compile(r"^(ACCESS|ACC)"), (0, 139, 139)),
+    (re.compile(r"^(SERVER|SRV)"), (106, 90, 205)),
+    (re.compile(r"^(APP)"), (138, 43, 226)),
+    (re.compile(r"^(WEB)"), (75, 0, 130)),
+    (re.compile(r"^(DB)"), (148, 0, 211)),
+    (re.compile(r"^(NAS)"), (210, 105, 30)),
+    (re.compile(r"^(SAN)"), (184, 134, 11)),
+    (re.compile(r"^(STORAGE)"), (205, 133, 63)),
+    (re.compile(r"^(BACKUP)"), (139, 90, 43)),
+]
+
+
+def get_device_color_rgb(name: str | None, override: list[int] | None = None) -> Tuple[int, int, int]:
+    if override and len(override) == 3:
+        return int(override[0]), int(override[1]), int(override[2])
+    key = (name or "").strip().upper()
+    for pattern, rgb in DEVICE_PREFIX_COLORS_RGB:
+        if pattern.match(key):
+            return rgb
+    return DEFAULT_DEVICE_COLOR_RGB
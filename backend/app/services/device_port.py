@@ -59,6 +59,14 @@ async def get_port_by_name(
     return result.scalar_one_or_none()
 
 
+async def get_port_keys(db: AsyncSession, project_id: str) -> set[tuple[str, str]]:
+    """Lấy tập (device_id, port_name) đã khai báo trong project (1 query)."""
+    result = await db.execute(
+        select(DevicePort.device_id, DevicePort.name).where(DevicePort.project_id == project_id)
+    )
+    return {(device_id, name) for device_id, name in result.all()}
+
+
 async def create_port(
     db: AsyncSession,
     project_id: str,
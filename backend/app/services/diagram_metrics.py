@@ -0,0 +1,32 @@
+"""Kích thước hiển thị dùng chung giữa layout (API) và renderer export.
+
+Giá trị khớp hằng số của frontend CanvasStage.vue; đặt ở services để renderer
+PPTX không phải import từ tầng endpoint.
+"""
+
+# UI uses 120px per logical unit (inch) when mapping to canvas.
+UNIT_PX = 120.0
+LABEL_CHAR_WIDTH_PX = 6.0
+LABEL_PADDING_PX = 8.0
+LABEL_MIN_WIDTH_PX = 24.0
+LABEL_HEIGHT_PX = 16.0
+DEFAULT_DEVICE_WIDTH = 1.2
+DEFAULT_DEVICE_HEIGHT = 0.8
+
+# Port band dimensions – mirror frontend CanvasStage.vue constants
+PORT_CELL_MIN_WIDTH_PX = 30.0
+PORT_CELL_HEIGHT_PX = 18.0
+PORT_CELL_GAP_PX = 2.0
+PORT_BAND_PADDING_X_PX = 6.0
+PORT_BAND_PADDING_Y_PX = 4.0
+PORT_FONT_SIZE_PX = 10.0
+PORT_CELL_TEXT_PADDING_PX = 10.0
+DEVICE_LABEL_FONT_SIZE_PX = 13.0
+DEVICE_BODY_VERTICAL_PADDING_PX = 6.0
+DEVICE_BODY_MIN_HEIGHT_PX = 24.0
+DEVICE_STANDARD_TOTAL_HEIGHT_PX = 76.0
+DEVICE_LABEL_MIN_HEIGHT_PX = max(
+    DEVICE_BODY_MIN_HEIGHT_PX,
+    DEVICE_LABEL_FONT_SIZE_PX + DEVICE_BODY_VERTICAL_PADDING_PX * 2,
+)
+DEVICE_MIN_WIDTH_PX = 96.0
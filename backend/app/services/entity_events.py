@@ -0,0 +1,160 @@
+"""Event delta cho device/link/area qua WebSocket.
+
+Service phát event sau khi commit, chỉ gồm id và trường đã đổi, để client đang
+cùng mở project vá state cục bộ thay vì tải lại toàn bộ danh sách:
+
+- device.created / device.moved / device.updated / device.deleted
+- link.created / link.updated / link.deleted
+- area.created / area.resized / area.updated / area.deleted
+- layout.applied: vị trí device/area thay đổi sau auto-layout
+
+data luôn chứa danh sách (devices/links/areas) hoặc ids, để thao tác đơn lẻ và
+bulk dùng chung 1 dạng.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Iterable, Optional
+
+from app.services.ws_manager import ws_manager
+
+logger = logging.getLogger(__name__)
+
+# Trường hình học: chỉ đổi các trường này thì event là "moved"/"resized".
+GEOMETRY_FIELDS = frozenset({"area_id", "x", "y", "width", "height", "grid_range", "grid_row", "grid_col"})
+
+
+def _json_value(value: Optional[str]) -> Any:
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def device_geometry(device) -> dict[str, Any]:
+    return {
+        "id": device.id,
+        "area_id": device.area_id,
+        "x": device.position_x,
+        "y": device.position_y,
+        "width": device.width,
+        "height": device.height,
+        "grid_range": device.grid_range,
+    }
+
+
+def device_snapshot(device) -> dict[str, Any]:
+    return {
+        **device_geometry(device),
+        "name": device.name,
+        "device_type": device.device_type,
+        "color_rgb": _json_value(device.color_rgb_json),
+    }
+
+
+def area_geometry(area) -> dict[str, Any]:
+    return {
+        "id": area.id,
+        "x": area.position_x,
+        "y": area.position_y,
+        "width": area.width,
+        "height": area.height,
+        "grid_range": area.grid_range,
+        "grid_row": area.grid_row,
+        "grid_col": area.grid_col,
+    }
+
+
+def area_snapshot(area) -> dict[str, Any]:
+    return {**area_geometry(area), "name": area.name, "style": _json_value(area.style_json)}
+
+
+def link_snapshot(link) -> dict[str, Any]:
+    return {
+        "id": link.id,
+        "from_device_id": link.from_device_id,
+        "from_port": link.from_port,
+        "to_device_id": link.to_device_id,
+        "to_port": link.to_port,
+        "purpose": link.purpose,
+        "line_style": link.line_style,
+        "color_rgb": _json_value(link.color_rgb_json),
+    }
+
+
+def diff_snapshot(before: dict[str, Any], after: dict[str, Any]) -> dict[str, Any]:
+    """Trường đã đổi (kèm id); rỗng nếu không đổi gì."""
+    changes = {key: value for key, value in after.items() if key != "id" and before.get(key) != value}
+    return {"id": after["id"], **changes} if changes else {}
+
+
+def update_event_name(entity: str, changes: dict[str, Any]) -> str:
+    """device.moved / area.resized nếu chỉ đổi hình học, ngược lại <entity>.updated."""
+    if set(changes) - {"id"} <= GEOMETRY_FIELDS:
+        return "device.moved" if entity == "device" else f"{entity}.resized"
+    return f"{entity}.updated"
+
+
+def diff_geometry(
+    before: dict[str, dict[str, Any]],
+    after: dict[str, dict[str, Any]],
+) -> tuple[list[dict[str, Any]], list[str]]:
+    """So 2 map id -> geometry: (item mới/đổi chỉ với trường đã đổi, id đã mất)."""
+    changed = []
+    for entity_id, current in after.items():
+        previous = before.get(entity_id)
+        if previous is None:
+            changed.append(current)
+            continue
+        delta = diff_snapshot(previous, current)
+        if delta:
+            changed.append(delta)
+    removed = [entity_id for entity_id in before if entity_id not in after]
+    return changed, removed
+
+
+def build_layout_event(
+    view_mode: str,
+    devices_before: dict[str, dict[str, Any]],
+    devices_after: dict[str, dict[str, Any]],
+    areas_before: dict[str, dict[str, Any]],
+    areas_after: dict[str, dict[str, Any]],
+) -> dict[str, Any]:
+    devices, removed_devices = diff_geometry(devices_before, devices_after)
+    areas, removed_areas = diff_geometry(areas_before, areas_after)
+    data: dict[str, Any] = {"view_mode": view_mode, "devices": devices, "areas": areas}
+    if removed_devices:
+        data["removed_device_ids"] = removed_devices
+    if removed_areas:
+        data["removed_area_ids"] = removed_areas
+    return {"event": "layout.applied", "data": data}
+
+
+async def publish(project_id: str, event: str, data: dict[str, Any]) -> None:
+    """Broadcast event; lỗi WebSocket không được làm hỏng thao tác đã commit."""
+    try:
+        await ws_manager.broadcast(project_id, {"event": event, "data": data})
+    except Exception:  # noqa: BLE001 - event chỉ là thông báo, dữ liệu đã commit
+        logger.exception("Không phát được event %s của project %s", event, project_id)
+
+
+async def publish_created(project_id: str, entity: str, items: Iterable[dict[str, Any]]) -> None:
+    items = list(items)
+    if items:
+        await publish(project_id, f"{entity}.created", {f"{entity}s": items})
+
+
+async def publish_updated(project_id: str, entity: str, before: dict[str, Any], after: dict[str, Any]) -> None:
+    delta = diff_snapshot(before, after)
+    if delta:
+        await publish(project_id, update_event_name(entity, delta), {f"{entity}s": [delta]})
+
+
+async def publish_deleted(project_id: str, entity: str, ids: Iterable[str]) -> None:
+    ids = list(ids)
+    if ids:
+        await publish(project_id, f"{entity}.deleted", {"ids": ids})
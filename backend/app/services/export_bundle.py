@@ -0,0 +1,76 @@
+"""Gói nhiều artifact export (sơ đồ L1/L2/L3 + file Excel) vào 1 file ZIP."""
+
+from __future__ import annotations
+
+import os
+import zipfile
+from typing import Any, Callable, Iterable, Optional
+
+BUNDLE_EXPORT_TYPE = "bundle"
+
+# Thứ tự artifact trong gói (cũng là thứ tự mặc định khi không chọn).
+BUNDLE_ARTIFACTS = ("l1_diagram", "l2_diagram", "l3_diagram", "device_file", "master_file")
+
+_ARTIFACT_EXTENSIONS = {
+    "l1_diagram": "pptx",
+    "l2_diagram": "pptx",
+    "l3_diagram": "pptx",
+    "device_file": "xlsx",
+    "master_file": "xlsx",
+}
+
+_COPY_CHUNK = 1024 * 1024
+
+
+def resolve_bundle_artifacts(options: Optional[dict[str, Any]]) -> list[str]:
+    """Danh sách artifact đã chuẩn hóa (bỏ trùng, theo thứ tự BUNDLE_ARTIFACTS)."""
+    requested = (options or {}).get("artifacts") or list(BUNDLE_ARTIFACTS)
+    unknown = [name for name in requested if name not in _ARTIFACT_EXTENSIONS]
+    if unknown:
+        raise ValueError(f"Artifact không hợp lệ: {', '.join(map(str, unknown))}")
+    return [name for name in BUNDLE_ARTIFACTS if name in set(requested)]
+
+
+def artifact_options(export_type: str, options: Optional[dict[str, Any]]) -> dict[str, Any]:
+    """Options cho từng artifact con: sơ đồ dùng mode/theme của gói, format theo loại."""
+    options = options or {}
+    child: dict[str, Any] = {"format": _ARTIFACT_EXTENSIONS[export_type]}
+    if export_type.endswith("_diagram"):
+        for key in ("mode", "theme"):
+            if options.get(key) is not None:
+                child[key] = options[key]
+    if options.get("version_id") is not None:
+        child["version_id"] = options["version_id"]
+    return child
+
+
+def artifact_arcname(export_type: str) -> str:
+    return f"{export_type}.{_ARTIFACT_EXTENSIONS[export_type]}"
+
+
+def write_bundle_zip(
+    zip_path: str,
+    members: Iterable[tuple[str, str]],
+    progress: Callable[[float, Optional[str]], None] | None = None,
+) -> int:
+    """Ghi ZIP từ (đường dẫn file, tên trong gói), copy theo chunk ra đĩa. Trả về kích thước.
+
+    PPTX/XLSX đã là ZIP nén sẵn nên lưu dạng STORED (không nén lại).
+    """
+    members = list(members)
+    total = max(1, sum(os.path.getsize(path) for path, _ in members))
+    written = 0
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for path, arcname in members:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_STORED
+            with open(path, "rb") as source, archive.open(info, "w", force_zip64=True) as target:
+                while True:
+                    chunk = source.read(_COPY_CHUNK)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    written += len(chunk)
+                    if progress is not None:
+                        progress(100 * written / total)
+    return os.path.getsize(zip_path)
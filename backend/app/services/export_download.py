@@ -0,0 +1,46 @@
+"""Helper tải file export: ETag, Content-Disposition, X-Accel-Redirect.
+
+Phần stream (Range/If-Range, http.response.pathsend) do FileResponse của Starlette
+đảm nhiệm; module này chỉ dựng header đi kèm. Không có biến thể nén sẵn: PPTX/XLSX/ZIP
+đã nén deflate bên trong, gzip/br thêm lần nữa gần như không giảm kích thước.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+def build_etag(job_id: str, stat_result: os.stat_result) -> str:
+    """ETag mạnh theo job + kích thước + mtime."""
+    return f'"{job_id}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """So khớp If-None-Match (so sánh yếu, hỗ trợ danh sách và '*')."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == target for candidate in if_none_match.split(","))
+
+
+def content_disposition(file_name: str) -> str:
+    """Header Content-Disposition attachment (RFC 5987 cho tên file không phải ASCII)."""
+    quoted = quote(file_name)
+    if quoted != file_name:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{file_name}"'
+
+
+def accel_redirect_uri(file_path: str, exports_dir: str, prefix: str) -> Optional[str]:
+    """URI nội bộ cho nginx X-Accel-Redirect (sendfile phía proxy). None nếu không áp dụng."""
+    if not prefix:
+        return None
+    try:
+        relative = Path(file_path).resolve().relative_to(Path(exports_dir).resolve())
+    except ValueError:
+        return None
+    return prefix.rstrip("/") + "/" + quote(relative.as_posix())
@@ -0,0 +1,123 @@
+"""Phát event export job tới WebSocket: 1 publisher mỗi project thay vì poll theo từng socket.
+
+Mỗi project có subscriber thì có đúng 1 task đọc DB theo nhịp poll_interval
+(hoặc ngay khi được poke lúc tạo job), so sánh với snapshot trước và đẩy tới các
+kết nối của process này. Tải DB không phụ thuộc số tab đang mở.
+
+Chỉ giao cục bộ (ConnectionManager.deliver), không qua broker: process API nào có
+subscriber cũng tự poll, gửi qua broker thì client nhận 1 bản mỗi process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Optional
+
+from app.core.config import WS_EXPORT_POLL_INTERVAL
+from app.db.session import async_session_maker
+from app.services import export_job as export_job_service
+from app.services.ws_codec import encode_json
+from app.services.ws_manager import ConnectionManager, ws_manager
+
+logger = logging.getLogger(__name__)
+
+
+def _job_state(job) -> tuple:
+    return (job.status, job.progress, job.message, job.file_name, job.error_message)
+
+
+class ExportEventPublisher:
+    def __init__(
+        self,
+        session_maker=None,
+        manager: Optional[ConnectionManager] = None,
+        poll_interval: float = WS_EXPORT_POLL_INTERVAL,
+        limit: int = 50,
+    ) -> None:
+        self.session_maker = session_maker or async_session_maker
+        self.manager = manager or ws_manager
+        self.poll_interval = poll_interval
+        self.limit = limit
+        self._subscribers: dict[str, int] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._wakeups: dict[str, asyncio.Event] = {}
+        self._states: dict[str, dict[str, tuple]] = {}
+        self._events: dict[str, dict[str, dict[str, Any]]] = {}
+
+    def subscriber_count(self, project_id: str) -> int:
+        return self._subscribers.get(project_id, 0)
+
+    async def subscribe(self, project_id: str, websocket) -> None:
+        """Đăng ký socket (đã connect vào manager); gửi ngay trạng thái job đã biết."""
+        self._subscribers[project_id] = self._subscribers.get(project_id, 0) + 1
+        for event in list(self._events.get(project_id, {}).values()):
+            await self.manager.send_json(websocket, event)
+        if project_id not in self._tasks:
+            self._wakeups[project_id] = asyncio.Event()
+            self._tasks[project_id] = asyncio.create_task(self._run(project_id))
+
+    def unsubscribe(self, project_id: str) -> None:
+        count = self._subscribers.get(project_id, 0) - 1
+        if count > 0:
+            self._subscribers[project_id] = count
+            return
+        self._subscribers.pop(project_id, None)
+        task = self._tasks.pop(project_id, None)
+        if task is not None:
+            task.cancel()
+        self._wakeups.pop(project_id, None)
+        self._states.pop(project_id, None)
+        self._events.pop(project_id, None)
+
+    def poke(self, project_id: str) -> None:
+        """Yêu cầu đọc lại ngay (vd. vừa tạo job); bỏ qua nếu project không có subscriber."""
+        wakeup = self._wakeups.get(project_id)
+        if wakeup is not None:
+            wakeup.set()
+
+    async def poll_once(self, project_id: str) -> int:
+        """Đọc job của project 1 lần, gửi job thay đổi tới kết nối cục bộ. Trả về số event."""
+        async with self.session_maker() as db:
+            jobs = await export_job_service.list_jobs(db, project_id, skip=0, limit=self.limit)
+
+        previous = self._states.get(project_id, {})
+        states: dict[str, tuple] = {}
+        events: dict[str, dict[str, Any]] = {}
+        changed = []
+        cached = self._events.get(project_id, {})
+        for job in jobs:
+            state = _job_state(job)
+            states[job.id] = state
+            if previous.get(job.id) == state and job.id in cached:
+                events[job.id] = cached[job.id]
+                continue
+            event = export_job_service.build_export_event(job)
+            events[job.id] = event
+            changed.append(event)
+        # Chỉ giữ job còn trong cửa sổ limit để bộ nhớ không tăng theo thời gian.
+        self._states[project_id] = states
+        self._events[project_id] = events
+        for event in changed:
+            self.manager.deliver(project_id, encode_json(event), event)
+        return len(changed)
+
+    async def _run(self, project_id: str) -> None:
+        while project_id in self._tasks:
+            try:
+                await self.poll_once(project_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001 - lỗi DB tạm thời không được dừng publisher
+                logger.exception("Không đọc được export job của project %s", project_id)
+            wakeup = self._wakeups.get(project_id)
+            if wakeup is None:
+                return
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+
+
+export_event_publisher = ExportEventPublisher()
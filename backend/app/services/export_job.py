@@ -1,13 +1,70 @@
 """Service cho export jobs."""
 
+import hashlib
 import json
-from datetime import datetime
+import os
+from datetime import datetime, timedelta
 from typing import Any, Optional
 
-from sqlalchemy import select
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
-from app.db.models import ExportJob
+from app.core.config import EXPORT_LEASE_SECONDS, EXPORT_MAX_ATTEMPTS
+from app.db.models import ExportJob, Project
+from app.services.export_bundle import BUNDLE_EXPORT_TYPE, resolve_bundle_artifacts
+from app.services.export_wakeup import notify_export_worker
+
+# Sơ đồ (người dùng đang chờ) được ưu tiên hơn file dump dữ liệu lớn.
+DEFAULT_JOB_PRIORITIES = {
+    "l1_diagram": 10,
+    "l2_diagram": 10,
+    "l3_diagram": 10,
+    "device_file": 0,
+    "master_file": 0,
+    "bundle": 0,
+}
+
+
+DIAGRAM_EXPORT_TYPES = {"l1_diagram", "l2_diagram", "l3_diagram"}
+
+# Option có ảnh hưởng tới output theo loại export (mode/theme không dùng cho file Excel).
+_OUTPUT_OPTION_DEFAULTS = {
+    "diagram": {"mode": "all_areas", "theme": "default", "format": "pptx", "version_id": None},
+    "file": {"format": "xlsx", "version_id": None},
+    "bundle": {"mode": "all_areas", "theme": "default", "format": "zip", "version_id": None},
+}
+
+
+def normalize_export_options(export_type: str, options: Optional[dict[str, Any]]) -> dict[str, Any]:
+    """Chuẩn hóa options: điền mặc định, bỏ key không ảnh hưởng output."""
+    if export_type == BUNDLE_EXPORT_TYPE:
+        kind = "bundle"
+    elif export_type in DIAGRAM_EXPORT_TYPES:
+        kind = "diagram"
+    else:
+        kind = "file"
+    options = options or {}
+    normalized = {}
+    for key, default in _OUTPUT_OPTION_DEFAULTS[kind].items():
+        value = options.get(key)
+        value = default if value is None else value
+        if value is not None:
+            normalized[key] = value
+    if kind == "bundle":
+        normalized["artifacts"] = resolve_bundle_artifacts(options)
+    return normalized
+
+
+def build_dedup_key(project_id: str, revision: int, export_type: str, options: Optional[dict[str, Any]]) -> str:
+    """sha256 của (project, revision, loại export, options chuẩn hóa)."""
+    payload = json.dumps(
+        [project_id, revision, export_type, normalize_export_options(export_type, options)],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
 async def create_job(
@@ -15,21 +72,85 @@ async def create_job(
     project_id: str,
     export_type: str,
     options: dict[str, Any],
+    priority: Optional[int] = None,
+    *,
+    dedup_key: Optional[str] = None,
+    project_revision: Optional[int] = None,
 ) -> ExportJob:
     """Tạo export job mới."""
+    if priority is None:
+        priority = DEFAULT_JOB_PRIORITIES.get(export_type, 0)
     job = ExportJob(
         project_id=project_id,
         export_type=export_type,
         status="pending",
+        priority=priority,
         progress=0,
         options_json=json.dumps(options) if options else None,
+        project_revision=project_revision,
+        dedup_key=dedup_key,
     )
     db.add(job)
     await db.commit()
     await db.refresh(job)
+    notify_export_worker()
     return job
 
 
+async def find_reusable_job(db: AsyncSession, dedup_key: str) -> Optional[ExportJob]:
+    """Job cùng dedup_key đang chờ/chạy, hoặc đã xong mà file còn trên đĩa."""
+    result = await db.execute(
+        select(ExportJob)
+        .where(ExportJob.dedup_key == dedup_key, ExportJob.status.in_(("pending", "processing", "completed")))
+        .order_by(ExportJob.created_at.desc())
+    )
+    for job in result.scalars():
+        if job.status != "completed":
+            return job
+        if job.file_path and os.path.isfile(job.file_path):
+            return job
+    return None
+
+
+async def get_or_create_job(
+    db: AsyncSession,
+    project_id: str,
+    export_type: str,
+    options: dict[str, Any],
+    priority: Optional[int] = None,
+) -> tuple[ExportJob, bool]:
+    """Tạo job hoặc dùng lại job trùng nội dung. Trả về (job, created).
+
+    Cùng project revision + loại export + options chuẩn hóa thì output giống hệt:
+    trả về artifact đã có hoặc gắn vào job đang chạy thay vì render lại.
+    """
+    revision = (
+        await db.execute(select(Project.revision).where(Project.id == project_id))
+    ).scalar_one_or_none() or 0
+    dedup_key = build_dedup_key(project_id, revision, export_type, options)
+    existing = await find_reusable_job(db, dedup_key)
+    if existing is not None:
+        return existing, False
+    try:
+        job = await create_job(
+            db,
+            project_id,
+            export_type,
+            options,
+            priority,
+            dedup_key=dedup_key,
+            project_revision=revision,
+        )
+    except IntegrityError:
+        # Request song song vừa tạo job cùng key (unique index trên job đang chờ/chạy).
+        await db.rollback()
+        existing = await find_reusable_job(db, dedup_key)
+        if existing is None:
+            raise
+        return existing, False
+    return job, True
+
+
 async def get_job(db: AsyncSession, job_id: str) -> Optional[ExportJob]:
     """Lấy export job theo ID."""
     result = await db.execute(select(ExportJob).where(ExportJob.id == job_id))
@@ -53,6 +174,31 @@ async def list_jobs(
     return list(result.scalars().all())
 
 
+def build_export_event(job: ExportJob, event: Optional[str] = None) -> dict[str, Any]:
+    """Event WebSocket cho export job (event suy ra từ status nếu không truyền)."""
+    if event is None:
+        if job.status == "completed":
+            event = "export.completed"
+        elif job.status == "failed":
+            event = "export.failed"
+        else:
+            event = "export.progress"
+    return {
+        "event": event,
+        "data": {
+            "id": job.id,
+            "project_id": job.project_id,
+            "export_type": job.export_type,
+            "status": job.status,
+            "progress": job.progress,
+            "message": job.message,
+            "file_name": job.file_name,
+            "file_size": job.file_size,
+            "error_message": job.error_message,
+        },
+    }
+
+
 def parse_options(options_json: Optional[str]) -> Optional[dict[str, Any]]:
     """Parse options JSON."""
     if not options_json:
@@ -110,12 +256,196 @@ async def mark_failed(
     return job
 
 
-async def get_next_pending_job(db: AsyncSession) -> Optional[ExportJob]:
-    """Lấy job pending tiếp theo."""
-    result = await db.execute(
-        select(ExportJob)
-        .where(ExportJob.status == "pending")
-        .order_by(ExportJob.created_at.asc())
+async def claim_next_job(
+    db: AsyncSession,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = EXPORT_LEASE_SECONDS,
+) -> Optional[ExportJob]:
+    """Claim nguyên tử 1 job pending (UPDATE ... WHERE status='pending' RETURNING).
+
+    Thứ tự: project đang có ít job processing nhất (công bằng giữa project),
+    sau đó priority cao hơn, rồi job cũ hơn. Nhiều worker process cùng claim
+    thì chỉ 1 bên cập nhật được dòng đó. Job claim xong có lease lease_seconds,
+    worker phải gia hạn (renew_leases) trước khi hết hạn.
+    """
+    candidate = aliased(ExportJob)
+    busy = aliased(ExportJob)
+    in_flight = (
+        select(func.count(busy.id))
+        .where(busy.project_id == candidate.project_id, busy.status == "processing")
+        .correlate(candidate)
+        .scalar_subquery()
+    )
+    next_id = (
+        select(candidate.id)
+        .where(candidate.status == "pending")
+        .order_by(in_flight.asc(), candidate.priority.desc(), candidate.created_at.asc())
         .limit(1)
+        .scalar_subquery()
     )
-    return result.scalar_one_or_none()
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(ExportJob)
+        .where(ExportJob.id == next_id, ExportJob.status == "pending")
+        .values(
+            status="processing",
+            progress=0,
+            started_at=now,
+            attempts=func.coalesce(ExportJob.attempts, 0) + 1,
+            worker_id=worker_id,
+            heartbeat_at=now,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+        )
+        .returning(ExportJob)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    job = result.scalar_one_or_none()
+    await db.commit()
+    return job
+
+
+async def renew_leases(
+    db: AsyncSession,
+    job_ids: list[str],
+    worker_id: Optional[str],
+    lease_seconds: float = EXPORT_LEASE_SECONDS,
+) -> set[str]:
+    """Gia hạn lease các job worker đang chạy. Trả về id còn giữ được lease."""
+    if not job_ids:
+        return set()
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(ExportJob)
+        .where(
+            ExportJob.id.in_(job_ids),
+            ExportJob.status == "processing",
+            ExportJob.worker_id.is_(None) if worker_id is None else ExportJob.worker_id == worker_id,
+        )
+        .values(heartbeat_at=now, lease_expires_at=now + timedelta(seconds=lease_seconds))
+        .returning(ExportJob.id)
+        .execution_options(synchronize_session=False)
+    )
+    renewed = set(result.scalars())
+    await db.commit()
+    return renewed
+
+
+async def reap_expired_jobs(
+    db: AsyncSession,
+    max_attempts: int = EXPORT_MAX_ATTEMPTS,
+    lease_seconds: float = EXPORT_LEASE_SECONDS,
+    now: Optional[datetime] = None,
+) -> tuple[list[ExportJob], list[ExportJob]]:
+    """Xử lý job processing hết lease (worker chết giữa chừng). Trả về (requeued, failed).
+
+    Còn lượt thử thì đưa về pending, hết lượt thì failed. Job cũ chưa có lease
+    được tính hết hạn theo started_at. Nhiều worker cùng reap vẫn an toàn vì
+    mỗi dòng chỉ khớp điều kiện của 1 UPDATE.
+    """
+    now = now or datetime.utcnow()
+    expired = and_(
+        ExportJob.status == "processing",
+        or_(
+            ExportJob.lease_expires_at < now,
+            and_(
+                ExportJob.lease_expires_at.is_(None),
+                ExportJob.started_at < now - timedelta(seconds=lease_seconds),
+            ),
+        ),
+    )
+    attempts = func.coalesce(ExportJob.attempts, 0)
+    requeued = await db.execute(
+        update(ExportJob)
+        .where(expired, attempts < max_attempts)
+        .values(
+            status="pending",
+            progress=0,
+            message="Worker mất kết nối, chờ chạy lại",
+            worker_id=None,
+            heartbeat_at=None,
+            lease_expires_at=None,
+            started_at=None,
+        )
+        .returning(ExportJob)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    requeued_jobs = list(requeued.scalars())
+    failed = await db.execute(
+        update(ExportJob)
+        .where(expired, attempts >= max_attempts)
+        .values(
+            status="failed",
+            error_message="Export bị gián đoạn quá số lần thử cho phép",
+            worker_id=None,
+            lease_expires_at=None,
+            completed_at=now,
+        )
+        .returning(ExportJob)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    failed_jobs = list(failed.scalars())
+    await db.commit()
+    return requeued_jobs, failed_jobs
+
+
+def holds_lease(job: ExportJob, worker_id: Optional[str]) -> bool:
+    """Job vẫn đang processing và thuộc worker này (chưa bị reap/claim lại)."""
+    return job.status == "processing" and job.worker_id == worker_id
+
+
+async def _finish_leased_job(
+    db: AsyncSession,
+    job_id: str,
+    worker_id: Optional[str],
+    **values: Any,
+) -> Optional[ExportJob]:
+    """Ghi kết quả bằng 1 UPDATE có điều kiện lease; None nếu job đã bị reap/claim lại."""
+    result = await db.execute(
+        update(ExportJob)
+        .where(
+            ExportJob.id == job_id,
+            ExportJob.status == "processing",
+            ExportJob.worker_id.is_(None) if worker_id is None else ExportJob.worker_id == worker_id,
+        )
+        .values(**values, completed_at=datetime.utcnow())
+        .returning(ExportJob)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    job = result.scalar_one_or_none()
+    await db.commit()
+    return job
+
+
+async def complete_leased_job(
+    db: AsyncSession,
+    job_id: str,
+    worker_id: Optional[str],
+    *,
+    file_path: str,
+    file_name: str,
+    file_size: int,
+    message: Optional[str] = None,
+) -> Optional[ExportJob]:
+    """Đánh dấu hoàn thành nếu worker còn giữ lease (không có khe giữa kiểm tra và ghi)."""
+    return await _finish_leased_job(
+        db,
+        job_id,
+        worker_id,
+        status="completed",
+        progress=100,
+        message=message,
+        file_path=file_path,
+        file_name=file_name,
+        file_size=file_size,
+    )
+
+
+async def fail_leased_job(
+    db: AsyncSession,
+    job_id: str,
+    worker_id: Optional[str],
+    *,
+    error_message: str,
+) -> Optional[ExportJob]:
+    """Đánh dấu thất bại nếu worker còn giữ lease."""
+    return await _finish_leased_job(db, job_id, worker_id, status="failed", error_message=error_message)
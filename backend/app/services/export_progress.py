@@ -0,0 +1,159 @@
+"""Kênh tiến độ export từ process render (ProcessPool) về worker.
+
+- Process con: ProgressReporter đẩy (job_id, percent, message) vào Manager queue,
+  đã throttle để không spam IPC.
+- Worker: ExportProgressPump gom bản mới nhất mỗi job, định kỳ ghi
+  progress/message xuống DB và phát event qua WebSocket.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import queue as queue_module
+import time
+from typing import Any, Callable, Optional
+
+from sqlalchemy import update
+
+from app.db.models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[float, Optional[str]], None]
+
+# Tiến độ do render báo được giới hạn dưới 100; 100 chỉ set khi mark_completed.
+MAX_REPORTED_PROGRESS = 99
+
+
+class ProgressReporter:
+    """Callable chạy trong process con; throttle theo % và thời gian."""
+
+    def __init__(self, progress_queue: Any, job_id: str, min_interval: float = 0.2) -> None:
+        self._queue = progress_queue
+        self._job_id = job_id
+        self._min_interval = min_interval
+        self._last_percent = -1
+        self._last_message: Optional[str] = None
+        self._last_sent = 0.0
+
+    def __call__(self, percent: float, message: Optional[str] = None) -> None:
+        value = max(0, min(int(percent), MAX_REPORTED_PROGRESS))
+        now = time.monotonic()
+        new_message = message is not None and message != self._last_message
+        if not new_message:
+            # Đổi phase (message) luôn gửi; chỉ đổi % thì throttle theo thời gian.
+            if value == self._last_percent or now - self._last_sent < self._min_interval:
+                return
+        self._last_percent = value
+        if message is not None:
+            self._last_message = message
+        self._last_sent = now
+        try:
+            self._queue.put_nowait((self._job_id, value, self._last_message))
+        except Exception:  # noqa: BLE001 - tiến độ là best-effort, không làm hỏng export
+            pass
+
+
+def make_reporter(progress_queue: Any, job_id: Optional[str]) -> Optional[ProgressCallback]:
+    if progress_queue is None or not job_id:
+        return None
+    return ProgressReporter(progress_queue, job_id)
+
+
+def scaled(progress: Optional[ProgressCallback], start: float, end: float) -> Optional[ProgressCallback]:
+    """Map tiến độ 0..100 của 1 bước con vào đoạn [start, end]."""
+    if progress is None:
+        return None
+
+    def report(percent: float, message: Optional[str] = None) -> None:
+        progress(start + (end - start) * max(0.0, min(percent, 100.0)) / 100.0, message)
+
+    return report
+
+
+class ExportProgressPump:
+    """Đọc queue tiến độ, ghi DB theo nhịp flush_interval và broadcast WebSocket."""
+
+    def __init__(
+        self,
+        progress_queue: Any,
+        session_maker,
+        flush_interval: float = 0.5,
+        broadcast=None,
+        worker_id: Optional[str] = None,
+    ) -> None:
+        self.queue = progress_queue
+        self.session_maker = session_maker
+        self.flush_interval = flush_interval
+        self.broadcast = broadcast
+        self.worker_id = worker_id  # Chỉ ghi tiến độ cho job worker này còn giữ lease
+        self._latest: dict[str, tuple[int, Optional[str]]] = {}
+        self._written: dict[str, tuple[int, Optional[str]]] = {}
+        self._stopped = False
+
+    def _drain(self, timeout: float) -> None:
+        """Chạy trong thread: chờ item đầu tiên rồi lấy hết phần còn lại."""
+        try:
+            item = self.queue.get(timeout=timeout)
+        except queue_module.Empty:
+            return
+        while True:
+            job_id, percent, message = item
+            self._latest[job_id] = (percent, message)
+            try:
+                item = self.queue.get_nowait()
+            except queue_module.Empty:
+                return
+
+    async def flush(self) -> int:
+        """Ghi các job có tiến độ mới. Trả về số job đã cập nhật."""
+        pending = {job_id: value for job_id, value in self._latest.items() if self._written.get(job_id) != value}
+        if not pending:
+            return 0
+        events = []
+        async with self.session_maker() as db:
+            for job_id, (percent, message) in pending.items():
+                conditions = [ExportJob.id == job_id, ExportJob.status == "processing"]
+                if self.worker_id is not None:
+                    conditions.append(ExportJob.worker_id == self.worker_id)
+                result = await db.execute(
+                    update(ExportJob)
+                    .where(*conditions)
+                    .values(progress=percent, message=message)
+                    .returning(ExportJob)
+                    .execution_options(synchronize_session=False)
+                )
+                job = result.scalar_one_or_none()
+                if job is None:
+                    # Job đã kết thúc hoặc bị worker khác claim lại: update trễ, bỏ qua.
+                    self.forget(job_id)
+                    continue
+                self._written[job_id] = (percent, message)
+                events.append(job)
+            await db.commit()
+        if self.broadcast is not None:
+            for job in events:
+                try:
+                    await self.broadcast(job)
+                except Exception:  # noqa: BLE001
+                    logger.exception("Không gửi được tiến độ export %s", job.id)
+        return len(pending)
+
+    def forget(self, job_id: str) -> None:
+        """Bỏ trạng thái của job đã kết thúc."""
+        self._latest.pop(job_id, None)
+        self._written.pop(job_id, None)
+
+    async def run(self) -> None:
+        while not self._stopped:
+            deadline = time.monotonic() + self.flush_interval
+            while not self._stopped and time.monotonic() < deadline:
+                await asyncio.to_thread(self._drain, max(0.05, deadline - time.monotonic()))
+            try:
+                await self.flush()
+            except Exception:  # noqa: BLE001 - lỗi ghi tiến độ không được dừng worker
+                logger.exception("Không ghi được tiến độ export")
+
+    def stop(self) -> None:
+        self._stopped = True
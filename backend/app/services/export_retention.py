@@ -0,0 +1,386 @@
+"""Dọn file export cũ và dòng export_jobs theo chính sách lưu trữ.
+
+Chính sách: hết hạn theo tuổi, giữ N job mới nhất mỗi project, quota byte theo
+project và toàn hệ thống. Worker chạy từng lượt nhỏ để không giữ lock SQLite lâu:
+mỗi lượt đọc 1 trang job đã kết thúc (từ mới tới cũ, tiếp tục từ con trỏ của lượt
+trước) và quét 1 phần thư mục export. Xóa dòng DB trước rồi mới xóa file, file mồ
+côi được quét lại sau.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed")
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """0 = không giới hạn cho từng tiêu chí."""
+
+    max_age_days: float = 30
+    keep_last: int = 50  # Số job đã kết thúc giữ lại mỗi project
+    project_quota_bytes: int = 0
+    total_quota_bytes: int = 0
+    grace_seconds: float = 300  # Job vừa xong không bị xóa (client có thể đang tải)
+    orphan_grace_seconds: float = 3600  # File chưa gắn job (đang render) không bị quét
+
+
+@dataclass(frozen=True, slots=True)
+class RetainedJob:
+    id: str
+    project_id: str
+    file_path: Optional[str]
+    file_size: int
+    finished_at: datetime
+
+
+@dataclass
+class RetentionResult:
+    deleted_jobs: int = 0
+    deleted_files: int = 0
+    freed_bytes: int = 0
+    orphan_files: int = 0
+    scanned_jobs: int = 0
+    scanned_entries: int = 0
+    more: bool = False  # Vòng quét chưa xong: lượt sau chạy ngay
+    errors: list[str] = field(default_factory=list)
+
+
+@dataclass
+class RetentionCursor:
+    """Vị trí vòng quét hiện tại, giữ qua các lượt.
+
+    Job: (completed_at, id) của job cuối đã xét cùng bộ đếm keep-last/quota của các
+    job được giữ tới đó. Job kết thúc sau khi vòng bắt đầu được tính ở vòng sau.
+    File: iterator os.scandir của thư mục export, đọc tiếp ở lượt sau.
+    """
+
+    finished_at: Optional[datetime] = None
+    job_id: Optional[str] = None
+    kept_count: dict[str, int] = field(default_factory=dict)
+    kept_bytes: dict[str, int] = field(default_factory=dict)
+    project_full: set[str] = field(default_factory=set)
+    total_bytes: int = 0
+    total_full: bool = False
+    entries: Optional[Iterator[os.DirEntry]] = None
+
+    def reset_jobs(self) -> None:
+        self.finished_at = None
+        self.job_id = None
+        self.kept_count.clear()
+        self.kept_bytes.clear()
+        self.project_full.clear()
+        self.total_bytes = 0
+        self.total_full = False
+
+    def close(self) -> None:
+        if self.entries is not None:
+            self.entries.close()
+            self.entries = None
+
+
+def select_expired(
+    jobs: Iterable[RetainedJob],
+    policy: RetentionPolicy,
+    now: datetime,
+    cursor: Optional[RetentionCursor] = None,
+) -> list[RetainedJob]:
+    """Chọn job cần xóa. Duyệt từ mới tới cũ; job cũ nhất bị loại trước khi vượt quota.
+
+    Có cursor thì tiếp tục bộ đếm của các trang trước (jobs phải cũ hơn con trỏ).
+    """
+    cursor = cursor or RetentionCursor()
+    expired: list[RetainedJob] = []
+    kept_count = cursor.kept_count
+    kept_bytes = cursor.kept_bytes
+    project_full = cursor.project_full
+    max_age = timedelta(days=policy.max_age_days) if policy.max_age_days else None
+    grace = timedelta(seconds=policy.grace_seconds)
+
+    for job in sorted(jobs, key=lambda item: (item.finished_at, item.id), reverse=True):
+        cursor.finished_at, cursor.job_id = job.finished_at, job.id
+        age = now - job.finished_at
+        size = job.file_size
+        project_id = job.project_id
+        if age >= grace:
+            drop = False
+            if max_age is not None and age > max_age:
+                drop = True
+            elif policy.keep_last and kept_count.get(project_id, 0) >= policy.keep_last:
+                drop = True
+            elif policy.project_quota_bytes and (
+                project_id in project_full or kept_bytes.get(project_id, 0) + size > policy.project_quota_bytes
+            ):
+                project_full.add(project_id)
+                drop = True
+            elif policy.total_quota_bytes and (
+                cursor.total_full or cursor.total_bytes + size > policy.total_quota_bytes
+            ):
+                cursor.total_full = True
+                drop = True
+            if drop:
+                expired.append(job)
+                continue
+        kept_count[project_id] = kept_count.get(project_id, 0) + 1
+        kept_bytes[project_id] = kept_bytes.get(project_id, 0) + size
+        cursor.total_bytes += size
+    return expired
+
+
+def remove_artifacts(file_paths: Iterable[str]) -> tuple[int, int, list[str]]:
+    """Xóa file export. Trả về (số file, số byte, lỗi)."""
+    removed = 0
+    freed = 0
+    errors: list[str] = []
+    for path in file_paths:
+        try:
+            size = os.stat(path).st_size
+            os.unlink(path)
+        except FileNotFoundError:
+            continue
+        except OSError as exc:
+            errors.append(f"{path}: {exc}")
+            continue
+        removed += 1
+        freed += size
+    return removed, freed, errors
+
+
+def scan_orphan_candidates(
+    cursor: RetentionCursor,
+    exports_dir: str,
+    grace_seconds: float,
+    limit: int,
+    now_ts: float,
+) -> tuple[list[tuple[str, int, bool]], int, bool]:
+    """Đọc tiếp tối đa limit entry của exports_dir, trả về file/thư mục đủ cũ để xét.
+
+    Trả về ([(path, size, is_bundle_dir)], số entry đã đọc, đã hết thư mục chưa).
+    """
+    if cursor.entries is None:
+        try:
+            cursor.entries = os.scandir(exports_dir)
+        except FileNotFoundError:
+            return [], 0, True
+    candidates: list[tuple[str, int, bool]] = []
+    scanned = 0
+    for entry in cursor.entries:
+        scanned += 1
+        try:
+            if entry.name.startswith(".bundle-") and entry.is_dir(follow_symlinks=False):
+                # Thư mục tạm của bundle bị bỏ lại khi worker chết giữa chừng.
+                if now_ts - entry.stat(follow_symlinks=False).st_mtime >= grace_seconds:
+                    candidates.append((entry.path, 0, True))
+            elif not entry.name.startswith(".") and entry.is_file(follow_symlinks=False):
+                stat_result = entry.stat(follow_symlinks=False)
+                if now_ts - stat_result.st_mtime >= grace_seconds:
+                    candidates.append((entry.path, stat_result.st_size, False))
+        except FileNotFoundError:
+            pass
+        if scanned >= limit:
+            return candidates, scanned, False
+    cursor.close()
+    return candidates, scanned, True
+
+
+def remove_orphans(candidates: list[tuple[str, int, bool]], referenced: set[str]) -> tuple[int, int, list[str]]:
+    """Xóa candidate không thuộc job nào. Trả về (số file, số byte, lỗi)."""
+    removed = 0
+    freed = 0
+    errors: list[str] = []
+    for path, size, is_dir in candidates:
+        try:
+            if is_dir:
+                shutil.rmtree(path)
+            elif os.path.abspath(path) in referenced:
+                continue
+            else:
+                os.unlink(path)
+        except FileNotFoundError:
+            continue
+        except OSError as exc:
+            errors.append(f"{path}: {exc}")
+            continue
+        removed += 1
+        freed += size
+    return removed, freed, errors
+
+
+async def _referenced_paths(db: AsyncSession, paths: list[str]) -> set[str]:
+    """Path (abspath) trong danh sách còn được job trỏ tới; so cả dạng tương đối lẫn tuyệt đối."""
+    forms = {form for path in paths for form in (path, os.path.abspath(path))}
+    if not forms:
+        return set()
+    rows = await db.execute(select(ExportJob.file_path).where(ExportJob.file_path.in_(sorted(forms))))
+    return {os.path.abspath(path) for path in rows.scalars()}
+
+
+async def run_retention_pass(
+    db: AsyncSession,
+    policy: RetentionPolicy,
+    exports_dir: str,
+    batch_size: int = 200,
+    now: Optional[datetime] = None,
+    sweep_orphans: bool = True,
+    cursor: Optional[RetentionCursor] = None,
+    scan_limit: int = 1000,
+) -> RetentionResult:
+    """1 lượt dọn: xét tối đa batch_size job đã kết thúc kể từ con trỏ (xóa job hết hạn,
+    dòng DB + file), rồi quét tối đa scan_limit entry của thư mục export.
+
+    Không truyền cursor thì lượt bắt đầu từ job mới nhất và đầu thư mục.
+    """
+    now = now or datetime.utcnow()
+    own_cursor = cursor is None
+    cursor = cursor or RetentionCursor()
+    result = RetentionResult()
+    query = select(
+        ExportJob.id,
+        ExportJob.project_id,
+        ExportJob.file_path,
+        ExportJob.file_size,
+        ExportJob.completed_at,
+    ).where(ExportJob.status.in_(FINISHED_STATUSES), ExportJob.completed_at.is_not(None))
+    if cursor.job_id is not None:
+        query = query.where(
+            tuple_(ExportJob.completed_at, ExportJob.id) < tuple_(cursor.finished_at, cursor.job_id)
+        )
+    rows = await db.execute(
+        query.order_by(ExportJob.completed_at.desc(), ExportJob.id.desc()).limit(batch_size)
+    )
+    jobs = [
+        RetainedJob(
+            id=row.id,
+            project_id=row.project_id,
+            file_path=row.file_path,
+            file_size=row.file_size or 0,
+            finished_at=row.completed_at,
+        )
+        for row in rows
+    ]
+    result.scanned_jobs = len(jobs)
+    batch = select_expired(jobs, policy, now, cursor)
+    if len(jobs) < batch_size:
+        cursor.reset_jobs()  # Hết vòng: lượt sau bắt đầu lại từ job mới nhất
+    else:
+        result.more = True
+
+    if batch:
+        await db.execute(
+            delete(ExportJob)
+            .where(ExportJob.id.in_([job.id for job in batch]), ExportJob.status.in_(FINISHED_STATUSES))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        result.deleted_jobs = len(batch)
+
+        candidate_paths = {job.file_path for job in batch if job.file_path}
+        if candidate_paths:
+            # Không xóa file còn được job khác trỏ tới.
+            still_used = await db.execute(
+                select(ExportJob.file_path).where(ExportJob.file_path.in_(candidate_paths))
+            )
+            candidate_paths -= set(still_used.scalars())
+        removed, freed, errors = await asyncio.to_thread(remove_artifacts, sorted(candidate_paths))
+        result.deleted_files += removed
+        result.freed_bytes += freed
+        result.errors.extend(errors)
+
+    if sweep_orphans:
+        candidates, scanned, done = await asyncio.to_thread(
+            scan_orphan_candidates,
+            cursor,
+            exports_dir,
+            policy.orphan_grace_seconds,
+            scan_limit,
+            time.time(),
+        )
+        result.scanned_entries = scanned
+        result.more = result.more or not done
+        referenced = await _referenced_paths(db, [path for path, _, is_dir in candidates if not is_dir])
+        orphans, freed, errors = await asyncio.to_thread(remove_orphans, candidates, referenced)
+        result.orphan_files = orphans
+        result.freed_bytes += freed
+        result.errors.extend(errors)
+    if own_cursor:
+        cursor.close()
+    return result
+
+
+class ExportRetention:
+    """Vòng dọn định kỳ trong worker; lượt còn việc thì chạy tiếp ngay."""
+
+    def __init__(
+        self,
+        session_maker,
+        policy: RetentionPolicy,
+        exports_dir: str,
+        interval: float = 300,
+        batch_size: int = 200,
+        scan_limit: int = 1000,
+    ) -> None:
+        self.session_maker = session_maker
+        self.policy = policy
+        self.exports_dir = exports_dir
+        self.interval = interval
+        self.batch_size = batch_size
+        self.scan_limit = scan_limit
+        self.cursor = RetentionCursor()
+        self._stop = asyncio.Event()
+
+    async def run_once(self) -> RetentionResult:
+        async with self.session_maker() as db:
+            result = await run_retention_pass(
+                db,
+                self.policy,
+                self.exports_dir,
+                self.batch_size,
+                cursor=self.cursor,
+                scan_limit=self.scan_limit,
+            )
+        if result.deleted_jobs or result.orphan_files:
+            logger.info(
+                "Dọn export: %d job, %d file, %d file mồ côi, giải phóng %d byte",
+                result.deleted_jobs,
+                result.deleted_files,
+                result.orphan_files,
+                result.freed_bytes,
+            )
+        for error in result.errors:
+            logger.warning("Không xóa được file export %s", error)
+        return result
+
+    async def run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                delay = self.interval
+                try:
+                    result = await self.run_once()
+                    if result.more:
+                        delay = 0  # Vòng quét chưa xong: nhường event loop rồi làm lượt tiếp
+                except Exception:  # noqa: BLE001 - lỗi dọn dẹp không được dừng worker
+                    logger.exception("Lỗi khi dọn export")
+                try:
+                    await asyncio.wait_for(self._stop.wait(), delay or 0.01)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.cursor.close()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,237 @@
+"""Snapshot dữ liệu project cho export (dict thuần, picklable sang ProcessPool)."""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import (
+    Area,
+    Device,
+    DevicePort,
+    InterfaceL2Assignment,
+    L1Link,
+    L2Segment,
+    L3Address,
+    PortAnchorOverride,
+    Project,
+)
+from app.services.grid_excel import excel_range_to_rect_units
+from app.services.link_palette import get_link_color_rgb
+
+# Đồng bộ frontend canvasConstants (GRID_FALLBACK_X/Y) khi area chưa có vị trí.
+AREA_FALLBACK_X = 4.0
+AREA_FALLBACK_Y = 2.5
+
+
+def _parse_rgb(raw: str | None) -> list[int] | None:
+    if not raw:
+        return None
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if isinstance(value, list) and len(value) == 3:
+        return [int(v) for v in value]
+    return None
+
+
+def _parse_json_dict(raw: str | None) -> dict[str, Any]:
+    if not raw:
+        return {}
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError):
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _resolve_rect(
+    grid_range: str | None,
+    x: float | None,
+    y: float | None,
+    width: float | None,
+    height: float | None,
+    fallback: tuple[float, float, float, float],
+) -> tuple[float, float, float, float]:
+    """Ưu tiên grid_range, sau đó position/size lưu trong DB (giống frontend)."""
+    if grid_range:
+        try:
+            rect = excel_range_to_rect_units(grid_range)
+            return rect["x"], rect["y"], rect["width"], rect["height"]
+        except ValueError:
+            pass
+    return (
+        float(x) if x is not None else fallback[0],
+        float(y) if y is not None else fallback[1],
+        float(width) if width else fallback[2],
+        float(height) if height else fallback[3],
+    )
+
+
+async def load_export_snapshot(db: AsyncSession, project_id: str) -> dict[str, Any]:
+    """Load toàn bộ dữ liệu cần render bằng select cột (không hydrate ORM)."""
+    project_name = (
+        await db.execute(select(Project.name).where(Project.id == project_id))
+    ).scalar_one_or_none()
+
+    areas = []
+    area_rows = await db.execute(
+        select(
+            Area.id,
+            Area.name,
+            Area.grid_row,
+            Area.grid_col,
+            Area.grid_range,
+            Area.position_x,
+            Area.position_y,
+            Area.width,
+            Area.height,
+            Area.style_json,
+        )
+        .where(Area.project_id == project_id)
+        .order_by(Area.grid_row, Area.grid_col, Area.name)
+    )
+    for row in area_rows:
+        x, y, width, height = _resolve_rect(
+            row.grid_range,
+            row.position_x,
+            row.position_y,
+            row.width,
+            row.height,
+            ((row.grid_col - 1) * AREA_FALLBACK_X, (row.grid_row - 1) * AREA_FALLBACK_Y, 3.0, 1.5),
+        )
+        areas.append({
+            "id": row.id,
+            "name": row.name,
+            "x": x,
+            "y": y,
+            "width": width,
+            "height": height,
+            "style": _parse_json_dict(row.style_json),
+            "is_waypoint": row.name.endswith("_wp_"),
+        })
+
+    devices = []
+    device_rows = await db.execute(
+        select(
+            Device.id,
+            Device.area_id,
+            Device.name,
+            Device.device_type,
+            Device.grid_range,
+            Device.position_x,
+            Device.position_y,
+            Device.width,
+            Device.height,
+            Device.color_rgb_json,
+        )
+        .where(Device.project_id == project_id)
+        .order_by(Device.name)
+    )
+    for row in device_rows:
+        x, y, width, height = _resolve_rect(
+            row.grid_range,
+            row.position_x,
+            row.position_y,
+            row.width,
+            row.height,
+            (0.0, 0.0, 1.2, 0.5),
+        )
+        devices.append({
+            "id": row.id,
+            "area_id": row.area_id,
+            "name": row.name,
+            "device_type": row.device_type,
+            "x": x,
+            "y": y,
+            "width": width,
+            "height": height,
+            "color_rgb": _parse_rgb(row.color_rgb_json),
+        })
+
+    port_rows = await db.execute(
+        select(DevicePort.device_id, DevicePort.name, DevicePort.side, DevicePort.offset_ratio)
+        .where(DevicePort.project_id == project_id)
+    )
+    ports = [dict(row._mapping) for row in port_rows]
+
+    override_rows = await db.execute(
+        select(
+            PortAnchorOverride.device_id,
+            PortAnchorOverride.port_name,
+            PortAnchorOverride.side,
+            PortAnchorOverride.offset_ratio,
+        ).where(PortAnchorOverride.project_id == project_id)
+    )
+    anchor_overrides = [dict(row._mapping) for row in override_rows]
+
+    links = []
+    link_rows = await db.execute(
+        select(
+            L1Link.id,
+            L1Link.from_device_id,
+            L1Link.from_port,
+            L1Link.to_device_id,
+            L1Link.to_port,
+            L1Link.purpose,
+            L1Link.line_style,
+            L1Link.color_rgb_json,
+        )
+        .where(L1Link.project_id == project_id)
+        .order_by(L1Link.created_at)
+    )
+    for row in link_rows:
+        color = _parse_rgb(row.color_rgb_json) or list(get_link_color_rgb(row.purpose))
+        links.append({
+            "id": row.id,
+            "from_device_id": row.from_device_id,
+            "from_port": row.from_port,
+            "to_device_id": row.to_device_id,
+            "to_port": row.to_port,
+            "purpose": row.purpose,
+            "line_style": row.line_style or "solid",
+            "color_rgb": color,
+        })
+
+    l2_rows = await db.execute(
+        select(
+            InterfaceL2Assignment.device_id,
+            InterfaceL2Assignment.interface_name,
+            InterfaceL2Assignment.port_mode,
+            InterfaceL2Assignment.native_vlan,
+            L2Segment.vlan_id,
+            L2Segment.name.label("segment_name"),
+        )
+        .join(L2Segment, L2Segment.id == InterfaceL2Assignment.l2_segment_id)
+        .where(InterfaceL2Assignment.project_id == project_id)
+    )
+    l2_assignments = [dict(row._mapping) for row in l2_rows]
+
+    l3_rows = await db.execute(
+        select(
+            L3Address.device_id,
+            L3Address.interface_name,
+            L3Address.ip_address,
+            L3Address.prefix_length,
+            L3Address.is_secondary,
+        )
+        .where(L3Address.project_id == project_id)
+        .order_by(L3Address.is_secondary, L3Address.interface_name)
+    )
+    l3_addresses = [dict(row._mapping) for row in l3_rows]
+
+    return {
+        "project_id": project_id,
+        "project_name": project_name or "",
+        "areas": areas,
+        "devices": devices,
+        "ports": ports,
+        "anchor_overrides": anchor_overrides,
+        "links": links,
+        "l2_assignments": l2_assignments,
+        "l3_addresses": l3_addresses,
+    }
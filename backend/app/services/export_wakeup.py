@@ -0,0 +1,141 @@
+"""Kênh đánh thức export worker khi có job mới (thay cho poll cố định).
+
+- Khác process: mỗi worker bind socket riêng "<EXPORT_WAKEUP_SOCKET>.<pid>-<uuid8>";
+  API gửi 1 datagram tới mọi socket cùng prefix (socket của process đã chết bị dọn).
+- Cùng process (co-hosted): set trực tiếp asyncio.Event của listener.
+Gửi tín hiệu là best-effort; worker vẫn poll chậm làm fallback.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import errno
+import os
+import socket
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import EXPORT_WAKEUP_SOCKET
+
+_local_listeners: set["ExportWakeup"] = set()
+
+
+def wakeup_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def _worker_sockets(base: Path) -> list[Path]:
+    """Socket của các worker đang chạy: cùng thư mục, tên "<base>.<pid>-<uuid8>"."""
+    prefix = f"{base.name}."
+    try:
+        return [Path(entry.path) for entry in os.scandir(base.parent) if entry.name.startswith(prefix)]
+    except FileNotFoundError:
+        return []
+
+
+def notify_export_worker(socket_path: Optional[str] = None) -> None:
+    """Báo mọi worker có job mới. Không chặn, không raise."""
+    for listener in list(_local_listeners):
+        listener.signal()
+
+    path = EXPORT_WAKEUP_SOCKET if socket_path is None else socket_path
+    if not path or not wakeup_supported():
+        return
+    targets = _worker_sockets(Path(path))
+    if not targets:
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.setblocking(False)
+        for target in targets:
+            try:
+                sock.sendto(b"1", str(target))
+            except OSError as exc:
+                if exc.errno in (errno.ECONNREFUSED, errno.ENOENT):
+                    # Worker đã chết mà không dọn socket.
+                    try:
+                        target.unlink()
+                    except OSError:
+                        pass
+                # Buffer đầy (đã có tín hiệu chờ xử lý): bỏ qua.
+
+
+class ExportWakeup:
+    """Listener phía worker: bind Unix datagram socket riêng và gom tín hiệu vào 1 Event."""
+
+    def __init__(self, socket_path: Optional[str] = None) -> None:
+        self.base_path = EXPORT_WAKEUP_SOCKET if socket_path is None else socket_path
+        self.socket_path: Optional[Path] = None
+        self._event = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._sock: socket.socket | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._sock is not None
+
+    def start(self) -> "ExportWakeup":
+        self._loop = asyncio.get_running_loop()
+        _local_listeners.add(self)
+        if not self.base_path or not wakeup_supported():
+            return self
+        base = Path(self.base_path)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        path = base.with_name(f"{base.name}.{os.getpid()}-{uuid.uuid4().hex[:8]}")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.bind(str(path))
+        self._sock = sock
+        self.socket_path = path
+        self._loop.add_reader(sock.fileno(), self._on_readable)
+        return self
+
+    def _on_readable(self) -> None:
+        assert self._sock is not None
+        while True:
+            try:
+                self._sock.recv(64)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break
+        self._event.set()
+
+    def signal(self) -> None:
+        """Set event an toàn từ thread/loop bất kỳ."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._event.set()
+        else:
+            loop.call_soon_threadsafe(self._event.set)
+
+    async def wait(self, timeout: float | None) -> bool:
+        """Chờ tín hiệu tối đa timeout giây. True nếu được đánh thức."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._event.clear()
+        return True
+
+    def close(self) -> None:
+        _local_listeners.discard(self)
+        if self._sock is None:
+            return
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        if self.socket_path is not None:
+            try:
+                self.socket_path.unlink()
+            except OSError:
+                pass
+            self.socket_path = None
@@ -0,0 +1,227 @@
+"""Kernel hình học dạng mảng NumPy cho layout, waypoint và rule check.
+
+Hình chữ nhật được giữ dạng mảng (n, 4) cột x0, y0, x1, y1 (inch, trục y đi
+xuống). Mọi phép tính chạy theo lô trên cả mảng thay vì vòng lặp Python:
+- bounds / group_bounds: bao ngoài của cả tập hoặc từng nhóm (vd theo area);
+- overlapping_pairs: các cặp chồng lấn hoặc gần nhau (sweep-and-prune theo x);
+- box_gaps: khoảng cách + phần chồng của danh sách cặp;
+- containment_margins / points_in_rect: kiểm tra nằm trong;
+- nearest_gap: box gần nhất; segment_box_distances: khoảng cách đoạn - box theo cặp;
+- SpatialGrid: lưới đều để lấy các box gần 1 đoạn thẳng dài (link chéo).
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+X0, Y0, X1, Y1 = range(4)
+
+# Chặn số ô lưới khi có tọa độ bất thường (vd box rất lớn): vượt thì tăng cỡ ô.
+MAX_GRID_CELLS = 1_000_000
+
+
+def rects_from_xywh(
+    xs: Iterable[float], ys: Iterable[float], widths: Iterable[float], heights: Iterable[float]
+) -> np.ndarray:
+    """Dựng mảng (n, 4) từ tọa độ góc trên-trái và kích thước."""
+    x = np.asarray(list(xs), dtype=np.float64)
+    y = np.asarray(list(ys), dtype=np.float64)
+    rects = np.empty((len(x), 4), dtype=np.float64)
+    rects[:, X0] = x
+    rects[:, Y0] = y
+    rects[:, X1] = x + np.asarray(list(widths), dtype=np.float64)
+    rects[:, Y1] = y + np.asarray(list(heights), dtype=np.float64)
+    return rects
+
+
+def rect_bounds(x: float, y: float, width: float, height: float) -> tuple[float, float, float, float]:
+    """(left, top, right, bottom) của 1 hình chữ nhật."""
+    return x, y, x + width, y + height
+
+
+def bounds(rects: np.ndarray) -> Optional[tuple[float, float, float, float]]:
+    """Bao ngoài của cả tập; None nếu rỗng."""
+    if len(rects) == 0:
+        return None
+    low = rects[:, :2].min(axis=0)
+    high = rects[:, 2:].max(axis=0)
+    return float(low[0]), float(low[1]), float(high[0]), float(high[1])
+
+
+def group_bounds(rects: np.ndarray, groups: Sequence) -> dict:
+    """Bao ngoài theo nhóm (groups[i] là nhóm của rects[i])."""
+    if len(rects) == 0:
+        return {}
+    keys, inverse = np.unique(np.asarray(groups, dtype=object), return_inverse=True)
+    low = np.full((len(keys), 2), np.inf)
+    high = np.full((len(keys), 2), -np.inf)
+    np.minimum.at(low, inverse, rects[:, :2])
+    np.maximum.at(high, inverse, rects[:, 2:])
+    return {
+        key: (float(low[index, 0]), float(low[index, 1]), float(high[index, 0]), float(high[index, 1]))
+        for index, key in enumerate(keys)
+    }
+
+
+def overlapping_pairs(rects: np.ndarray, margin: float = 0.0, eps: float = 0.0) -> np.ndarray:
+    """Các cặp (i, j), i < j, có phần chồng > eps sau khi nới mỗi box thêm margin/2 mỗi phía.
+
+    margin = 0: cặp chồng lấn thật; margin = gap: cặp cách nhau < gap. Sweep-and-prune:
+    sắp theo x0, với mỗi box chỉ xét các box có x0 nằm trong [x0_i, x1_i + margin]
+    (searchsorted), rồi lọc theo y trên cả lô.
+    """
+    count = len(rects)
+    if count < 2:
+        return np.empty((0, 2), dtype=np.intp)
+    order = np.argsort(rects[:, X0], kind="stable")
+    ordered = rects[order]
+    ends = np.searchsorted(ordered[:, X0], ordered[:, X1] + margin - eps, side="left")
+    starts = np.arange(1, count + 1)
+    counts = np.maximum(ends - starts, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty((0, 2), dtype=np.intp)
+    first = np.repeat(np.arange(count), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = np.repeat(starts, counts) + offsets
+    a, b = ordered[first], ordered[second]
+    overlap_x = np.minimum(a[:, X1], b[:, X1]) - np.maximum(a[:, X0], b[:, X0]) + margin
+    overlap_y = np.minimum(a[:, Y1], b[:, Y1]) - np.maximum(a[:, Y0], b[:, Y0]) + margin
+    keep = (overlap_x > eps) & (overlap_y > eps)
+    pairs = np.stack([order[first[keep]], order[second[keep]]], axis=1)
+    pairs.sort(axis=1)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def box_gaps(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(khoảng cách Euclid, phần chồng x, phần chồng y) cho từng cặp a[k], b[k]."""
+    overlap_x = np.minimum(a[:, X1], b[:, X1]) - np.maximum(a[:, X0], b[:, X0])
+    overlap_y = np.minimum(a[:, Y1], b[:, Y1]) - np.maximum(a[:, Y0], b[:, Y0])
+    gap = np.hypot(np.maximum(-overlap_x, 0.0), np.maximum(-overlap_y, 0.0))
+    return gap, overlap_x, overlap_y
+
+
+def containment_margins(outer: np.ndarray, inner: np.ndarray) -> np.ndarray:
+    """Khoảng cách nhỏ nhất từ inner[k] tới biên outer[k]; âm nếu lòi ra ngoài."""
+    return np.min(
+        np.stack(
+            [
+                inner[:, X0] - outer[:, X0],
+                inner[:, Y0] - outer[:, Y0],
+                outer[:, X1] - inner[:, X1],
+                outer[:, Y1] - inner[:, Y1],
+            ],
+            axis=1,
+        ),
+        axis=1,
+    )
+
+
+def points_in_rect(xs: np.ndarray, ys: np.ndarray, rect: Sequence[float]) -> np.ndarray:
+    """Mảng bool: điểm (xs[k], ys[k]) nằm trong (kể cả biên) rect (left, top, right, bottom)."""
+    left, top, right, bottom = rect
+    return (xs >= left) & (xs <= right) & (ys >= top) & (ys <= bottom)
+
+
+def point_in_rect(px: float, py: float, rect: Sequence[float]) -> bool:
+    return bool(points_in_rect(np.asarray([px]), np.asarray([py]), rect)[0])
+
+
+def nearest_gap(rects: np.ndarray, query: Sequence[float]) -> tuple[int, float]:
+    """(chỉ số, khoảng cách) của box gần query (left, top, right, bottom) nhất; (-1, inf) nếu rỗng."""
+    if len(rects) == 0:
+        return -1, float("inf")
+    gaps, _, _ = box_gaps(rects, np.broadcast_to(np.asarray(query, dtype=np.float64), rects.shape))
+    index = int(np.argmin(gaps))
+    return index, float(gaps[index])
+
+
+def segment_box_distances(segments: np.ndarray, rects: np.ndarray) -> np.ndarray:
+    """Khoảng cách từ đoạn segments[k] = (ax, ay, bx, by) tới box rects[k] (0 nếu đoạn cắt qua box)."""
+    if len(rects) == 0:
+        return np.empty(0)
+    ax, ay, bx, by = segments[:, 0], segments[:, 1], segments[:, 2], segments[:, 3]
+    dx, dy = bx - ax, by - ay
+    # Liang-Barsky theo lô: đoạn cắt box khi khoảng tham số [t0, t1] không rỗng.
+    t0 = np.zeros(len(rects))
+    t1 = np.ones(len(rects))
+    hits = np.ones(len(rects), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in (
+            (-dx, ax - rects[:, X0]),
+            (dx, rects[:, X1] - ax),
+            (-dy, ay - rects[:, Y0]),
+            (dy, rects[:, Y1] - ay),
+        ):
+            parallel = p == 0
+            hits &= ~parallel | (q >= 0)
+            t = q / np.where(parallel, 1.0, p)
+            t0 = np.where(~parallel & (p < 0), np.maximum(t0, t), t0)
+            t1 = np.where(~parallel & (p > 0), np.minimum(t1, t), t1)
+    hits &= t0 <= t1
+
+    length_sq = dx * dx + dy * dy
+    safe_length = np.where(length_sq == 0, 1.0, length_sq)
+    distances = []
+    for cx, cy in ((X0, Y0), (X1, Y0), (X0, Y1), (X1, Y1)):
+        px, py = rects[:, cx], rects[:, cy]
+        t = np.where(length_sq == 0, 0.0, np.clip(((px - ax) * dx + (py - ay) * dy) / safe_length, 0.0, 1.0))
+        distances.append(np.hypot(px - (ax + t * dx), py - (ay + t * dy)))
+    for px, py in ((ax, ay), (bx, by)):
+        gap_x = np.maximum(np.maximum(rects[:, X0] - px, 0.0), px - rects[:, X1])
+        gap_y = np.maximum(np.maximum(rects[:, Y0] - py, 0.0), py - rects[:, Y1])
+        distances.append(np.hypot(gap_x, gap_y))
+    return np.where(hits, 0.0, np.min(np.stack(distances, axis=1), axis=1))
+
+
+def grid_cell_size(rects: np.ndarray, margin: float) -> float:
+    """Cỡ ô ~ cạnh lớn nhất của box + margin: mỗi box phủ tối đa vài ô."""
+    if len(rects) == 0:
+        return 1.0
+    size = float(np.max(rects[:, 2:] - rects[:, :2])) + margin
+    size = max(size, 1e-6)
+    low_x, low_y, high_x, high_y = bounds(rects)
+    while ((high_x - low_x) / size + 1) * ((high_y - low_y) / size + 1) > MAX_GRID_CELLS:
+        size *= 2
+    return size
+
+
+class SpatialGrid:
+    """Lưới đều trong bộ nhớ: box được ghi vào mọi ô nó phủ (dựng theo lô), truy vấn theo hình chữ nhật."""
+
+    def __init__(self, rects: np.ndarray, cell_size: float) -> None:
+        self.cell_size = max(cell_size, 1e-6)
+        self.cells: dict[tuple[int, int], list[int]] = {}
+        if len(rects) == 0:
+            return
+        cells = np.floor(rects / self.cell_size).astype(np.int64)
+        spans_x = cells[:, X1] - cells[:, X0] + 1
+        spans_y = cells[:, Y1] - cells[:, Y0] + 1
+        per_box = spans_x * spans_y
+        owner = np.repeat(np.arange(len(rects)), per_box)
+        local = np.arange(int(per_box.sum())) - np.repeat(np.cumsum(per_box) - per_box, per_box)
+        cols = cells[owner, X0] + local // spans_y[owner]
+        rows = cells[owner, Y0] + local % spans_y[owner]
+        for col, row, index in zip(cols.tolist(), rows.tolist(), owner.tolist()):
+            self.cells.setdefault((col, row), []).append(index)
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> set[int]:
+        size = self.cell_size
+        found: set[int] = set()
+        for col in range(math.floor(x0 / size), math.floor(x1 / size) + 1):
+            for row in range(math.floor(y0 / size), math.floor(y1 / size) + 1):
+                found.update(self.cells.get((col, row), ()))
+        return found
+
+    def query_segment(self, ax: float, ay: float, bx: float, by: float, margin: float) -> set[int]:
+        """Box gần đoạn AB (trong margin): đi dọc đoạn theo từng ô, không quét cả bbox của link chéo dài."""
+        steps = max(1, math.ceil(math.hypot(bx - ax, by - ay) / self.cell_size))
+        found: set[int] = set()
+        for step in range(steps):
+            sx, sy = ax + (bx - ax) * step / steps, ay + (by - ay) * step / steps
+            ex, ey = ax + (bx - ax) * (step + 1) / steps, ay + (by - ay) * (step + 1) / steps
+            found |= self.query(min(sx, ex) - margin, min(sy, ey) - margin, max(sx, ex) + margin, max(sy, ey) + margin)
+        return found
@@ -4,7 +4,7 @@ import json
 from typing import Any, Optional
 
 from pydantic import ValidationError
-from sqlalchemy import delete, select
+from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import (
@@ -28,6 +28,9 @@ from app.schemas.l2_segment import L2SegmentCreate
 from app.schemas.l3_address import L3AddressCreate
 from app.schemas.port_channel import PortChannelCreate
 from app.schemas.virtual_port import VirtualPortCreate
+from app.services.l3_address import build_address
+from app.services.link import normalize_link_key
+from app.services.vlan_bitset import bitmap_from_vlans
 
 
 def _add_error(
@@ -62,16 +65,6 @@ def _map_validation_code(entity: str, field: Optional[str]) -> str:
     return "VALIDATION_ERROR"
 
 
-def _normalize_link_key(
-    from_device_id: str, from_port: str, to_device_id: str, to_port: str
-) -> tuple[str, str, str, str]:
-    left = (from_device_id, from_port)
-    right = (to_device_id, to_port)
-    if left <= right:
-        return (from_device_id, from_port, to_device_id, to_port)
-    return (to_device_id, to_port, from_device_id, from_port)
-
-
 def _extract_channel_number(name: str) -> Optional[int]:
     import re
 
@@ -133,6 +126,13 @@ async def _clear_project_data(db: AsyncSession, project_id: str) -> None:
     await db.execute(delete(DevicePort).where(DevicePort.project_id == project_id))
     await db.execute(delete(Device).where(Device.project_id == project_id))
     await db.execute(delete(Area).where(Area.project_id == project_id))
+    # Delete bulk không qua flush nên phải tự tăng revision.
+    await db.execute(
+        update(Project)
+        .where(Project.id == project_id)
+        .values(revision=Project.revision + 1)
+        .execution_options(synchronize_session=False)
+    )
 
 
 async def import_project_data(
@@ -277,7 +277,7 @@ async def import_project_data(
 
             result = await db.execute(select(L1Link).where(L1Link.project_id == project_id))
             for link in result.scalars().all():
-                key = _normalize_link_key(
+                key = normalize_link_key(
                     link.from_device_id,
                     link.from_port,
                     link.to_device_id,
@@ -416,7 +416,7 @@ async def import_project_data(
                 )
                 continue
 
-            key = _normalize_link_key(
+            key = normalize_link_key(
                 from_device.id, link_data.from_port, to_device.id, link_data.to_port
             )
             if key in link_keys:
@@ -711,6 +711,7 @@ async def import_project_data(
                     if assign_data.allowed_vlans is None
                     else json.dumps(assign_data.allowed_vlans)
                 ),
+                allowed_vlans_bitmap=bitmap_from_vlans(assign_data.allowed_vlans),
             )
             db.add(assignment)
             await db.flush()
@@ -747,15 +748,7 @@ async def import_project_data(
                 )
                 continue
 
-            address = L3Address(
-                project_id=project_id,
-                device_id=device.id,
-                interface_name=addr_data.interface_name,
-                ip_address=addr_data.ip_address,
-                prefix_length=addr_data.prefix_length,
-                is_secondary=addr_data.is_secondary,
-                description=addr_data.description,
-            )
+            address = build_address(project_id, device.id, addr_data)
             db.add(address)
             await db.flush()
             l3_address_keys.add(key)
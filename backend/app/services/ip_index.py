@@ -0,0 +1,351 @@
+"""Index địa chỉ L3 theo project: phát hiện trùng IP và subnet chồng lấn.
+
+Mỗi địa chỉ được parse 1 lần thành số nguyên (ip, network, broadcast). Subnet CIDR
+chỉ có thể lồng nhau hoặc rời nhau, nên:
+- subnet chứa địa chỉ mới: tra dict theo (version, network đã mask, prefix) cho từng
+  prefix ngắn hơn (tối đa 33/129 lần tra);
+- subnet nằm trong địa chỉ mới: bisect trên mảng network đã sắp xếp.
+Kiểm tra 1 địa chỉ vì vậy là O(log n), không phụ thuộc số địa chỉ của project.
+
+Cột ip_key/network_key của L3Address lưu cùng số nguyên dạng hex cố định độ dài
+(version + hex), sắp xếp chuỗi = sắp xếp số, để tra bằng index DB khi tạo 1 địa chỉ.
+"""
+
+from __future__ import annotations
+
+import bisect
+import ipaddress
+import socket
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Device, L3Address
+from app.services.rule_check import SEVERITY_ERROR, SEVERITY_WARN, RuleCheckReport
+
+MAX_PREFIX = {4: 32, 6: 128}
+KEY_WIDTH = {4: 8, 6: 32}
+# Subnet point-to-point (/31, /32, /127, /128) không có network/broadcast, không cần gateway.
+HOST_SUBNET_MAX_PREFIX = {4: 30, 6: 126}
+GATEWAY_DEVICE_TYPES = {"ROUTER", "FIREWALL", "SWITCH"}
+HOST_DEVICE_TYPES = {"SERVER", "STORAGE", "PC", "AP"}
+
+Violation = tuple[str, str]
+
+
+@dataclass(frozen=True)
+class ParsedAddress:
+    id: Optional[str]
+    device_id: str
+    interface_name: str
+    version: int
+    ip: int
+    network: int
+    broadcast: int
+    prefix_length: int
+    is_secondary: bool = False
+    device_name: str = ""
+
+    @property
+    def network_key(self) -> tuple[int, int, int]:
+        return self.version, self.network, self.prefix_length
+
+    @property
+    def ip_text(self) -> str:
+        return str(ipaddress.IPv4Address(self.ip) if self.version == 4 else ipaddress.IPv6Address(self.ip))
+
+    @property
+    def cidr(self) -> str:
+        return format_network(self.version, self.network, self.prefix_length)
+
+    @property
+    def label(self) -> str:
+        return f"{self.device_name or self.device_id}:{self.interface_name}"
+
+
+def format_network(version: int, network: int, prefix_length: int) -> str:
+    address = ipaddress.IPv4Address(network) if version == 4 else ipaddress.IPv6Address(network)
+    return f"{address}/{prefix_length}"
+
+
+def parse_address(
+    ip_address: str,
+    prefix_length: int,
+    id: Optional[str] = None,
+    device_id: str = "",
+    interface_name: str = "",
+    is_secondary: bool = False,
+    device_name: str = "",
+) -> ParsedAddress:
+    """Parse IP + prefix; ValueError nếu không hợp lệ (vd prefix > 32 với IPv4).
+
+    Dùng inet_pton thay cho ipaddress.ip_interface (nhanh hơn ~20 lần khi load 100k địa chỉ).
+    """
+    text = ip_address.strip()
+    version = 6 if ":" in text else 4
+    try:
+        packed = socket.inet_pton(socket.AF_INET6 if version == 6 else socket.AF_INET, text.split("%", 1)[0])
+    except OSError:
+        raise ValueError(f"Địa chỉ IP '{ip_address}' không hợp lệ") from None
+    bits = MAX_PREFIX[version]
+    if not 0 <= prefix_length <= bits:
+        raise ValueError(f"Prefix length {prefix_length} không hợp lệ cho IPv{version}")
+    ip = int.from_bytes(packed, "big")
+    network = _mask(version, ip, prefix_length)
+    return ParsedAddress(
+        id=id,
+        device_id=device_id,
+        interface_name=interface_name,
+        version=version,
+        ip=ip,
+        network=network,
+        broadcast=network | ((1 << (bits - prefix_length)) - 1),
+        prefix_length=prefix_length,
+        is_secondary=bool(is_secondary),
+        device_name=device_name or "",
+    )
+
+
+def int_key(version: int, value: int) -> str:
+    return f"{version}{value:0{KEY_WIDTH[version]}x}"
+
+
+def address_keys(ip_address: str, prefix_length: int) -> tuple[Optional[str], Optional[str]]:
+    """(ip_key, network_key) cho cột L3Address; (None, None) nếu không parse được."""
+    try:
+        parsed = parse_address(ip_address, prefix_length)
+    except ValueError:
+        return None, None
+    return int_key(parsed.version, parsed.ip), int_key(parsed.version, parsed.network)
+
+
+def _mask(version: int, value: int, prefix_length: int) -> int:
+    bits = MAX_PREFIX[version]
+    return value >> (bits - prefix_length) << (bits - prefix_length) if prefix_length else 0
+
+
+@dataclass
+class AddressIndex:
+    """Index in-memory: IP -> địa chỉ, subnet -> địa chỉ, mảng subnet đã sắp xếp."""
+
+    by_ip: dict[tuple[int, int], list[ParsedAddress]] = field(default_factory=dict)
+    by_network: dict[tuple[int, int, int], list[ParsedAddress]] = field(default_factory=dict)
+    networks: list[tuple[int, int, int]] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, addresses: Iterable[ParsedAddress]) -> "AddressIndex":
+        index = cls()
+        for address in addresses:
+            index.by_ip.setdefault((address.version, address.ip), []).append(address)
+            index.by_network.setdefault(address.network_key, []).append(address)
+        index.networks = sorted(index.by_network)
+        return index
+
+    def add(self, address: ParsedAddress) -> None:
+        self.by_ip.setdefault((address.version, address.ip), []).append(address)
+        members = self.by_network.setdefault(address.network_key, [])
+        if not members:
+            bisect.insort(self.networks, address.network_key)
+        members.append(address)
+
+    def containing(self, address: ParsedAddress) -> Iterable[ParsedAddress]:
+        """Địa chỉ có subnet chứa (hoặc bằng) subnet của address."""
+        for prefix_length in range(address.prefix_length + 1):
+            key = (address.version, _mask(address.version, address.ip, prefix_length), prefix_length)
+            yield from self.by_network.get(key, ())
+
+    def contained(self, address: ParsedAddress) -> Iterable[ParsedAddress]:
+        """Địa chỉ có subnet nằm hẳn trong subnet của address (prefix dài hơn)."""
+        start = bisect.bisect_left(self.networks, (address.version, address.network, address.prefix_length + 1))
+        for position in range(start, len(self.networks)):
+            version, network, prefix_length = self.networks[position]
+            if version != address.version or network > address.broadcast:
+                break
+            if prefix_length > address.prefix_length:
+                yield from self.by_network[self.networks[position]]
+
+    def check(self, address: ParsedAddress) -> Optional[Violation]:
+        """Vi phạm đầu tiên của address so với index (bỏ qua bản ghi cùng id khi update)."""
+        for other in self.by_ip.get((address.version, address.ip), ()):
+            if not _same_record(other, address):
+                return "IP_DUPLICATE", f"Địa chỉ IP '{address.ip_text}' đã được gán cho {other.label}"
+        for other in self.containing(address):
+            if _same_record(other, address):
+                continue
+            if other.prefix_length != address.prefix_length:
+                return (
+                    "SUBNET_OVERLAP",
+                    f"Subnet {address.cidr} chồng lấn {other.cidr} trên {other.label}",
+                )
+            if other.device_id == address.device_id and other.interface_name != address.interface_name:
+                return (
+                    "SUBNET_DUPLICATE_ON_DEVICE",
+                    f"Subnet {address.cidr} đã có trên interface {other.interface_name} của device",
+                )
+        for other in self.contained(address):
+            if not _same_record(other, address):
+                return "SUBNET_OVERLAP", f"Subnet {address.cidr} chồng lấn {other.cidr} trên {other.label}"
+        return None
+
+
+def _same_record(other: ParsedAddress, address: ParsedAddress) -> bool:
+    return address.id is not None and other.id == address.id
+
+
+def build_conflict_report(addresses: list[ParsedAddress], device_types: dict[str, str]) -> RuleCheckReport:
+    """Báo cáo xung đột địa chỉ của cả project (RB-401..405) trong O(n log n)."""
+    index = AddressIndex.build(addresses)
+    report = RuleCheckReport(checked={"l3_addresses": len(addresses), "subnets": len(index.networks)})
+
+    for members in index.by_ip.values():
+        if len(members) > 1:
+            report.add(
+                "RB-401",
+                SEVERITY_ERROR,
+                "l3_address",
+                [member.id for member in members],
+                f"IP {members[0].ip_text} bị trùng trên: {_labels(members)}",
+            )
+
+    # Subnet CIDR lồng nhau như ngoặc: duyệt theo (network, prefix) với 1 stack các subnet đang mở,
+    # đỉnh stack là subnet nhỏ nhất chứa subnet hiện tại.
+    stack: list[tuple[int, int, int]] = []
+    for key in index.networks:
+        version, network, _ = key
+        members = index.by_network[key]
+        broadcast = members[0].broadcast
+        while stack and (stack[-1][0] != version or index.by_network[stack[-1]][0].broadcast < network):
+            stack.pop()
+        if stack:
+            outer = index.by_network[stack[-1]]
+            report.add(
+                "RB-402",
+                SEVERITY_ERROR,
+                "l3_address",
+                [member.id for member in members + outer],
+                f"Subnet {members[0].cidr} ({_labels(members)}) chồng lấn {outer[0].cidr} ({_labels(outer)})",
+            )
+        stack.append(key)
+        _check_subnet_members(report, members, broadcast, device_types)
+    return report
+
+
+def _labels(members: list[ParsedAddress], limit: int = 3) -> str:
+    labels = ", ".join(member.label for member in members[:limit])
+    return labels if len(members) <= limit else f"{labels}, +{len(members) - limit}"
+
+
+def _check_subnet_members(
+    report: RuleCheckReport, members: list[ParsedAddress], broadcast: int, device_types: dict[str, str]
+) -> None:
+    first = members[0]
+    interfaces_by_device: dict[str, set[str]] = {}
+    for member in members:
+        interfaces_by_device.setdefault(member.device_id, set()).add(member.interface_name)
+    for device_id, interfaces in interfaces_by_device.items():
+        if len(interfaces) > 1:
+            ids = [member.id for member in members if member.device_id == device_id]
+            report.add(
+                "RB-403",
+                SEVERITY_ERROR,
+                "l3_address",
+                ids,
+                f"Subnet {first.cidr} gán trên nhiều interface của cùng device: {', '.join(sorted(interfaces))}",
+            )
+
+    if first.prefix_length > HOST_SUBNET_MAX_PREFIX[first.version]:
+        return
+    if first.version == 4:
+        for member in members:
+            if member.ip in (member.network, broadcast):
+                report.add(
+                    "RB-404",
+                    SEVERITY_ERROR,
+                    "l3_address",
+                    [member.id],
+                    f"IP {member.ip_text} trên {member.label} là địa chỉ network/broadcast của {first.cidr}",
+                )
+    types = {(device_types.get(member.device_id) or "").upper() for member in members}
+    if types & HOST_DEVICE_TYPES and not types & GATEWAY_DEVICE_TYPES:
+        report.add(
+            "RB-405",
+            SEVERITY_WARN,
+            "l3_address",
+            [member.id for member in members],
+            f"Subnet {first.cidr} có host nhưng không có gateway (Router/Firewall/L3 Switch)",
+        )
+
+
+def _parsed_rows(rows) -> list[ParsedAddress]:
+    parsed = []
+    for address_id, device_id, interface_name, ip_address, prefix_length, is_secondary, device_name in rows:
+        try:
+            parsed.append(
+                parse_address(
+                    ip_address, prefix_length, address_id, device_id, interface_name, is_secondary, device_name or ""
+                )
+            )
+        except ValueError:
+            continue
+    return parsed
+
+
+def _address_query(project_id: str):
+    return (
+        select(
+            L3Address.id,
+            L3Address.device_id,
+            L3Address.interface_name,
+            L3Address.ip_address,
+            L3Address.prefix_length,
+            L3Address.is_secondary,
+            Device.name,
+        )
+        .outerjoin(Device, Device.id == L3Address.device_id)
+        .where(L3Address.project_id == project_id)
+    )
+
+
+async def load_address_index(
+    db: AsyncSession, project_id: str, candidate: Optional[ParsedAddress] = None
+) -> AddressIndex:
+    """Load AddressIndex của project.
+
+    Có candidate thì chỉ đọc các địa chỉ có thể xung đột với nó (trùng ip_key, subnet chứa
+    nó, 1 subnet nằm trong nó) qua index ix_l3_addresses_project_*_key: đủ cho index.check.
+    """
+    if candidate is None:
+        return AddressIndex.build(_parsed_rows((await db.execute(_address_query(project_id))).all()))
+
+    version = candidate.version
+    containing_keys = [
+        int_key(version, _mask(version, candidate.ip, prefix_length))
+        for prefix_length in range(candidate.prefix_length + 1)
+    ]
+    queries = [
+        _address_query(project_id).where(L3Address.ip_key == int_key(version, candidate.ip)),
+        _address_query(project_id).where(
+            L3Address.network_key.in_(containing_keys),
+            L3Address.prefix_length <= candidate.prefix_length,
+        ),
+        _address_query(project_id)
+        .where(
+            L3Address.network_key >= int_key(version, candidate.network),
+            L3Address.network_key <= int_key(version, candidate.broadcast),
+            L3Address.prefix_length > candidate.prefix_length,
+        )
+        .limit(2),
+    ]
+    rows = {}
+    for query in queries:
+        for row in (await db.execute(query)).all():
+            rows[row[0]] = row
+    return AddressIndex.build(_parsed_rows(rows.values()))
+
+
+async def run_address_conflict_report(db: AsyncSession, project_id: str) -> RuleCheckReport:
+    rows = (await db.execute(_address_query(project_id))).all()
+    device_rows = await db.execute(select(Device.id, Device.device_type).where(Device.project_id == project_id))
+    return build_conflict_report(_parsed_rows(rows), dict(device_rows.all()))
@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import Device, InterfaceL2Assignment, L2Segment
 from app.schemas.l2_assignment import InterfaceL2AssignmentCreate, InterfaceL2AssignmentUpdate
+from app.services.vlan_bitset import bitmap_from_vlans, vlans_from_bitmap
 
 
 async def get_assignment(
@@ -75,18 +76,27 @@ async def get_device_by_name(
     return result.scalar_one_or_none()
 
 
-async def create_assignment(
-    db: AsyncSession,
+async def get_assignment_keys(db: AsyncSession, project_id: str) -> set[tuple[str, str]]:
+    """Lấy tập (device_id, interface_name) đã có L2 assignment trong project (1 query)."""
+    result = await db.execute(
+        select(InterfaceL2Assignment.device_id, InterfaceL2Assignment.interface_name).where(
+            InterfaceL2Assignment.project_id == project_id
+        )
+    )
+    return {(device_id, interface_name) for device_id, interface_name in result.all()}
+
+
+def build_assignment(
     project_id: str,
     device_id: str,
     data: InterfaceL2AssignmentCreate,
 ) -> InterfaceL2Assignment:
-    """Tạo L2 assignment mới."""
+    """Dựng InterfaceL2Assignment từ payload (chưa add/commit)."""
     allowed_vlans_json = None
     if data.allowed_vlans:
         allowed_vlans_json = json.dumps(data.allowed_vlans)
 
-    assignment = InterfaceL2Assignment(
+    return InterfaceL2Assignment(
         project_id=project_id,
         device_id=device_id,
         interface_name=data.interface_name,
@@ -94,13 +104,35 @@ async def create_assignment(
         port_mode=data.port_mode,
         native_vlan=data.native_vlan,
         allowed_vlans_json=allowed_vlans_json,
+        allowed_vlans_bitmap=bitmap_from_vlans(data.allowed_vlans or None),
     )
+
+
+async def create_assignment(
+    db: AsyncSession,
+    project_id: str,
+    device_id: str,
+    data: InterfaceL2AssignmentCreate,
+) -> InterfaceL2Assignment:
+    """Tạo L2 assignment mới."""
+    assignment = build_assignment(project_id, device_id, data)
     db.add(assignment)
     await db.commit()
     await db.refresh(assignment)
     return assignment
 
 
+async def create_assignments_bulk(
+    db: AsyncSession, assignments: list[InterfaceL2Assignment]
+) -> list[InterfaceL2Assignment]:
+    """Insert nhiều L2 assignment trong 1 transaction."""
+    if not assignments:
+        return assignments
+    db.add_all(assignments)
+    await db.commit()
+    return assignments
+
+
 async def update_assignment(
     db: AsyncSession,
     assignment: InterfaceL2Assignment,
@@ -117,6 +149,7 @@ async def update_assignment(
     # Handle allowed_vlans
     if data.allowed_vlans is not None:
         update_data["allowed_vlans_json"] = json.dumps(data.allowed_vlans)
+        update_data["allowed_vlans_bitmap"] = bitmap_from_vlans(data.allowed_vlans)
 
     for field, value in update_data.items():
         setattr(assignment, field, value)
@@ -152,3 +185,10 @@ def parse_allowed_vlans(allowed_vlans_json: Optional[str]) -> Optional[list[int]
         return json.loads(allowed_vlans_json)
     except json.JSONDecodeError:
         return None
+
+
+def assignment_allowed_vlans(assignment: InterfaceL2Assignment) -> Optional[list[int]]:
+    """allowed_vlans đọc từ bitmap; JSON chỉ dùng cho bản ghi chưa backfill."""
+    if assignment.allowed_vlans_bitmap is not None:
+        return vlans_from_bitmap(assignment.allowed_vlans_bitmap)
+    return parse_allowed_vlans(assignment.allowed_vlans_json)
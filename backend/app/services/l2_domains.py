@@ -0,0 +1,237 @@
+"""Broadcast domain L2 theo VLAN bằng union-find trên nút (device, VLAN).
+
+Mỗi interface có assignment mang 1 tập VLAN: access -> VLAN của segment; trunk ->
+allowed VLAN (None = mọi VLAN) cộng VLAN của segment. Device là thành viên VLAN v nếu
+có interface mang v. 1 L1 link nối (A, v) với (B, v) cho mọi v mà cả 2 đầu cùng mang;
+đầu không có assignment không nối gì. Chỉ xét VLAN có trong project (segment/access).
+
+Tập VLAN được nén về ma trận (port, VLAN của project) bool, giao theo lô cho mọi link;
+union chạy vector hóa trên mảng parent (hook gốc lớn vào gốc nhỏ + nén đường đi) nên
+50k link x vài trăm VLAN vẫn trong vài trăm ms. Kết quả cache theo Project.revision.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import InterfaceL2Assignment, L1Link, L2Segment, Project
+from app.services.vlan_bitset import VLAN_MAX, VLAN_MIN, bitmap_from_json, stack_bitmaps
+
+CACHE_MAX_PROJECTS = 64
+
+
+class DisjointSet:
+    """Union-find trên 0..n-1, union theo lô bằng NumPy."""
+
+    def __init__(self, size: int) -> None:
+        self.parent = np.arange(size, dtype=np.int64)
+
+    def _compress(self) -> None:
+        parent = self.parent
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+        self.parent = parent
+
+    def find(self, nodes: np.ndarray) -> np.ndarray:
+        self._compress()
+        return self.parent[nodes]
+
+    def union(self, left: np.ndarray, right: np.ndarray) -> None:
+        """Nối từng cặp (left[i], right[i]); gốc lớn hook vào gốc nhỏ nên không tạo vòng."""
+        left = np.asarray(left, dtype=np.int64)
+        right = np.asarray(right, dtype=np.int64)
+        while left.size:
+            root_left = self.find(left)
+            root_right = self.find(right)
+            pending = root_left != root_right
+            if not pending.any():
+                break
+            left, right = left[pending], right[pending]
+            low = np.minimum(root_left[pending], root_right[pending])
+            high = np.maximum(root_left[pending], root_right[pending])
+            np.minimum.at(self.parent, high, low)
+
+    def roots(self) -> np.ndarray:
+        self._compress()
+        return self.parent
+
+
+@dataclass
+class BroadcastDomains:
+    """Component theo VLAN: list device id, component lớn nhất đứng đầu."""
+
+    vlans: dict[int, list[list[str]]] = field(default_factory=dict)
+    names: dict[int, str] = field(default_factory=dict)
+    revision: Optional[int] = None
+
+    def islands(self, vlan_id: int) -> list[list[str]]:
+        """Phần VLAN bị tách khỏi component chính (không thông L2 tới nó)."""
+        return self.vlans.get(vlan_id, [])[1:]
+
+    def component_index(self, vlan_id: int) -> dict[str, int]:
+        return {
+            device_id: idx for idx, component in enumerate(self.vlans.get(vlan_id, [])) for device_id in component
+        }
+
+    @property
+    def split_vlans(self) -> list[int]:
+        return [vlan_id for vlan_id, components in self.vlans.items() if len(components) > 1]
+
+
+def _carried_vlans(allowed: np.ndarray, vlans: np.ndarray) -> np.ndarray:
+    """(n, 64) uint64 -> (n, len(vlans)) bool: port có mang VLAN vlans[j] không."""
+    words = allowed[:, vlans // 64]
+    return ((words >> (vlans % 64).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def compute_broadcast_domains(assignment_rows, link_rows, project_vlans=()) -> BroadcastDomains:
+    """assignment_rows: (device_id, interface_name, port_mode, vlan_id, bitmap, allowed_vlans_json);
+    link_rows: (from_device_id, from_port, to_device_id, to_port)."""
+    rows = list(assignment_rows)
+    vlan_set = {int(vlan) for vlan in project_vlans if vlan is not None}
+    vlan_set.update(int(row[3]) for row in rows if row[3] is not None)
+    vlans = np.asarray(sorted(v for v in vlan_set if VLAN_MIN <= v <= VLAN_MAX), dtype=np.int64)
+    if not rows or not vlans.size:
+        return BroadcastDomains()
+    column = {int(vlan): idx for idx, vlan in enumerate(vlans.tolist())}
+
+    device_index: dict[str, int] = {}
+    port_index: dict[tuple[str, str], int] = {}
+    row_port, row_vlan, trunk_rows, trunk_bitmaps = [], [], [], []
+    for device_id, interface_name, port_mode, vlan_id, bitmap, allowed_vlans_json in rows:
+        device_index.setdefault(device_id, len(device_index))
+        port = port_index.setdefault((device_id, (interface_name or "").strip()), len(port_index))
+        row_port.append(port)
+        row_vlan.append(column.get(int(vlan_id), -1) if vlan_id is not None else -1)
+        if (port_mode or "").lower() == "trunk":
+            trunk_rows.append(port)
+            trunk_bitmaps.append(bitmap if bitmap is not None else bitmap_from_json(allowed_vlans_json))
+
+    carried = np.zeros((len(port_index), vlans.size), dtype=bool)
+    row_port_arr = np.asarray(row_port, dtype=np.int64)
+    row_vlan_arr = np.asarray(row_vlan, dtype=np.int64)
+    has_vlan = row_vlan_arr >= 0
+    carried[row_port_arr[has_vlan], row_vlan_arr[has_vlan]] = True
+    if trunk_rows:
+        trunk_carried = _carried_vlans(stack_bitmaps(trunk_bitmaps), vlans)
+        np.logical_or.at(carried, np.asarray(trunk_rows, dtype=np.int64), trunk_carried)
+
+    port_device = np.empty(len(port_index), dtype=np.int64)
+    for (device_id, _), port in port_index.items():
+        port_device[port] = device_index[device_id]
+    width = vlans.size
+    member = np.zeros((len(device_index), width), dtype=bool)
+    np.logical_or.at(member, port_device, carried)
+
+    link_a, link_b = [], []
+    for from_device_id, from_port, to_device_id, to_port in link_rows:
+        a = port_index.get((from_device_id, (from_port or "").strip()))
+        b = port_index.get((to_device_id, (to_port or "").strip()))
+        if a is not None and b is not None:
+            link_a.append(a)
+            link_b.append(b)
+
+    forest = DisjointSet(len(device_index) * width)
+    if link_a:
+        a = np.asarray(link_a, dtype=np.int64)
+        b = np.asarray(link_b, dtype=np.int64)
+        link_idx, vlan_idx = np.nonzero(carried[a] & carried[b])
+        forest.union(port_device[a[link_idx]] * width + vlan_idx, port_device[b[link_idx]] * width + vlan_idx)
+
+    device_ids = sorted(device_index)
+    rank = np.empty(len(device_index), dtype=np.int64)
+    rank[[device_index[device_id] for device_id in device_ids]] = np.arange(len(device_ids))
+    node_device, node_vlan = np.nonzero(member)
+    node_root = forest.roots()[node_device * width + node_vlan]
+    order = np.lexsort((rank[node_device], node_root, node_vlan))
+    node_rank, node_vlan, node_root = rank[node_device[order]].tolist(), node_vlan[order], node_root[order]
+    bounds = np.flatnonzero((np.diff(node_vlan) != 0) | (np.diff(node_root) != 0)) + 1
+    starts = [0, *bounds.tolist()]
+    ends = [*bounds.tolist(), len(node_rank)]
+    vlan_of = vlans[node_vlan[starts]].tolist() if node_rank else []
+
+    result = BroadcastDomains()
+    for vlan_id, start, end in zip(vlan_of, starts, ends):
+        result.vlans.setdefault(vlan_id, []).append([device_ids[r] for r in node_rank[start:end]])
+    for components in result.vlans.values():
+        components.sort(key=lambda component: (-len(component), component[0]))
+    result.vlans = dict(sorted(result.vlans.items()))
+    return result
+
+
+def domains_from_models(l2_assignments, links, l2_segments) -> BroadcastDomains:
+    """Tính trực tiếp từ object đã load (model hoặc object tương đương)."""
+    segment_vlans = {segment.id: segment.vlan_id for segment in l2_segments}
+    rows = [
+        (
+            assignment.device_id,
+            getattr(assignment, "interface_name", None),
+            getattr(assignment, "port_mode", None),
+            segment_vlans.get(assignment.l2_segment_id),
+            getattr(assignment, "allowed_vlans_bitmap", None),
+            getattr(assignment, "allowed_vlans_json", None),
+        )
+        for assignment in l2_assignments
+        if assignment.l2_segment_id in segment_vlans
+    ]
+    link_rows = [(link.from_device_id, link.from_port, link.to_device_id, link.to_port) for link in links]
+    domains = compute_broadcast_domains(rows, link_rows, segment_vlans.values())
+    for segment in sorted(l2_segments, key=lambda segment: (segment.vlan_id, segment.name)):
+        domains.names.setdefault(segment.vlan_id, segment.name)
+    return domains
+
+
+_cache: OrderedDict[str, BroadcastDomains] = OrderedDict()
+
+
+async def get_broadcast_domains(db: AsyncSession, project_id: str) -> BroadcastDomains:
+    """Broadcast domain của project; chỉ tính lại khi Project.revision đổi."""
+    revision = await db.scalar(select(Project.revision).where(Project.id == project_id))
+    cached = _cache.get(project_id)
+    if cached is not None and cached.revision == revision:
+        _cache.move_to_end(project_id)
+        return cached
+
+    assignment_rows = await db.execute(
+        select(
+            InterfaceL2Assignment.device_id,
+            InterfaceL2Assignment.interface_name,
+            InterfaceL2Assignment.port_mode,
+            L2Segment.vlan_id,
+            InterfaceL2Assignment.allowed_vlans_bitmap,
+            InterfaceL2Assignment.allowed_vlans_json,
+        )
+        .join(L2Segment, L2Segment.id == InterfaceL2Assignment.l2_segment_id)
+        .where(InterfaceL2Assignment.project_id == project_id)
+    )
+    link_rows = await db.execute(
+        select(L1Link.from_device_id, L1Link.from_port, L1Link.to_device_id, L1Link.to_port).where(
+            L1Link.project_id == project_id
+        )
+    )
+    segment_rows = await db.execute(
+        select(L2Segment.vlan_id, L2Segment.name)
+        .where(L2Segment.project_id == project_id)
+        .order_by(L2Segment.vlan_id, L2Segment.name)
+    )
+    names: dict[int, str] = {}
+    for vlan_id, name in segment_rows.all():
+        names.setdefault(vlan_id, name)
+    domains = compute_broadcast_domains(assignment_rows.all(), link_rows.all(), names)
+    domains.names = names
+    domains.revision = revision
+
+    _cache[project_id] = domains
+    _cache.move_to_end(project_id)
+    while len(_cache) > CACHE_MAX_PROJECTS:
+        _cache.popitem(last=False)
+    return domains
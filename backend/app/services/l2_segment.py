@@ -46,6 +46,12 @@ async def get_segments_by_project(
     return list(result.scalars().all())
 
 
+async def get_segment_map(db: AsyncSession, project_id: str) -> dict[str, L2Segment]:
+    """Lấy map id -> L2 segment của project (1 query, dùng cho bulk)."""
+    result = await db.execute(select(L2Segment).where(L2Segment.project_id == project_id))
+    return {segment.id: segment for segment in result.scalars().all()}
+
+
 async def create_segment(
     db: AsyncSession, project_id: str, data: L2SegmentCreate
 ) -> L2Segment:
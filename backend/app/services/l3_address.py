@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models import Device, L3Address
 from app.schemas.l3_address import L3AddressCreate, L3AddressUpdate
+from app.services.ip_index import address_keys
 
 
 async def get_address(db: AsyncSession, address_id: str) -> Optional[L3Address]:
@@ -67,14 +68,14 @@ async def get_device_by_name(
     return result.scalar_one_or_none()
 
 
-async def create_address(
-    db: AsyncSession,
+def build_address(
     project_id: str,
     device_id: str,
     data: L3AddressCreate,
 ) -> L3Address:
-    """Tạo L3 address mới."""
-    address = L3Address(
+    """Dựng L3Address từ payload (chưa add/commit)."""
+    ip_key, network_key = address_keys(data.ip_address, data.prefix_length)
+    return L3Address(
         project_id=project_id,
         device_id=device_id,
         interface_name=data.interface_name,
@@ -82,13 +83,34 @@ async def create_address(
         prefix_length=data.prefix_length,
         is_secondary=data.is_secondary,
         description=data.description,
+        ip_key=ip_key,
+        network_key=network_key,
     )
+
+
+async def create_address(
+    db: AsyncSession,
+    project_id: str,
+    device_id: str,
+    data: L3AddressCreate,
+) -> L3Address:
+    """Tạo L3 address mới."""
+    address = build_address(project_id, device_id, data)
     db.add(address)
     await db.commit()
     await db.refresh(address)
     return address
 
 
+async def create_addresses_bulk(db: AsyncSession, addresses: list[L3Address]) -> list[L3Address]:
+    """Insert nhiều L3 address trong 1 transaction."""
+    if not addresses:
+        return addresses
+    db.add_all(addresses)
+    await db.commit()
+    return addresses
+
+
 async def update_address(
     db: AsyncSession,
     address: L3Address,
@@ -104,6 +126,7 @@ async def update_address(
 
     for field, value in update_data.items():
         setattr(address, field, value)
+    address.ip_key, address.network_key = address_keys(address.ip_address, address.prefix_length)
 
     await db.commit()
     await db.refresh(address)
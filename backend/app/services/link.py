@@ -1,14 +1,78 @@
 """L1 Link service."""
 
 import json
+from dataclasses import dataclass, field
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import delete, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.db.models import Device, L1Link
 from app.schemas.link import L1LinkCreate, L1LinkUpdate
+from app.services import entity_events
+
+
+LinkKey = tuple[str, str, str, str]
+
+
+def normalize_link_key(from_device_id: str, from_port: str, to_device_id: str, to_port: str) -> LinkKey:
+    """Chuẩn hóa key link không phụ thuộc chiều."""
+    left = (from_device_id, from_port)
+    right = (to_device_id, to_port)
+    if left <= right:
+        return (from_device_id, from_port, to_device_id, to_port)
+    return (to_device_id, to_port, from_device_id, from_port)
+
+
+@dataclass
+class LinkIndex:
+    """Index link của project: key chuẩn hóa, port đang dùng, số link theo device."""
+
+    keys: set[LinkKey] = field(default_factory=set)
+    ports_in_use: set[tuple[str, str]] = field(default_factory=set)
+    device_link_counts: dict[str, int] = field(default_factory=dict)
+
+    def add(self, from_device_id: str, from_port: str, to_device_id: str, to_port: str) -> None:
+        self.keys.add(normalize_link_key(from_device_id, from_port, to_device_id, to_port))
+        self.ports_in_use.add((from_device_id, from_port))
+        self.ports_in_use.add((to_device_id, to_port))
+        self.device_link_counts[from_device_id] = self.device_link_counts.get(from_device_id, 0) + 1
+        self.device_link_counts[to_device_id] = self.device_link_counts.get(to_device_id, 0) + 1
+
+    def has_link(self, from_device_id: str, from_port: str, to_device_id: str, to_port: str) -> bool:
+        return normalize_link_key(from_device_id, from_port, to_device_id, to_port) in self.keys
+
+    def link_count(self, device_id: str) -> int:
+        return self.device_link_counts.get(device_id, 0)
+
+    def port_in_use(self, device_id: str, port: str) -> bool:
+        return (device_id, port) in self.ports_in_use
+
+
+async def load_link_index(
+    db: AsyncSession,
+    project_id: str,
+    device_ids: Optional[list[str]] = None,
+    exclude_link_id: Optional[str] = None,
+) -> LinkIndex:
+    """Load LinkIndex của project bằng 1 query (chỉ các cột endpoint).
+
+    Có device_ids thì chỉ đọc link chạm các device đó (đủ để validate 1 link mới giữa
+    chúng; dùng index ix_l1_links_*_device_port, không phụ thuộc số link của project).
+    """
+    query = select(L1Link.from_device_id, L1Link.from_port, L1Link.to_device_id, L1Link.to_port).where(
+        L1Link.project_id == project_id
+    )
+    if device_ids is not None:
+        query = query.where(or_(L1Link.from_device_id.in_(device_ids), L1Link.to_device_id.in_(device_ids)))
+    if exclude_link_id:
+        query = query.where(L1Link.id != exclude_link_id)
+    result = await db.execute(query)
+    index = LinkIndex()
+    for from_device_id, from_port, to_device_id, to_port in result.all():
+        index.add(from_device_id, from_port, to_device_id, to_port)
+    return index
 
 
 async def get_links(db: AsyncSession, project_id: str) -> list[L1Link]:
@@ -102,19 +166,18 @@ async def check_port_in_use(
     return result.scalar_one_or_none() is not None
 
 
-async def create_link(
-    db: AsyncSession,
+def build_link(
     project_id: str,
     from_device: Device,
     to_device: Device,
     data: L1LinkCreate,
 ) -> L1Link:
-    """Tạo link mới."""
+    """Dựng L1Link từ payload (chưa add/commit)."""
     color_rgb_json = None
     if data.color_rgb:
         color_rgb_json = json.dumps(data.color_rgb)
 
-    link = L1Link(
+    return L1Link(
         project_id=project_id,
         from_device_id=from_device.id,
         from_port=data.from_port,
@@ -124,12 +187,36 @@ async def create_link(
         line_style=data.line_style,
         color_rgb_json=color_rgb_json,
     )
+
+
+async def create_link(
+    db: AsyncSession,
+    project_id: str,
+    from_device: Device,
+    to_device: Device,
+    data: L1LinkCreate,
+) -> L1Link:
+    """Tạo link mới."""
+    link = build_link(project_id, from_device, to_device, data)
     db.add(link)
     await db.commit()
     await db.refresh(link)
+    await entity_events.publish_created(project_id, "link", [entity_events.link_snapshot(link)])
     return link
 
 
+async def create_links_bulk(db: AsyncSession, links: list[L1Link]) -> list[L1Link]:
+    """Insert nhiều link trong 1 transaction."""
+    if not links:
+        return links
+    db.add_all(links)
+    await db.commit()
+    await entity_events.publish_created(
+        links[0].project_id, "link", [entity_events.link_snapshot(link) for link in links]
+    )
+    return links
+
+
 async def update_link(
     db: AsyncSession,
     link: L1Link,
@@ -138,6 +225,7 @@ async def update_link(
     to_device: Optional[Device] = None,
 ) -> L1Link:
     """Cập nhật link."""
+    before = entity_events.link_snapshot(link)
     update_data = data.model_dump(exclude_unset=True)
 
     # Handle device references
@@ -163,13 +251,27 @@ async def update_link(
 
     await db.commit()
     await db.refresh(link)
+    await entity_events.publish_updated(link.project_id, "link", before, entity_events.link_snapshot(link))
     return link
 
 
 async def delete_link(db: AsyncSession, link: L1Link) -> None:
     """Xóa link."""
+    project_id, link_id = link.project_id, link.id
     await db.delete(link)
     await db.commit()
+    await entity_events.publish_deleted(project_id, "link", [link_id])
+
+
+async def delete_links_of_devices(db: AsyncSession, device_ids: list[str]) -> list[str]:
+    """Xóa (chưa commit) mọi link nối vào các device. Trả về id link đã xóa để phát event."""
+    if not device_ids:
+        return []
+    attached = or_(L1Link.from_device_id.in_(device_ids), L1Link.to_device_id.in_(device_ids))
+    link_ids = list((await db.execute(select(L1Link.id).where(attached))).scalars())
+    if link_ids:
+        await db.execute(delete(L1Link).where(L1Link.id.in_(link_ids)).execution_options(synchronize_session=False))
+    return link_ids
 
 
 def parse_link_color(link: L1Link) -> Optional[list[int]]:
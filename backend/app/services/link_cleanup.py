@@ -0,0 +1,163 @@
+"""Dọn link L1 vi phạm rule cho cả project (thay scripts/cleanup_links_rules.py).
+
+Chạy lại validation của endpoints/links.py trên toàn bộ link hiện có trong 1 lượt:
+- 3 query (area, device, link chỉ lấy cột cần), DeviceRoles tính 1 lần mỗi device;
+- link duyệt theo thứ tự tạo (created_at, id), link hợp lệ được đưa vào LinkIndex
+  nên link cũ nhất được giữ khi trùng link / trùng port / vượt 1 uplink (RB-008);
+- dry-run trả về danh sách link sẽ xóa; apply xóa theo lô và phát event link.deleted.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Area, Device, DevicePort, L1Link
+from app.services import entity_events
+from app.services.link import LinkIndex
+from app.services.link_rules import DeviceRoles, classify_device, link_violation
+
+# Số id mỗi câu DELETE ... IN (...): dưới giới hạn biến của SQLite.
+DELETE_CHUNK_SIZE = 500
+
+
+@dataclass
+class CleanupItem:
+    """1 link sẽ bị xóa và lý do."""
+
+    id: str
+    from_device: str
+    from_port: str
+    to_device: str
+    to_port: str
+    code: str
+    message: str
+
+
+@dataclass
+class CleanupPlan:
+    total_links: int = 0
+    items: list[CleanupItem] = field(default_factory=list)
+
+    @property
+    def link_ids(self) -> list[str]:
+        return [item.id for item in self.items]
+
+    def to_dict(self) -> dict:
+        return {
+            "total_links": self.total_links,
+            "delete_count": len(self.items),
+            "items": [asdict(item) for item in self.items],
+        }
+
+
+def plan_link_cleanup(
+    devices: dict[str, DeviceRoles],
+    port_keys: set[tuple[str, str]],
+    links: Iterable[tuple[str, str, str, str, str]],
+    codes: Optional[set[str]] = None,
+) -> CleanupPlan:
+    """Link cần xóa; links là (id, from_device_id, from_port, to_device_id, to_port) theo thứ tự tạo.
+
+    codes: chỉ xóa các vi phạm có code trong tập này; link vi phạm code khác vẫn được giữ
+    (và tính vào index như link hợp lệ).
+    """
+    plan = CleanupPlan()
+    index = LinkIndex()
+    for link_id, from_device_id, from_port, to_device_id, to_port in links:
+        plan.total_links += 1
+        a = devices.get(from_device_id)
+        b = devices.get(to_device_id)
+        violation = _link_violation(a, b, from_device_id, from_port, to_device_id, to_port, port_keys, index)
+        if violation and (codes is None or violation[0] in codes):
+            plan.items.append(
+                CleanupItem(
+                    id=link_id,
+                    from_device=a.name if a else from_device_id,
+                    from_port=from_port,
+                    to_device=b.name if b else to_device_id,
+                    to_port=to_port,
+                    code=violation[0],
+                    message=violation[1],
+                )
+            )
+            continue
+        index.add(from_device_id, from_port, to_device_id, to_port)
+    return plan
+
+
+def _link_violation(
+    a: Optional[DeviceRoles],
+    b: Optional[DeviceRoles],
+    from_device_id: str,
+    from_port: str,
+    to_device_id: str,
+    to_port: str,
+    port_keys: set[tuple[str, str]],
+    index: LinkIndex,
+) -> Optional[tuple[str, str]]:
+    """Cùng thứ tự kiểm tra với create_new_link."""
+    for device, device_id in ((a, from_device_id), (b, to_device_id)):
+        if device is None:
+            return "DEVICE_NOT_FOUND", f"Device '{device_id}' không tồn tại"
+    for device, port in ((a, from_port), (b, to_port)):
+        if (device.id, port) not in port_keys:
+            return "PORT_NOT_FOUND", f"Port '{port}' chưa khai báo trên '{device.name}'"
+    if index.has_link(from_device_id, from_port, to_device_id, to_port):
+        return "L1_LINK_DUP", "Link đã tồn tại"
+    for device, port in ((a, from_port), (b, to_port)):
+        if index.port_in_use(device.id, port):
+            return "PORT_IN_USE", f"Port '{port}' trên device '{device.name}' đã được sử dụng"
+    return link_violation(a, b, index.link_count)
+
+
+async def build_link_cleanup_plan(
+    db: AsyncSession, project_id: str, codes: Optional[set[str]] = None
+) -> CleanupPlan:
+    areas = await db.execute(select(Area.id, Area.name).where(Area.project_id == project_id))
+    area_names = dict(areas.all())
+    rows = await db.execute(
+        select(Device.id, Device.name, Device.device_type, Device.area_id).where(Device.project_id == project_id)
+    )
+    devices = {
+        device_id: classify_device(device_id, name, device_type, area_id, area_names.get(area_id))
+        for device_id, name, device_type, area_id in rows.all()
+    }
+    ports = await db.execute(select(DevicePort.device_id, DevicePort.name).where(DevicePort.project_id == project_id))
+    port_keys = {(device_id, name) for device_id, name in ports.all()}
+    links = await db.execute(
+        select(L1Link.id, L1Link.from_device_id, L1Link.from_port, L1Link.to_device_id, L1Link.to_port)
+        .where(L1Link.project_id == project_id)
+        .order_by(L1Link.created_at, L1Link.id)
+    )
+    return plan_link_cleanup(devices, port_keys, links.all(), codes)
+
+
+async def delete_links_bulk(db: AsyncSession, project_id: str, link_ids: list[str]) -> None:
+    """Xóa nhiều link trong 1 transaction rồi phát 1 event link.deleted."""
+    if not link_ids:
+        return
+    for start in range(0, len(link_ids), DELETE_CHUNK_SIZE):
+        chunk = link_ids[start:start + DELETE_CHUNK_SIZE]
+        await db.execute(delete(L1Link).where(L1Link.project_id == project_id, L1Link.id.in_(chunk)))
+    await db.commit()
+    await entity_events.publish_deleted(project_id, "link", link_ids)
+
+
+async def cleanup_links(
+    db: AsyncSession,
+    project_id: str,
+    dry_run: bool = True,
+    codes: Optional[set[str]] = None,
+    link_ids: Optional[set[str]] = None,
+) -> CleanupPlan:
+    """Tính plan; apply thì xóa. link_ids giới hạn việc xóa trong diff đã duyệt ở bước dry-run."""
+    plan = await build_link_cleanup_plan(db, project_id, codes)
+    if link_ids is not None:
+        plan.items = [item for item in plan.items if item.id in link_ids]
+    if not dry_run:
+        await delete_links_bulk(db, project_id, plan.link_ids)
+    return plan
@@ -0,0 +1,153 @@
+"""Rule kết nối L1 theo vai trò device (RB-008, RB-012..015).
+
+Vai trò của device (endpoint, access/distribution switch, server, ...) được tính
+1 lần thành DeviceRoles; các rule chỉ so cờ boolean nên dùng được cho cả
+validate từng link (endpoints/links.py) lẫn quét cả project (link_cleanup).
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+ENDPOINT_TYPES = {"PC", "AP"}
+ENDPOINT_NAME_RE = re.compile(r"\b(PC|PRN|PRINTER|CAM|CCTV|PHONE|IPPHONE|ENDPOINT|CLIENT|TERMINAL)\b", re.IGNORECASE)
+CORE_NAME_RE = re.compile(r"\bCORE\b|SW-CORE|CORE-SW", re.IGNORECASE)
+DIST_NAME_RE = re.compile(r"\bDIST\b|DISTR", re.IGNORECASE)
+SERVER_NAME_RE = re.compile(r"\b(SERVER|SRV|APP|WEB|DB|NAS|SAN|STORAGE|BACKUP)\b", re.IGNORECASE)
+SERVER_SWITCH_RE = re.compile(r"\b(SW|SWITCH)\b", re.IGNORECASE)
+SERVER_AREA_RE = re.compile(r"\bSERVER|STORAGE\b", re.IGNORECASE)
+BUSINESS_AREA_RE = re.compile(r"\b(HEAD\s*OFFICE|HQ|HO|DEPARTMENT|DEPT|PROJECT|IT)\b", re.IGNORECASE)
+ACCESS_NAME_RE = re.compile(r"\bACCESS\b|\bACC\b", re.IGNORECASE)
+
+Violation = tuple[str, str]
+
+
+@dataclass(frozen=True)
+class DeviceRoles:
+    """Vai trò của 1 device, tính sẵn từ tên, loại và tên area."""
+
+    id: str
+    name: str
+    area_id: Optional[str]
+    endpoint: bool
+    core_or_dist: bool
+    switch: bool
+    business_area: bool
+    access_switch: bool
+    distribution_switch: bool
+    server: bool
+    server_switch: bool
+
+
+def classify_device(
+    device_id: str,
+    name: Optional[str],
+    device_type: Optional[str],
+    area_id: Optional[str],
+    area_name: Optional[str],
+) -> DeviceRoles:
+    name = name or ""
+    area_name = area_name or ""
+    dtype = (device_type or "").upper()
+    switch = dtype == "SWITCH"
+    core_or_dist = bool(CORE_NAME_RE.search(name) or DIST_NAME_RE.search(name))
+    server_switch = switch and bool(
+        (SERVER_NAME_RE.search(name) and SERVER_SWITCH_RE.search(name))
+        or SERVER_AREA_RE.search(area_name)
+        or (DIST_NAME_RE.search(name) and SERVER_NAME_RE.search(name))
+    )
+    return DeviceRoles(
+        id=device_id,
+        name=name,
+        area_id=area_id,
+        endpoint=dtype in ENDPOINT_TYPES or bool(ENDPOINT_NAME_RE.search(name)),
+        core_or_dist=core_or_dist,
+        switch=switch,
+        business_area=bool(BUSINESS_AREA_RE.search(area_name)),
+        access_switch=switch and bool(ACCESS_NAME_RE.search(name)),
+        distribution_switch=switch and core_or_dist,
+        server=dtype in {"SERVER", "STORAGE"} or bool(SERVER_NAME_RE.search(name)),
+        server_switch=server_switch,
+    )
+
+
+def device_roles(device) -> DeviceRoles:
+    """DeviceRoles từ ORM Device (cần relationship area đã load)."""
+    return classify_device(
+        device.id,
+        getattr(device, "name", None),
+        getattr(device, "device_type", None),
+        getattr(device, "area_id", None),
+        getattr(getattr(device, "area", None), "name", None),
+    )
+
+
+def endpoint_uplink_violation(a: DeviceRoles, b: DeviceRoles) -> Optional[Violation]:
+    if (a.endpoint and b.core_or_dist) or (b.endpoint and a.core_or_dist):
+        return (
+            "ENDPOINT_UPLINK_INVALID",
+            "Endpoint không được kết nối trực tiếp lên Distribution/Core (phải qua Access).",
+        )
+    return None
+
+
+def business_area_violation(
+    a: DeviceRoles, b: DeviceRoles, link_count_fn: Callable[[str], int]
+) -> Optional[Violation]:
+    for device, other in ((a, b), (b, a)):
+        if device.business_area and not device.access_switch:
+            if not (other.access_switch and device.area_id == other.area_id):
+                return (
+                    "BUSINESS_AREA_UPLINK_INVALID",
+                    "Thiết bị trong Area HO/IT/Department/Project chỉ được kết nối đến Access Switch cùng Area.",
+                )
+            if link_count_fn(device.id) >= 1:
+                return (
+                    "BUSINESS_AREA_SINGLE_UPLINK",
+                    "Thiết bị trong Area HO/IT/Department/Project chỉ được có 1 uplink lên Access Switch.",
+                )
+    return None
+
+
+def access_switch_violation(a: DeviceRoles, b: DeviceRoles) -> Optional[Violation]:
+    for device, other in ((a, b), (b, a)):
+        if device.access_switch:
+            if other.switch:
+                if not other.distribution_switch:
+                    return ("ACCESS_UPLINK_INVALID", "Access Switch chỉ được uplink lên Distribution Switch.")
+            elif device.area_id != other.area_id:
+                return ("ACCESS_DOWNLINK_INVALID", "Access Switch chỉ được kết nối thiết bị cùng Area.")
+    return None
+
+
+def server_switch_violation(a: DeviceRoles, b: DeviceRoles) -> Optional[Violation]:
+    for device, other in ((a, b), (b, a)):
+        if device.server_switch:
+            if other.switch:
+                if not other.distribution_switch:
+                    return ("SERVER_SWITCH_UPLINK_INVALID", "Server Switch chỉ được uplink lên Distribution Switch.")
+            elif not other.server:
+                return ("SERVER_SWITCH_DOWNLINK_INVALID", "Server Switch chỉ được kết nối tới thiết bị Server/Storage.")
+    return None
+
+
+def server_uplink_violation(a: DeviceRoles, b: DeviceRoles) -> Optional[Violation]:
+    if (a.server and not b.server_switch) or (b.server and not a.server_switch):
+        return ("SERVER_UPLINK_INVALID", "Server chỉ được kết nối lên Server Distribution Switch.")
+    return None
+
+
+def link_violation(a: DeviceRoles, b: DeviceRoles, link_count_fn: Callable[[str], int]) -> Optional[Violation]:
+    """Vi phạm đầu tiên (code, message) của link a-b theo thứ tự rule; None nếu hợp lệ.
+
+    link_count_fn(device_id): số link hiện có của device, không tính link đang xét.
+    """
+    return (
+        endpoint_uplink_violation(a, b)
+        or business_area_violation(a, b, link_count_fn)
+        or access_switch_violation(a, b)
+        or server_switch_violation(a, b)
+        or server_uplink_violation(a, b)
+    )
@@ -86,29 +86,66 @@ async def get_device_by_name(
     return result.scalar_one_or_none()
 
 
-async def create_port_channel(
-    db: AsyncSession,
+async def get_port_channel_keys(
+    db: AsyncSession, project_id: str
+) -> tuple[set[tuple[str, str]], set[tuple[str, int]]]:
+    """Lấy tập (device_id, name) và (device_id, channel_number) của project (1 query)."""
+    result = await db.execute(
+        select(PortChannel.device_id, PortChannel.name, PortChannel.channel_number).where(
+            PortChannel.project_id == project_id
+        )
+    )
+    name_keys: set[tuple[str, str]] = set()
+    number_keys: set[tuple[str, int]] = set()
+    for device_id, name, channel_number in result.all():
+        name_keys.add((device_id, name))
+        number_keys.add((device_id, channel_number))
+    return name_keys, number_keys
+
+
+def build_port_channel(
     project_id: str,
     device_id: str,
     data: PortChannelCreate,
     channel_number: int,
 ) -> PortChannel:
-    """Tạo Port Channel mới."""
-    members_json = json.dumps(data.members)
-    port_channel = PortChannel(
+    """Dựng PortChannel từ payload (chưa add/commit)."""
+    return PortChannel(
         project_id=project_id,
         device_id=device_id,
         name=data.name,
         channel_number=channel_number,
         mode=data.mode,
-        members_json=members_json,
+        members_json=json.dumps(data.members),
     )
+
+
+async def create_port_channel(
+    db: AsyncSession,
+    project_id: str,
+    device_id: str,
+    data: PortChannelCreate,
+    channel_number: int,
+) -> PortChannel:
+    """Tạo Port Channel mới."""
+    port_channel = build_port_channel(project_id, device_id, data, channel_number)
     db.add(port_channel)
     await db.commit()
     await db.refresh(port_channel)
     return port_channel
 
 
+async def create_port_channels_bulk(
+    db: AsyncSession, port_channels: list[PortChannel]
+) -> list[PortChannel]:
+    """Insert nhiều Port Channel trong 1 transaction."""
+    if not port_channels:
+        return port_channels
+    db.add_all(port_channels)
+    await db.commit()
+    return port_channels
+
+
 async def update_port_channel(
     db: AsyncSession,
     port_channel: PortChannel,
@@ -0,0 +1,830 @@
+"""Render sơ đồ L1/L2/L3 ra PPTX.
+
+Shape được dựng theo batch: mỗi style chỉ parse XML template 1 lần, sau đó
+deepcopy + set xfrm/text rồi append thẳng vào spTree (bỏ qua add_shape() vốn
+parse XML và quét toàn bộ shape id cho từng shape).
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import re
+from copy import deepcopy
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Iterable
+
+from app.services.device_palette import get_device_color_rgb
+from app.services.diagram_metrics import (
+    DEVICE_BODY_VERTICAL_PADDING_PX,
+    DEVICE_LABEL_FONT_SIZE_PX,
+    DEVICE_LABEL_MIN_HEIGHT_PX,
+    DEVICE_MIN_WIDTH_PX,
+    DEVICE_STANDARD_TOTAL_HEIGHT_PX,
+    PORT_BAND_PADDING_X_PX,
+    PORT_BAND_PADDING_Y_PX,
+    PORT_CELL_GAP_PX,
+    PORT_CELL_HEIGHT_PX,
+    PORT_CELL_MIN_WIDTH_PX,
+    PORT_CELL_TEXT_PADDING_PX,
+    PORT_FONT_SIZE_PX,
+    UNIT_PX,
+)
+from app.services.link_palette import get_link_palette_rgb
+
+logger = logging.getLogger(__name__)
+
+EMU_PER_INCH = 914400
+# PowerPoint giới hạn slide tối đa 56 inch mỗi chiều.
+MAX_SLIDE_INCHES = 56.0
+MIN_SLIDE_WIDTH_INCHES = 13.333
+MIN_SLIDE_HEIGHT_INCHES = 7.5
+SLIDE_MARGIN_INCHES = 0.5
+TITLE_BAND_INCHES = 0.4
+FONT_FAMILY = "Calibri"
+
+PORT_BAND_HEIGHT = (PORT_CELL_HEIGHT_PX + PORT_BAND_PADDING_Y_PX * 2) / UNIT_PX
+LABEL_LINE_HEIGHT = 0.16
+LABEL_MAX_LINES = 6
+PROGRESS_SHAPE_STEP = 500
+
+DIAGRAM_VIEWS = {"l1_diagram": "L1", "l2_diagram": "L2", "l3_diagram": "L3"}
+
+THEMES: dict[str, dict[str, Any]] = {
+    "default": {
+        "background": None,
+        "area_fill": (240, 240, 240),
+        "area_stroke": (51, 51, 51),
+        "area_text": (51, 51, 51),
+        "device_fill": (255, 255, 255),
+        "device_text": (31, 31, 31),
+        "port_fill": (255, 255, 255),
+        "port_stroke": (43, 42, 40),
+        "port_text": (43, 42, 40),
+        "label_fill": (232, 244, 232),
+        "label_text": (45, 90, 45),
+        "title_text": (51, 51, 51),
+        "line_scale": 1.0,
+        "use_area_style": True,
+        "use_link_color": True,
+    },
+    "light": {
+        "background": None,
+        "area_fill": (250, 250, 250),
+        "area_stroke": (160, 160, 160),
+        "area_text": (96, 96, 96),
+        "device_fill": (255, 255, 255),
+        "device_text": (64, 64, 64),
+        "port_fill": (255, 255, 255),
+        "port_stroke": (150, 150, 150),
+        "port_text": (96, 96, 96),
+        "label_fill": (245, 248, 245),
+        "label_text": (90, 110, 90),
+        "title_text": (96, 96, 96),
+        "line_scale": 0.75,
+        "use_area_style": False,
+        "use_link_color": True,
+    },
+    "contrast": {
+        "background": None,
+        "area_fill": None,
+        "area_stroke": (0, 0, 0),
+        "area_text": (0, 0, 0),
+        "device_fill": (255, 255, 255),
+        "device_text": (0, 0, 0),
+        "port_fill": (255, 255, 255),
+        "port_stroke": (0, 0, 0),
+        "port_text": (0, 0, 0),
+        "label_fill": (255, 255, 255),
+        "label_text": (0, 0, 0),
+        "title_text": (0, 0, 0),
+        "line_scale": 1.5,
+        "use_area_style": False,
+        "use_link_color": True,
+    },
+    "dark": {
+        "background": (30, 30, 30),
+        "area_fill": (43, 43, 43),
+        "area_stroke": (170, 170, 170),
+        "area_text": (230, 230, 230),
+        "device_fill": (51, 51, 51),
+        "device_text": (238, 238, 238),
+        "port_fill": (60, 60, 60),
+        "port_stroke": (200, 200, 200),
+        "port_text": (238, 238, 238),
+        "label_fill": (45, 60, 45),
+        "label_text": (210, 240, 210),
+        "title_text": (230, 230, 230),
+        "line_scale": 1.0,
+        "use_area_style": False,
+        "use_link_color": True,
+    },
+}
+
+_DASH_MAP = {"dashed": "dash", "dash": "dash", "dotted": "sysDot", "dot": "sysDot"}
+
+
+@dataclass(frozen=True)
+class ShapeStyle:
+    """Style của 1 shape; hashable để dùng làm key cache template."""
+
+    geom: str = "rect"
+    fill: tuple[int, int, int] | None = None
+    line: tuple[int, int, int] | None = None
+    line_width: float = 1.0  # pt
+    dash: str | None = None
+    font_size: float | None = None  # pt, None = không có text
+    font_color: tuple[int, int, int] = (0, 0, 0)
+    bold: bool = False
+    align: str = "ctr"
+    anchor: str = "ctr"
+
+
+@dataclass(slots=True)
+class DiagramShape:
+    """Shape trung gian (inch, tọa độ tuyệt đối). Line: (x, y) -> (x + w, y + h)."""
+
+    kind: str  # rect | line
+    x: float
+    y: float
+    w: float
+    h: float
+    style: ShapeStyle
+    text: str = ""
+    area_id: str | None = None
+
+    def bbox(self) -> tuple[float, float, float, float]:
+        x1, x2 = sorted((self.x, self.x + self.w))
+        y1, y2 = sorted((self.y, self.y + self.h))
+        return x1, y1, x2, y2
+
+
+@dataclass
+class DiagramPage:
+    """1 slide: shape đã dời về gốc tọa độ của trang."""
+
+    title: str
+    origin_x: float
+    origin_y: float
+    shapes: list[DiagramShape] = field(default_factory=list)
+
+
+# ---------------------------------------------------------------------------
+# Model (thuần Python, không phụ thuộc python-pptx)
+# ---------------------------------------------------------------------------
+
+
+def _port_index(name: str) -> int | None:
+    match = None
+    for m in re.finditer(r"(\d+)", name):
+        match = m
+    return int(match.group(1)) if match else None
+
+
+def _natural_key(name: str) -> tuple:
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part.lower()) for part in re.split(r"(\d+)", name))
+
+
+def _port_cell_width(name: str) -> float:
+    char_width = PORT_FONT_SIZE_PX * 0.62
+    width_px = max(PORT_CELL_MIN_WIDTH_PX, math.ceil(len(name) * char_width + PORT_CELL_TEXT_PADDING_PX))
+    return width_px / UNIT_PX
+
+
+def _band_width(cells: list[float]) -> float:
+    if not cells:
+        return 0.0
+    gaps = PORT_CELL_GAP_PX / UNIT_PX * (len(cells) - 1)
+    return PORT_BAND_PADDING_X_PX * 2 / UNIT_PX + sum(cells) + gaps
+
+
+def build_port_bands(snapshot: dict[str, Any]) -> dict[str, dict[str, list[str]]]:
+    """Chia port mỗi device vào band top/bottom (override > DevicePort.side > heuristic)."""
+    sides: dict[str, dict[str, tuple[str, float | None]]] = {}
+
+    def add(device_id: str | None, port: str | None, side: str | None = None, ratio: float | None = None) -> None:
+        name = (port or "").strip()
+        if not device_id or not name:
+            return
+        device_ports = sides.setdefault(device_id, {})
+        if side in ("top", "bottom"):
+            device_ports[name] = (side, ratio)
+        elif name not in device_ports:
+            device_ports[name] = ("top" if _port_index(name) == 1 else "bottom", ratio)
+
+    for link in snapshot.get("links", []):
+        add(link["from_device_id"], link["from_port"])
+        add(link["to_device_id"], link["to_port"])
+    for port in snapshot.get("ports", []):
+        add(port["device_id"], port["name"], port.get("side"), port.get("offset_ratio"))
+    for override in snapshot.get("anchor_overrides", []):
+        add(override["device_id"], override["port_name"], override.get("side"), override.get("offset_ratio"))
+
+    bands: dict[str, dict[str, list[str]]] = {}
+    for device_id, ports in sides.items():
+        top = [(name, ratio) for name, (side, ratio) in ports.items() if side == "top"]
+        bottom = [(name, ratio) for name, (side, ratio) in ports.items() if side == "bottom"]
+        order = lambda item: (item[1] if item[1] is not None else 2.0, _natural_key(item[0]))  # noqa: E731
+        bands[device_id] = {
+            "top": [name for name, _ in sorted(top, key=order)],
+            "bottom": [name for name, _ in sorted(bottom, key=order)],
+        }
+    return bands
+
+
+def _device_frame(
+    device: dict[str, Any],
+    bands: dict[str, list[str]] | None,
+) -> tuple[float, float, float, float, float, float]:
+    """Mirror frontend expandDeviceRectForPorts(): (x, y, w, h, top_band, bottom_band)."""
+    top = bands["top"] if bands else []
+    bottom = bands["bottom"] if bands else []
+    width = max(
+        device["width"],
+        DEVICE_MIN_WIDTH_PX / UNIT_PX,
+        _band_width([_port_cell_width(p) for p in top]),
+        _band_width([_port_cell_width(p) for p in bottom]),
+    )
+    top_band = PORT_BAND_HEIGHT if top else 0.0
+    bottom_band = PORT_BAND_HEIGHT if bottom else 0.0
+    base_total = max(device["height"], DEVICE_STANDARD_TOTAL_HEIGHT_PX / UNIT_PX)
+    body = max(base_total - top_band - bottom_band, DEVICE_LABEL_MIN_HEIGHT_PX / UNIT_PX)
+    center_x = device["x"] + device["width"] / 2
+    return center_x - width / 2, device["y"], width, top_band + body + bottom_band, top_band, bottom_band
+
+
+def _label_lines(device_id: str, label_index: dict[str, list[str]]) -> list[str]:
+    lines = label_index.get(device_id, [])
+    if len(lines) > LABEL_MAX_LINES:
+        return lines[: LABEL_MAX_LINES - 1] + [f"+{len(lines) - LABEL_MAX_LINES + 1} more"]
+    return lines
+
+
+def _index_l2_labels(snapshot: dict[str, Any]) -> dict[str, list[str]]:
+    vlans: dict[str, dict[int, str]] = {}
+    for item in snapshot.get("l2_assignments", []):
+        vlans.setdefault(item["device_id"], {})[item["vlan_id"]] = item["segment_name"]
+    return {
+        device_id: [f"VLAN {vlan_id} {name}".strip() for vlan_id, name in sorted(items.items())]
+        for device_id, items in vlans.items()
+    }
+
+
+def _index_l3_labels(snapshot: dict[str, Any]) -> dict[str, list[str]]:
+    labels: dict[str, list[str]] = {}
+    for item in snapshot.get("l3_addresses", []):
+        labels.setdefault(item["device_id"], []).append(
+            f"{item['interface_name']}: {item['ip_address']}/{item['prefix_length']}"
+        )
+    return labels
+
+
+def build_diagram_shapes(snapshot: dict[str, Any], view: str, theme_name: str = "default") -> list[DiagramShape]:
+    """Dựng danh sách shape theo z-order: area -> link -> device -> port/label."""
+    theme = THEMES.get(theme_name, THEMES["default"])
+    scale = theme["line_scale"]
+    shapes: list[DiagramShape] = []
+
+    area_style_cache: dict[tuple, ShapeStyle] = {}
+    for area in snapshot.get("areas", []):
+        if area.get("is_waypoint"):
+            continue
+        style_data = area.get("style") or {}
+        fill = theme["area_fill"]
+        stroke = theme["area_stroke"]
+        stroke_width = 1.0
+        if theme["use_area_style"]:
+            fill = tuple(style_data.get("fill_color_rgb") or fill)
+            stroke = tuple(style_data.get("stroke_color_rgb") or stroke)
+            stroke_width = float(style_data.get("stroke_width") or stroke_width)
+        key = (fill, stroke, stroke_width)
+        style = area_style_cache.get(key)
+        if style is None:
+            style = ShapeStyle(
+                geom="roundRect",
+                fill=fill,
+                line=stroke,
+                line_width=stroke_width * scale,
+                font_size=14,
+                font_color=theme["area_text"],
+                bold=True,
+                align="l",
+                anchor="t",
+            )
+            area_style_cache[key] = style
+        shapes.append(
+            DiagramShape("rect", area["x"], area["y"], area["width"], area["height"], style, area["name"], area["id"])
+        )
+
+    devices = {device["id"]: device for device in snapshot.get("devices", [])}
+    bands = build_port_bands(snapshot) if view == "L1" else {}
+    frames = {device_id: _device_frame(device, bands.get(device_id)) for device_id, device in devices.items()}
+
+    # Tính anchor cho từng port trước để link nối đúng ô port.
+    port_style = ShapeStyle(
+        fill=theme["port_fill"],
+        line=theme["port_stroke"],
+        line_width=0.75 * scale,
+        font_size=7,
+        font_color=theme["port_text"],
+    )
+    cell_h = PORT_CELL_HEIGHT_PX / UNIT_PX
+    pad_x = PORT_BAND_PADDING_X_PX / UNIT_PX
+    pad_y = PORT_BAND_PADDING_Y_PX / UNIT_PX
+    gap = PORT_CELL_GAP_PX / UNIT_PX
+    port_shapes: list[DiagramShape] = []
+    anchors: dict[tuple[str, str], tuple[float, float]] = {}
+    for device_id, device_bands in bands.items():
+        device = devices.get(device_id)
+        if device is None:
+            continue
+        x, y, w, h, top_band, bottom_band = frames[device_id]
+        for side, band_y in (("top", y), ("bottom", y + h - bottom_band)):
+            names = device_bands[side]
+            if not names:
+                continue
+            widths = [_port_cell_width(name) for name in names]
+            total = sum(widths) + gap * (len(widths) - 1)
+            cursor = x + max(pad_x, (w - total) / 2)
+            cell_y = band_y + pad_y
+            for name, cell_w in zip(names, widths):
+                port_shapes.append(
+                    DiagramShape("rect", cursor, cell_y, cell_w, cell_h, port_style, name, device["area_id"])
+                )
+                anchor_y = cell_y if side == "top" else cell_y + cell_h
+                anchors[(device_id, name)] = (cursor + cell_w / 2, anchor_y)
+                cursor += cell_w + gap
+
+    link_styles: dict[tuple, ShapeStyle] = {}
+    for link in snapshot.get("links", []):
+        source = devices.get(link["from_device_id"])
+        target = devices.get(link["to_device_id"])
+        if source is None or target is None:
+            continue
+        start = anchors.get((source["id"], (link["from_port"] or "").strip()))
+        end = anchors.get((target["id"], (link["to_port"] or "").strip()))
+        if start is None:
+            fx, fy, fw, fh, _, _ = frames[source["id"]]
+            start = (fx + fw / 2, fy + fh / 2)
+        if end is None:
+            tx, ty, tw, th, _, _ = frames[target["id"]]
+            end = (tx + tw / 2, ty + th / 2)
+        color = tuple(link["color_rgb"]) if theme["use_link_color"] else theme["port_stroke"]
+        dash = _DASH_MAP.get((link.get("line_style") or "").lower())
+        key = (color, dash)
+        style = link_styles.get(key)
+        if style is None:
+            style = ShapeStyle(geom="line", line=color, line_width=1.5 * scale, dash=dash)
+            link_styles[key] = style
+        area_id = source["area_id"] if source["area_id"] == target["area_id"] else None
+        dx, dy = end[0] - start[0], end[1] - start[1]
+        shapes.append(DiagramShape("line", start[0], start[1], dx, dy, style, area_id=area_id))
+
+    device_styles: dict[tuple[int, int, int], ShapeStyle] = {}
+    frame_styles: dict[tuple[int, int, int], ShapeStyle] = {}
+    body_pad = DEVICE_BODY_VERTICAL_PADDING_PX / UNIT_PX
+    for device_id, device in devices.items():
+        x, y, w, h, top_band, bottom_band = frames[device_id]
+        stroke = get_device_color_rgb(device["name"], device.get("color_rgb"))
+        style = device_styles.get(stroke)
+        if style is None:
+            style = ShapeStyle(
+                fill=theme["device_fill"],
+                line=stroke,
+                line_width=1.25 * scale,
+                font_size=round(DEVICE_LABEL_FONT_SIZE_PX * 0.75),
+                font_color=theme["device_text"],
+                bold=True,
+            )
+            device_styles[stroke] = style
+        body_h = h - top_band - bottom_band
+        if view == "L1" and (top_band or bottom_band):
+            # Khung ngoài chứa port band + body có label.
+            frame_style = frame_styles.get(stroke)
+            if frame_style is None:
+                frame_style = ShapeStyle(fill=theme["device_fill"], line=stroke, line_width=0.75 * scale)
+                frame_styles[stroke] = frame_style
+            shapes.append(DiagramShape("rect", x, y, w, h, frame_style, area_id=device["area_id"]))
+            shapes.append(DiagramShape("rect", x, y + top_band, w, body_h, style, device["name"], device["area_id"]))
+        else:
+            body_h = max(body_h, body_pad * 2)
+            shapes.append(DiagramShape("rect", x, y, w, body_h, style, device["name"], device["area_id"]))
+
+    shapes.extend(port_shapes)
+
+    if view in ("L2", "L3"):
+        label_index = _index_l2_labels(snapshot) if view == "L2" else _index_l3_labels(snapshot)
+        label_style = ShapeStyle(
+            geom="roundRect",
+            fill=theme["label_fill"],
+            line=None,
+            font_size=8,
+            font_color=theme["label_text"],
+            align="l",
+            anchor="t",
+        )
+        for device_id, device in devices.items():
+            lines = _label_lines(device_id, label_index)
+            if not lines:
+                continue
+            x, y, w, h, _, _ = frames[device_id]
+            label_w = max(w, max(len(line) for line in lines) * 0.065 + 0.1)
+            label_h = LABEL_LINE_HEIGHT * len(lines) + 0.04
+            shapes.append(
+                DiagramShape(
+                    "rect",
+                    x + (w - label_w) / 2,
+                    y + h + 0.04,
+                    label_w,
+                    label_h,
+                    label_style,
+                    "\n".join(lines),
+                    device["area_id"],
+                )
+            )
+    return shapes
+
+
+def _bounds(shapes: Iterable[DiagramShape]) -> tuple[float, float, float, float] | None:
+    min_x = min_y = math.inf
+    max_x = max_y = -math.inf
+    for shape in shapes:
+        x1, y1, x2, y2 = shape.bbox()
+        min_x = min(min_x, x1)
+        min_y = min(min_y, y1)
+        max_x = max(max_x, x2)
+        max_y = max(max_y, y2)
+    if min_x is math.inf:
+        return None
+    return min_x, min_y, max_x, max_y
+
+
+def compute_slide_size(groups: list[list[DiagramShape]]) -> tuple[float, float]:
+    """Kích thước slide chung (PPTX chỉ có 1 slide size), tối đa 56 inch."""
+    width = MIN_SLIDE_WIDTH_INCHES
+    height = MIN_SLIDE_HEIGHT_INCHES
+    for shapes in groups:
+        bounds = _bounds(shapes)
+        if bounds is None:
+            continue
+        width = max(width, bounds[2] - bounds[0] + SLIDE_MARGIN_INCHES * 2)
+        height = max(height, bounds[3] - bounds[1] + SLIDE_MARGIN_INCHES * 2 + TITLE_BAND_INCHES)
+    return min(width, MAX_SLIDE_INCHES), min(height, MAX_SLIDE_INCHES)
+
+
+def paginate_shapes(
+    shapes: list[DiagramShape],
+    title: str,
+    slide_width: float,
+    slide_height: float,
+) -> list[DiagramPage]:
+    """Chia sơ đồ quá khổ thành lưới trang; shape cắt qua biên xuất hiện ở mọi trang nó chạm."""
+    bounds = _bounds(shapes)
+    if bounds is None:
+        return [DiagramPage(title=title, origin_x=0.0, origin_y=0.0)]
+    min_x, min_y, max_x, max_y = bounds
+    usable_w = slide_width - SLIDE_MARGIN_INCHES * 2
+    usable_h = slide_height - SLIDE_MARGIN_INCHES * 2 - TITLE_BAND_INCHES
+    cols = max(1, math.ceil((max_x - min_x) / usable_w - 1e-9))
+    rows = max(1, math.ceil((max_y - min_y) / usable_h - 1e-9))
+
+    pages: list[DiagramPage] = []
+    for row in range(rows):
+        for col in range(cols):
+            page_title = title if cols * rows == 1 else f"{title} ({row * cols + col + 1}/{cols * rows})"
+            pages.append(
+                DiagramPage(
+                    title=page_title,
+                    origin_x=min_x + col * usable_w - SLIDE_MARGIN_INCHES,
+                    origin_y=min_y + row * usable_h - SLIDE_MARGIN_INCHES - TITLE_BAND_INCHES,
+                )
+            )
+    if len(pages) == 1:
+        pages[0].shapes = list(shapes)
+        return pages
+
+    for shape in shapes:
+        x1, y1, x2, y2 = shape.bbox()
+        col_a = min(cols - 1, max(0, int((x1 - min_x) // usable_w)))
+        col_b = min(cols - 1, max(0, int((x2 - min_x) // usable_w)))
+        row_a = min(rows - 1, max(0, int((y1 - min_y) // usable_h)))
+        row_b = min(rows - 1, max(0, int((y2 - min_y) // usable_h)))
+        for row in range(row_a, row_b + 1):
+            for col in range(col_a, col_b + 1):
+                pages[row * cols + col].shapes.append(shape)
+    return pages
+
+
+def build_diagram_pages(
+    snapshot: dict[str, Any],
+    export_type: str,
+    options: dict[str, Any],
+) -> tuple[list[DiagramPage], tuple[float, float]]:
+    """Dựng toàn bộ trang cho export (all_areas hoặc per_area)."""
+    view = DIAGRAM_VIEWS.get(export_type)
+    if view is None:
+        raise ValueError("Export type không hợp lệ")
+    shapes = build_diagram_shapes(snapshot, view, options.get("theme") or "default")
+    base_title = f"{snapshot.get('project_name') or 'Project'} - {view}"
+
+    groups: list[tuple[str, list[DiagramShape]]] = []
+    if options.get("mode") == "per_area":
+        by_area: dict[str, list[DiagramShape]] = {}
+        for shape in shapes:
+            if shape.area_id:
+                by_area.setdefault(shape.area_id, []).append(shape)
+        for area in snapshot.get("areas", []):
+            area_shapes = by_area.get(area["id"])
+            if area_shapes and not area.get("is_waypoint"):
+                groups.append((f"{base_title} - {area['name']}", area_shapes))
+    if not groups:
+        groups.append((base_title, shapes))
+
+    slide_width, slide_height = compute_slide_size([group for _, group in groups])
+    pages: list[DiagramPage] = []
+    for title, group in groups:
+        pages.extend(paginate_shapes(group, title, slide_width, slide_height))
+    return pages, (slide_width, slide_height)
+
+
+# ---------------------------------------------------------------------------
+# Writer XML (python-pptx oxml)
+# ---------------------------------------------------------------------------
+
+
+def _emu(value: float) -> int:
+    return int(round(value * EMU_PER_INCH))
+
+
+def _hex(rgb: tuple[int, int, int]) -> str:
+    return "%02X%02X%02X" % tuple(rgb)
+
+
+def _fill_xml(rgb: tuple[int, int, int] | None) -> str:
+    if rgb is None:
+        return "<a:noFill/>"
+    return f'<a:solidFill><a:srgbClr val="{_hex(rgb)}"/></a:solidFill>'
+
+
+def _line_xml(style: ShapeStyle) -> str:
+    if style.line is None:
+        return "<a:ln><a:noFill/></a:ln>"
+    dash = f'<a:prstDash val="{style.dash}"/>' if style.dash else ""
+    return f'<a:ln w="{int(style.line_width * 12700)}">{_fill_xml(style.line)}{dash}</a:ln>'
+
+
+@lru_cache(maxsize=None)
+def _shape_template(style: ShapeStyle):
+    """Parse XML template 1 lần cho mỗi style."""
+    from pptx.oxml import parse_xml
+    from pptx.oxml.ns import nsdecls
+
+    if style.geom == "line":
+        xml = (
+            f"<p:cxnSp {nsdecls('p', 'a')}>"
+            '<p:nvCxnSpPr><p:cNvPr id="0" name=""/><p:cNvCxnSpPr/><p:nvPr/></p:nvCxnSpPr>'
+            '<p:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/></a:xfrm>'
+            '<a:prstGeom prst="line"><a:avLst/></a:prstGeom>'
+            f"{_line_xml(style)}</p:spPr>"
+            "</p:cxnSp>"
+        )
+        return parse_xml(xml)
+
+    text_xml = ""
+    if style.font_size is not None:
+        bold = ' b="1"' if style.bold else ""
+        text_xml = (
+            "<p:txBody>"
+            f'<a:bodyPr wrap="square" lIns="27432" tIns="18288" rIns="27432" bIns="18288" anchor="{style.anchor}">'
+            "<a:normAutofit/></a:bodyPr><a:lstStyle/>"
+            f'<a:p><a:pPr algn="{style.align}"/><a:r>'
+            f'<a:rPr lang="en-US" sz="{int(style.font_size * 100)}"{bold} dirty="0">'
+            f'{_fill_xml(style.font_color)}<a:latin typeface="{FONT_FAMILY}"/></a:rPr>'
+            "<a:t></a:t></a:r></a:p>"
+            "</p:txBody>"
+        )
+    xml = (
+        f"<p:sp {nsdecls('p', 'a')}>"
+        '<p:nvSpPr><p:cNvPr id="0" name=""/><p:cNvSpPr/><p:nvPr/></p:nvSpPr>'
+        '<p:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/></a:xfrm>'
+        f'<a:prstGeom prst="{style.geom}"><a:avLst/></a:prstGeom>'
+        f"{_fill_xml(style.fill)}{_line_xml(style)}</p:spPr>"
+        f"{text_xml}"
+        "</p:sp>"
+    )
+    return parse_xml(xml)
+
+
+# python-pptx không có API public cho spTree của slide và đường dẫn template mặc định;
+# mọi truy cập private đi qua PptxInternals, kiểm version 1 lần và có đường dự phòng.
+PPTX_TESTED_VERSIONS = ("0.6.", "1.0.")
+
+
+class PptxInternals:
+    """Truy cập API private của python-pptx (đã kiểm với PPTX_TESTED_VERSIONS)."""
+
+    _checked = False
+
+    @classmethod
+    def _check_version(cls) -> None:
+        if cls._checked:
+            return
+        import pptx
+
+        version = getattr(pptx, "__version__", "")
+        if not version.startswith(PPTX_TESTED_VERSIONS):
+            logger.warning(
+                "python-pptx %s chưa được kiểm với renderer PPTX (đã kiểm: %s)",
+                version,
+                ", ".join(f"{prefix}x" for prefix in PPTX_TESTED_VERSIONS),
+            )
+        cls._checked = True
+
+    @classmethod
+    def shape_tree(cls, slide):
+        """Phần tử <p:spTree> của slide."""
+        cls._check_version()
+        tree = getattr(slide.shapes, "_spTree", None)
+        if tree is None:
+            tree = slide.element.cSld.spTree
+        return tree
+
+    @classmethod
+    def default_template_path(cls) -> str:
+        """Đường dẫn default.pptx đóng gói kèm python-pptx."""
+        cls._check_version()
+        import pptx
+
+        try:
+            from pptx.api import _default_pptx_path
+        except ImportError:
+            return os.path.join(os.path.dirname(pptx.__file__), "templates", "default.pptx")
+        return _default_pptx_path()
+
+
+class SlideShapeWriter:
+    """Append shape vào spTree của 1 slide với shape id tự cấp phát."""
+
+    def __init__(self, slide) -> None:
+        self._sp_tree = PptxInternals.shape_tree(slide)
+        ids = [int(value) for value in self._sp_tree.xpath("//@id") if str(value).isdigit()]
+        self._next_id = max(ids, default=1) + 1
+
+    def _allocate(self, element, name: str) -> None:
+        c_nv_pr = element[0][0]
+        c_nv_pr.set("id", str(self._next_id))
+        c_nv_pr.set("name", f"{name} {self._next_id}")
+        self._next_id += 1
+
+    def add(self, shape: DiagramShape, origin_x: float, origin_y: float) -> None:
+        element = deepcopy(_shape_template(shape.style))
+        xfrm = element[1][0]
+        off, ext = xfrm[0], xfrm[1]
+        if shape.kind == "line":
+            self._allocate(element, "Connector")
+            x1, y1, x2, y2 = shape.bbox()
+            if shape.w < 0:
+                xfrm.set("flipH", "1")
+            if shape.h < 0:
+                xfrm.set("flipV", "1")
+        else:
+            self._allocate(element, "Shape")
+            x1, y1 = shape.x, shape.y
+            x2, y2 = shape.x + shape.w, shape.y + shape.h
+        off.set("x", str(_emu(x1 - origin_x)))
+        off.set("y", str(_emu(y1 - origin_y)))
+        ext.set("cx", str(max(_emu(x2 - x1), 0)))
+        ext.set("cy", str(max(_emu(y2 - y1), 0)))
+        if shape.text and shape.style.font_size is not None:
+            self._set_text(element[2], shape.text)
+        self._sp_tree.append(element)
+
+    @staticmethod
+    def _set_text(tx_body, text: str) -> None:
+        paragraph = tx_body[2]
+        lines = text.split("\n")
+        paragraph[1][1].text = lines[0]
+        for line in lines[1:]:
+            clone = deepcopy(paragraph)
+            clone[1][1].text = line
+            tx_body.append(clone)
+
+
+_base_template: bytes | None = None
+_spare_presentation = None
+
+
+def _template_bytes() -> bytes:
+    """Nội dung template mặc định của python-pptx, đọc 1 lần mỗi process."""
+    global _base_template
+    if _base_template is None:
+        with open(PptxInternals.default_template_path(), "rb") as handle:
+            _base_template = handle.read()
+    return _base_template
+
+
+def _new_presentation():
+    from io import BytesIO
+
+    from pptx import Presentation
+
+    return Presentation(BytesIO(_template_bytes()))
+
+
+def take_base_presentation():
+    """Lấy Presentation gốc: bản đã parse sẵn (nếu có) hoặc parse mới từ template trong RAM."""
+    global _spare_presentation
+    presentation, _spare_presentation = _spare_presentation, None
+    return presentation if presentation is not None else _new_presentation()
+
+
+def warm_renderer() -> None:
+    """Làm nóng process render: đọc template và parse sẵn 1 Presentation gốc."""
+    global _spare_presentation
+    if _spare_presentation is None:
+        _spare_presentation = _new_presentation()
+
+
+def _set_background(slide, rgb: tuple[int, int, int]) -> None:
+    from pptx.oxml import parse_xml
+    from pptx.oxml.ns import nsdecls
+
+    background = parse_xml(
+        f"<p:bg {nsdecls('p', 'a')}><p:bgPr>{_fill_xml(rgb)}<a:effectLst/></p:bgPr></p:bg>"
+    )
+    slide._element.cSld.insert(0, background)
+
+
+def render_diagram_pptx(
+    file_path: str,
+    snapshot: dict[str, Any],
+    export_type: str,
+    options: dict[str, Any],
+    progress: Callable[[float, str | None], None] | None = None,
+) -> int:
+    """Render sơ đồ vào file PPTX. Trả về số slide sơ đồ.
+
+    progress(percent, message): báo tiến độ 0..100 (tùy chọn).
+    """
+    report = progress or (lambda percent, message=None: None)
+    report(0, "Dựng mô hình sơ đồ")
+    theme = THEMES.get(options.get("theme") or "default", THEMES["default"])
+    pages, (slide_width, slide_height) = build_diagram_pages(snapshot, export_type, options)
+    total_shapes = max(1, sum(len(page.shapes) for page in pages))
+    done_shapes = 0
+
+    presentation = take_base_presentation()
+    presentation.slide_width = _emu(slide_width)
+    presentation.slide_height = _emu(slide_height)
+    blank_layout = presentation.slide_layouts[6]
+
+    title_style = ShapeStyle(fill=None, line=None, font_size=16, font_color=theme["title_text"], bold=True, align="l")
+    for page_index, page in enumerate(pages, start=1):
+        report(10 + 80 * done_shapes / total_shapes, f"Vẽ slide {page_index}/{len(pages)}")
+        slide = presentation.slides.add_slide(blank_layout)
+        if theme["background"]:
+            _set_background(slide, theme["background"])
+        writer = SlideShapeWriter(slide)
+        writer.add(
+            DiagramShape(
+                "rect",
+                SLIDE_MARGIN_INCHES,
+                0.1,
+                slide_width - SLIDE_MARGIN_INCHES * 2,
+                TITLE_BAND_INCHES,
+                title_style,
+                page.title,
+            ),
+            0.0,
+            0.0,
+        )
+        for shape_index, shape in enumerate(page.shapes, start=1):
+            writer.add(shape, page.origin_x, page.origin_y)
+            if shape_index % PROGRESS_SHAPE_STEP == 0:
+                report(10 + 80 * (done_shapes + shape_index) / total_shapes)
+        done_shapes += len(page.shapes)
+
+    _append_legend_slide(presentation, blank_layout, theme)
+    report(90, "Lưu file PPTX")
+    presentation.save(file_path)
+    return len(pages)
+
+
+def _append_legend_slide(presentation, layout, theme: dict[str, Any]) -> None:
+    slide = presentation.slides.add_slide(layout)
+    if theme["background"]:
+        _set_background(slide, theme["background"])
+    writer = SlideShapeWriter(slide)
+    text_style = ShapeStyle(fill=None, line=None, font_size=10, font_color=theme["title_text"], align="l")
+    heading_style = ShapeStyle(fill=None, line=None, font_size=16, font_color=theme["title_text"], bold=True, align="l")
+    writer.add(
+        DiagramShape("rect", 0.6, 0.6, 4.0, 0.4, heading_style, "Link legend"),
+        0.0,
+        0.0,
+    )
+    for idx, (purpose, rgb) in enumerate(get_link_palette_rgb().items()):
+        top = 1.2 + 0.28 * idx
+        writer.add(DiagramShape("rect", 0.6, top, 0.22, 0.22, ShapeStyle(fill=rgb, line=rgb)), 0.0, 0.0)
+        writer.add(DiagramShape("rect", 0.92, top - 0.02, 2.8, 0.26, text_style, purpose), 0.0, 0.0)
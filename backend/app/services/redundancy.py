@@ -0,0 +1,242 @@
+"""Phân tích dự phòng trên đồ thị device L1 (Tarjan, tuyến tính theo số link).
+
+- Articulation point: device mà bỏ đi thì topology bị tách (split_count = số mảnh thêm ra).
+- Bridge: cạnh mà mất đi thì topology bị tách.
+- Biconnected component: nhóm cạnh không có điểm chết đơn lẻ bên trong.
+
+Đồ thị là multigraph: 2 link song song giữa cùng 2 device không phải bridge. Khi
+collapse_port_channels, các link mà đầu nằm trong member của cùng PortChannel được gộp
+thành 1 cạnh logic (bundle LACP hỏng cùng nhau), nên bundle duy nhất vẫn là bridge.
+DFS chạy lặp (không đệ quy) trên adjacency CSR; kết quả cache theo Project.revision.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Device, L1Link, PortChannel, Project
+from app.services.port_channel import parse_members
+
+CACHE_MAX_PROJECTS = 64
+
+
+@dataclass
+class LogicalEdge:
+    """Cạnh của đồ thị device: 1 link, hoặc cả bundle PortChannel khi collapse."""
+
+    a: str
+    b: str
+    link_ids: list[str]
+    port_channels: list[str] = field(default_factory=list)
+
+
+@dataclass
+class RedundancyReport:
+    devices: int = 0
+    links: int = 0
+    edges: list[LogicalEdge] = field(default_factory=list)
+    articulation_points: list[tuple[str, int]] = field(default_factory=list)
+    bridges: list[int] = field(default_factory=list)
+    components: list[list[int]] = field(default_factory=list)
+    device_names: dict[str, str] = field(default_factory=dict)
+    revision: Optional[int] = None
+
+    def component_devices(self, component: list[int]) -> list[str]:
+        return sorted({self.edges[e].a for e in component} | {self.edges[e].b for e in component})
+
+    def to_dict(self) -> dict:
+        names = self.device_names
+        return {
+            "revision": self.revision,
+            "checked": {"devices": self.devices, "links": self.links, "edges": len(self.edges)},
+            "articulation_points": [
+                {"device_id": device_id, "device_name": names.get(device_id), "split_count": split_count}
+                for device_id, split_count in self.articulation_points
+            ],
+            "bridges": [
+                {
+                    "from_device_id": self.edges[e].a,
+                    "to_device_id": self.edges[e].b,
+                    "link_ids": self.edges[e].link_ids,
+                    "port_channels": self.edges[e].port_channels,
+                }
+                for e in self.bridges
+            ],
+            "biconnected_components": [
+                {
+                    "device_ids": self.component_devices(component),
+                    "link_ids": sorted(link_id for e in component for link_id in self.edges[e].link_ids),
+                }
+                for component in self.components
+            ],
+        }
+
+
+def build_edges(link_rows, channel_members: Optional[dict[tuple[str, str], str]] = None) -> list[LogicalEdge]:
+    """link_rows: (id, from_device_id, from_port, to_device_id, to_port);
+    channel_members: (device_id, member port) -> tên PortChannel (None = không collapse)."""
+    edges: list[LogicalEdge] = []
+    bundles: dict[tuple, int] = {}
+    for link_id, from_device_id, from_port, to_device_id, to_port in link_rows:
+        if from_device_id == to_device_id:
+            continue
+        if channel_members:
+            end_a = (from_device_id, channel_members.get((from_device_id, (from_port or "").strip())))
+            end_b = (to_device_id, channel_members.get((to_device_id, (to_port or "").strip())))
+            if end_a[1] is not None or end_b[1] is not None:
+                key = tuple(sorted((end_a, end_b), key=lambda end: (end[0], end[1] or "")))
+                idx = bundles.get(key)
+                if idx is not None:
+                    edges[idx].link_ids.append(link_id)
+                    continue
+                bundles[key] = len(edges)
+                channels = [f"{device}:{name}" for device, name in key if name is not None]
+                edges.append(LogicalEdge(from_device_id, to_device_id, [link_id], channels))
+                continue
+        edges.append(LogicalEdge(from_device_id, to_device_id, [link_id]))
+    return edges
+
+
+def analyze_redundancy(edges: list[LogicalEdge], device_ids=()) -> RedundancyReport:
+    """Tarjan lặp: articulation point, bridge, biconnected component trong O(V + E)."""
+    index: dict[str, int] = {}
+    for device_id in device_ids:
+        index.setdefault(device_id, len(index))
+    for edge in edges:
+        index.setdefault(edge.a, len(index))
+        index.setdefault(edge.b, len(index))
+    report = RedundancyReport(devices=len(index), links=sum(len(edge.link_ids) for edge in edges), edges=edges)
+    n = len(index)
+    if not edges:
+        return report
+
+    # Adjacency CSR: mỗi cạnh e xuất hiện ở cả 2 đầu.
+    ends = np.asarray([(index[edge.a], index[edge.b]) for edge in edges], dtype=np.int64)
+    source = np.concatenate((ends[:, 0], ends[:, 1]))
+    target = np.concatenate((ends[:, 1], ends[:, 0]))
+    edge_of = np.concatenate((np.arange(len(edges)), np.arange(len(edges))))
+    order = np.argsort(source, kind="stable")
+    neighbors = target[order].tolist()
+    edge_ids = edge_of[order].tolist()
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(source, minlength=n)))).tolist()
+
+    disc = [-1] * n
+    low = [0] * n
+    parent_edge = [-1] * n
+    cursor = indptr[:-1]
+    splits = [0] * n
+    edge_stack: list[int] = []
+    clock = 0
+
+    for root in range(n):
+        if disc[root] != -1 or indptr[root] == indptr[root + 1]:
+            continue
+        disc[root] = low[root] = clock
+        clock += 1
+        stack = [root]
+        while stack:
+            v = stack[-1]
+            i = cursor[v]
+            if i < indptr[v + 1]:
+                cursor[v] = i + 1
+                e = edge_ids[i]
+                if e == parent_edge[v]:
+                    continue
+                w = neighbors[i]
+                if disc[w] == -1:
+                    parent_edge[w] = e
+                    disc[w] = low[w] = clock
+                    clock += 1
+                    edge_stack.append(e)
+                    stack.append(w)
+                elif disc[w] < disc[v]:
+                    if disc[w] < low[v]:
+                        low[v] = disc[w]
+                    edge_stack.append(e)
+                continue
+            stack.pop()
+            if not stack:
+                continue
+            u = stack[-1]
+            if low[v] < low[u]:
+                low[u] = low[v]
+            if low[v] >= disc[u]:
+                splits[u] += 1
+                tree_edge = parent_edge[v]
+                component: list[int] = []
+                while True:
+                    e = edge_stack.pop()
+                    component.append(e)
+                    if e == tree_edge:
+                        break
+                report.components.append(component)
+                if low[v] > disc[u]:
+                    report.bridges.append(tree_edge)
+        # Gốc DFS chỉ là articulation khi có >= 2 nhánh con.
+        splits[root] -= 1
+
+    ids = list(index)
+    report.articulation_points = sorted(
+        ((ids[v], count) for v, count in enumerate(splits) if count > 0),
+        key=lambda item: (-item[1], item[0]),
+    )
+    report.components.sort(key=lambda component: -len(component))
+    return report
+
+
+def channel_member_map(channel_rows) -> dict[tuple[str, str], str]:
+    """channel_rows: (device_id, name, members_json)."""
+    members: dict[tuple[str, str], str] = {}
+    for device_id, name, members_json in channel_rows:
+        for member in parse_members(members_json):
+            if isinstance(member, str) and member.strip():
+                members.setdefault((device_id, member.strip()), name)
+    return members
+
+
+_cache: OrderedDict[tuple[str, bool], RedundancyReport] = OrderedDict()
+
+
+async def get_redundancy_report(
+    db: AsyncSession,
+    project_id: str,
+    collapse_port_channels: bool = True,
+) -> RedundancyReport:
+    """Báo cáo dự phòng của project; chỉ tính lại khi Project.revision đổi."""
+    revision = await db.scalar(select(Project.revision).where(Project.id == project_id))
+    key = (project_id, collapse_port_channels)
+    cached = _cache.get(key)
+    if cached is not None and cached.revision == revision:
+        _cache.move_to_end(key)
+        return cached
+
+    link_rows = await db.execute(
+        select(L1Link.id, L1Link.from_device_id, L1Link.from_port, L1Link.to_device_id, L1Link.to_port)
+        .where(L1Link.project_id == project_id)
+        .order_by(L1Link.created_at, L1Link.id)
+    )
+    channel_members = None
+    if collapse_port_channels:
+        channel_rows = await db.execute(
+            select(PortChannel.device_id, PortChannel.name, PortChannel.members_json).where(
+                PortChannel.project_id == project_id
+            )
+        )
+        channel_members = channel_member_map(channel_rows.all())
+    device_rows = await db.execute(select(Device.id, Device.name).where(Device.project_id == project_id))
+    device_names = dict(device_rows.all())
+    report = analyze_redundancy(build_edges(link_rows.all(), channel_members), device_names)
+    report.device_names = device_names
+    report.revision = revision
+
+    _cache[key] = report
+    _cache.move_to_end(key)
+    while len(_cache) > CACHE_MAX_PROJECTS:
+        _cache.popitem(last=False)
+    return report
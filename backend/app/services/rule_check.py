@@ -0,0 +1,349 @@
+"""Rule check toàn project trước export (xem docs/RULE_BASED_CHECKS.md).
+
+Chạy mọi rule trong 1 lượt trên dữ liệu đã load sẵn (mỗi bảng 1 query). Các rule
+hình học chạy theo lô trên mảng NumPy (app.services.geometry): cặp device/area gần
+nhau tìm bằng sweep-and-prune, link chỉ so với device trong các ô lưới
+(geometry.SpatialGrid) mà đoạn link đi qua, thay vì so từng cặp.
+
+Rule đang kiểm:
+- RB-001 (ERROR): link trỏ tới device/port không tồn tại.
+- RB-101 (ERROR) / RB-141 (WARN): device chồng lấn / cách nhau < device_gap.
+- RB-102 (ERROR): area chồng lấn.
+- RB-103 (ERROR): device nằm ngoài area hoặc cách biên < area_padding.
+- RB-104 / RB-143 (WARN): link cắt qua / đi sát (< link_gap) device không liên quan.
+  Backend chưa có route chi tiết nên link được xét theo đoạn thẳng nối tâm 2
+  device; vì là xấp xỉ nên chỉ báo WARN.
+- RB-301 (INFO): device/area chưa có tọa độ, bỏ qua kiểm tra hình học.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterable, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Area, Device, L1Link
+from app.services import geometry
+from app.services.admin_config import get_admin_config
+from app.services.device_port import get_port_keys
+
+SEVERITY_ERROR = "ERROR"
+SEVERITY_WARN = "WARN"
+SEVERITY_INFO = "INFO"
+SEVERITIES = (SEVERITY_ERROR, SEVERITY_WARN, SEVERITY_INFO)
+
+
+@dataclass(frozen=True)
+class RuleCheckParams:
+    """Ngưỡng kiểm tra (inch), mặc định theo docs/RULE_BASED_CHECKS.md mục 2."""
+
+    area_padding: float = 0.15
+    device_gap: float = 0.2
+    label_gap: float = 0.05
+    link_gap: float = 0.05
+    overlap_epsilon: float = 0.01
+    min_link_segment: float = 0.1
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "RuleCheckParams":
+        """Đọc override từ admin config: validation.layout_checks."""
+        validation = config.get("validation") if isinstance(config, dict) else None
+        checks = validation.get("layout_checks") if isinstance(validation, dict) else None
+        if not isinstance(checks, dict):
+            return cls()
+        values = {}
+        for name in cls.__dataclass_fields__:
+            try:
+                values[name] = float(checks[name])
+            except (KeyError, TypeError, ValueError):
+                continue
+        return cls(**values)
+
+
+@dataclass(frozen=True)
+class Box:
+    id: str
+    name: str
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    area_id: Optional[str] = None
+
+    @property
+    def center(self) -> tuple[float, float]:
+        return ((self.x0 + self.x1) / 2, (self.y0 + self.y1) / 2)
+
+
+@dataclass
+class Finding:
+    rule: str
+    severity: str
+    entity_type: str
+    entity_ids: list[str]
+    message: str
+
+
+@dataclass
+class RuleCheckReport:
+    findings: list[Finding] = field(default_factory=list)
+    checked: dict[str, int] = field(default_factory=dict)
+
+    def add(self, rule: str, severity: str, entity_type: str, entity_ids: list[str], message: str) -> None:
+        self.findings.append(Finding(rule, severity, entity_type, entity_ids, message))
+
+    @property
+    def summary(self) -> dict[str, int]:
+        counts = {severity: 0 for severity in SEVERITIES}
+        for finding in self.findings:
+            counts[finding.severity] += 1
+        return counts
+
+    @property
+    def export_blocked(self) -> bool:
+        return any(finding.severity == SEVERITY_ERROR for finding in self.findings)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "summary": self.summary,
+            "export_blocked": self.export_blocked,
+            "checked": dict(self.checked),
+            "findings": [asdict(finding) for finding in self.findings],
+        }
+
+
+def _rects(boxes: list[Box]) -> np.ndarray:
+    return np.array([(box.x0, box.y0, box.x1, box.y1) for box in boxes], dtype=np.float64).reshape(-1, 4)
+
+
+def _check_device_spacing(report: RuleCheckReport, devices: list[Box], params: RuleCheckParams) -> None:
+    rects = _rects(devices)
+    eps = params.overlap_epsilon
+    pairs = geometry.overlapping_pairs(rects, margin=params.device_gap, eps=eps)
+    gaps, overlap_x, overlap_y = geometry.box_gaps(rects[pairs[:, 0]], rects[pairs[:, 1]])
+    rows = zip(pairs.tolist(), gaps.tolist(), overlap_x.tolist(), overlap_y.tolist())
+    for (index, other_index), gap, ox, oy in rows:
+        box, other = devices[index], devices[other_index]
+        if ox > eps and oy > eps:
+            report.add(
+                "RB-101",
+                SEVERITY_ERROR,
+                "device",
+                [box.id, other.id],
+                f"Device '{box.name}' chồng lấn device '{other.name}'.",
+            )
+        elif gap < params.device_gap - eps:
+            report.add(
+                "RB-141",
+                SEVERITY_WARN,
+                "device",
+                [box.id, other.id],
+                f"Device '{box.name}' cách device '{other.name}' {gap:.2f} inch (< {params.device_gap:g}).",
+            )
+
+
+def _check_area_overlap(report: RuleCheckReport, areas: list[Box], params: RuleCheckParams) -> None:
+    for index, other_index in geometry.overlapping_pairs(_rects(areas), eps=params.overlap_epsilon).tolist():
+        box, other = areas[index], areas[other_index]
+        report.add(
+            "RB-102",
+            SEVERITY_ERROR,
+            "area",
+            [box.id, other.id],
+            f"Area '{box.name}' chồng lấn area '{other.name}'.",
+        )
+
+
+def _check_device_in_area(
+    report: RuleCheckReport, devices: list[Box], areas: dict[str, Box], params: RuleCheckParams
+) -> None:
+    placed = [(box, areas[box.area_id]) for box in devices if box.area_id in areas]
+    if not placed:
+        return
+    margins = geometry.containment_margins(
+        _rects([area for _, area in placed]), _rects([box for box, _ in placed])
+    )
+    eps = params.overlap_epsilon
+    for (box, area), margin in zip(placed, margins.tolist()):
+        if margin < -eps:
+            report.add(
+                "RB-103",
+                SEVERITY_ERROR,
+                "device",
+                [box.id, area.id],
+                f"Device '{box.name}' nằm ngoài area '{area.name}'.",
+            )
+        elif margin < params.area_padding - eps:
+            report.add(
+                "RB-103",
+                SEVERITY_ERROR,
+                "device",
+                [box.id, area.id],
+                f"Device '{box.name}' cách biên area '{area.name}' {margin:.2f} inch (< {params.area_padding:g}).",
+            )
+
+
+def _check_link_clearance(
+    report: RuleCheckReport,
+    links: list[tuple[str, str, str]],
+    devices: list[Box],
+    params: RuleCheckParams,
+) -> None:
+    rects = _rects(devices)
+    grid = geometry.SpatialGrid(rects, geometry.grid_cell_size(rects, params.link_gap))
+    by_id = {box.id: index for index, box in enumerate(devices)}
+    eps = params.overlap_epsilon
+    gap = params.link_gap
+    # Gom mọi cặp (link, device gần đoạn link) rồi tính khoảng cách 1 lần trên cả lô.
+    pair_links: list[int] = []
+    pair_segments: list[int] = []
+    pair_devices: list[int] = []
+    segments: list[tuple[float, float, float, float]] = []
+    for link_index, (_, from_id, to_id) in enumerate(links):
+        start, end = by_id.get(from_id), by_id.get(to_id)
+        if start is None or end is None:
+            continue
+        (ax, ay), (bx, by) = devices[start].center, devices[end].center
+        segments.append((ax, ay, bx, by))
+        for index in sorted(grid.query_segment(ax, ay, bx, by, gap)):
+            if index not in (start, end):
+                pair_links.append(link_index)
+                pair_segments.append(len(segments) - 1)
+                pair_devices.append(index)
+    if not pair_links:
+        return
+    distances = geometry.segment_box_distances(
+        np.asarray(segments, dtype=np.float64)[pair_segments], rects[pair_devices]
+    )
+    for link_index, index, distance in zip(pair_links, pair_devices, distances.tolist()):
+        link_id, from_id, to_id = links[link_index]
+        start, end, box = devices[by_id[from_id]], devices[by_id[to_id]], devices[index]
+        if distance <= eps:
+            report.add(
+                "RB-104",
+                SEVERITY_WARN,
+                "link",
+                [link_id, box.id],
+                f"Link '{start.name}' - '{end.name}' đi xuyên qua device '{box.name}'.",
+            )
+        elif distance < gap - eps:
+            report.add(
+                "RB-143",
+                SEVERITY_WARN,
+                "link",
+                [link_id, box.id],
+                f"Link '{start.name}' - '{end.name}' cách device '{box.name}' {distance:.2f} inch (< {gap:g}).",
+            )
+
+
+def _check_link_ports(
+    report: RuleCheckReport,
+    links: list[tuple[str, str, str, str, str]],
+    device_names: dict[str, str],
+    port_keys: set[tuple[str, str]],
+) -> None:
+    for link_id, from_id, from_port, to_id, to_port in links:
+        for device_id, port in ((from_id, from_port), (to_id, to_port)):
+            if device_id not in device_names:
+                report.add(
+                    "RB-001", SEVERITY_ERROR, "link", [link_id], f"Link trỏ tới device không tồn tại ({device_id})."
+                )
+            elif (device_id, port) not in port_keys:
+                report.add(
+                    "RB-001",
+                    SEVERITY_ERROR,
+                    "link",
+                    [link_id, device_id],
+                    f"Port '{port}' chưa khai báo trên device '{device_names[device_id]}'.",
+                )
+
+
+def _positioned(
+    report: RuleCheckReport, entity_type: str, rows: Iterable[tuple], with_area: bool
+) -> list[Box]:
+    boxes: list[Box] = []
+    for row in rows:
+        entity_id, name, x, y, width, height = row[:6]
+        if x is None or y is None:
+            report.add(
+                "RB-301",
+                SEVERITY_INFO,
+                entity_type,
+                [entity_id],
+                f"{entity_type.capitalize()} '{name}' chưa có tọa độ, bỏ qua kiểm tra hình học.",
+            )
+            continue
+        width, height = float(width or 0.0), float(height or 0.0)
+        area_id = row[6] if with_area else None
+        boxes.append(Box(entity_id, name, float(x), float(y), float(x) + width, float(y) + height, area_id))
+    return boxes
+
+
+def check_project_rules(
+    areas: list[tuple],
+    devices: list[tuple],
+    links: list[tuple[str, str, str, str, str]],
+    port_keys: set[tuple[str, str]],
+    params: Optional[RuleCheckParams] = None,
+) -> RuleCheckReport:
+    """Chạy mọi rule trên dữ liệu thô.
+
+    areas: (id, name, x, y, width, height); devices: (id, name, x, y, width, height, area_id);
+    links: (id, from_device_id, from_port, to_device_id, to_port).
+    """
+    params = params or RuleCheckParams()
+    report = RuleCheckReport(checked={"areas": len(areas), "devices": len(devices), "links": len(links)})
+    area_boxes = _positioned(report, "area", areas, with_area=False)
+    device_boxes = _positioned(report, "device", devices, with_area=True)
+
+    _check_link_ports(report, links, {row[0]: row[1] for row in devices}, port_keys)
+    _check_area_overlap(report, area_boxes, params)
+    _check_device_spacing(report, device_boxes, params)
+    _check_device_in_area(report, device_boxes, {box.id: box for box in area_boxes}, params)
+    _check_link_clearance(report, [(link[0], link[1], link[3]) for link in links], device_boxes, params)
+    return report
+
+
+async def run_rule_checks(db: AsyncSession, project_id: str) -> RuleCheckReport:
+    """Load dữ liệu project (mỗi bảng 1 query, chỉ các cột cần) rồi chạy rule check."""
+    areas = (
+        await db.execute(
+            select(Area.id, Area.name, Area.position_x, Area.position_y, Area.width, Area.height)
+            .where(Area.project_id == project_id)
+            .order_by(Area.name)
+        )
+    ).all()
+    devices = (
+        await db.execute(
+            select(
+                Device.id,
+                Device.name,
+                Device.position_x,
+                Device.position_y,
+                Device.width,
+                Device.height,
+                Device.area_id,
+            )
+            .where(Device.project_id == project_id)
+            .order_by(Device.name)
+        )
+    ).all()
+    links = (
+        await db.execute(
+            select(L1Link.id, L1Link.from_device_id, L1Link.from_port, L1Link.to_device_id, L1Link.to_port)
+            .where(L1Link.project_id == project_id)
+            .order_by(L1Link.created_at)
+        )
+    ).all()
+    port_keys = await get_port_keys(db, project_id)
+    params = RuleCheckParams.from_config(await get_admin_config(db))
+    return check_project_rules(
+        [tuple(row) for row in areas],
+        [tuple(row) for row in devices],
+        [tuple(row) for row in links],
+        port_keys,
+        params,
+    )
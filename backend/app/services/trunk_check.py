@@ -0,0 +1,143 @@
+"""Kiểm tra nhất quán L2 giữa 2 đầu L1 link (RB-501..504).
+
+Assignment của project được load 1 lần thành mảng (mode, native, VLAN access) và ma
+trận bitmap (n, 64) uint64; mỗi link map 2 đầu sang chỉ số hàng rồi so sánh cả lô:
+- RB-501: 1 đầu access, 1 đầu trunk;
+- RB-502: trunk 2 đầu cho phép tập VLAN khác nhau (XOR khác 0);
+- RB-503: native VLAN khác nhau (không khai báo = VLAN 1);
+- RB-504: access 2 đầu khác VLAN.
+Link chỉ có assignment ở 1 đầu (hoặc không có) được bỏ qua.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Device, InterfaceL2Assignment, L1Link, L2Segment
+from app.services.rule_check import SEVERITY_ERROR, SEVERITY_WARN, RuleCheckReport
+from app.services.vlan_bitset import bitmap_from_json, format_ranges, popcount, row_vlans, stack_bitmaps
+
+DEFAULT_NATIVE_VLAN = 1
+
+
+@dataclass
+class L2Ports:
+    """Assignment theo cột: hàng i ứng với interface keys[i]."""
+
+    index: dict[tuple[str, str], int]
+    trunk: np.ndarray
+    native: np.ndarray
+    access_vlan: np.ndarray
+    allowed: np.ndarray
+
+
+def build_l2_ports(rows) -> L2Ports:
+    """rows: (device_id, interface_name, port_mode, native_vlan, vlan_id, bitmap, allowed_vlans_json)."""
+    index: dict[tuple[str, str], int] = {}
+    trunk, native, access_vlan, bitmaps = [], [], [], []
+    for device_id, interface_name, port_mode, native_vlan, vlan_id, bitmap, allowed_vlans_json in rows:
+        key = (device_id, (interface_name or "").strip())
+        if key in index:
+            continue
+        index[key] = len(trunk)
+        trunk.append((port_mode or "").lower() == "trunk")
+        native.append(native_vlan or DEFAULT_NATIVE_VLAN)
+        access_vlan.append(vlan_id or 0)
+        bitmaps.append(bitmap if bitmap is not None else bitmap_from_json(allowed_vlans_json))
+    return L2Ports(
+        index=index,
+        trunk=np.asarray(trunk, dtype=bool),
+        native=np.asarray(native, dtype=np.int64),
+        access_vlan=np.asarray(access_vlan, dtype=np.int64),
+        allowed=stack_bitmaps(bitmaps),
+    )
+
+
+def check_trunk_consistency(ports: L2Ports, links, device_names: dict[str, str]) -> RuleCheckReport:
+    """links: (id, from_device_id, from_port, to_device_id, to_port)."""
+    link_ids, a_rows, b_rows, labels = [], [], [], []
+    for link_id, from_device_id, from_port, to_device_id, to_port in links:
+        a = ports.index.get((from_device_id, (from_port or "").strip()))
+        b = ports.index.get((to_device_id, (to_port or "").strip()))
+        if a is None or b is None:
+            continue
+        link_ids.append(link_id)
+        a_rows.append(a)
+        b_rows.append(b)
+        labels.append(
+            f"{device_names.get(from_device_id, from_device_id)}:{from_port} - "
+            f"{device_names.get(to_device_id, to_device_id)}:{to_port}"
+        )
+    report = RuleCheckReport(checked={"l2_assignments": len(ports.index), "l2_links": len(link_ids)})
+    if not link_ids:
+        return report
+
+    a = np.asarray(a_rows, dtype=np.intp)
+    b = np.asarray(b_rows, dtype=np.intp)
+    trunk_a, trunk_b = ports.trunk[a], ports.trunk[b]
+    mode_mismatch = trunk_a != trunk_b
+    both_trunk = trunk_a & trunk_b
+    both_access = ~trunk_a & ~trunk_b
+
+    only_a = ports.allowed[a] & ~ports.allowed[b]
+    only_b = ports.allowed[b] & ~ports.allowed[a]
+    allowed_mismatch = both_trunk & ((popcount(only_a) + popcount(only_b)) > 0)
+    native_mismatch = both_trunk & (ports.native[a] != ports.native[b])
+    access_mismatch = both_access & (ports.access_vlan[a] != ports.access_vlan[b])
+
+    for k in np.flatnonzero(mode_mismatch).tolist():
+        report.add("RB-501", SEVERITY_ERROR, "l1_link", [link_ids[k]], f"Link {labels[k]}: 1 đầu access, 1 đầu trunk")
+    for k in np.flatnonzero(allowed_mismatch).tolist():
+        report.add(
+            "RB-502",
+            SEVERITY_WARN,
+            "l1_link",
+            [link_ids[k]],
+            f"Link {labels[k]}: allowed VLAN lệch (chỉ đầu A: {format_ranges(row_vlans(only_a[k])) or '-'}; "
+            f"chỉ đầu B: {format_ranges(row_vlans(only_b[k])) or '-'})",
+        )
+    for k in np.flatnonzero(native_mismatch).tolist():
+        report.add(
+            "RB-503",
+            SEVERITY_ERROR,
+            "l1_link",
+            [link_ids[k]],
+            f"Link {labels[k]}: native VLAN lệch ({ports.native[a[k]]} / {ports.native[b[k]]})",
+        )
+    for k in np.flatnonzero(access_mismatch).tolist():
+        report.add(
+            "RB-504",
+            SEVERITY_ERROR,
+            "l1_link",
+            [link_ids[k]],
+            f"Link {labels[k]}: access VLAN lệch ({ports.access_vlan[a[k]]} / {ports.access_vlan[b[k]]})",
+        )
+    return report
+
+
+async def run_trunk_check(db: AsyncSession, project_id: str) -> RuleCheckReport:
+    assignment_rows = await db.execute(
+        select(
+            InterfaceL2Assignment.device_id,
+            InterfaceL2Assignment.interface_name,
+            InterfaceL2Assignment.port_mode,
+            InterfaceL2Assignment.native_vlan,
+            L2Segment.vlan_id,
+            InterfaceL2Assignment.allowed_vlans_bitmap,
+            InterfaceL2Assignment.allowed_vlans_json,
+        )
+        .outerjoin(L2Segment, L2Segment.id == InterfaceL2Assignment.l2_segment_id)
+        .where(InterfaceL2Assignment.project_id == project_id)
+        .order_by(InterfaceL2Assignment.created_at, InterfaceL2Assignment.id)
+    )
+    link_rows = await db.execute(
+        select(L1Link.id, L1Link.from_device_id, L1Link.from_port, L1Link.to_device_id, L1Link.to_port).where(
+            L1Link.project_id == project_id
+        )
+    )
+    device_rows = await db.execute(select(Device.id, Device.name).where(Device.project_id == project_id))
+    return check_trunk_consistency(build_l2_ports(assignment_rows.all()), link_rows.all(), dict(device_rows.all()))
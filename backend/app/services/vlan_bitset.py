@@ -0,0 +1,93 @@
+"""Tập VLAN dạng bitset 4096 bit (512 byte) cho L2 assignment.
+
+VLAN v nằm ở bit v % 64 của word v // 64 (uint64 little-endian), nên 1 bitmap là
+1 hàng (64,) uint64 và cả project là ma trận (n, 64): giao/hợp/hiệu/đếm cho mọi
+trunk chạy theo lô bằng NumPy, không parse JSON từng dòng.
+
+Cột InterfaceL2Assignment.allowed_vlans_bitmap lưu 512 byte packed; None nghĩa là
+không giới hạn (trunk cho phép mọi VLAN 1-4094, như mặc định của switch).
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+VLAN_MIN = 1
+VLAN_MAX = 4094
+VLAN_BITS = 4096
+BITMAP_BYTES = VLAN_BITS // 8
+BITMAP_WORDS = VLAN_BITS // 64
+
+
+def vlan_bits(vlans: Iterable[int]) -> np.ndarray:
+    """Mảng bool (4096,) từ danh sách VLAN; bỏ VLAN ngoài 1-4094."""
+    bits = np.zeros(VLAN_BITS, dtype=bool)
+    values = np.fromiter((int(vlan) for vlan in vlans), dtype=np.int64)
+    bits[values[(values >= VLAN_MIN) & (values <= VLAN_MAX)]] = True
+    return bits
+
+
+def bitmap_from_vlans(vlans: Optional[Iterable[int]]) -> Optional[bytes]:
+    if vlans is None:
+        return None
+    return np.packbits(vlan_bits(vlans), bitorder="little").tobytes()
+
+
+def vlans_from_bitmap(bitmap: Optional[bytes]) -> Optional[list[int]]:
+    if bitmap is None:
+        return None
+    bits = np.unpackbits(np.frombuffer(bitmap, dtype=np.uint8), bitorder="little")
+    return np.flatnonzero(bits).tolist()
+
+
+ALL_VLANS = bitmap_from_vlans(range(VLAN_MIN, VLAN_MAX + 1))
+
+
+def bitmap_from_json(allowed_vlans_json: Optional[str]) -> Optional[bytes]:
+    """Chuyển cột allowed_vlans_json cũ sang bitmap (None nếu rỗng/hỏng)."""
+    if not allowed_vlans_json:
+        return None
+    try:
+        vlans = json.loads(allowed_vlans_json)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(vlans, list):
+        return None
+    return bitmap_from_vlans(vlan for vlan in vlans if isinstance(vlan, int))
+
+
+def format_ranges(vlans: Optional[Sequence[int]]) -> str:
+    """[1, 2, 3, 10, 20, 21] -> "1-3,10,20-21" (rỗng nếu None)."""
+    if not vlans:
+        return ""
+    values = np.unique(np.asarray(vlans, dtype=np.int64))
+    breaks = np.flatnonzero(np.diff(values) != 1)
+    starts = np.concatenate(([values[0]], values[breaks + 1]))
+    ends = np.concatenate((values[breaks], [values[-1]]))
+    return ",".join(str(start) if start == end else f"{start}-{end}" for start, end in zip(starts, ends))
+
+
+def stack_bitmaps(bitmaps: Sequence[Optional[bytes]]) -> np.ndarray:
+    """Ma trận (n, 64) uint64; None thay bằng ALL_VLANS."""
+    if not bitmaps:
+        return np.zeros((0, BITMAP_WORDS), dtype=np.uint64)
+    raw = b"".join(ALL_VLANS if bitmap is None else bitmap for bitmap in bitmaps)
+    return np.frombuffer(raw, dtype="<u8").reshape(len(bitmaps), BITMAP_WORDS)
+
+
+def row_vlans(row: np.ndarray) -> list[int]:
+    """VLAN của 1 hàng (64,) uint64."""
+    bits = np.unpackbits(np.ascontiguousarray(row, dtype="<u8").view(np.uint8), bitorder="little")
+    return np.flatnonzero(bits).tolist()
+
+
+def popcount(rows: np.ndarray) -> np.ndarray:
+    """Số VLAN trên từng hàng của ma trận (n, 64) uint64."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(rows).sum(axis=1, dtype=np.int64)
+    bytes_view = np.ascontiguousarray(rows, dtype="<u8").view(np.uint8)
+    return np.unpackbits(bytes_view, axis=1).sum(axis=1, dtype=np.int64)
+
@@ -0,0 +1,340 @@
+"""Export master/device file (Excel) theo kiểu NS, stream từ DB sang openpyxl write-only.
+
+Chạy trong ProcessPool: dùng engine sync riêng, đọc theo chunk (yield_per) và ghi
+từng dòng, không giữ ORM object hay toàn bộ worksheet trong bộ nhớ.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Iterator
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import aliased
+
+from app.db.models import (
+    Area,
+    Device,
+    DevicePort,
+    InterfaceL2Assignment,
+    L1Link,
+    L2Segment,
+    L3Address,
+    PortChannel,
+    Project,
+    VirtualPort,
+)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+_engines: dict[str, Engine] = {}
+
+
+def sync_database_url(database_url: str) -> str:
+    """Đổi URL async (sqlite+aiosqlite) sang driver sync mặc định của backend."""
+    url = make_url(database_url)
+    if "+" in url.drivername:
+        url = url.set(drivername=url.get_backend_name())
+    return url.render_as_string(hide_password=False)
+
+
+def _get_engine(database_url: str) -> Engine:
+    url = sync_database_url(database_url)
+    engine = _engines.get(url)
+    if engine is None:
+        connect_args = {"check_same_thread": False, "timeout": 30} if url.startswith("sqlite") else {}
+        engine = create_engine(url, connect_args=connect_args)
+        _engines[url] = engine
+    return engine
+
+
+def _json_list_text(raw: str | None) -> str:
+    if not raw:
+        return ""
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError):
+        return raw
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return str(value)
+
+
+def _sheet_areas(project_id: str):
+    query = (
+        select(
+            Area.name,
+            Area.grid_row,
+            Area.grid_col,
+            Area.grid_range,
+            Area.position_x,
+            Area.position_y,
+            Area.width,
+            Area.height,
+            Area.style_json,
+        )
+        .where(Area.project_id == project_id)
+        .order_by(Area.grid_row, Area.grid_col, Area.name)
+    )
+    header = ["name", "grid_row", "grid_col", "grid_range", "position_x", "position_y", "width", "height", "style"]
+    return "Areas", header, query, None
+
+
+def _sheet_devices(project_id: str):
+    query = (
+        select(
+            Device.name,
+            Device.device_type,
+            Area.name,
+            Device.grid_range,
+            Device.position_x,
+            Device.position_y,
+            Device.width,
+            Device.height,
+            Device.color_rgb_json,
+        )
+        .join(Area, Area.id == Device.area_id)
+        .where(Device.project_id == project_id)
+        .order_by(Area.name, Device.name)
+    )
+    header = [
+        "name",
+        "device_type",
+        "area_name",
+        "grid_range",
+        "position_x",
+        "position_y",
+        "width",
+        "height",
+        "color_rgb",
+    ]
+
+    def convert(row) -> list[Any]:
+        values = list(row)
+        values[8] = _json_list_text(values[8])
+        return values
+
+    return "Devices", header, query, convert
+
+
+def _sheet_device_ports(project_id: str):
+    query = (
+        select(Device.name, DevicePort.name, DevicePort.side, DevicePort.offset_ratio)
+        .join(Device, Device.id == DevicePort.device_id)
+        .where(DevicePort.project_id == project_id)
+        .order_by(Device.name, DevicePort.name)
+    )
+    return "Device_Ports", ["device_name", "name", "side", "offset_ratio"], query, None
+
+
+def _sheet_links(project_id: str):
+    from_device = aliased(Device)
+    to_device = aliased(Device)
+    query = (
+        select(
+            from_device.name,
+            L1Link.from_port,
+            to_device.name,
+            L1Link.to_port,
+            L1Link.purpose,
+            L1Link.line_style,
+            L1Link.color_rgb_json,
+        )
+        .join(from_device, from_device.id == L1Link.from_device_id)
+        .join(to_device, to_device.id == L1Link.to_device_id)
+        .where(L1Link.project_id == project_id)
+        .order_by(L1Link.created_at, L1Link.id)
+    )
+    header = ["from_device", "from_port", "to_device", "to_port", "purpose", "line_style", "color_rgb"]
+
+    def convert(row) -> list[Any]:
+        values = list(row)
+        values[6] = _json_list_text(values[6])
+        return values
+
+    return "L1_Links", header, query, convert
+
+
+def _sheet_port_channels(project_id: str):
+    query = (
+        select(Device.name, PortChannel.name, PortChannel.channel_number, PortChannel.mode, PortChannel.members_json)
+        .join(Device, Device.id == PortChannel.device_id)
+        .where(PortChannel.project_id == project_id)
+        .order_by(Device.name, PortChannel.channel_number)
+    )
+    header = ["device_name", "name", "channel_number", "mode", "members"]
+
+    def convert(row) -> list[Any]:
+        values = list(row)
+        values[4] = _json_list_text(values[4])
+        return values
+
+    return "PortChannels", header, query, convert
+
+
+def _sheet_virtual_ports(project_id: str):
+    query = (
+        select(Device.name, VirtualPort.name, VirtualPort.interface_type)
+        .join(Device, Device.id == VirtualPort.device_id)
+        .where(VirtualPort.project_id == project_id)
+        .order_by(Device.name, VirtualPort.name)
+    )
+    return "VirtualPorts", ["device_name", "name", "interface_type"], query, None
+
+
+def _sheet_l2_segments(project_id: str):
+    query = (
+        select(L2Segment.name, L2Segment.vlan_id, L2Segment.description)
+        .where(L2Segment.project_id == project_id)
+        .order_by(L2Segment.vlan_id, L2Segment.name)
+    )
+    return "L2_Segments", ["name", "vlan_id", "description"], query, None
+
+
+def _sheet_l2_assignments(project_id: str):
+    query = (
+        select(
+            Device.name,
+            InterfaceL2Assignment.interface_name,
+            L2Segment.name,
+            L2Segment.vlan_id,
+            InterfaceL2Assignment.port_mode,
+            InterfaceL2Assignment.native_vlan,
+            InterfaceL2Assignment.allowed_vlans_json,
+        )
+        .join(Device, Device.id == InterfaceL2Assignment.device_id)
+        .join(L2Segment, L2Segment.id == InterfaceL2Assignment.l2_segment_id)
+        .where(InterfaceL2Assignment.project_id == project_id)
+        .order_by(Device.name, InterfaceL2Assignment.interface_name)
+    )
+    header = ["device_name", "interface_name", "l2_segment", "vlan_id", "port_mode", "native_vlan", "allowed_vlans"]
+
+    def convert(row) -> list[Any]:
+        values = list(row)
+        values[6] = _json_list_text(values[6])
+        return values
+
+    return "L2_Assignments", header, query, convert
+
+
+def _sheet_l3_addresses(project_id: str):
+    query = (
+        select(
+            Device.name,
+            L3Address.interface_name,
+            L3Address.ip_address,
+            L3Address.prefix_length,
+            L3Address.is_secondary,
+            L3Address.description,
+        )
+        .join(Device, Device.id == L3Address.device_id)
+        .where(L3Address.project_id == project_id)
+        .order_by(Device.name, L3Address.interface_name)
+    )
+    header = ["device_name", "interface_name", "ip_address", "prefix_length", "is_secondary", "description"]
+    return "IP_Addresses", header, query, None
+
+
+# Thứ tự sheet theo thứ tự import (TEMPLATE_SCHEMA §3) để file export nhập lại được.
+WORKBOOK_SHEETS: dict[str, list[Callable[[str], tuple]]] = {
+    "master_file": [
+        _sheet_areas,
+        _sheet_devices,
+        _sheet_device_ports,
+        _sheet_links,
+        _sheet_port_channels,
+        _sheet_virtual_ports,
+        _sheet_l2_segments,
+        _sheet_l2_assignments,
+        _sheet_l3_addresses,
+    ],
+    "device_file": [
+        _sheet_devices,
+        _sheet_device_ports,
+        _sheet_port_channels,
+        _sheet_virtual_ports,
+        _sheet_l2_assignments,
+        _sheet_l3_addresses,
+    ],
+}
+
+
+def iter_rows(conn, query, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[list]:
+    """Stream kết quả theo chunk (server-side cursor), trả về từng partition."""
+    result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def write_project_workbook(
+    file_path: str,
+    export_type: str,
+    project_id: str,
+    database_url: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Callable[[float, str | None], None] | None = None,
+) -> dict[str, int]:
+    """Ghi workbook write-only. Trả về số dòng dữ liệu theo sheet.
+
+    progress(percent, message): báo tiến độ 0..100 theo số dòng đã ghi (tùy chọn).
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    sheet_builders = WORKBOOK_SHEETS.get(export_type)
+    if sheet_builders is None:
+        raise ValueError("Export type không hợp lệ")
+
+    workbook = Workbook(write_only=True)
+    header_font = Font(bold=True)
+    counts: dict[str, int] = {}
+
+    with _get_engine(database_url).connect() as conn:
+        project_name = conn.execute(select(Project.name).where(Project.id == project_id)).scalar_one_or_none()
+        if project_name is None:
+            raise ValueError("Project không tồn tại")
+
+        meta = workbook.create_sheet("Metadata")
+        meta.append(["key", "value"])
+        meta.append(["project_name", project_name])
+        meta.append(["export_type", export_type])
+
+        sheets = [builder(project_id) for builder in sheet_builders]
+        totals = None
+        if progress is not None:
+            totals = [
+                conn.execute(select(func.count()).select_from(query.subquery())).scalar_one()
+                for _, _, query, _ in sheets
+            ]
+        grand_total = max(1, sum(totals or []))
+        written = 0
+
+        for sheet_index, (title, header, query, convert) in enumerate(sheets):
+            if progress is not None:
+                progress(95 * written / grand_total, f"Ghi sheet {title}")
+            sheet = workbook.create_sheet(title)
+            header_cells = []
+            for name in header:
+                cell = WriteOnlyCell(sheet, value=name)
+                cell.font = header_font
+                header_cells.append(cell)
+            sheet.append(header_cells)
+            total = 0
+            for partition in iter_rows(conn, query, chunk_size):
+                for row in partition:
+                    sheet.append(convert(row) if convert else list(row))
+                total += len(partition)
+                if progress is not None:
+                    progress(95 * (written + total) / grand_total)
+            counts[title] = total
+            written += totals[sheet_index] if totals else total
+
+    if progress is not None:
+        progress(95, "Lưu file Excel")
+    workbook.save(file_path)
+    return counts
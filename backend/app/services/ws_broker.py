@@ -0,0 +1,273 @@
+"""Broker phát message WebSocket giữa các process API (uvicorn --workers N).
+
+ConnectionManager tự fanout cho socket của process mình; broker chuyển message
+broadcast tới các process khác, mỗi process nhận lại fanout cho socket cục bộ.
+
+- LocalBroker: chỉ 1 process, không chuyển đi đâu (mặc định).
+- UnixSocketBroker: mỗi process bind 1 Unix datagram socket trong thư mục chung;
+  publish = gửi 1 datagram tới socket của từng process khác.
+  Không cần hub hay dịch vụ ngoài, độ trễ chỉ là 1 lần sendto. Danh sách peer được
+  cache, chỉ quét lại thư mục khi mtime của nó đổi hoặc sau PEER_REFRESH_SECONDS;
+  socket của process đã chết (ECONNREFUSED) bị xóa khi gặp.
+
+Message không tới được process khác (quá MAX_DATAGRAM_BYTES, hoặc backlog của peer
+tràn) được thay bằng event resync của project đó để client tải lại state.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import errno
+import logging
+import os
+import socket
+import uuid
+from collections import Counter, deque
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.core.config import WS_BROKER
+from app.services.ws_codec import encode_json, resync_message
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[str, str], int]
+
+_SOCKET_SUFFIX = ".sock"
+# Giới hạn datagram AF_UNIX trên Linux phụ thuộc net.core.wmem_max (~208 KB mặc định).
+MAX_DATAGRAM_BYTES = 200 * 1024
+# Số message chờ gửi tối đa cho mỗi process khác khi hàng đợi nhận của nó đầy.
+PEER_BACKLOG = 1024
+# Quét lại thư mục socket tối thiểu mỗi N giây (phòng filesystem có mtime thô).
+PEER_REFRESH_SECONDS = 5.0
+
+
+def encode_envelope(project_id: str, text: str) -> bytes:
+    return f"{project_id}\n{text}".encode("utf-8")
+
+
+def decode_envelope(payload: bytes) -> tuple[str, str]:
+    project_id, _, text = payload.decode("utf-8").partition("\n")
+    return project_id, text
+
+
+def resync_envelope(project_id: str, reason: str) -> bytes:
+    return encode_envelope(project_id, encode_json(resync_message(reason)))
+
+
+class LocalBroker:
+    """Broker 1 process: không có process khác để chuyển tới."""
+
+    def __init__(self) -> None:
+        self._deliver: Optional[Deliver] = None
+        self.metrics: Counter[str] = Counter()
+
+    async def start(self, deliver: Deliver) -> None:
+        """deliver(project_id, text) fanout message nhận từ process khác cho socket cục bộ."""
+        self._deliver = deliver
+
+    async def publish(self, project_id: str, text: str) -> None:
+        """Chuyển message (đã serialize) tới các process khác."""
+
+    async def close(self) -> None:
+        self._deliver = None
+
+
+class _PeerLink:
+    """Socket datagram đã connect tới 1 process khác, kèm backlog khi hàng đợi nhận đầy."""
+
+    def __init__(self, broker: "UnixSocketBroker", path: Path) -> None:
+        self.broker = broker
+        self.path = path
+        self.pending: deque[bytes] = deque()
+        self.lost: set[str] = set()  # Project có message bị bỏ khỏi backlog
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.connect(str(path))
+        self._waiting = False
+
+    def send(self, payload: bytes) -> None:
+        if self.pending:
+            self._queue(payload)
+            return
+        try:
+            self.sock.send(payload)
+            self.broker.metrics["sent"] += 1
+        except (BlockingIOError, InterruptedError):
+            self._queue(payload)
+
+    def _queue(self, payload: bytes) -> None:
+        # Process kia đọc chậm: giữ tối đa PEER_BACKLOG message, bỏ cũ nhất giống client chậm.
+        if len(self.pending) >= PEER_BACKLOG:
+            dropped = self.pending.popleft()
+            self.lost.add(dropped.partition(b"\n")[0].decode("utf-8"))
+            self.broker.metrics["dropped"] += 1
+        self.pending.append(payload)
+        if not self._waiting:
+            self._waiting = True
+            self.broker.loop.add_writer(self.sock.fileno(), self._flush)
+
+    def _flush(self) -> None:
+        while self.pending or self.lost:
+            if not self.pending:
+                # Backlog đã xả: báo các project bị mất message tải lại state.
+                self.pending.extend(resync_envelope(project_id, "dropped") for project_id in sorted(self.lost))
+                self.broker.metrics["resyncs"] += len(self.lost)
+                self.lost.clear()
+            try:
+                self.sock.send(self.pending[0])
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as exc:
+                self.broker.drop_peer(self, exc)
+                return
+            self.pending.popleft()
+            self.broker.metrics["sent"] += 1
+        self._stop_waiting()
+
+    def _stop_waiting(self) -> None:
+        if self._waiting:
+            self._waiting = False
+            if not self.broker.loop.is_closed():
+                self.broker.loop.remove_writer(self.sock.fileno())
+
+    def close(self) -> None:
+        self._stop_waiting()
+        self.sock.close()
+
+
+class UnixSocketBroker(LocalBroker):
+    """Fanout giữa các process qua Unix datagram socket trong 1 thư mục chung."""
+
+    def __init__(self, directory: str) -> None:
+        super().__init__()
+        self.directory = Path(directory)
+        self.socket_path: Optional[Path] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sock: Optional[socket.socket] = None
+        self._peers: dict[Path, _PeerLink] = {}
+        self._peers_mtime: Optional[int] = None
+        self._peers_checked = 0.0
+
+    async def start(self, deliver: Deliver) -> None:
+        await super().start(deliver)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.socket_path = self.directory / f"{os.getpid()}-{uuid.uuid4().hex[:8]}{_SOCKET_SUFFIX}"
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.bind(str(self.socket_path))
+        self._sock = sock
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(sock.fileno(), self._on_readable)
+
+    def _refresh_peers(self) -> list[_PeerLink]:
+        """Đồng bộ danh sách peer với các file socket đang có trong thư mục."""
+        try:
+            paths = {
+                Path(entry.path)
+                for entry in os.scandir(self.directory)
+                if entry.name.endswith(_SOCKET_SUFFIX)
+            }
+        except FileNotFoundError:
+            paths = set()
+        paths.discard(self.socket_path)
+        for path in list(self._peers):
+            if path not in paths:
+                self._peers.pop(path).close()
+        for path in paths - set(self._peers):
+            try:
+                self._peers[path] = _PeerLink(self, path)
+            except OSError as exc:
+                self._remove_stale(path, exc)
+        return list(self._peers.values())
+
+    def _current_peers(self) -> list[_PeerLink]:
+        """Peer đã cache; chỉ quét lại thư mục khi có process vào/ra (mtime đổi) hoặc quá hạn."""
+        assert self.loop is not None
+        now = self.loop.time()
+        try:
+            mtime: Optional[int] = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._peers_mtime and now - self._peers_checked < PEER_REFRESH_SECONDS:
+            return list(self._peers.values())
+        self._peers_mtime, self._peers_checked = mtime, now
+        self.metrics["peer_scans"] += 1
+        return self._refresh_peers()
+
+    async def publish(self, project_id: str, text: str) -> None:
+        if self._sock is None:
+            return
+        payload = encode_envelope(project_id, text)
+        if len(payload) > MAX_DATAGRAM_BYTES:
+            # Không chia nhỏ: process khác báo client của project tải lại state.
+            self.metrics["oversized"] += 1
+            logger.warning("Message WebSocket %d byte quá lớn cho broker, gửi resync", len(payload))
+            payload = resync_envelope(project_id, "oversized")
+        for peer in self._current_peers():
+            try:
+                peer.send(payload)
+            except OSError as exc:
+                self.drop_peer(peer, exc)
+
+    def drop_peer(self, peer: _PeerLink, exc: OSError) -> None:
+        if self._peers.get(peer.path) is peer:
+            del self._peers[peer.path]
+        peer.close()
+        self._remove_stale(peer.path, exc)
+
+    def _remove_stale(self, path: Path, exc: OSError) -> None:
+        if exc.errno not in (errno.ECONNREFUSED, errno.ENOENT, errno.ECONNRESET):
+            self.metrics["errors"] += 1
+            logger.warning("Không gửi được tới %s: %s", path, exc)
+            return
+        # Process đã chết mà không dọn socket.
+        self.metrics["stale_peers"] += 1
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _on_readable(self) -> None:
+        assert self._sock is not None
+        while True:
+            try:
+                payload = self._sock.recv(MAX_DATAGRAM_BYTES + 1024)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break
+            self.metrics["received"] += 1
+            if self._deliver is not None:
+                project_id, text = decode_envelope(payload)
+                self._deliver(project_id, text)
+
+    async def close(self) -> None:
+        await super().close()
+        for peer in self._peers.values():
+            peer.close()
+        self._peers.clear()
+        if self._sock is None:
+            return
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        if self.socket_path is not None:
+            try:
+                self.socket_path.unlink()
+            except OSError:
+                pass
+
+
+def create_broker(spec: Optional[str] = None) -> LocalBroker:
+    """Tạo broker từ cấu hình WS_BROKER: "local" hoặc "unix:<thư mục socket>"."""
+    spec = (WS_BROKER if spec is None else spec).strip()
+    if not spec or spec == "local":
+        return LocalBroker()
+    if spec.startswith("unix:"):
+        if not hasattr(socket, "AF_UNIX"):
+            logger.warning("Hệ điều hành không hỗ trợ Unix socket, dùng broker local")
+            return LocalBroker()
+        return UnixSocketBroker(spec[len("unix:"):] or "./data/ws_bus")
+    raise ValueError(f"WS_BROKER không hợp lệ: {spec}")
@@ -0,0 +1,168 @@
+"""Mã hóa frame WebSocket: gộp event theo cửa sổ thời gian và dạng nhị phân "packed".
+
+Gộp (coalesce): các event broadcast trong cùng cửa sổ được gửi trong 1 frame.
+Event delta liền kề cùng loại được trộn theo id (trường mới ghi đè), export event
+cùng job chỉ giữ bản mới nhất. Còn nhiều event thì gửi
+{"event": "batch", "data": {"events": [...]}}.
+
+Client lỡ event delta (hàng đợi gửi tràn, message quá lớn hoặc tràn backlog của broker) nhận
+{"event": "resync", "data": {"reason": ...}} và phải tải lại state của project.
+
+Encoding chọn lúc connect (?encoding=json|packed):
+- json: text frame JSON như trước.
+- packed: binary frame
+    uint32 LE  độ dài phần JSON (n)
+    n byte     JSON UTF-8; item có id và tọa độ kiểu float được bỏ các trường
+               đó, thay bằng "$g": slot (key gốc bắt đầu bằng "$" được thêm 1 "$")
+    0-7 byte   đệm cho chia hết 8
+    float64 LE 4 số/slot: x, y, width, height (NaN = không có trong item)
+  Client đọc bằng new Float64Array(buffer, offset, slots * 4). float64 giữ
+  nguyên giá trị (không mất chính xác); số nguyên vẫn nằm trong JSON.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import struct
+from typing import Any, Optional
+
+ENCODINGS = ("json", "packed")
+BATCH_EVENT = "batch"
+RESYNC_EVENT = "resync"
+
+PACKED_FIELDS = ("x", "y", "width", "height")
+_ENTITY_LIST_KEYS = ("devices", "links", "areas")
+_HEADER = struct.Struct("<I")
+
+
+def encode_json(message: dict) -> str:
+    """Serialize giống WebSocket.send_json (mode text)."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def resync_message(reason: str) -> dict:
+    """Báo client đã lỡ event: tải lại state thay vì vá tiếp bằng delta."""
+    return {"event": RESYNC_EVENT, "data": {"reason": reason}}
+
+
+def _merge_items(first: list[dict], second: list[dict]) -> Optional[list[dict]]:
+    merged: dict[Any, dict] = {}
+    for item in [*first, *second]:
+        if not isinstance(item, dict) or "id" not in item:
+            return None
+        merged[item["id"]] = {**merged.get(item["id"], {}), **item}
+    return list(merged.values())
+
+
+def _merge_pair(previous: dict, current: dict) -> Optional[dict]:
+    """Trộn 2 event liền kề nếu được; None nếu phải giữ riêng."""
+    prev_data, data = previous.get("data"), current.get("data")
+    if not isinstance(prev_data, dict) or not isinstance(data, dict):
+        return None
+    if str(current.get("event", "")).startswith("export."):
+        # Event export (build_export_event) mang trạng thái đầy đủ của job: bản mới thay bản cũ.
+        return current if data.get("id") is not None and prev_data.get("id") == data["id"] else None
+    if previous.get("event") != current.get("event"):
+        return None
+    if set(data) != set(prev_data) or len(data) != 1:
+        return None
+    (key,) = data
+    if key == "ids":
+        return {**current, "data": {"ids": list(dict.fromkeys([*prev_data["ids"], *data["ids"]]))}}
+    if key in _ENTITY_LIST_KEYS:
+        items = _merge_items(prev_data[key], data[key])
+        if items is not None:
+            return {**current, "data": {key: items}}
+    return None
+
+
+def coalesce_messages(messages: list[dict]) -> dict:
+    """Gộp danh sách event trong 1 cửa sổ thành 1 message."""
+    merged: list[dict] = []
+    for message in messages:
+        combined = _merge_pair(merged[-1], message) if merged else None
+        if combined is None:
+            merged.append(message)
+        else:
+            merged[-1] = combined
+    if len(merged) == 1:
+        return merged[0]
+    return {"event": BATCH_EVENT, "data": {"events": merged}}
+
+
+_SLOT_KEY = "$g"
+_HEADER_ALIGN = 8
+
+
+def _is_packable(value: Any) -> bool:
+    return isinstance(value, float)
+
+
+def _escape_key(key: str) -> str:
+    return f"${key}" if key.startswith("$") else key
+
+
+def _unescape_key(key: str) -> str:
+    return key[1:] if key.startswith("$$") else key
+
+
+def _pack_value(value: Any, floats: list[float]) -> Any:
+    if isinstance(value, list):
+        return [_pack_value(item, floats) for item in value]
+    if not isinstance(value, dict):
+        return value
+    has_geometry = "id" in value and any(_is_packable(value.get(field)) for field in PACKED_FIELDS)
+    packed = {
+        _escape_key(key): _pack_value(item, floats)
+        for key, item in value.items()
+        if not (has_geometry and key in PACKED_FIELDS and _is_packable(item))
+    }
+    if has_geometry:
+        packed[_SLOT_KEY] = len(floats) // len(PACKED_FIELDS)
+        for field in PACKED_FIELDS:
+            item = value.get(field)
+            floats.append(item if _is_packable(item) else math.nan)
+    return packed
+
+
+def _padding(length: int) -> int:
+    return -(_HEADER.size + length) % _HEADER_ALIGN
+
+
+def encode_packed(message: dict) -> bytes:
+    floats: list[float] = []
+    body = encode_json(_pack_value(message, floats)).encode("utf-8")
+    return b"".join(
+        (
+            _HEADER.pack(len(body)),
+            body,
+            b"\0" * _padding(len(body)),
+            struct.pack(f"<{len(floats)}d", *floats),
+        )
+    )
+
+
+def _unpack_value(value: Any, floats: tuple[float, ...]) -> Any:
+    if isinstance(value, list):
+        return [_unpack_value(item, floats) for item in value]
+    if not isinstance(value, dict):
+        return value
+    result = {_unescape_key(key): _unpack_value(item, floats) for key, item in value.items() if key != _SLOT_KEY}
+    if _SLOT_KEY in value:
+        base = value[_SLOT_KEY] * len(PACKED_FIELDS)
+        for offset, field in enumerate(PACKED_FIELDS):
+            number = floats[base + offset]
+            if not math.isnan(number):
+                result[field] = number
+    return result
+
+
+def decode_packed(frame: bytes) -> dict:
+    """Giải mã frame packed (tham chiếu cho client và test)."""
+    (length,) = _HEADER.unpack_from(frame)
+    body = frame[_HEADER.size:_HEADER.size + length]
+    start = _HEADER.size + length + _padding(length)
+    count = (len(frame) - start) // 8
+    floats = struct.unpack_from(f"<{count}d", frame, start)
+    return _unpack_value(json.loads(body), floats)
@@ -1,30 +1,283 @@
-"""Quản lý WebSocket connections theo project."""
+"""Quản lý WebSocket connections theo project.
+
+Mỗi kết nối có 1 hàng đợi gửi giới hạn và 1 writer task riêng: broadcast chỉ
+serialize 1 lần rồi đẩy vào hàng đợi (không await socket), nên 1 client chậm
+không làm trễ các client khác.
+
+Broadcast trong cùng cửa sổ coalesce_window được gộp thành 1 frame; mỗi kết
+nối nhận theo encoding chọn lúc connect (json/packed, xem ws_codec). Với nhiều
+process API, frame còn được chuyển qua broker (xem ws_broker) để socket ở
+process khác cũng nhận được.
+
+Client chậm:
+- hàng đợi đầy thì bỏ message cũ nhất; trước message kế tiếp client nhận event
+  resync (delta đã mất, phải tải lại state);
+- bỏ quá max_drops message liên tiếp, hoặc gửi 1 message quá send_timeout,
+  thì đóng kết nối (1013 - thử lại sau).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import Counter
+from typing import Any, Optional, Union
 
 from fastapi import WebSocket
 
+from app.core.config import WS_COALESCE_MS, WS_MAX_DROPS, WS_SEND_QUEUE_SIZE, WS_SEND_TIMEOUT
+from app.services.ws_broker import LocalBroker, create_broker
+from app.services.ws_codec import coalesce_messages, encode_json, encode_packed, resync_message
+
+logger = logging.getLogger(__name__)
+
+# Close code khi ngắt client quá chậm (RFC 6455: Try Again Later).
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+Frame = Union[str, bytes]
+
+
+def encode_frame(message: dict, encoding: str) -> Frame:
+    return encode_packed(message) if encoding == "packed" else encode_json(message)
+
+
+class _ClientChannel:
+    """Hàng đợi gửi + writer task của 1 kết nối."""
+
+    def __init__(
+        self,
+        manager: "ConnectionManager",
+        project_id: str,
+        websocket: WebSocket,
+        encoding: str = "json",
+    ) -> None:
+        self.manager = manager
+        self.project_id = project_id
+        self.websocket = websocket
+        self.encoding = encoding
+        self.queue: asyncio.Queue[Frame] = asyncio.Queue(maxsize=manager.queue_size)
+        self.consecutive_drops = 0
+        self.missed = False  # Đã bỏ message: gửi resync trước message kế tiếp
+        self.closed = False
+        self.task = asyncio.create_task(self._writer())
+
+    def offer(self, frame: Frame) -> bool:
+        """Đưa message vào hàng đợi, không chờ. False nếu kết nối bị ngắt vì quá chậm."""
+        if self.closed:
+            return False
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.missed = True
+            self.consecutive_drops += 1
+            self.manager.metrics["messages_dropped"] += 1
+            if self.consecutive_drops > self.manager.max_drops:
+                self.manager.metrics["slow_disconnects"] += 1
+                self.close(SLOW_CONSUMER_CLOSE_CODE)
+                return False
+        self.queue.put_nowait(frame)
+        self.manager.metrics["messages_enqueued"] += 1
+        return True
+
+    async def _send(self, frame: Frame) -> bool:
+        """Gửi 1 frame; False nếu kết nối đã bị bỏ (quá send_timeout hoặc lỗi socket)."""
+        metrics = self.manager.metrics
+        send = self.websocket.send_bytes(frame) if isinstance(frame, bytes) else self.websocket.send_text(frame)
+        try:
+            await asyncio.wait_for(send, self.manager.send_timeout)
+        except asyncio.TimeoutError:
+            metrics["send_timeouts"] += 1
+            metrics["slow_disconnects"] += 1
+            self.close(SLOW_CONSUMER_CLOSE_CODE, cancel_writer=False)
+            return False
+        except Exception:  # noqa: BLE001 - socket đã đóng/lỗi mạng: chỉ bỏ kết nối này
+            metrics["send_errors"] += 1
+            self.close(cancel_writer=False)
+            return False
+        metrics["messages_sent"] += 1
+        return True
+
+    async def _writer(self) -> None:
+        try:
+            # Kiểm tra closed thay vì chỉ dựa vào cancel: wait_for (3.11) nuốt cancel
+            # nếu lần gửi vừa xong đúng lúc bị hủy, writer sẽ treo ở queue.get().
+            while not self.closed:
+                frame = await self.queue.get()
+                if self.missed:
+                    self.missed = False
+                    self.manager.metrics["resyncs"] += 1
+                    if not await self._send(encode_frame(resync_message("dropped"), self.encoding)):
+                        return
+                if not await self._send(frame):
+                    return
+                if self.queue.empty():
+                    self.consecutive_drops = 0
+        except asyncio.CancelledError:
+            return
+
+    def close(self, code: Optional[int] = None, cancel_writer: bool = True) -> None:
+        """Bỏ kết nối khỏi manager; đóng socket nếu có code (chạy nền, không chặn broadcast)."""
+        if self.closed:
+            return
+        self.closed = True
+        self.manager._remove(self)
+        if cancel_writer:
+            self.task.cancel()
+        if code is not None:
+            logger.warning("Ngắt WebSocket chậm của project %s (code %s)", self.project_id, code)
+            asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), self.manager.send_timeout)
+        except Exception:  # noqa: BLE001
+            pass
+
 
 class ConnectionManager:
-    def __init__(self) -> None:
-        self._connections: dict[str, set[WebSocket]] = {}
+    def __init__(
+        self,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        send_timeout: float = WS_SEND_TIMEOUT,
+        max_drops: int = WS_MAX_DROPS,
+        broker: Optional[LocalBroker] = None,
+        coalesce_window: float = 0.0,
+    ) -> None:
+        self.queue_size = max(1, queue_size)
+        self.send_timeout = send_timeout
+        self.max_drops = max_drops
+        self.broker = broker or LocalBroker()
+        # Giây gom broadcast của 1 project vào 1 frame (0 = gửi ngay).
+        self.coalesce_window = coalesce_window
+        self._connections: dict[str, dict[WebSocket, _ClientChannel]] = {}
+        self._pending: dict[str, list[dict]] = {}
+        self._flushers: dict[str, asyncio.Task] = {}
+        self.metrics: Counter[str] = Counter()
+
+    async def start(self) -> None:
+        """Bắt đầu nhận message broadcast từ process khác."""
+        await self.broker.start(self.deliver)
 
-    async def connect(self, project_id: str, websocket: WebSocket) -> None:
+    async def stop(self) -> None:
+        """Gửi nốt frame đang gom, đóng mọi kết nối cục bộ và chờ writer task kết thúc."""
+        for project_id in list(self._flushers):
+            self._flushers.pop(project_id).cancel()
+            await self._flush(project_id)
+        channels = [channel for channels in self._connections.values() for channel in channels.values()]
+        for channel in channels:
+            channel.close()
+        await asyncio.gather(*(channel.task for channel in channels), return_exceptions=True)
+        await self.broker.close()
+
+    async def connect(self, project_id: str, websocket: WebSocket, encoding: str = "json") -> None:
         await websocket.accept()
-        self._connections.setdefault(project_id, set()).add(websocket)
+        channel = _ClientChannel(self, project_id, websocket, encoding)
+        self._connections.setdefault(project_id, {})[websocket] = channel
+        self.metrics["connections_opened"] += 1
 
     def disconnect(self, project_id: str, websocket: WebSocket) -> None:
-        if project_id not in self._connections:
+        channel = self._connections.get(project_id, {}).get(websocket)
+        if channel is not None:
+            channel.close()
+
+    def _remove(self, channel: _ClientChannel) -> None:
+        channels = self._connections.get(channel.project_id)
+        if channels is None or channels.get(channel.websocket) is not channel:
             return
-        self._connections[project_id].discard(websocket)
-        if not self._connections[project_id]:
-            self._connections.pop(project_id, None)
+        channels.pop(channel.websocket, None)
+        if not channels:
+            self._connections.pop(channel.project_id, None)
+        self.metrics["connections_closed"] += 1
+
+    def connection_count(self, project_id: Optional[str] = None) -> int:
+        if project_id is not None:
+            return len(self._connections.get(project_id, {}))
+        return sum(len(channels) for channels in self._connections.values())
 
     async def send_json(self, websocket: WebSocket, message: dict) -> None:
+        for channels in self._connections.values():
+            channel = channels.get(websocket)
+            if channel is not None:
+                channel.offer(encode_frame(message, channel.encoding))
+                return
         await websocket.send_json(message)
 
-    async def broadcast(self, project_id: str, message: dict) -> None:
-        connections = list(self._connections.get(project_id, set()))
-        for websocket in connections:
-            await websocket.send_json(message)
+    async def broadcast(self, project_id: str, message: dict) -> int:
+        """Gửi message tới mọi kết nối của project (mọi process). Trả về số kết nối cục bộ.
+
+        Có coalesce_window thì message được gom và gửi khi hết cửa sổ.
+        """
+        self.metrics["broadcasts"] += 1
+        if self.coalesce_window <= 0:
+            return await self._publish(project_id, message)
+        self._pending.setdefault(project_id, []).append(message)
+        if project_id not in self._flushers:
+            self._flushers[project_id] = asyncio.create_task(self._flush_later(project_id))
+        return self.connection_count(project_id)
+
+    async def _flush_later(self, project_id: str) -> None:
+        await asyncio.sleep(self.coalesce_window)
+        self._flushers.pop(project_id, None)
+        await self._flush(project_id)
+
+    async def _flush(self, project_id: str) -> None:
+        messages = self._pending.pop(project_id, [])
+        if not messages:
+            return
+        if len(messages) > 1:
+            self.metrics["messages_coalesced"] += len(messages) - 1
+        try:
+            await self._publish(project_id, coalesce_messages(messages))
+        except Exception:  # noqa: BLE001 - lỗi 1 frame không được dừng các lần gửi sau
+            logger.exception("Không gửi được frame WebSocket của project %s", project_id)
+
+    async def _publish(self, project_id: str, message: dict) -> int:
+        self.metrics["frames"] += 1
+        text = encode_json(message)
+        delivered = self.deliver(project_id, text, message)
+        await self.broker.publish(project_id, text)
+        return delivered
+
+    def deliver(self, project_id: str, text: str, message: Optional[dict] = None) -> int:
+        """Đẩy frame vào hàng đợi các kết nối cục bộ; mỗi encoding chỉ serialize 1 lần."""
+        channels = list(self._connections.get(project_id, {}).values())
+        frames: dict[str, Frame] = {"json": text}
+        delivered = 0
+        for channel in channels:
+            frame = frames.get(channel.encoding)
+            if frame is None:
+                if message is None:
+                    message = json.loads(text)
+                frame = frames[channel.encoding] = encode_frame(message, channel.encoding)
+            delivered += channel.offer(frame)
+        return delivered
+
+    def get_metrics(self) -> dict[str, Any]:
+        queued = [channel.queue.qsize() for channels in self._connections.values() for channel in channels.values()]
+        return {
+            **{
+                key: self.metrics[key]
+                for key in (
+                    "broadcasts",
+                    "frames",
+                    "messages_coalesced",
+                    "messages_enqueued",
+                    "messages_sent",
+                    "messages_dropped",
+                    "resyncs",
+                    "send_timeouts",
+                    "send_errors",
+                    "slow_disconnects",
+                    "connections_opened",
+                    "connections_closed",
+                )
+            },
+            "connections": len(queued),
+            "projects": len(self._connections),
+            "queued_messages": sum(queued),
+            "max_queue_depth": max(queued, default=0),
+            "broker": {"type": type(self.broker).__name__, **self.broker.metrics},
+        }
 
 
-ws_manager = ConnectionManager()
+ws_manager = ConnectionManager(broker=create_broker(), coalesce_window=WS_COALESCE_MS / 1000)
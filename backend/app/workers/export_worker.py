@@ -1,74 +1,120 @@
 """Worker xử lý export jobs với ProcessPool."""
 
 import asyncio
+import logging
+import multiprocessing
 import os
+import shutil
+import socket
+import tempfile
+import uuid
 from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-from app.core.config import EXPORTS_DIR
+from app.core.config import (
+    DATABASE_URL,
+    EXPORT_GC_INTERVAL,
+    EXPORT_KEEP_LAST,
+    EXPORT_LEASE_SECONDS,
+    EXPORT_MAX_ATTEMPTS,
+    EXPORT_PROJECT_QUOTA_MB,
+    EXPORT_RETENTION_DAYS,
+    EXPORT_TOTAL_QUOTA_MB,
+    EXPORTS_DIR,
+)
+from app.db.models import ExportJob
 from app.db.session import async_session_maker, init_db
 from app.services import export_job as export_job_service
+from app.services.export_bundle import (
+    BUNDLE_EXPORT_TYPE,
+    artifact_arcname,
+    artifact_options,
+    resolve_bundle_artifacts,
+    write_bundle_zip,
+)
+from app.services.export_progress import ExportProgressPump, ProgressCallback, make_reporter, scaled
+from app.services.export_retention import ExportRetention, RetentionPolicy
+from app.services.export_snapshot import load_export_snapshot
+from app.services.export_wakeup import ExportWakeup, notify_export_worker
+from app.services.ws_manager import ws_manager
+
+logger = logging.getLogger(__name__)
 
 DIAGRAM_EXPORT_TYPES = {"l1_diagram", "l2_diagram", "l3_diagram"}
 FILE_EXPORT_TYPES = {"device_file", "master_file"}
 
+# Import sẵn trong forkserver: process render fork từ server đã nóng, không import lại.
+EXPORT_PRELOAD_MODULES = [
+    "pptx",
+    "openpyxl",
+    "app.services.pptx_diagram",
+    "app.services.workbook_export",
+    "app.workers.export_worker",
+]
 
-def _generate_pptx(file_path: Path, title: str, metadata: dict[str, Any]) -> None:
-    from pptx import Presentation
-    from pptx.dml.color import RGBColor
-    from pptx.enum.shapes import MSO_SHAPE
-    from pptx.util import Inches, Pt
 
-    from app.services.link_palette import get_link_palette_rgb
+def _init_export_process() -> None:
+    """Initializer của ProcessPool: import module nặng và parse sẵn Presentation gốc."""
+    import openpyxl  # noqa: F401
 
-    presentation = Presentation()
-    slide = presentation.slides.add_slide(presentation.slide_layouts[1])
-    shapes = slide.shapes
-    if shapes.title:
-        shapes.title.text = title
-    lines = [f"{k}: {v}" for k, v in metadata.items()]
-    if len(shapes.placeholders) > 1:
-        body = shapes.placeholders[1]
-        body.text = "\n".join(lines)
-    else:
-        textbox = shapes.add_textbox(0, 0, presentation.slide_width, presentation.slide_height)
-        textbox.text = "\n".join(lines)
-    palette = get_link_palette_rgb()
-    legend_left = Inches(0.6)
-    legend_top = Inches(1.7)
-    swatch_size = Inches(0.22)
-    row_height = Inches(0.28)
-
-    for idx, (purpose, rgb) in enumerate(palette.items()):
-        top = legend_top + row_height * idx
-        swatch = shapes.add_shape(MSO_SHAPE.RECTANGLE, legend_left, top, swatch_size, swatch_size)
-        swatch.fill.solid()
-        swatch.fill.fore_color.rgb = RGBColor(*rgb)
-        swatch.line.color.rgb = RGBColor(*rgb)
-
-        label_box = shapes.add_textbox(legend_left + Inches(0.32), top - Inches(0.02), Inches(2.8), swatch_size)
-        text_frame = label_box.text_frame
-        text_frame.clear()
-        run = text_frame.paragraphs[0].add_run()
-        run.text = purpose
-        run.font.size = Pt(10)
-
-    presentation.save(str(file_path))
-
-
-def _generate_xlsx(file_path: Path, title: str, metadata: dict[str, Any]) -> None:
-    from openpyxl import Workbook
-
-    workbook = Workbook()
-    sheet = workbook.active
-    sheet.title = "export"
-    sheet.append(["key", "value"])
-    sheet.append(["title", title])
-    for key, value in metadata.items():
-        sheet.append([key, str(value)])
-    workbook.save(str(file_path))
+    from app.services import workbook_export  # noqa: F401
+    from app.services.pptx_diagram import warm_renderer
+
+    warm_renderer()
+
+
+def create_export_executor(
+    max_workers: int,
+    max_tasks_per_child: int | None = None,
+    start_method: str = "forkserver",
+) -> ProcessPoolExecutor:
+    """ProcessPool nóng: forkserver preload module, process con tự thay mới sau N job."""
+    methods = multiprocessing.get_all_start_methods()
+    if start_method not in methods:
+        start_method = "forkserver" if "forkserver" in methods else "spawn"
+    context = multiprocessing.get_context(start_method)
+    if start_method == "forkserver":
+        # Forkserver (Python < 3.13) không nhận sys.path của process cha: thêm backend vào
+        # PYTHONPATH để preload được module app.* dù worker chạy từ thư mục khác.
+        backend_root = str(Path(__file__).resolve().parents[2])
+        python_path = [entry for entry in os.environ.get("PYTHONPATH", "").split(os.pathsep) if entry]
+        if backend_root not in python_path:
+            os.environ["PYTHONPATH"] = os.pathsep.join([backend_root, *python_path])
+        context.set_forkserver_preload(EXPORT_PRELOAD_MODULES)
+    elif start_method == "fork":
+        max_tasks_per_child = None  # ProcessPoolExecutor không hỗ trợ recycle với fork
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=context,
+        initializer=_init_export_process,
+        max_tasks_per_child=max_tasks_per_child or None,
+    )
+
+
+def _generate_pptx(
+    file_path: Path,
+    export_type: str,
+    options: dict[str, Any],
+    snapshot: dict[str, Any],
+    progress: ProgressCallback | None = None,
+) -> None:
+    from app.services.pptx_diagram import render_diagram_pptx
+
+    render_diagram_pptx(str(file_path), snapshot, export_type, options, progress=progress)
+
+
+def _generate_xlsx(
+    file_path: Path,
+    export_type: str,
+    project_id: str,
+    database_url: str,
+    progress: ProgressCallback | None = None,
+) -> None:
+    from app.services.workbook_export import write_project_workbook
+
+    write_project_workbook(str(file_path), export_type, project_id, database_url, progress=progress)
 
 
 def generate_export_file(
@@ -76,95 +122,356 @@ def generate_export_file(
     project_id: str,
     options: dict[str, Any],
     exports_dir: str,
+    snapshot: dict[str, Any] | None = None,
+    database_url: str = DATABASE_URL,
+    progress_queue: Any = None,
+    job_id: str | None = None,
 ) -> tuple[str, str, int]:
-    """Tạo file export (PPTX/Excel) trong ProcessPool."""
+    """Tạo file export (PPTX/Excel) trong ProcessPool.
+
+    snapshot: dữ liệu project đã load sẵn ở event loop (xem export_snapshot).
+    database_url: file Excel stream trực tiếp từ DB trong process con.
+    progress_queue: Manager queue để báo tiến độ về worker (xem export_progress).
+    """
+    progress = make_reporter(progress_queue, job_id)
     export_root = Path(exports_dir)
     export_root.mkdir(parents=True, exist_ok=True)
 
     timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    # Job chạy song song cùng giây không được ghi đè file của nhau (retention xóa theo file_path).
+    suffix = f"_{job_id[:8]}" if job_id else ""
     format_name = options.get("format")
 
     if export_type in DIAGRAM_EXPORT_TYPES:
         format_name = format_name or "pptx"
-        file_name = f"{export_type}_{timestamp}.{format_name}"
+        if format_name != "pptx":
+            raise ValueError(f"Định dạng {format_name} chưa hỗ trợ cho sơ đồ")
+        file_name = f"{export_type}_{timestamp}{suffix}.{format_name}"
         file_path = export_root / file_name
-        metadata = {
-            "project_id": project_id,
-            "export_type": export_type,
-            "mode": options.get("mode"),
-            "theme": options.get("theme"),
-            "format": format_name,
-        }
-        _generate_pptx(file_path, "BSV Network Sketcher Export", metadata)
+        _generate_pptx(file_path, export_type, options, snapshot or {"project_id": project_id}, progress)
     elif export_type in FILE_EXPORT_TYPES:
         format_name = format_name or "xlsx"
-        file_name = f"{export_type}_{timestamp}.{format_name}"
+        if format_name != "xlsx":
+            raise ValueError(f"Định dạng {format_name} chưa hỗ trợ cho file export")
+        file_name = f"{export_type}_{timestamp}{suffix}.{format_name}"
         file_path = export_root / file_name
-        metadata = {
-            "project_id": project_id,
-            "export_type": export_type,
-            "format": format_name,
-        }
-        _generate_xlsx(file_path, "BSV Network Sketcher Export", metadata)
+        _generate_xlsx(file_path, export_type, project_id, database_url, progress)
     else:
         raise ValueError("Export type không hợp lệ")
 
     return str(file_path), file_name, file_path.stat().st_size
 
 
-async def _process_job(executor: ProcessPoolExecutor) -> bool:
-    """Xử lý 1 job pending. Trả về True nếu có job."""
-    async with async_session_maker() as db:
-        job = await export_job_service.get_next_pending_job(db)
-        if not job:
-            return False
+async def generate_export_bundle(
+    executor: ProcessPoolExecutor,
+    job_id: str,
+    project_id: str,
+    options: dict[str, Any],
+    progress_queue: Any = None,
+) -> tuple[str, str, int]:
+    """Gói nhiều artifact: load snapshot 1 lần, render song song trên pool, ghi 1 ZIP.
 
-        job_id = job.id
-        project_id = job.project_id
-        export_type = job.export_type
-        options = export_job_service.parse_options(job.options_json) or {}
-        await export_job_service.mark_processing(db, job)
+    Artifact con không báo tiến độ riêng; tiến độ gói tính theo số artifact xong.
+    """
+    artifacts = resolve_bundle_artifacts(options)
+    progress = make_reporter(progress_queue, job_id)
+    snapshot = None
+    if any(artifact in DIAGRAM_EXPORT_TYPES for artifact in artifacts):
+        async with async_session_maker() as db:
+            snapshot = await load_export_snapshot(db, project_id)
 
+    export_root = Path(EXPORTS_DIR)
+    export_root.mkdir(parents=True, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".bundle-", dir=export_root)
     loop = asyncio.get_running_loop()
-    try:
-        file_path, file_name, file_size = await loop.run_in_executor(
+    completed: list[str] = []
+
+    async def render(artifact: str) -> str:
+        file_path, _, _ = await loop.run_in_executor(
             executor,
             generate_export_file,
-            export_type,
+            artifact,
             project_id,
-            options,
-            EXPORTS_DIR,
+            artifact_options(artifact, options),
+            staging,
+            snapshot if artifact in DIAGRAM_EXPORT_TYPES else None,
+            DATABASE_URL,
+            None,
+            job_id,
         )
+        completed.append(artifact)
+        if progress is not None:
+            progress(80 * len(completed) / len(artifacts), f"Xong {artifact} ({len(completed)}/{len(artifacts)})")
+        return file_path
+
+    try:
+        if progress is not None:
+            progress(0, f"Render {len(artifacts)} artifact")
+        # Chờ mọi artifact kết thúc (kể cả khi 1 cái lỗi) trước khi xóa thư mục tạm.
+        results = await asyncio.gather(*(render(artifact) for artifact in artifacts), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        file_name = f"{BUNDLE_EXPORT_TYPE}_{timestamp}_{job_id[:8]}.zip"
+        file_path = export_root / file_name
+        members = [(path, artifact_arcname(artifact)) for artifact, path in zip(artifacts, results)]
+        if progress is not None:
+            progress(80, "Đóng gói ZIP")
+        file_size = await asyncio.to_thread(write_bundle_zip, str(file_path), members, scaled(progress, 80, 99))
+    finally:
+        await asyncio.to_thread(shutil.rmtree, staging, True)
+    return str(file_path), file_name, file_size
+
+
+def build_retention_policy() -> RetentionPolicy:
+    mb = 1024 * 1024
+    return RetentionPolicy(
+        max_age_days=EXPORT_RETENTION_DAYS,
+        keep_last=EXPORT_KEEP_LAST,
+        project_quota_bytes=EXPORT_PROJECT_QUOTA_MB * mb,
+        total_quota_bytes=EXPORT_TOTAL_QUOTA_MB * mb,
+    )
+
+
+async def _broadcast_export_event(job: ExportJob) -> None:
+    """Đẩy tiến độ qua WebSocket: socket cục bộ (co-hosted) và process API qua broker WS_BROKER."""
+    await ws_manager.broadcast(job.project_id, export_job_service.build_export_event(job))
+
+
+def make_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def _claim_job(worker_id: str | None = None, lease_seconds: float = EXPORT_LEASE_SECONDS) -> ExportJob | None:
+    async with async_session_maker() as db:
+        return await export_job_service.claim_next_job(db, worker_id, lease_seconds)
+
+
+async def _process_job(
+    executor: ProcessPoolExecutor,
+    job: ExportJob,
+    progress_queue: Any = None,
+    progress_pump: ExportProgressPump | None = None,
+    worker_id: str | None = None,
+) -> None:
+    """Chạy 1 job đã claim (status=processing) trên ProcessPool.
+
+    Chỉ ghi kết quả khi worker còn giữ lease (1 UPDATE có điều kiện worker_id +
+    status); job đã bị reap/claim lại thì bỏ kết quả (file thừa do retention quét
+    file mồ côi).
+    """
+    job_id = job.id
+    project_id = job.project_id
+    export_type = job.export_type
+    options = export_job_service.parse_options(job.options_json) or {}
+
+    loop = asyncio.get_running_loop()
+    finished: ExportJob | None = None
+    try:
+        if export_type == BUNDLE_EXPORT_TYPE:
+            file_path, file_name, file_size = await generate_export_bundle(
+                executor, job_id, project_id, options, progress_queue
+            )
+        else:
+            snapshot = None
+            if export_type in DIAGRAM_EXPORT_TYPES:
+                async with async_session_maker() as db:
+                    snapshot = await load_export_snapshot(db, project_id)
+            file_path, file_name, file_size = await loop.run_in_executor(
+                executor,
+                generate_export_file,
+                export_type,
+                project_id,
+                options,
+                EXPORTS_DIR,
+                snapshot,
+                DATABASE_URL,
+                progress_queue,
+                job_id,
+            )
         async with async_session_maker() as db:
-            job = await export_job_service.get_job(db, job_id)
-            if job:
-                await export_job_service.mark_completed(
-                    db,
-                    job,
-                    file_path=file_path,
-                    file_name=file_name,
-                    file_size=file_size,
-                    message="Export hoàn tất",
-                )
+            finished = await export_job_service.complete_leased_job(
+                db,
+                job_id,
+                worker_id,
+                file_path=file_path,
+                file_name=file_name,
+                file_size=file_size,
+                message="Export hoàn tất",
+            )
     except Exception as exc:
         async with async_session_maker() as db:
-            job = await export_job_service.get_job(db, job_id)
-            if job:
-                await export_job_service.mark_failed(db, job, error_message=str(exc))
-    return True
+            finished = await export_job_service.fail_leased_job(db, job_id, worker_id, error_message=str(exc))
+    finally:
+        if progress_pump is not None:
+            progress_pump.forget(job_id)
+    if finished is None:
+        logger.warning("Bỏ kết quả export job %s: worker không còn giữ lease", job_id)
+
+
+class ExportScheduler:
+    """Giữ tối đa max_in_flight job chạy song song, claim thêm ngay khi có slot trống.
+
+    Song song đó gia hạn lease các job đang chạy và reap job hết lease của
+    worker khác (worker chết giữa chừng).
+    """
+
+    def __init__(
+        self,
+        executor: ProcessPoolExecutor,
+        max_in_flight: int,
+        poll_interval: float,
+        wakeup: ExportWakeup | None = None,
+        progress_queue: Any = None,
+        progress_pump: ExportProgressPump | None = None,
+        worker_id: str | None = None,
+        lease_seconds: float = EXPORT_LEASE_SECONDS,
+        max_attempts: int = EXPORT_MAX_ATTEMPTS,
+    ) -> None:
+        self.executor = executor
+        self.max_in_flight = max(1, max_in_flight)
+        self.poll_interval = poll_interval
+        self.wakeup = wakeup
+        self.progress_queue = progress_queue
+        self.progress_pump = progress_pump
+        self.worker_id = worker_id or make_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.in_flight: dict[asyncio.Task, str] = {}
+
+    async def fill_slots(self) -> int:
+        """Claim job cho tới khi đầy slot hoặc hết job pending. Trả về số job mới."""
+        started = 0
+        while len(self.in_flight) < self.max_in_flight:
+            job = await _claim_job(self.worker_id, self.lease_seconds)
+            if job is None:
+                break
+            task = asyncio.create_task(
+                _process_job(self.executor, job, self.progress_queue, self.progress_pump, self.worker_id)
+            )
+            self.in_flight[task] = job.id
+            task.add_done_callback(self._on_done)
+            started += 1
+        return started
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self.in_flight.pop(task, None)
+
+    async def heartbeat(self) -> set[str]:
+        """Gia hạn lease cho các job đang chạy. Trả về id còn giữ lease."""
+        job_ids = list(self.in_flight.values())
+        if not job_ids:
+            return set()
+        async with async_session_maker() as db:
+            renewed = await export_job_service.renew_leases(db, job_ids, self.worker_id, self.lease_seconds)
+        for job_id in set(job_ids) - renewed:
+            logger.warning("Mất lease export job %s (đã bị reap hoặc kết thúc)", job_id)
+        return renewed
+
+    async def reap(self) -> tuple[int, int]:
+        """Requeue/fail job hết lease. Trả về (số job requeue, số job failed)."""
+        async with async_session_maker() as db:
+            requeued, failed = await export_job_service.reap_expired_jobs(
+                db, self.max_attempts, self.lease_seconds
+            )
+        if requeued:
+            logger.warning("Requeue %d export job hết lease", len(requeued))
+            notify_export_worker()
+        for job in [*requeued, *failed]:
+            try:
+                await _broadcast_export_event(job)
+            except Exception:  # noqa: BLE001
+                logger.exception("Không gửi được event export %s", job.id)
+        return len(requeued), len(failed)
+
+    async def maintain(self) -> None:
+        """Heartbeat + reap theo nhịp 1/3 lease (lease sống qua ít nhất 2 lần gia hạn lỡ)."""
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.heartbeat()
+                await self.reap()
+            except Exception:  # noqa: BLE001 - lỗi tạm thời của DB không được dừng worker
+                logger.exception("Lỗi khi gia hạn/reap export job")
+
+    async def wait_for_work(self) -> None:
+        """Chờ job mới: tín hiệu wakeup, hoặc poll chậm làm fallback."""
+        if self.wakeup is not None:
+            await self.wakeup.wait(self.poll_interval)
+        else:
+            await asyncio.sleep(self.poll_interval)
+
+    async def run(self) -> None:
+        # Job của lần chạy trước (worker crash) được xử lý ngay khi khởi động.
+        await self.reap()
+        maintain_task = asyncio.create_task(self.maintain())
+        try:
+            while True:
+                await self.fill_slots()
+                if len(self.in_flight) >= self.max_in_flight:
+                    # Đầy slot: chờ 1 job xong rồi claim tiếp.
+                    await asyncio.wait(self.in_flight, return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    await self.wait_for_work()
+        finally:
+            maintain_task.cancel()
+            await asyncio.gather(maintain_task, return_exceptions=True)
 
 
 async def run_worker() -> None:
     """Background worker để xử lý export jobs (PPTX/Excel)."""
-    poll_interval = float(os.getenv("EXPORT_POLL_INTERVAL", "2"))
     max_workers = int(os.getenv("EXPORT_MAX_WORKERS", "2"))
+    max_tasks_per_child = int(os.getenv("EXPORT_MAX_TASKS_PER_CHILD", "50"))
+    start_method = os.getenv("EXPORT_POOL_START_METHOD", "forkserver")
     await init_db()
+    # Worker chạy process riêng: chỉ tới được client WebSocket của API qua broker.
+    await ws_manager.start()
 
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        while True:
-            handled = await _process_job(executor)
-            if not handled:
-                await asyncio.sleep(poll_interval)
+    wakeup = ExportWakeup().start()
+    # Có kênh wakeup thì poll chỉ còn là fallback chậm.
+    poll_interval = float(os.getenv("EXPORT_POLL_INTERVAL", "30" if wakeup.enabled else "2"))
+    progress_interval = float(os.getenv("EXPORT_PROGRESS_INTERVAL", "0.5"))
+    worker_id = make_worker_id()
+    try:
+        with multiprocessing.Manager() as manager, create_export_executor(
+            max_workers, max_tasks_per_child, start_method
+        ) as executor:
+            progress_queue = manager.Queue()
+            pump = ExportProgressPump(
+                progress_queue,
+                async_session_maker,
+                flush_interval=progress_interval,
+                broadcast=_broadcast_export_event,
+                worker_id=worker_id,
+            )
+            pump_task = asyncio.create_task(pump.run())
+            retention = ExportRetention(
+                async_session_maker,
+                build_retention_policy(),
+                EXPORTS_DIR,
+                interval=EXPORT_GC_INTERVAL,
+            )
+            retention_task = asyncio.create_task(retention.run())
+            try:
+                scheduler = ExportScheduler(
+                    executor,
+                    max_workers,
+                    poll_interval,
+                    wakeup,
+                    progress_queue,
+                    pump,
+                    worker_id=worker_id,
+                )
+                await scheduler.run()
+            finally:
+                pump.stop()
+                retention.stop()
+                await asyncio.gather(pump_task, retention_task, return_exceptions=True)
+    finally:
+        wakeup.close()
+        await ws_manager.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+import asyncio
+import json
+
+import pytest
+
+
+class FakeWebSocket:
+    """WebSocket giả cho ConnectionManager: ghi lại frame đã gửi (sent = frame text đã parse JSON)."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False) -> None:
+        self.delay = delay
+        self.fail = fail
+        self.frames: list[str | bytes] = []
+        self.sent: list[dict] = []
+        self.closed_with: int | None = None
+
+    async def accept(self) -> None:
+        return None
+
+    async def _transmit(self, data: str | bytes) -> None:
+        if self.fail:
+            raise RuntimeError("socket closed")
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.frames.append(data)
+
+    async def send_text(self, data: str) -> None:
+        await self._transmit(data)
+        self.sent.append(json.loads(data))
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self._transmit(data)
+
+    async def send_json(self, message: dict) -> None:
+        self.sent.append(message)
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_with = code
+
+
+@pytest.fixture
+def fake_websocket() -> type[FakeWebSocket]:
+    return FakeWebSocket
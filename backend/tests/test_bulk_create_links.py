@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints.links import bulk_create_links
+from app.db.base import Base
+from app.db.models import Area, Device, DevicePort, L1Link, Project, User
+from app.schemas.link import L1LinkBulkCreate
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_links_uses_preloaded_indexes() -> None:
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+    )
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as session:
+        user = User(email="bulk@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+
+        project = Project(name="Bulk Project", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+
+        area = Area(project_id=project.id, name="Core", grid_row=1, grid_col=1)
+        session.add(area)
+        await session.commit()
+
+        device_count = 40
+        devices = [
+            Device(project_id=project.id, area_id=area.id, name=f"SW-{idx}", device_type="Switch")
+            for idx in range(device_count)
+        ]
+        session.add_all(devices)
+        await session.commit()
+        session.add_all(
+            [
+                DevicePort(project_id=project.id, device_id=device.id, name=f"Gi 0/{port}")
+                for device in devices
+                for port in range(2)
+            ]
+        )
+        await session.commit()
+
+        rows = [
+            {
+                "from_device": f"SW-{idx}",
+                "from_port": "Gi 0/0",
+                "to_device": f"SW-{idx + 1}",
+                "to_port": "Gi 0/1",
+            }
+            for idx in range(device_count - 1)
+        ]
+        rows.append(dict(rows[0]))  # duplicate trong cùng batch
+        rows.append({"from_device": "SW-0", "from_port": "Gi 9/9", "to_device": "SW-2", "to_port": "Gi 0/1"})
+        rows.append({"from_device": "MISSING", "from_port": "Gi 0/0", "to_device": "SW-2", "to_port": "Gi 0/1"})
+
+        statements: list[str] = []
+
+        def _count(conn, cursor, statement, parameters, context, executemany) -> None:
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _count)
+        response = await bulk_create_links(project.id, L1LinkBulkCreate(links=rows), user, session)
+        event.remove(engine.sync_engine, "before_cursor_execute", _count)
+
+        assert response.success_count == device_count - 1
+        assert [err["code"] for err in response.errors] == ["L1_LINK_DUP", "PORT_NOT_FOUND", "DEVICE_NOT_FOUND"]
+        assert all(item["id"] for item in response.created)
+        # Số query không phụ thuộc số dòng (không còn N+1 per-row).
+        assert len(statements) < 15
+
+        stored = (await session.execute(select(L1Link).where(L1Link.project_id == project.id))).scalars().all()
+        assert len(stored) == device_count - 1
+
+    await engine.dispose()
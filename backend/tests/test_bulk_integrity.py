@@ -0,0 +1,177 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints import devices as devices_endpoint
+from app.api.v1.endpoints.devices import bulk_create_devices
+from app.api.v1.endpoints.l2_assignments import bulk_create_assignments
+from app.api.v1.endpoints.l3_addresses import bulk_create_addresses
+from app.api.v1.endpoints.port_channels import bulk_create_port_channels
+from app.db.base import Base
+from app.db.models import (
+    Area,
+    Device,
+    InterfaceL2Assignment,
+    L2Segment,
+    L3Address,
+    PortChannel,
+    Project,
+    User,
+)
+from app.schemas.device import DeviceBulkCreate, DeviceCreate
+from app.schemas.l2_assignment import InterfaceL2AssignmentBulkCreate, InterfaceL2AssignmentCreate
+from app.schemas.l3_address import L3AddressBulkCreate, L3AddressCreate
+from app.schemas.port_channel import PortChannelBulkCreate, PortChannelCreate
+from app.services import device as device_service
+
+
+@pytest_asyncio.fixture
+async def bulk_db(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'bulk.db'}",
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _foreign_keys(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with async_session() as session:
+        user = User(email="bulk-integrity@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Bulk Integrity", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        area = Area(project_id=project.id, name="Core", grid_row=1, grid_col=1)
+        session.add(area)
+        await session.commit()
+        device = Device(project_id=project.id, area_id=area.id, name="SW-1", device_type="Switch")
+        segment = L2Segment(project_id=project.id, name="Users", vlan_id=10)
+        session.add_all([device, segment])
+        await session.commit()
+        yield session, user, project, area, device, segment
+
+    await engine.dispose()
+
+
+def _ghost_devices(monkeypatch, project, area) -> None:
+    """Device vừa bị xóa sau khi preload: còn trong map nhưng không còn trong DB."""
+    original = device_service.get_device_name_map
+
+    async def _with_ghost(db, project_id):
+        devices = await original(db, project_id)
+        devices["GHOST"] = Device(id="ghost-device", project_id=project.id, area_id=area.id, name="GHOST")
+        return devices
+
+    monkeypatch.setattr(device_service, "get_device_name_map", _with_ghost)
+
+
+async def _count(session, model) -> int:
+    return await session.scalar(select(func.count()).select_from(model))
+
+
+@pytest.mark.asyncio
+async def test_bulk_devices_rolls_back_on_integrity_error(bulk_db, monkeypatch) -> None:
+    session, user, project, area, _, _ = bulk_db
+    original = devices_endpoint.get_area_name_map
+
+    async def _with_ghost(db, project_id):
+        areas = await original(db, project_id)
+        areas["Gone"] = Area(id="ghost-area", project_id=project.id, name="Gone", grid_row=1, grid_col=1)
+        return areas
+
+    monkeypatch.setattr(devices_endpoint, "get_area_name_map", _with_ghost)
+    response = await bulk_create_devices(
+        project.id,
+        DeviceBulkCreate(
+            devices=[
+                DeviceCreate(name="SW-2", area_name="Core", device_type="Switch"),
+                DeviceCreate(name="SW-3", area_name="Gone", device_type="Switch"),
+            ]
+        ),
+        user,
+        session,
+    )
+
+    assert response.success_count == 0
+    assert [(error["row"], error["code"]) for error in response.errors] == [
+        (0, "BULK_INTEGRITY_ERROR"),
+        (1, "BULK_INTEGRITY_ERROR"),
+    ]
+    assert await _count(session, Device) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_l2_assignments_rolls_back_on_integrity_error(bulk_db, monkeypatch) -> None:
+    session, user, project, area, _, segment = bulk_db
+    _ghost_devices(monkeypatch, project, area)
+
+    response = await bulk_create_assignments(
+        project.id,
+        InterfaceL2AssignmentBulkCreate(
+            assignments=[
+                InterfaceL2AssignmentCreate(device_name=name, interface_name="Gi 0/1", l2_segment_id=segment.id)
+                for name in ("SW-1", "GHOST", "MISSING")
+            ]
+        ),
+        db=session,
+        current_user=user,
+    )
+
+    assert response.success_count == 0
+    assert sorted(error["index"] for error in response.errors) == [0, 1, 2]
+    assert all("ràng buộc" in error["error"] for error in response.errors if error["index"] != 2)
+    assert await _count(session, InterfaceL2Assignment) == 0
+
+
+@pytest.mark.asyncio
+async def test_bulk_l3_addresses_rolls_back_on_integrity_error(bulk_db, monkeypatch) -> None:
+    session, user, project, area, _, _ = bulk_db
+    _ghost_devices(monkeypatch, project, area)
+
+    response = await bulk_create_addresses(
+        project.id,
+        L3AddressBulkCreate(
+            addresses=[
+                L3AddressCreate(device_name="SW-1", interface_name="Vlan 10", ip_address="10.0.0.1", prefix_length=24),
+                L3AddressCreate(device_name="GHOST", interface_name="Vlan 20", ip_address="10.0.1.1", prefix_length=24),
+            ]
+        ),
+        db=session,
+        current_user=user,
+    )
+
+    assert response.success_count == 0
+    assert [error["index"] for error in response.errors] == [0, 1]
+    assert await _count(session, L3Address) == 0
+
+
+@pytest.mark.asyncio
+async def test_bulk_port_channels_rolls_back_on_integrity_error(bulk_db, monkeypatch) -> None:
+    session, user, project, area, _, _ = bulk_db
+    _ghost_devices(monkeypatch, project, area)
+
+    response = await bulk_create_port_channels(
+        project.id,
+        PortChannelBulkCreate(
+            port_channels=[
+                PortChannelCreate(device_name=name, name="Port-Channel 1", members=["Gi 0/1", "Gi 0/2"])
+                for name in ("SW-1", "GHOST")
+            ]
+        ),
+        db=session,
+        current_user=user,
+    )
+
+    assert response.success_count == 0
+    assert [error["index"] for error in response.errors] == [0, 1]
+    assert await _count(session, PortChannel) == 0
+
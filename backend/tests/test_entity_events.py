@@ -0,0 +1,166 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models import Project, User
+from app.schemas.area import AreaCreate, AreaUpdate
+from app.schemas.device import DeviceCreate, DeviceUpdate
+from app.schemas.link import L1LinkCreate, L1LinkUpdate
+from app.services import area as area_service
+from app.services import device as device_service
+from app.services import entity_events
+from app.services import link as link_service
+
+
+class _RecordingManager:
+    def __init__(self) -> None:
+        self.events: list[tuple[str, dict]] = []
+
+    async def broadcast(self, project_id: str, message: dict) -> int:
+        self.events.append((project_id, message))
+        return 1
+
+
+def test_layout_event_contains_only_changed_geometry() -> None:
+    before = {
+        "d1": {"id": "d1", "area_id": "a1", "x": 0.0, "y": 0.0, "width": 1.2, "height": 0.5, "grid_range": "A1"},
+        "d2": {"id": "d2", "area_id": "a1", "x": 2.0, "y": 0.0, "width": 1.2, "height": 0.5, "grid_range": "B1"},
+    }
+    after = {
+        "d1": {**before["d1"], "x": 3.0, "grid_range": "D1"},
+        "d2": dict(before["d2"]),
+    }
+    event = entity_events.build_layout_event("L1", before, after, {"a1": {"id": "a1", "x": 0}}, {})
+    assert event == {
+        "event": "layout.applied",
+        "data": {
+            "view_mode": "L1",
+            "devices": [{"id": "d1", "x": 3.0, "grid_range": "D1"}],
+            "areas": [],
+            "removed_area_ids": ["a1"],
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_services_publish_entity_deltas(tmp_path, monkeypatch) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'entity_events.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+    manager = _RecordingManager()
+    monkeypatch.setattr(entity_events, "ws_manager", manager)
+
+    async with async_session() as session:
+        user = User(email="events@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Deltas", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+
+        area = await area_service.create_area(
+            session, project.id, AreaCreate(name="Core", grid_row=1, grid_col=1, position_x=0, position_y=0)
+        )
+        core = await device_service.create_device(
+            session, project.id, area, DeviceCreate(name="CORE-1", area_name="Core", position_x=0.5, position_y=0.5)
+        )
+        access = await device_service.create_device(
+            session, project.id, area, DeviceCreate(name="SW-1", area_name="Core", position_x=2.0, position_y=0.5)
+        )
+        link = await link_service.create_link(
+            session,
+            project.id,
+            core,
+            access,
+            L1LinkCreate(from_device="CORE-1", from_port="Gi 0/1", to_device="SW-1", to_port="Gi 0/1"),
+        )
+        manager.events.clear()
+
+        await device_service.update_device(session, core, DeviceUpdate(position_x=1.5))
+        await device_service.update_device(session, core, DeviceUpdate(device_type="Router"))
+        await area_service.update_area(session, area, AreaUpdate(width=6.0))
+        await link_service.update_link(session, link, L1LinkUpdate(purpose="WAN"))
+        await device_service.update_device(session, core, DeviceUpdate(device_type="Router"))
+        await link_service.delete_link(session, link)
+
+    events = [(message["event"], message["data"]) for project_id, message in manager.events]
+    assert all(project_id == project.id for project_id, _ in manager.events)
+    assert [name for name, _ in events] == [
+        "device.moved",
+        "device.updated",
+        "area.resized",
+        "link.updated",
+        "link.deleted",
+    ]
+    moved = events[0][1]["devices"][0]
+    assert moved["id"] == core.id and moved["x"] == 1.5
+    assert "name" not in moved and "y" not in moved
+    assert events[1][1] == {"devices": [{"id": core.id, "device_type": "Router"}]}
+    assert events[3][1] == {"links": [{"id": link.id, "purpose": "WAN"}]}
+    assert events[4][1] == {"ids": [link.id]}
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_cascade_deletes_publish_dependent_ids(tmp_path, monkeypatch) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'cascade_events.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+    manager = _RecordingManager()
+    monkeypatch.setattr(entity_events, "ws_manager", manager)
+
+    async with async_session() as session:
+        user = User(email="cascade@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Cascade", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+
+        core = await area_service.create_area(session, project.id, AreaCreate(name="Core", grid_row=1, grid_col=1))
+        edge = await area_service.create_area(session, project.id, AreaCreate(name="Edge", grid_row=1, grid_col=2))
+        devices = {}
+        for name, area in (("CORE-1", core), ("CORE-2", core), ("EDGE-1", edge), ("EDGE-2", edge)):
+            devices[name] = await device_service.create_device(
+                session, project.id, area, DeviceCreate(name=name, area_name=area.name)
+            )
+        links = {}
+        for from_name, to_name in (("CORE-1", "CORE-2"), ("CORE-1", "EDGE-1"), ("EDGE-1", "EDGE-2")):
+            links[(from_name, to_name)] = await link_service.create_link(
+                session,
+                project.id,
+                devices[from_name],
+                devices[to_name],
+                L1LinkCreate(
+                    from_device=from_name, from_port=f"Gi {to_name}", to_device=to_name, to_port=f"Gi {from_name}"
+                ),
+            )
+        manager.events.clear()
+
+        await device_service.delete_device(session, devices["EDGE-2"])
+        await area_service.delete_area(session, core)
+
+        events = [(message["event"], sorted(message["data"]["ids"])) for _, message in manager.events]
+        assert events == [
+            ("link.deleted", [links[("EDGE-1", "EDGE-2")].id]),
+            ("device.deleted", [devices["EDGE-2"].id]),
+            ("link.deleted", sorted([links[("CORE-1", "CORE-2")].id, links[("CORE-1", "EDGE-1")].id])),
+            ("device.deleted", sorted([devices["CORE-1"].id, devices["CORE-2"].id])),
+            ("area.deleted", [core.id]),
+        ]
+        assert await link_service.get_links(session, project.id) == []
+        remaining = await device_service.get_devices(session, project.id)
+        assert [device.name for device in remaining] == ["EDGE-1"]
+
+    await engine.dispose()
@@ -0,0 +1,99 @@
+import os
+import queue
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models import Area, Device, L1Link, Project, User
+from app.services import export_job as export_job_service
+from app.services.export_bundle import artifact_options, resolve_bundle_artifacts
+from app.workers import export_worker
+
+
+def test_resolve_bundle_artifacts_orders_and_validates() -> None:
+    assert resolve_bundle_artifacts({}) == ["l1_diagram", "l2_diagram", "l3_diagram", "device_file", "master_file"]
+    assert resolve_bundle_artifacts({"artifacts": ["master_file", "l1_diagram", "l1_diagram"]}) == [
+        "l1_diagram",
+        "master_file",
+    ]
+    with pytest.raises(ValueError):
+        resolve_bundle_artifacts({"artifacts": ["bundle"]})
+
+    assert artifact_options("l2_diagram", {"theme": "dark", "format": "zip"}) == {"format": "pptx", "theme": "dark"}
+    assert artifact_options("device_file", {"theme": "dark"}) == {"format": "xlsx"}
+    # Thứ tự artifact không làm đổi dedup key.
+    key = export_job_service.build_dedup_key
+    assert key("p", 1, "bundle", {"artifacts": ["master_file", "l1_diagram"]}) == key(
+        "p", 1, "bundle", {"artifacts": ["l1_diagram", "master_file"], "format": "zip"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_generate_export_bundle_writes_single_zip(tmp_path, monkeypatch) -> None:
+    database_url = f"sqlite+aiosqlite:///{tmp_path / 'bundle.db'}"
+    engine = create_async_engine(database_url, connect_args={"check_same_thread": False})
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as session:
+        user = User(email="bundle@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Bundle", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        area = Area(project_id=project.id, name="Core", grid_row=1, grid_col=1, position_x=0, position_y=0)
+        session.add(area)
+        await session.commit()
+        core = Device(project_id=project.id, area_id=area.id, name="CORE-1", position_x=0.5, position_y=0.5)
+        access = Device(project_id=project.id, area_id=area.id, name="SW-1", position_x=2.0, position_y=0.5)
+        session.add_all([core, access])
+        await session.commit()
+        session.add(
+            L1Link(
+                project_id=project.id,
+                from_device_id=core.id,
+                from_port="Gi 0/1",
+                to_device_id=access.id,
+                to_port="Gi 0/1",
+                purpose="LAN",
+            )
+        )
+        await session.commit()
+
+    exports_dir = tmp_path / "exports"
+    monkeypatch.setattr(export_worker, "async_session_maker", async_session)
+    monkeypatch.setattr(export_worker, "DATABASE_URL", database_url)
+    monkeypatch.setattr(export_worker, "EXPORTS_DIR", str(exports_dir))
+
+    progress_queue: queue.Queue = queue.Queue()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        file_path, file_name, file_size = await export_worker.generate_export_bundle(
+            executor,
+            "job-bundle-1",
+            project.id,
+            {"artifacts": ["master_file", "l1_diagram"], "theme": "dark"},
+            progress_queue,
+        )
+
+    assert file_name.startswith("bundle_") and file_name.endswith(".zip")
+    assert file_size == os.path.getsize(file_path)
+    with zipfile.ZipFile(file_path) as archive:
+        assert archive.namelist() == ["l1_diagram.pptx", "master_file.xlsx"]
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+        assert archive.testzip() is None
+    # Thư mục tạm đã bị xóa, chỉ còn file ZIP.
+    assert os.listdir(exports_dir) == [file_name]
+
+    messages = []
+    while not progress_queue.empty():
+        messages.append(progress_queue.get_nowait()[2])
+    assert "Đóng gói ZIP" in messages
+
+    await engine.dispose()
@@ -0,0 +1,132 @@
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models import Area, Device, Project, User
+from app.services import export_job as export_job_service
+
+
+async def _setup(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'dedup.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def _revision(session, project_id: str) -> int:
+    return (await session.execute(select(Project.revision).where(Project.id == project_id))).scalar_one()
+
+
+def test_normalize_export_options_fills_defaults_and_drops_unused_keys() -> None:
+    assert export_job_service.normalize_export_options("l1_diagram", {"format": "pptx"}) == {
+        "mode": "all_areas",
+        "theme": "default",
+        "format": "pptx",
+    }
+    assert export_job_service.normalize_export_options("master_file", {"theme": "dark", "mode": "per_area"}) == {
+        "format": "xlsx",
+    }
+    key = export_job_service.build_dedup_key
+    assert key("p", 1, "l1_diagram", {}) == key("p", 1, "l1_diagram", {"theme": "default", "mode": "all_areas"})
+    assert key("p", 1, "l1_diagram", {}) != key("p", 2, "l1_diagram", {})
+    assert key("p", 1, "l1_diagram", {}) != key("p", 1, "l1_diagram", {"theme": "dark"})
+
+
+@pytest.mark.asyncio
+async def test_project_revision_bumps_on_data_changes(tmp_path) -> None:
+    engine, async_session = await _setup(tmp_path)
+    async with async_session() as session:
+        user = User(email="rev@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Rev", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        assert await _revision(session, project.id) == 0
+
+        area = Area(project_id=project.id, name="A", grid_row=1, grid_col=1, position_x=0, position_y=0)
+        session.add(area)
+        await session.commit()
+        assert await _revision(session, project.id) == 1
+
+        device = Device(project_id=project.id, area_id=area.id, name="SW-1", device_type="Switch")
+        session.add(device)
+        await session.commit()
+        assert await _revision(session, project.id) == 2
+
+        # Flush không đổi giá trị nào thì không tăng revision.
+        device.name = "SW-1"
+        await session.commit()
+        assert await _revision(session, project.id) == 2
+
+        device.position_x = 3.5
+        await session.commit()
+        assert await _revision(session, project.id) == 3
+
+        await session.delete(device)
+        await session.commit()
+        assert await _revision(session, project.id) == 4
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_job_reuses_in_flight_and_completed_jobs(tmp_path) -> None:
+    engine, async_session = await _setup(tmp_path)
+    async with async_session() as session:
+        user = User(email="dedup@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Dedup", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        area = Area(project_id=project.id, name="A", grid_row=1, grid_col=1, position_x=0, position_y=0)
+        session.add(area)
+        await session.commit()
+
+        first, created = await export_job_service.get_or_create_job(
+            session, project.id, "l1_diagram", {"format": "pptx"}
+        )
+        assert created and first.project_revision == 1 and first.dedup_key
+        # Job đang chờ: request giống hệt gắn vào job đó.
+        same, created = await export_job_service.get_or_create_job(
+            session, project.id, "l1_diagram", {"format": "pptx", "theme": "default"}
+        )
+        assert not created and same.id == first.id
+        other, created = await export_job_service.get_or_create_job(
+            session, project.id, "l1_diagram", {"format": "pptx", "theme": "dark"}
+        )
+        assert created and other.id != first.id
+
+        # Đã xong và file còn: trả về artifact có sẵn.
+        artifact = tmp_path / "l1.pptx"
+        artifact.write_bytes(b"pptx")
+        await export_job_service.mark_completed(
+            session, first, file_path=str(artifact), file_name="l1.pptx", file_size=4
+        )
+        reused, created = await export_job_service.get_or_create_job(
+            session, project.id, "l1_diagram", {"format": "pptx"}
+        )
+        assert not created and reused.id == first.id and reused.status == "completed"
+
+        # File đã bị xóa: tạo job mới.
+        artifact.unlink()
+        fresh, created = await export_job_service.get_or_create_job(
+            session, project.id, "l1_diagram", {"format": "pptx"}
+        )
+        assert created and fresh.id != first.id
+
+        # Dữ liệu project đổi (revision mới): không dùng lại job cũ.
+        area.width = 5.0
+        await session.commit()
+        changed, created = await export_job_service.get_or_create_job(
+            session, project.id, "l1_diagram", {"format": "pptx"}
+        )
+        assert created and changed.project_revision == 2
+
+    await engine.dispose()
@@ -0,0 +1,165 @@
+import pytest
+from pptx import Presentation
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models import Area, Device, DevicePort, L1Link, L2Segment, InterfaceL2Assignment, Project, User
+from app.services.export_snapshot import load_export_snapshot
+from app.services.pptx_diagram import (
+    MAX_SLIDE_INCHES,
+    PptxInternals,
+    build_diagram_pages,
+    build_port_bands,
+    render_diagram_pptx,
+)
+from app.workers.export_worker import generate_export_file
+
+
+def _grid_snapshot(rows: int, cols: int) -> dict:
+    devices = []
+    links = []
+    for row in range(rows):
+        for col in range(cols):
+            devices.append({
+                "id": f"d-{row}-{col}",
+                "area_id": "a1",
+                "name": f"Access-{row}-{col}",
+                "device_type": "Switch",
+                "x": col * 2.0,
+                "y": row * 1.5,
+                "width": 1.2,
+                "height": 0.5,
+                "color_rgb": None,
+            })
+            if col:
+                links.append({
+                    "id": f"l-{row}-{col}",
+                    "from_device_id": f"d-{row}-{col - 1}",
+                    "from_port": "Gi 0/2",
+                    "to_device_id": f"d-{row}-{col}",
+                    "to_port": "Gi 0/1",
+                    "purpose": "LAN",
+                    "line_style": "solid",
+                    "color_rgb": [39, 174, 96],
+                })
+    return {
+        "project_id": "p1",
+        "project_name": "Grid",
+        "areas": [{
+            "id": "a1",
+            "name": "Access",
+            "x": -0.5,
+            "y": -0.5,
+            "width": cols * 2.0 + 1,
+            "height": rows * 1.5 + 1,
+            "style": {},
+            "is_waypoint": False,
+        }],
+        "devices": devices,
+        "ports": [],
+        "anchor_overrides": [],
+        "links": links,
+        "l2_assignments": [],
+        "l3_addresses": [],
+    }
+
+
+def test_port_bands_respect_override_and_heuristic() -> None:
+    snapshot = _grid_snapshot(1, 2)
+    snapshot["anchor_overrides"] = [
+        {"device_id": "d-0-0", "port_name": "Gi 0/2", "side": "top", "offset_ratio": None},
+    ]
+    bands = build_port_bands(snapshot)
+    assert bands["d-0-0"] == {"top": ["Gi 0/2"], "bottom": []}
+    assert bands["d-0-1"] == {"top": ["Gi 0/1"], "bottom": []}
+
+
+def test_oversized_diagram_is_split_across_slides(tmp_path) -> None:
+    snapshot = _grid_snapshot(40, 40)
+    pages, (width, height) = build_diagram_pages(snapshot, "l1_diagram", {"mode": "all_areas"})
+    assert width <= MAX_SLIDE_INCHES and height <= MAX_SLIDE_INCHES
+    assert len(pages) > 1
+    # Mọi device body xuất hiện ít nhất trên 1 trang.
+    labels = {shape.text for page in pages for shape in page.shapes if shape.text.startswith("Access-")}
+    assert len(labels) == 40 * 40
+
+    file_path = tmp_path / "l1.pptx"
+    slide_count = render_diagram_pptx(str(file_path), snapshot, "l1_diagram", {"theme": "dark"})
+    presentation = Presentation(str(file_path))
+    assert len(presentation.slides) == slide_count + 1  # + legend
+    shape_ids = [shape.shape_id for shape in presentation.slides[0].shapes]
+    assert len(shape_ids) == len(set(shape_ids))
+
+
+def test_pptx_internals_guard_private_api(monkeypatch, caplog) -> None:
+    import pptx
+
+    presentation = Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[6])
+    assert PptxInternals.shape_tree(slide) is slide.element.cSld.spTree
+    with open(PptxInternals.default_template_path(), "rb") as handle:
+        assert handle.read(2) == b"PK"
+
+    monkeypatch.setattr(PptxInternals, "_checked", False)
+    monkeypatch.setattr(pptx, "__version__", "9.9.0")
+    caplog.set_level("WARNING", logger="app.services.pptx_diagram")
+    PptxInternals.shape_tree(slide)
+    PptxInternals.shape_tree(slide)
+    assert [record.getMessage().split(" ")[1] for record in caplog.records] == ["9.9.0"]
+
+
+@pytest.mark.asyncio
+async def test_export_worker_renders_snapshot(tmp_path) -> None:
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+    )
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as session:
+        user = User(email="export@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Export Project", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        core = Area(project_id=project.id, name="Core", grid_row=1, grid_col=1, position_x=0, position_y=0, width=6, height=3)
+        access = Area(project_id=project.id, name="Access", grid_row=2, grid_col=1, grid_range="A20:F30")
+        session.add_all([core, access])
+        await session.commit()
+        sw1 = Device(project_id=project.id, area_id=core.id, name="Core-SW1", position_x=1, position_y=1)
+        sw2 = Device(project_id=project.id, area_id=access.id, name="Access-SW1", position_x=1, position_y=6)
+        session.add_all([sw1, sw2])
+        await session.commit()
+        session.add_all([
+            DevicePort(project_id=project.id, device_id=sw1.id, name="Gi 0/2", side="bottom"),
+            L1Link(project_id=project.id, from_device_id=sw1.id, from_port="Gi 0/2", to_device_id=sw2.id, to_port="Gi 0/1", purpose="UPLINK"),
+        ])
+        segment = L2Segment(project_id=project.id, name="Users", vlan_id=10)
+        session.add(segment)
+        await session.commit()
+        session.add(InterfaceL2Assignment(
+            project_id=project.id, device_id=sw2.id, interface_name="Gi 0/1", l2_segment_id=segment.id, port_mode="access"
+        ))
+        await session.commit()
+
+        snapshot = await load_export_snapshot(session, project.id)
+
+    await engine.dispose()
+
+    assert snapshot["project_name"] == "Export Project"
+    access_area = next(area for area in snapshot["areas"] if area["name"] == "Access")
+    assert access_area["y"] > 0  # grid_range được ưu tiên
+    assert snapshot["links"][0]["color_rgb"] == [230, 126, 34]
+
+    path, name, size = generate_export_file("l2_diagram", project.id, {"mode": "per_area"}, str(tmp_path), snapshot)
+    assert name.endswith(".pptx") and size > 0
+    presentation = Presentation(path)
+    texts = [shape.text_frame.text for slide in presentation.slides for shape in slide.shapes if shape.has_text_frame]
+    assert "Core-SW1" in texts and "Access-SW1" in texts
+    assert any("VLAN 10 Users" in value for value in texts)
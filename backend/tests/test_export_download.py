@@ -0,0 +1,118 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.requests import Request
+
+from app.api.v1.endpoints import export as export_endpoints
+from app.db.base import Base
+from app.db.models import ExportJob, Project, User
+from app.services import export_download
+
+
+def _request(headers: dict[str, str] | None = None) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/download",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+            "asgi": {"spec_version": "2.4"},
+        }
+    )
+
+
+async def _send_response(response, headers: dict[str, str] | None = None) -> tuple[int, dict[str, str], bytes]:
+    messages = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await response(_request(headers).scope, receive, send)
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+
+def test_etag_and_accel_helpers(tmp_path) -> None:
+    path = tmp_path / "a.pptx"
+    path.write_bytes(b"x" * 10)
+    stat_result = os.stat(path)
+
+    etag = export_download.build_etag("job", stat_result)
+    assert export_download.etag_matches(f'"other", W/{etag}', etag)
+    assert export_download.etag_matches("*", etag)
+    assert not export_download.etag_matches('"other"', etag)
+    assert export_download.build_etag("other-job", stat_result) != etag
+
+    assert export_download.accel_redirect_uri(str(path), str(tmp_path), "/_exports/") == "/_exports/a.pptx"
+    assert export_download.accel_redirect_uri("/etc/passwd", str(tmp_path), "/_exports") is None
+    assert export_download.accel_redirect_uri(str(path), str(tmp_path), "") is None
+
+
+@pytest.mark.asyncio
+async def test_download_endpoint_supports_range_and_conditional_get(tmp_path) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'download.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    artifact = tmp_path / "diagram.pptx"
+    artifact.write_bytes(bytes(range(256)) * 4)
+
+    async with async_session() as session:
+        user = User(email="dl@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Download", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        pending = ExportJob(project_id=project.id, export_type="l1_diagram", status="pending")
+        done = ExportJob(
+            project_id=project.id,
+            export_type="l1_diagram",
+            status="completed",
+            file_path=str(artifact),
+            file_name="L1 sơ đồ.pptx",
+            file_size=1024,
+        )
+        session.add_all([pending, done])
+        await session.commit()
+
+        with pytest.raises(HTTPException) as exc:
+            await export_endpoints.download_export_job(project.id, pending.id, _request(), session, user)
+        assert exc.value.status_code == 409
+
+        response = await export_endpoints.download_export_job(project.id, done.id, _request(), session, user)
+        status_code, headers, body = await _send_response(response)
+        assert status_code == 200 and body == artifact.read_bytes()
+        assert headers["accept-ranges"] == "bytes"
+        assert headers["content-disposition"].startswith("attachment; filename*=utf-8''")
+        assert "presentationml" in headers["content-type"]
+        etag = headers["etag"]
+
+        response = await export_endpoints.download_export_job(
+            project.id, done.id, _request({"If-None-Match": etag}), session, user
+        )
+        assert response.status_code == 304
+
+        response = await export_endpoints.download_export_job(project.id, done.id, _request(), session, user)
+        status_code, headers, body = await _send_response(response, {"Range": "bytes=100-199"})
+        assert status_code == 206 and body == artifact.read_bytes()[100:200]
+        assert headers["content-range"] == "bytes 100-199/1024"
+
+        os.remove(artifact)
+        with pytest.raises(HTTPException) as exc:
+            await export_endpoints.download_export_job(project.id, done.id, _request(), session, user)
+        assert exc.value.status_code == 410
+
+    await engine.dispose()
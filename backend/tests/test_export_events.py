@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models import ExportJob, Project, User
+from app.services.export_events import ExportEventPublisher
+
+
+class _RecordingManager:
+    def __init__(self) -> None:
+        self.broadcasts: list[tuple[str, dict]] = []
+        self.direct: list[tuple[object, dict]] = []
+
+    async def broadcast(self, project_id: str, message: dict) -> None:
+        raise AssertionError("Poll export phải giao cục bộ, không qua broker")
+
+    def deliver(self, project_id: str, text: str, message: dict) -> int:
+        assert json.loads(text) == message
+        self.broadcasts.append((project_id, message))
+        return 1
+
+    async def send_json(self, websocket, message: dict) -> None:
+        self.direct.append((websocket, message))
+
+
+class _CountingSessionMaker:
+    def __init__(self, session_maker) -> None:
+        self.session_maker = session_maker
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return self.session_maker()
+
+
+@pytest.mark.asyncio
+async def test_publisher_polls_once_per_project_and_fans_out(tmp_path) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'events.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with async_session() as session:
+        user = User(email="events@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Events", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        job = ExportJob(project_id=project.id, export_type="l1_diagram", status="processing", progress=10)
+        session.add(job)
+        await session.commit()
+
+    manager = _RecordingManager()
+    sessions = _CountingSessionMaker(async_session)
+    publisher = ExportEventPublisher(sessions, manager, poll_interval=3600)
+
+    # 10 tab cùng project: chỉ 1 task đọc DB.
+    sockets = [object() for _ in range(10)]
+    for websocket in sockets:
+        await publisher.subscribe(project.id, websocket)
+    await asyncio.sleep(0.05)
+    assert publisher.subscriber_count(project.id) == 10
+    assert sessions.opened == 1
+    assert [event["data"]["progress"] for _, event in manager.broadcasts] == [10]
+
+    # Không đổi gì: không broadcast lại.
+    assert await publisher.poll_once(project.id) == 0
+
+    async with async_session() as session:
+        stored = await session.get(ExportJob, job.id)
+        stored.status = "completed"
+        stored.progress = 100
+        await session.commit()
+    publisher.poke(project.id)
+    await asyncio.sleep(0.05)
+    assert manager.broadcasts[-1][1]["event"] == "export.completed"
+    assert len(manager.broadcasts) == 2
+
+    # Tab mới nhận ngay trạng thái hiện tại từ cache, không cần đọc DB.
+    opened = sessions.opened
+    late = object()
+    await publisher.subscribe(project.id, late)
+    assert [(ws, event["event"]) for ws, event in manager.direct] == [(late, "export.completed")]
+    assert sessions.opened == opened
+
+    for _ in range(11):
+        publisher.unsubscribe(project.id)
+    assert publisher.subscriber_count(project.id) == 0
+    assert not publisher._tasks and not publisher._events
+
+    await engine.dispose()
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models import ExportJob, Project, User
+from app.services import export_job as export_job_service
+
+
+@pytest.mark.asyncio
+async def test_claim_next_job_prioritizes_and_is_fair(tmp_path) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as session:
+        user = User(email="jobs@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        busy_project = Project(name="Busy", owner_id=user.id)
+        idle_project = Project(name="Idle", owner_id=user.id)
+        session.add_all([busy_project, idle_project])
+        await session.commit()
+
+        session.add(ExportJob(project_id=busy_project.id, export_type="l1_diagram", status="processing"))
+        await session.commit()
+        busy_file = await export_job_service.create_job(session, busy_project.id, "master_file", {})
+        busy_diagram = await export_job_service.create_job(session, busy_project.id, "l1_diagram", {})
+        idle_file = await export_job_service.create_job(session, idle_project.id, "device_file", {})
+        assert (busy_file.priority, busy_diagram.priority) == (0, 10)
+
+    async with async_session() as session:
+        # Project đang có job chạy nhường lượt cho project rảnh dù priority thấp hơn.
+        first = await export_job_service.claim_next_job(session)
+        assert first.id == idle_file.id and first.status == "processing"
+        assert first.started_at is not None
+        # Cùng project: priority cao hơn được claim trước job cũ hơn.
+        second = await export_job_service.claim_next_job(session)
+        assert second.id == busy_diagram.id
+
+    # Nhiều claimer đồng thời không lấy trùng job.
+    async with async_session() as session:
+        for _ in range(6):
+            await export_job_service.create_job(session, idle_project.id, "l2_diagram", {})
+
+    async def claim() -> str | None:
+        async with async_session() as session:
+            job = await export_job_service.claim_next_job(session)
+            return job.id if job else None
+
+    claimed = [job_id for job_id in await asyncio.gather(*(claim() for _ in range(10))) if job_id]
+    assert len(claimed) == len(set(claimed)) == 7
+
+    async with async_session() as session:
+        assert await export_job_service.claim_next_job(session) is None
+
+    await engine.dispose()
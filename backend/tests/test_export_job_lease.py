@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models import ExportJob, Project, User
+from app.services import export_job as export_job_service
+from app.services.export_progress import ExportProgressPump
+
+
+@pytest.mark.asyncio
+async def test_expired_leases_are_requeued_then_failed(tmp_path) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'lease.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with async_session() as session:
+        user = User(email="lease@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Lease", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        created = await export_job_service.create_job(session, project.id, "l1_diagram", {})
+        # Job processing từ bản cũ (chưa có lease) bị bỏ lại khi worker chết.
+        legacy = ExportJob(
+            project_id=project.id,
+            export_type="master_file",
+            status="processing",
+            started_at=datetime.utcnow() - timedelta(hours=1),
+        )
+        session.add(legacy)
+        await session.commit()
+
+    async with async_session() as session:
+        job = await export_job_service.claim_next_job(session, "worker-a", lease_seconds=60)
+        assert job.id == created.id and job.attempts == 1 and job.worker_id == "worker-a"
+        assert job.lease_expires_at > job.started_at
+
+        assert await export_job_service.renew_leases(session, [job.id], "worker-b") == set()
+        assert await export_job_service.renew_leases(session, [job.id], "worker-a") == {job.id}
+
+        # Lease còn hạn: không reap job đang chạy, chỉ reap job cũ không có lease.
+        requeued, failed = await export_job_service.reap_expired_jobs(session, max_attempts=2, lease_seconds=60)
+        assert [item.id for item in requeued] == [legacy.id] and failed == []
+
+        later = datetime.utcnow() + timedelta(minutes=5)
+        requeued, failed = await export_job_service.reap_expired_jobs(
+            session, max_attempts=2, lease_seconds=60, now=later
+        )
+        assert [item.id for item in requeued] == [job.id] and failed == []
+        assert requeued[0].status == "pending" and requeued[0].worker_id is None
+
+        reclaimed = await export_job_service.claim_next_job(session, "worker-b", lease_seconds=60)
+        assert reclaimed.id == job.id and reclaimed.attempts == 2
+        # Worker A (zombie) không còn giữ lease nên không được ghi kết quả.
+        current = await export_job_service.get_job(session, job.id)
+        await session.refresh(current)
+        assert not export_job_service.holds_lease(current, "worker-a")
+        assert export_job_service.holds_lease(current, "worker-b")
+        stale = await export_job_service.complete_leased_job(
+            session, job.id, "worker-a", file_path="/tmp/zombie.pptx", file_name="zombie.pptx", file_size=1
+        )
+        assert stale is None
+        assert await export_job_service.fail_leased_job(session, job.id, "worker-a", error_message="zombie") is None
+        await session.refresh(current)
+        assert current.status == "processing" and current.file_path is None
+
+        zombie_pump = ExportProgressPump(None, async_session, worker_id="worker-a")
+        zombie_pump._latest[job.id] = (80, "zombie")
+        await zombie_pump.flush()
+        await session.refresh(current)
+        assert current.progress == 0 and current.message != "zombie"
+
+        requeued, failed = await export_job_service.reap_expired_jobs(
+            session, max_attempts=2, lease_seconds=60, now=later + timedelta(minutes=5)
+        )
+        assert requeued == [] and [item.id for item in failed] == [job.id]
+        assert failed[0].status == "failed" and failed[0].error_message
+
+        # Job đã kết thúc: cả chủ lease cũ cũng không ghi đè được kết quả.
+        assert await export_job_service.fail_leased_job(session, job.id, "worker-b", error_message="late") is None
+
+        fresh = await export_job_service.create_job(session, project.id, "l2_diagram", {})
+        claimed = await export_job_service.claim_next_job(session, "worker-c", lease_seconds=60)
+        assert claimed.id == fresh.id
+        done = await export_job_service.complete_leased_job(
+            session, fresh.id, "worker-c", file_path="/tmp/l2.pptx", file_name="l2.pptx", file_size=10
+        )
+        assert done.status == "completed" and done.progress == 100 and done.completed_at is not None
+
+    await engine.dispose()
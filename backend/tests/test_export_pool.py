@@ -0,0 +1,30 @@
+import os
+import sys
+
+from app.services import pptx_diagram
+from app.workers.export_worker import create_export_executor
+
+
+def _loaded_modules() -> tuple[int, bool, bool]:
+    return os.getpid(), "pptx" in sys.modules, pptx_diagram._spare_presentation is not None
+
+
+def test_take_base_presentation_uses_warm_spare_once() -> None:
+    pptx_diagram._spare_presentation = None
+    pptx_diagram.warm_renderer()
+    spare = pptx_diagram._spare_presentation
+    assert spare is not None
+
+    assert pptx_diagram.take_base_presentation() is spare
+    fresh = pptx_diagram.take_base_presentation()
+    assert fresh is not spare and len(fresh.slide_layouts) > 6
+
+
+def test_export_executor_preloads_and_recycles_workers() -> None:
+    with create_export_executor(1, max_tasks_per_child=2) as executor:
+        results = [executor.submit(_loaded_modules).result() for _ in range(4)]
+
+    # Process con đã import pptx và parse sẵn Presentation gốc trước job đầu tiên.
+    assert all(preloaded and warmed for _, preloaded, warmed in results)
+    pids = [pid for pid, _, _ in results]
+    assert pids[0] == pids[1] and pids[2] == pids[3] and pids[0] != pids[2]
@@ -0,0 +1,108 @@
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models import ExportJob, Project, User
+from app.services.export_progress import ExportProgressPump, ProgressReporter
+from app.services.pptx_diagram import render_diagram_pptx
+from app.workers.export_worker import generate_export_file
+from tests.test_export_diagram_pptx import _grid_snapshot
+
+
+def test_reporter_throttles_and_caps_progress() -> None:
+    sink: queue.Queue = queue.Queue()
+    report = ProgressReporter(sink, "job-1", min_interval=60)
+    report(0, "Bắt đầu")
+    report(5)  # bị throttle (chưa hết min_interval, không đổi message)
+    report(50, "Phase 2")  # đổi message luôn gửi
+    report(150, "Xong")
+    items = [sink.get_nowait() for _ in range(sink.qsize())]
+    assert items == [("job-1", 0, "Bắt đầu"), ("job-1", 50, "Phase 2"), ("job-1", 99, "Xong")]
+
+
+def test_render_reports_monotonic_progress(tmp_path) -> None:
+    seen: list[tuple[float, str | None]] = []
+    render_diagram_pptx(
+        str(tmp_path / "p.pptx"),
+        _grid_snapshot(30, 30),
+        "l1_diagram",
+        {},
+        progress=lambda percent, message=None: seen.append((percent, message)),
+    )
+    percents = [percent for percent, _ in seen]
+    assert percents == sorted(percents)
+    assert seen[0] == (0, "Dựng mô hình sơ đồ") and seen[-1] == (90, "Lưu file PPTX")
+    assert any(message and message.startswith("Vẽ slide") for _, message in seen)
+
+
+def test_progress_pipe_crosses_process_pool(tmp_path) -> None:
+    with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=1) as executor:
+        progress_queue = manager.Queue()
+        future = executor.submit(
+            generate_export_file,
+            "l1_diagram",
+            "p1",
+            {},
+            str(tmp_path),
+            _grid_snapshot(5, 5),
+            "sqlite:///unused.db",
+            progress_queue,
+            "job-42",
+        )
+        future.result(timeout=60)
+        items = []
+        while not progress_queue.empty():
+            items.append(progress_queue.get_nowait())
+    assert items and all(job_id == "job-42" for job_id, _, _ in items)
+    assert items[-1][1:] == (90, "Lưu file PPTX")
+
+
+@pytest.mark.asyncio
+async def test_pump_writes_latest_progress_only_for_running_jobs() -> None:
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+    )
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as session:
+        user = User(email="progress@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Progress", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        running = ExportJob(project_id=project.id, export_type="l1_diagram", status="processing")
+        done = ExportJob(project_id=project.id, export_type="l1_diagram", status="completed", progress=100)
+        session.add_all([running, done])
+        await session.commit()
+
+    sink: queue.Queue = queue.Queue()
+    for item in [(running.id, 10, "A"), (running.id, 40, "B"), (done.id, 50, "late")]:
+        sink.put(item)
+    events = []
+
+    async def broadcast(job) -> None:
+        events.append((job.id, job.progress, job.message))
+
+    pump = ExportProgressPump(sink, async_session, broadcast=broadcast)
+    pump._drain(0.1)
+    assert await pump.flush() == 2
+    assert events == [(running.id, 40, "B")]
+    assert await pump.flush() == 0  # không ghi lại khi không có gì mới
+
+    async with async_session() as session:
+        assert (await session.get(ExportJob, running.id)).progress == 40
+        stored_done = await session.get(ExportJob, done.id)
+        assert (stored_done.progress, stored_done.message) == (100, None)
+
+    await engine.dispose()
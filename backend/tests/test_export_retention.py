@@ -0,0 +1,152 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models import ExportJob, Project, User
+from app.services.export_retention import (
+    RetainedJob,
+    RetentionCursor,
+    RetentionPolicy,
+    run_retention_pass,
+    select_expired,
+)
+
+NOW = datetime(2026, 1, 31, 12, 0, 0)
+
+
+def _job(job_id: str, project_id: str, hours_ago: float, size: int = 100) -> RetainedJob:
+    return RetainedJob(
+        id=job_id,
+        project_id=project_id,
+        file_path=f"/exports/{job_id}.pptx",
+        file_size=size,
+        finished_at=NOW - timedelta(hours=hours_ago),
+    )
+
+
+def _ids(jobs) -> set[str]:
+    return {job.id for job in jobs}
+
+
+def test_select_expired_applies_age_keep_last_and_quotas() -> None:
+    jobs = [_job(f"a{i}", "A", hours_ago=i + 1) for i in range(5)] + [_job("old", "B", hours_ago=24 * 40)]
+
+    assert _ids(select_expired(jobs, RetentionPolicy(max_age_days=30, keep_last=0), NOW)) == {"old"}
+    assert _ids(select_expired(jobs, RetentionPolicy(max_age_days=0, keep_last=2), NOW)) == {"a2", "a3", "a4"}
+    # Quota project 250 byte: giữ 2 file mới nhất, file cũ hơn bị xóa dù vừa chỗ.
+    quota = RetentionPolicy(max_age_days=0, keep_last=0, project_quota_bytes=250)
+    assert _ids(select_expired(jobs, quota, NOW)) == {"a2", "a3", "a4"}
+    total = RetentionPolicy(max_age_days=0, keep_last=0, total_quota_bytes=300)
+    assert _ids(select_expired(jobs, total, NOW)) == {"a3", "a4", "old"}
+
+    # Job vừa xong (trong grace) không bị xóa nhưng vẫn tính vào quota.
+    fresh = [_job("new", "A", hours_ago=0.01, size=300), _job("older", "A", hours_ago=2)]
+    assert _ids(select_expired(fresh, quota, NOW)) == {"older"}
+
+
+def test_select_expired_carries_counters_across_pages() -> None:
+    jobs = [_job(f"a{i}", "A", hours_ago=i + 1) for i in range(5)]
+    policy = RetentionPolicy(max_age_days=0, keep_last=2)
+    cursor = RetentionCursor()
+
+    pages = [select_expired(jobs[start:start + 2], policy, NOW, cursor) for start in range(0, 5, 2)]
+    assert [_ids(page) for page in pages] == [set(), {"a2", "a3"}, {"a4"}]
+    assert cursor.job_id == "a4"
+
+
+@pytest.mark.asyncio
+async def test_retention_pass_walks_jobs_and_files_incrementally(tmp_path) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'gc.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    exports_dir = tmp_path / "exports"
+    exports_dir.mkdir()
+
+    def artifact(name: str) -> str:
+        path = exports_dir / name
+        path.write_bytes(b"x" * 10)
+        return str(path)
+
+    async with async_session() as session:
+        user = User(email="gc@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="GC", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+
+        jobs = []
+        for index in range(4):
+            path = artifact(f"job{index}.pptx")
+            jobs.append(
+                ExportJob(
+                    project_id=project.id,
+                    export_type="l1_diagram",
+                    status="completed",
+                    file_path=path,
+                    file_name=os.path.basename(path),
+                    file_size=10,
+                    completed_at=NOW - timedelta(hours=index + 1),
+                )
+            )
+        running = ExportJob(project_id=project.id, export_type="l1_diagram", status="processing")
+        session.add_all(jobs + [running])
+        await session.commit()
+
+        orphan = exports_dir / "orphan.xlsx"
+        orphan.write_bytes(b"o" * 5)
+        old = time.time() - 7200
+        os.utime(orphan, (old, old))
+        rendering = exports_dir / "rendering.pptx"
+        rendering.write_bytes(b"r")
+        (exports_dir / ".gitkeep").write_bytes(b"")
+
+        policy = RetentionPolicy(max_age_days=0, keep_last=1)
+        cursor = RetentionCursor()
+        # Mỗi lượt chỉ đọc 2 job và 2 entry thư mục, tiếp tục từ con trỏ của lượt trước.
+        passes = []
+        while True:
+            result = await run_retention_pass(
+                session, policy, str(exports_dir), batch_size=2, now=NOW, cursor=cursor, scan_limit=2
+            )
+            assert result.scanned_jobs <= 2 and result.scanned_entries <= 2
+            passes.append(result)
+            if not result.more:
+                break
+        assert [result.deleted_jobs for result in passes[:2]] == [1, 2]
+        assert sum(result.deleted_files for result in passes) == 3
+        assert sum(result.orphan_files for result in passes) == 1 and not orphan.exists()
+        assert rendering.exists() and (exports_dir / ".gitkeep").exists()
+        assert cursor.job_id is None and cursor.entries is None
+
+        remaining = set((await session.execute(select(ExportJob.id))).scalars())
+        assert remaining == {jobs[0].id, running.id}
+        assert sorted(os.listdir(exports_dir)) == [".gitkeep", "job0.pptx", "rendering.pptx"]
+
+    await engine.dispose()
+
+
+def test_worker_builds_retention_policy_from_config(monkeypatch) -> None:
+    from app.workers import export_worker
+
+    monkeypatch.setattr(export_worker, "EXPORT_RETENTION_DAYS", 7)
+    monkeypatch.setattr(export_worker, "EXPORT_KEEP_LAST", 5)
+    monkeypatch.setattr(export_worker, "EXPORT_PROJECT_QUOTA_MB", 2)
+    monkeypatch.setattr(export_worker, "EXPORT_TOTAL_QUOTA_MB", 0)
+
+    # run_worker truyền thẳng kết quả vào ExportRetention: phải là policy, không phải coroutine.
+    policy = export_worker.build_retention_policy()
+    assert isinstance(policy, RetentionPolicy)
+    assert policy.max_age_days == 7 and policy.keep_last == 5
+    assert policy.project_quota_bytes == 2 * 1024 * 1024 and policy.total_quota_bytes == 0
@@ -0,0 +1,79 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from app.services.export_wakeup import ExportWakeup, _local_listeners, notify_export_worker, wakeup_supported
+
+
+def _socket_files(directory) -> list[str]:
+    return sorted(path.name for path in directory.iterdir() if path.name.startswith("worker.sock."))
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not wakeup_supported(), reason="Unix socket không khả dụng")
+async def test_notify_wakes_worker_over_socket(tmp_path) -> None:
+    socket_path = str(tmp_path / "worker.sock")
+    wakeup = ExportWakeup(socket_path).start()
+    try:
+        assert wakeup.enabled
+        assert await wakeup.wait(0.05) is False
+
+        started = time.perf_counter()
+        waiter = asyncio.create_task(wakeup.wait(5))
+        await asyncio.sleep(0)
+        # Gửi datagram thô như API chạy ở process khác.
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(b"1", str(wakeup.socket_path))
+        assert await waiter is True
+        assert time.perf_counter() - started < 1
+
+        # Nhiều tín hiệu dồn lại chỉ đánh thức 1 lần.
+        for _ in range(5):
+            notify_export_worker(socket_path)
+        assert await wakeup.wait(1) is True
+        await asyncio.sleep(0.05)
+        assert await wakeup.wait(0.05) is False
+    finally:
+        wakeup.close()
+    assert not _socket_files(tmp_path)
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not wakeup_supported(), reason="Unix socket không khả dụng")
+async def test_notify_wakes_every_worker_and_drops_stale_socket(tmp_path) -> None:
+    socket_path = str(tmp_path / "worker.sock")
+    first = ExportWakeup(socket_path).start()
+    second = ExportWakeup(socket_path).start()
+    # Socket của worker đã chết (không ai đọc).
+    dead = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    dead.bind(str(tmp_path / "worker.sock.1-deadbeef"))
+    dead.close()
+    try:
+        assert first.socket_path != second.socket_path
+        assert len(_socket_files(tmp_path)) == 3
+
+        # Không có listener trong process: chỉ còn đường socket.
+        _local_listeners.clear()
+        notify_export_worker(socket_path)
+        assert await first.wait(1) is True
+        assert await second.wait(1) is True
+        assert _socket_files(tmp_path) == sorted([first.socket_path.name, second.socket_path.name])
+    finally:
+        first.close()
+        second.close()
+    assert _socket_files(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_notify_without_listener_is_noop(tmp_path) -> None:
+    notify_export_worker(str(tmp_path / "missing.sock"))
+
+    wakeup = ExportWakeup("").start()
+    try:
+        assert not wakeup.enabled
+        notify_export_worker("")
+        assert await wakeup.wait(1) is True
+    finally:
+        wakeup.close()
@@ -0,0 +1,138 @@
+import pytest
+from openpyxl import load_workbook
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.base import Base
+from app.db.models import (
+    Area,
+    Device,
+    DevicePort,
+    InterfaceL2Assignment,
+    L1Link,
+    L2Segment,
+    L3Address,
+    PortChannel,
+    Project,
+    User,
+)
+from app.services.workbook_export import sync_database_url, write_project_workbook
+
+
+def test_sync_database_url_drops_async_driver() -> None:
+    assert sync_database_url("sqlite+aiosqlite:///./data/app.db") == "sqlite:///./data/app.db"
+    assert sync_database_url("sqlite:///x.db") == "sqlite:///x.db"
+
+
+@pytest.mark.asyncio
+async def test_master_file_streams_all_sheets(tmp_path) -> None:
+    database_url = f"sqlite+aiosqlite:///{tmp_path / 'export.db'}"
+    engine = create_async_engine(database_url, connect_args={"check_same_thread": False})
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+
+    device_count = 250
+    async with async_session() as session:
+        user = User(email="workbook@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Workbook Project", owner_id=user.id)
+        other = Project(name="Other Project", owner_id=user.id)
+        session.add_all([project, other])
+        await session.commit()
+        area = Area(project_id=project.id, name="Core", grid_row=1, grid_col=1)
+        other_area = Area(project_id=other.id, name="Other", grid_row=1, grid_col=1)
+        session.add_all([area, other_area])
+        await session.commit()
+        devices = [
+            Device(project_id=project.id, area_id=area.id, name=f"SW-{idx:03d}", color_rgb_json="[1, 2, 3]")
+            for idx in range(device_count)
+        ]
+        session.add_all(devices + [Device(project_id=other.id, area_id=other_area.id, name="Foreign")])
+        await session.commit()
+        session.add_all(
+            [DevicePort(project_id=project.id, device_id=device.id, name="Gi 0/1") for device in devices]
+            + [
+                L1Link(
+                    project_id=project.id,
+                    from_device_id=devices[idx].id,
+                    from_port="Gi 0/1",
+                    to_device_id=devices[idx + 1].id,
+                    to_port="Gi 0/2",
+                    purpose="LAN",
+                )
+                for idx in range(device_count - 1)
+            ]
+            + [
+                PortChannel(
+                    project_id=project.id,
+                    device_id=devices[0].id,
+                    name="Port-Channel 1",
+                    channel_number=1,
+                    members_json='["Gi 0/1", "Gi 0/2"]',
+                ),
+                L3Address(
+                    project_id=project.id,
+                    device_id=devices[0].id,
+                    interface_name="Vlan 10",
+                    ip_address="10.0.0.1",
+                    prefix_length=24,
+                ),
+            ]
+        )
+        segment = L2Segment(project_id=project.id, name="Users", vlan_id=10)
+        session.add(segment)
+        await session.commit()
+        session.add(
+            InterfaceL2Assignment(
+                project_id=project.id,
+                device_id=devices[1].id,
+                interface_name="Gi 0/1",
+                l2_segment_id=segment.id,
+                port_mode="trunk",
+                allowed_vlans_json="[10, 20]",
+            )
+        )
+        await session.commit()
+        project_id = project.id
+
+    await engine.dispose()
+
+    file_path = tmp_path / "master.xlsx"
+    counts = write_project_workbook(str(file_path), "master_file", project_id, database_url, chunk_size=64)
+
+    assert counts["Devices"] == device_count
+    assert counts["L1_Links"] == device_count - 1
+    assert counts["Device_Ports"] == device_count
+
+    workbook = load_workbook(str(file_path), read_only=True)
+    assert workbook.sheetnames == [
+        "Metadata",
+        "Areas",
+        "Devices",
+        "Device_Ports",
+        "L1_Links",
+        "PortChannels",
+        "VirtualPorts",
+        "L2_Segments",
+        "L2_Assignments",
+        "IP_Addresses",
+    ]
+    device_rows = list(workbook["Devices"].iter_rows(values_only=True))
+    assert device_rows[0][:3] == ("name", "device_type", "area_name")
+    assert device_rows[1][0] == "SW-000" and device_rows[1][2] == "Core" and device_rows[1][8] == "1, 2, 3"
+    assert all(row[0] != "Foreign" for row in device_rows)
+    link_rows = list(workbook["L1_Links"].iter_rows(values_only=True))
+    assert link_rows[1][:4] == ("SW-000", "Gi 0/1", "SW-001", "Gi 0/2")
+    assignment = list(workbook["L2_Assignments"].iter_rows(values_only=True))[1]
+    assert assignment == ("SW-001", "Gi 0/1", "Users", 10, "trunk", None, "10, 20")
+    channel = list(workbook["PortChannels"].iter_rows(values_only=True))[1]
+    assert channel[4] == "Gi 0/1, Gi 0/2"
+    workbook.close()
+
+    device_file = tmp_path / "device.xlsx"
+    write_project_workbook(str(device_file), "device_file", project_id, database_url)
+    assert "Areas" not in load_workbook(str(device_file), read_only=True).sheetnames
@@ -0,0 +1,62 @@
+import itertools
+import random
+
+import numpy as np
+
+from app.services import geometry
+
+
+def _brute_pairs(rects: np.ndarray, margin: float, eps: float) -> list[tuple[int, int]]:
+    pairs = []
+    for i, j in itertools.combinations(range(len(rects)), 2):
+        a, b = rects[i], rects[j]
+        overlap_x = min(a[2], b[2]) - max(a[0], b[0]) + margin
+        overlap_y = min(a[3], b[3]) - max(a[1], b[1]) + margin
+        if overlap_x > eps and overlap_y > eps:
+            pairs.append((i, j))
+    return pairs
+
+
+def test_overlapping_pairs_matches_brute_force() -> None:
+    rng = random.Random(7)
+    rects = geometry.rects_from_xywh(
+        [rng.uniform(0, 20) for _ in range(300)],
+        [rng.uniform(0, 10) for _ in range(300)],
+        [rng.uniform(0.2, 1.5) for _ in range(300)],
+        [rng.uniform(0.2, 0.8) for _ in range(300)],
+    )
+    for margin, eps in ((0.0, 0.0), (0.2, 0.01)):
+        found = [tuple(pair) for pair in geometry.overlapping_pairs(rects, margin=margin, eps=eps).tolist()]
+        assert found == _brute_pairs(rects, margin, eps)
+    assert geometry.overlapping_pairs(rects[:1]).shape == (0, 2)
+
+
+def test_bounds_containment_and_nearest_gap() -> None:
+    rects = geometry.rects_from_xywh([0.0, 2.0, 5.0], [0.0, 1.0, 0.5], [1.0, 1.0, 2.0], [0.5, 0.5, 1.0])
+    assert geometry.bounds(rects) == (0.0, 0.0, 7.0, 1.5)
+    assert geometry.bounds(rects[:0]) is None
+    assert geometry.group_bounds(rects, ["a", "a", "b"]) == {"a": (0.0, 0.0, 3.0, 1.5), "b": (5.0, 0.5, 7.0, 1.5)}
+
+    outer = np.array([[-0.5, -0.5, 4.0, 2.0]] * 3)
+    margins = geometry.containment_margins(outer, rects)
+    assert np.allclose(margins, [0.5, 0.5, -3.0])
+
+    assert geometry.nearest_gap(rects, (3.5, 1.0, 4.0, 1.5)) == (1, 0.5)
+    assert geometry.nearest_gap(rects[:0], (0, 0, 1, 1))[0] == -1
+    assert geometry.point_in_rect(1.0, 0.5, (0.0, 0.0, 1.0, 0.5))
+    assert not geometry.point_in_rect(1.01, 0.5, (0.0, 0.0, 1.0, 0.5))
+
+
+def test_segment_box_distances() -> None:
+    rects = np.array([[1.0, -0.5, 2.0, 0.5], [1.0, 0.6, 2.0, 1.0], [4.0, 3.0, 5.0, 4.0], [1.0, -0.5, 2.0, 0.5]])
+    segments = np.array([[0.0, 0.0, 3.0, 0.0]] * 3 + [[0.0, 1.0, 0.0, 1.0]])
+    distances = geometry.segment_box_distances(segments, rects)
+    assert np.allclose(distances, [0.0, 0.6, np.hypot(1.0, 3.0), np.hypot(1.0, 0.5)])
+
+
+def test_spatial_grid_segment_query_walks_cells() -> None:
+    rects = geometry.rects_from_xywh([float(x) for x in range(0, 100, 2)], [0.0] * 50, [1.0] * 50, [1.0] * 50)
+    grid = geometry.SpatialGrid(rects, geometry.grid_cell_size(rects, 0.0))
+    assert grid.query(3.5, 0.0, 4.5, 0.5) == {1, 2}
+    assert grid.query_segment(0.5, 5.0, 99.0, 5.0, 0.1) == set()
+    assert grid.query_segment(0.5, 0.5, 10.5, 0.5, 0.0) == {0, 1, 2, 3, 4, 5}
@@ -0,0 +1,203 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints.l3_addresses import (
+    bulk_create_addresses,
+    create_address,
+    get_address_conflicts,
+    update_address,
+)
+from app.db.base import Base
+from app.db.models import Area, Device, L3Address, Project, User
+from app.schemas.l3_address import L3AddressBulkCreate, L3AddressCreate, L3AddressUpdate
+from app.services.ip_index import AddressIndex, address_keys, build_conflict_report, parse_address
+
+
+def _address(id: str, ip: str, prefix: int, device: str = "R1", interface: str = "Gi 0/0"):
+    return parse_address(ip, prefix, id, device, interface, device_name=device)
+
+
+def test_index_check_detects_duplicates_and_overlaps() -> None:
+    index = AddressIndex.build(
+        [
+            _address("a1", "10.0.0.1", 24, "R1"),
+            _address("a2", "10.1.0.1", 16, "R2"),
+            _address("a3", "2001:db8::1", 64, "R1", "Gi 0/1"),
+        ]
+    )
+
+    assert index.check(_address("n1", "10.0.0.1", 24, "SW1"))[0] == "IP_DUPLICATE"
+    # Cùng subnet, cùng prefix, khác device: segment dùng chung, hợp lệ.
+    assert index.check(_address("n2", "10.0.0.2", 24, "SW1")) is None
+    # Prefix khác trên subnet đang có (nằm trong / chứa).
+    assert index.check(_address("n3", "10.0.0.2", 25, "SW1"))[0] == "SUBNET_OVERLAP"
+    assert index.check(_address("n4", "10.1.5.1", 24, "SW1"))[0] == "SUBNET_OVERLAP"
+    assert index.check(_address("n5", "10.0.0.0", 8, "SW1"))[0] == "SUBNET_OVERLAP"
+    assert index.check(_address("n6", "10.0.0.9", 24, "R1", "Gi 0/2"))[0] == "SUBNET_DUPLICATE_ON_DEVICE"
+    assert index.check(_address("n7", "2001:db8::2", 64, "SW1")) is None
+    assert index.check(_address("n8", "2001:db8::1", 64, "SW1"))[0] == "IP_DUPLICATE"
+    # Update chính nó không bị tính là trùng.
+    assert index.check(_address("a1", "10.0.0.1", 24, "R1")) is None
+
+    index.add(_address("n2", "10.0.0.2", 24, "SW1"))
+    assert index.check(_address("n9", "10.0.0.2", 24, "SW2"))[0] == "IP_DUPLICATE"
+
+    with pytest.raises(ValueError):
+        parse_address("10.0.0.1", 33)
+    assert address_keys("10.0.0.5", 24) == ("40a000005", "40a000000")
+    assert address_keys("bad", 24) == (None, None)
+
+
+def test_conflict_report_rules() -> None:
+    addresses = [
+        _address("a1", "10.0.0.1", 24, "R1"),
+        _address("a2", "10.0.0.1", 24, "R2"),
+        _address("a3", "10.0.0.0", 16, "FW1"),
+        _address("a4", "10.2.0.1", 24, "R1", "Gi 0/1"),
+        _address("a5", "10.2.0.2", 24, "R1", "Gi 0/2"),
+        _address("a6", "10.3.0.255", 24, "SRV1"),
+        _address("a7", "10.3.0.10", 24, "SRV2"),
+        _address("a8", "10.9.0.0", 31, "SRV1"),
+    ]
+    types = {"R1": "Router", "R2": "Router", "FW1": "Firewall", "SRV1": "Server", "SRV2": "Server"}
+
+    report = build_conflict_report(addresses, types)
+    found = {(finding.rule, tuple(sorted(finding.entity_ids))) for finding in report.findings}
+
+    assert ("RB-401", ("a1", "a2")) in found
+    assert ("RB-402", ("a1", "a2", "a3")) in found
+    assert ("RB-403", ("a4", "a5")) in found
+    assert ("RB-404", ("a6",)) in found
+    assert ("RB-405", ("a6", "a7")) in found
+    # /31 point-to-point: không xét network/broadcast, không cần gateway.
+    assert not any("a8" in ids for _, ids in found)
+    assert report.export_blocked
+    assert report.checked == {"l3_addresses": 8, "subnets": 5}
+
+
+def test_conflict_report_scales_to_100k_addresses() -> None:
+    addresses = [
+        parse_address(f"10.{idx // 16384}.{idx // 64 % 256}.{idx % 64 * 4 + 1}", 30, str(idx), f"d{idx}", "Gi 0/0")
+        for idx in range(100_000)
+    ]
+    started = time.perf_counter()
+    report = build_conflict_report(addresses, {})
+    index = AddressIndex.build(addresses)
+    for address in addresses[:10_000]:
+        assert index.check(address) is None
+    elapsed = time.perf_counter() - started
+
+    assert report.findings == []
+    assert elapsed < 3.0
+
+
+@pytest.mark.asyncio
+async def test_address_endpoints_reject_conflicts(tmp_path) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'ip_index.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with async_session() as session:
+        user = User(email="ip@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="IP Project", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        area = Area(project_id=project.id, name="Core", grid_row=1, grid_col=1)
+        session.add(area)
+        await session.commit()
+        router = Device(project_id=project.id, area_id=area.id, name="R1", device_type="Router")
+        server = Device(project_id=project.id, area_id=area.id, name="SRV1", device_type="Server")
+        session.add_all([router, server])
+        await session.commit()
+
+        # 2000 địa chỉ có sẵn: tạo 1 địa chỉ chỉ đọc vài dòng ứng viên qua index key.
+        for idx in range(2000):
+            ip_key, network_key = address_keys(f"172.16.{idx // 64}.{idx % 64 * 4 + 1}", 30)
+            session.add(
+                L3Address(
+                    project_id=project.id,
+                    device_id=router.id,
+                    interface_name=f"Gi 1/{idx}",
+                    ip_address=f"172.16.{idx // 64}.{idx % 64 * 4 + 1}",
+                    prefix_length=30,
+                    ip_key=ip_key,
+                    network_key=network_key,
+                )
+            )
+        await session.commit()
+
+        created = await create_address(
+            project.id,
+            L3AddressCreate(device_name="R1", interface_name="Vlan 10", ip_address="10.0.0.1", prefix_length=24),
+            db=session,
+            current_user=user,
+        )
+
+        rows: list[int] = []
+
+        def _rows(conn, cursor, statement, parameters, context, executemany) -> None:
+            if statement.lstrip().upper().startswith("SELECT") and "l3_addresses" in statement:
+                rows.append(1)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _rows)
+        with pytest.raises(HTTPException) as duplicate:
+            await create_address(
+                project.id,
+                L3AddressCreate(device_name="SRV1", interface_name="Eth 0", ip_address="10.0.0.1", prefix_length=24),
+                db=session,
+                current_user=user,
+            )
+        event.remove(engine.sync_engine, "before_cursor_execute", _rows)
+        assert duplicate.value.status_code == 400
+        assert "R1:Vlan 10" in duplicate.value.detail
+        assert len(rows) <= 3
+
+        with pytest.raises(HTTPException) as overlap:
+            await create_address(
+                project.id,
+                L3AddressCreate(device_name="SRV1", interface_name="Eth 0", ip_address="172.16.0.0", prefix_length=16),
+                db=session,
+                current_user=user,
+            )
+        assert "chồng lấn" in overlap.value.detail
+
+        # Đổi prefix của chính nó: không tự xung đột.
+        updated = await update_address(
+            project.id, created.id, L3AddressUpdate(prefix_length=25), db=session, current_user=user
+        )
+        assert updated.prefix_length == 25
+
+        result = await bulk_create_addresses(
+            project.id,
+            L3AddressBulkCreate(
+                addresses=[
+                    L3AddressCreate(device_name="SRV1", interface_name=name, ip_address=ip, prefix_length=prefix)
+                    for name, ip, prefix in (
+                        ("Eth 0", "10.0.0.10", 25),
+                        ("Eth 1", "10.0.0.10", 25),
+                        ("Eth 2", "10.0.0.20", 24),
+                    )
+                ]
+            ),
+            db=session,
+            current_user=user,
+        )
+        assert result.success_count == 1
+        assert [error["index"] for error in result.errors] == [1, 2]
+
+        report = await get_address_conflicts(project.id, db=session, current_user=user)
+        assert report.checked["l3_addresses"] == 2002
+        assert report.findings == []
+
+    await engine.dispose()
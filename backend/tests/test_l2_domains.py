@@ -0,0 +1,215 @@
+import time
+
+import numpy as np
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints.l2_segments import get_segment_broadcast_domains
+from app.api.v1.endpoints.layout import compute_layout_l2
+from app.db.base import Base
+from app.db.models import Area, Device, InterfaceL2Assignment, L1Link, L2Segment, Project, User
+from app.services.l2_domains import DisjointSet, compute_broadcast_domains
+from app.services.layout_models import LayoutConfig
+from app.services.vlan_bitset import bitmap_from_vlans
+
+
+def _access(device_id, interface, vlan):
+    return device_id, interface, "access", vlan, None, None
+
+
+def _trunk(device_id, interface, allowed=None, vlan=None):
+    return device_id, interface, "trunk", vlan, bitmap_from_vlans(allowed), None
+
+
+def test_disjoint_set_batch_union() -> None:
+    forest = DisjointSet(8)
+    forest.union(np.array([7, 5, 3, 1]), np.array([6, 4, 2, 7]))
+    forest.union(np.array([2]), np.array([6]))
+    roots = forest.find(np.arange(8))
+
+    assert roots.tolist() == [0, 1, 1, 1, 4, 4, 1, 1]
+
+
+def test_domains_follow_links_carrying_the_vlan() -> None:
+    rows = [
+        _access("pc1", "Eth 0", 10),
+        _access("sw1", "Gi 0/1", 10),
+        _trunk("sw1", "Gi 0/24", [10, 20]),
+        _trunk("sw2", "Gi 0/24", [10, 20, 30]),
+        _access("sw2", "Gi 0/1", 10),
+        _access("pc2", "Eth 0", 10),
+        _access("sw2", "Gi 0/2", 20),
+        _access("pc3", "Eth 0", 20),
+        # Trunk không giới hạn nhưng đầu kia không mang VLAN 10: không nối.
+        _trunk("sw3", "Gi 0/24"),
+        _access("sw3", "Gi 0/1", 10),
+        _access("pc4", "Eth 0", 10),
+    ]
+    links = [
+        ("pc1", "Eth 0", "sw1", "Gi 0/1"),
+        ("sw1", "Gi 0/24", "sw2", "Gi 0/24"),
+        ("sw2", "Gi 0/1", "pc2", "Eth 0"),
+        ("sw2", "Gi 0/2", "pc3", "Eth 0"),
+        ("sw3", "Gi 0/1", "pc4", "Eth 0"),
+        ("sw3", "Gi 0/24", "pc3", "Eth 0"),
+        # Đầu không có assignment: bỏ qua.
+        ("sw1", "Gi 0/48", "sw3", "Gi 0/48"),
+    ]
+    domains = compute_broadcast_domains(rows, links, [10, 20, 30])
+
+    assert domains.vlans[10] == [["pc1", "pc2", "sw1", "sw2"], ["pc4", "sw3"]]
+    assert domains.vlans[20] == [["pc3", "sw1", "sw2", "sw3"]]
+    assert domains.vlans[30] == [["sw2"], ["sw3"]]
+    assert domains.islands(10) == [["pc4", "sw3"]]
+    assert domains.split_vlans == [10, 30]
+    assert domains.component_index(10)["sw3"] == 1
+
+
+def test_domains_scale_to_50k_links() -> None:
+    rng = np.random.default_rng(11)
+    switches = 10_000
+    rows = []
+    links = []
+    for idx in range(switches):
+        allowed = rng.choice(np.arange(1, 201), size=20, replace=False).tolist()
+        rows.append(_trunk(f"sw{idx}", "Gi 0/1", allowed))
+        rows.append(_trunk(f"sw{idx}", "Gi 0/2", allowed))
+        rows.append(_access(f"pc{idx}", "Eth 0", allowed[0]))
+        rows.append(_access(f"sw{idx}", "Gi 0/3", allowed[0]))
+    for idx in range(switches):
+        links.append((f"sw{idx}", "Gi 0/1", f"sw{(idx + 1) % switches}", "Gi 0/2"))
+        links.append((f"sw{idx}", "Gi 0/3", f"pc{idx}", "Eth 0"))
+    for idx in range(30_000):
+        links.append((f"sw{idx % switches}", f"Te {idx}", f"sw{(idx * 7) % switches}", f"Te {idx}"))
+
+    started = time.perf_counter()
+    domains = compute_broadcast_domains(rows, links, range(1, 201))
+    elapsed = time.perf_counter() - started
+
+    assert sum(len(component) for components in domains.vlans.values() for component in components) > switches
+    assert elapsed < 3.0
+
+
+class _Segment:
+    def __init__(self, seg_id: str, vlan_id: int, name: str) -> None:
+        self.id = seg_id
+        self.vlan_id = vlan_id
+        self.name = name
+
+
+class _Assignment:
+    def __init__(self, device_id: str, interface_name: str, seg_id: str) -> None:
+        self.device_id = device_id
+        self.interface_name = interface_name
+        self.l2_segment_id = seg_id
+        self.port_mode = "access"
+
+
+class _Link:
+    def __init__(self, from_device_id: str, from_port: str, to_device_id: str, to_port: str) -> None:
+        self.from_device_id = from_device_id
+        self.from_port = from_port
+        self.to_device_id = to_device_id
+        self.to_port = to_port
+
+
+class _Device:
+    def __init__(self, device_id: str) -> None:
+        self.id = device_id
+        self.name = device_id
+        self.device_type = "Switch"
+        self.area_id = None
+
+
+def test_layout_l2_draws_one_box_per_domain() -> None:
+    segment = _Segment("S10", 10, "Users")
+    devices = [_Device(name) for name in ("sw1", "sw2", "sw3")]
+    assignments = [
+        _Assignment("sw1", "Gi 0/1", "S10"),
+        _Assignment("sw2", "Gi 0/1", "S10"),
+        _Assignment("sw3", "Gi 0/1", "S10"),
+    ]
+    links = [_Link("sw1", "Gi 0/1", "sw2", "Gi 0/1")]
+    config = LayoutConfig(layer_gap=1.0, node_spacing=0.4, node_width=1.0, node_height=1.0)
+
+    result = compute_layout_l2(devices, links, assignments, [segment], config)
+    groups = [(group.name, sorted(group.device_ids), group.domain_index) for group in result["vlan_groups"]]
+
+    assert groups == [("Users (1/2)", ["sw1", "sw2"], 0), ("Users (2/2)", ["sw3"], 1)]
+    assert {device.id for device in result["devices"]} == {"sw1", "sw2", "sw3"}
+
+
+@pytest.mark.asyncio
+async def test_domains_endpoint_is_cached_by_revision(tmp_path) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'domains.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with async_session() as session:
+        user = User(email="domains@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Domain Project", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        area = Area(project_id=project.id, name="Core", grid_row=1, grid_col=1)
+        session.add(area)
+        await session.commit()
+        sw1 = Device(project_id=project.id, area_id=area.id, name="SW-1", device_type="Switch")
+        sw2 = Device(project_id=project.id, area_id=area.id, name="SW-2", device_type="Switch")
+        segment = L2Segment(project_id=project.id, name="Users", vlan_id=10)
+        session.add_all([sw1, sw2, segment])
+        await session.commit()
+        for device in (sw1, sw2):
+            session.add(
+                InterfaceL2Assignment(
+                    project_id=project.id,
+                    device_id=device.id,
+                    interface_name="Gi 0/1",
+                    l2_segment_id=segment.id,
+                    port_mode="access",
+                )
+            )
+        await session.commit()
+
+        first = await get_segment_broadcast_domains(project.id, db=session, current_user=user)
+        assert first.split_vlans == [10]
+        assert first.vlans[0].name == "Users"
+        assert first.vlans[0].island_count == 1
+
+        queries: list[str] = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany) -> None:
+            if statement.lstrip().upper().startswith("SELECT") and "l1_links" in statement:
+                queries.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _record)
+        cached = await get_segment_broadcast_domains(project.id, db=session, current_user=user)
+        assert cached.revision == first.revision
+        assert queries == []
+
+        session.add(
+            L1Link(
+                project_id=project.id,
+                from_device_id=sw1.id,
+                from_port="Gi 0/1",
+                to_device_id=sw2.id,
+                to_port="Gi 0/1",
+            )
+        )
+        await session.commit()
+        joined = await get_segment_broadcast_domains(project.id, db=session, current_user=user)
+        event.remove(engine.sync_engine, "before_cursor_execute", _record)
+
+        assert joined.revision > first.revision
+        assert len(queries) == 1
+        assert joined.split_vlans == []
+        assert joined.vlans[0].components == [sorted([sw1.id, sw2.id])]
+
+    await engine.dispose()
@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints.links import cleanup_invalid_links
+from app.db.base import Base
+from app.db.models import Area, Device, DevicePort, L1Link, Project, User
+from app.schemas.link import L1LinkCleanupRequest
+from app.services import entity_events
+from app.services.link_cleanup import plan_link_cleanup
+from app.services.link_rules import classify_device
+
+
+class _RecordingManager:
+    def __init__(self) -> None:
+        self.events: list[tuple[str, dict]] = []
+
+    async def broadcast(self, project_id: str, message: dict) -> int:
+        self.events.append((project_id, message))
+        return 1
+
+
+def test_plan_keeps_oldest_link_per_rule() -> None:
+    devices = {
+        "acc": classify_device("acc", "ACCESS-SW-1", "Switch", "ho", "HO"),
+        "dist": classify_device("dist", "DIST-SW-1", "Switch", "core", "Core"),
+        "pc1": classify_device("pc1", "PC-1", "PC", "ho", "HO"),
+        "pc2": classify_device("pc2", "PC-2", "PC", "ho", "HO"),
+    }
+    port_keys = {(device_id, f"Gi 0/{port}") for device_id in devices for port in range(4)}
+    links = [
+        ("l1", "acc", "Gi 0/0", "dist", "Gi 0/0"),
+        ("l2", "pc1", "Gi 0/0", "acc", "Gi 0/1"),
+        ("l3", "pc1", "Gi 0/1", "acc", "Gi 0/2"),  # uplink thứ 2 của PC-1
+        ("l4", "pc2", "Gi 0/0", "dist", "Gi 0/1"),  # endpoint lên thẳng Distribution
+        ("l5", "dist", "Gi 0/0", "acc", "Gi 0/0"),  # trùng l1 (đảo chiều)
+        ("l6", "pc2", "Gi 0/1", "acc", "Gi 0/1"),  # port acc Gi 0/1 đã dùng bởi l2
+        ("l7", "pc2", "Gi 9/9", "acc", "Gi 0/3"),
+    ]
+
+    plan = plan_link_cleanup(devices, port_keys, links)
+
+    assert plan.total_links == 7
+    assert [(item.id, item.code) for item in plan.items] == [
+        ("l3", "BUSINESS_AREA_SINGLE_UPLINK"),
+        ("l4", "ENDPOINT_UPLINK_INVALID"),
+        ("l5", "L1_LINK_DUP"),
+        ("l6", "PORT_IN_USE"),
+        ("l7", "PORT_NOT_FOUND"),
+    ]
+    assert plan.items[0].from_device == "PC-1"
+
+    only_dup = plan_link_cleanup(devices, port_keys, links, codes={"L1_LINK_DUP"})
+    assert only_dup.link_ids == ["l5"]
+
+
+@pytest.mark.asyncio
+async def test_cleanup_endpoint_dry_run_then_apply(tmp_path, monkeypatch) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'link_cleanup.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+    manager = _RecordingManager()
+    monkeypatch.setattr(entity_events, "ws_manager", manager)
+
+    async with async_session() as session:
+        user = User(email="cleanup@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Cleanup Project", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        ho = Area(project_id=project.id, name="HO", grid_row=1, grid_col=1)
+        core = Area(project_id=project.id, name="Core", grid_row=1, grid_col=2)
+        session.add_all([ho, core])
+        await session.commit()
+
+        access = Device(project_id=project.id, area_id=ho.id, name="ACCESS-SW-1", device_type="Switch")
+        dist = Device(project_id=project.id, area_id=core.id, name="DIST-SW-1", device_type="Switch")
+        pcs = [
+            Device(project_id=project.id, area_id=ho.id, name=f"PC-{idx}", device_type="PC")
+            for idx in range(50)
+        ]
+        session.add_all([access, dist, *pcs])
+        await session.commit()
+        session.add_all(
+            [
+                DevicePort(project_id=project.id, device_id=device.id, name=f"Gi 0/{port}")
+                for device in [access, dist, *pcs]
+                for port in range(110)
+            ]
+        )
+
+        started = datetime(2026, 1, 1)
+        links = [L1Link(project_id=project.id, from_device_id=access.id, from_port="Gi 0/0",
+                        to_device_id=dist.id, to_port="Gi 0/0")]
+        for idx, pc in enumerate(pcs):
+            links.append(L1Link(project_id=project.id, from_device_id=pc.id, from_port="Gi 0/0",
+                                to_device_id=access.id, to_port=f"Gi 0/{idx + 1}"))
+            # Uplink thứ 2 lên Distribution: vi phạm cả endpoint lẫn single-uplink.
+            links.append(L1Link(project_id=project.id, from_device_id=pc.id, from_port="Gi 0/1",
+                                to_device_id=dist.id, to_port=f"Gi 0/{idx + 1}"))
+        for offset, link in enumerate(links):
+            link.created_at = started + timedelta(seconds=offset)
+        session.add_all(links)
+        await session.commit()
+
+        statements: list[str] = []
+
+        def _count(conn, cursor, statement, parameters, context, executemany) -> None:
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _count)
+        preview = await cleanup_invalid_links(project.id, L1LinkCleanupRequest(), user, session)
+        event.remove(engine.sync_engine, "before_cursor_execute", _count)
+
+        assert preview.dry_run is True
+        assert preview.total_links == 101
+        assert preview.delete_count == 50
+        assert {item.code for item in preview.items} == {"ENDPOINT_UPLINK_INVALID"}
+        # Số query không phụ thuộc số link.
+        assert len(statements) < 10
+        assert manager.events == []
+        stored = (await session.execute(select(L1Link.id).where(L1Link.project_id == project.id))).scalars().all()
+        assert len(stored) == 101
+
+        approved = [item.id for item in preview.items[:10]]
+        result = await cleanup_invalid_links(
+            project.id,
+            L1LinkCleanupRequest(dry_run=False, link_ids=approved),
+            user,
+            session,
+        )
+        assert result.delete_count == 10
+        stored = set((await session.execute(select(L1Link.id).where(L1Link.project_id == project.id))).scalars())
+        assert len(stored) == 91
+        assert not stored & set(approved)
+        assert manager.events == [(project.id, {"event": "link.deleted", "data": {"ids": approved}})]
+
+    await engine.dispose()
@@ -1,11 +1,13 @@
 import pytest
+from fastapi import HTTPException
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
+from app.api.v1.endpoints.links import bulk_create_links, create_new_link, update_existing_link
 from app.db.base import Base
-from app.db.models import Area, Device, Project, User
-from app.schemas.link import L1LinkCreate
-from app.services.link import check_link_exists, check_port_in_use, create_link
+from app.db.models import Area, Device, DevicePort, Project, User
+from app.schemas.link import L1LinkBulkCreate, L1LinkCreate, L1LinkUpdate
+from app.services.link import check_link_exists, check_port_in_use, create_link, load_link_index
 
 
 @pytest.mark.asyncio
@@ -122,3 +124,85 @@ async def test_link_exists_and_port_in_use_exclude() -> None:
         )
 
     await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_single_link_validation_uses_scoped_index() -> None:
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+    )
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_session() as session:
+        user = User(email="scoped@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Scoped Project", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        area = Area(project_id=project.id, name="Core", grid_row=1, grid_col=1)
+        session.add(area)
+        await session.commit()
+
+        devices = [
+            Device(project_id=project.id, area_id=area.id, name=f"SW-{idx}", device_type="Switch")
+            for idx in range(30)
+        ]
+        session.add_all(devices)
+        await session.commit()
+        session.add_all(
+            [
+                DevicePort(project_id=project.id, device_id=device.id, name=f"Gi 0/{port}")
+                for device in devices
+                for port in range(2)
+            ]
+        )
+        await session.commit()
+        rows = [
+            {"from_device": f"SW-{idx}", "from_port": "Gi 0/0", "to_device": f"SW-{idx + 1}", "to_port": "Gi 0/1"}
+            for idx in range(28)
+        ]
+        response = await bulk_create_links(project.id, L1LinkBulkCreate(links=rows), user, session)
+        assert response.success_count == 28
+
+        index = await load_link_index(session, project.id, device_ids=[devices[28].id, devices[29].id])
+        assert len(index.keys) == 1
+        assert index.link_count(devices[28].id) == 1 and index.link_count(devices[29].id) == 0
+        assert index.port_in_use(devices[28].id, "Gi 0/1")
+        assert not index.port_in_use(devices[28].id, "Gi 0/0")
+
+        created = await create_new_link(
+            project.id,
+            L1LinkCreate(from_device="SW-29", from_port="Gi 0/0", to_device="SW-28", to_port="Gi 0/0"),
+            user,
+            session,
+        )
+        assert created.from_device_name == "SW-29"
+
+        with pytest.raises(HTTPException) as exc:
+            await create_new_link(
+                project.id,
+                L1LinkCreate(from_device="SW-29", from_port="Gi 0/1", to_device="SW-0", to_port="Gi 0/0"),
+                user,
+                session,
+            )
+        assert "SW-0" in exc.value.detail
+        with pytest.raises(HTTPException) as exc:
+            await create_new_link(
+                project.id,
+                L1LinkCreate(from_device="SW-28", from_port="Gi 0/0", to_device="SW-29", to_port="Gi 0/0"),
+                user,
+                session,
+            )
+        assert exc.value.detail == "Link đã tồn tại"
+
+        # Cập nhật chính link đó: link hiện tại bị loại khỏi index, không tự báo trùng.
+        updated = await update_existing_link(project.id, created.id, L1LinkUpdate(purpose="WAN"), user, session)
+        assert updated.purpose == "WAN"
+
+    await engine.dispose()
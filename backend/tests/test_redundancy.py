@@ -0,0 +1,190 @@
+import json
+import random
+import time
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints.links import get_link_redundancy
+from app.db.base import Base
+from app.db.models import Area, Device, L1Link, PortChannel, Project, User
+from app.services.redundancy import analyze_redundancy, build_edges
+
+
+def _links(*pairs):
+    return [(f"l{idx}", a, f"p{idx}", b, f"p{idx}") for idx, (a, b) in enumerate(pairs)]
+
+
+def _pieces(nodes, edges) -> int:
+    parent = {node: node for node in nodes}
+
+    def find(node):
+        while parent[node] != node:
+            node = parent[node]
+        return node
+
+    for a, b in edges:
+        parent[find(a)] = find(b)
+    return len({find(node) for node in nodes})
+
+
+def test_articulation_points_bridges_and_components() -> None:
+    # Vòng a-b-c, c nối d (bridge), d-e song song 2 link (không phải bridge).
+    edges = build_edges(_links(("a", "b"), ("b", "c"), ("c", "a"), ("c", "d"), ("d", "e"), ("e", "d"), ("f", "f")))
+    report = analyze_redundancy(edges, ["a", "b", "c", "d", "e", "g"])
+
+    assert report.articulation_points == [("c", 1), ("d", 1)]
+    assert [edges[e].link_ids for e in report.bridges] == [["l3"]]
+    assert sorted(report.component_devices(component) for component in report.components) == [
+        ["a", "b", "c"],
+        ["c", "d"],
+        ["d", "e"],
+    ]
+    assert report.devices == 6
+    assert report.links == 6
+
+
+def test_port_channel_members_collapse_into_one_edge() -> None:
+    links = [
+        ("l1", "sw1", "Gi 0/1", "sw2", "Gi 0/1"),
+        ("l2", "sw1", "Gi 0/2", "sw2", "Gi 0/2"),
+        ("l3", "sw2", "Gi 0/3", "sw3", "Gi 0/3"),
+    ]
+    members = {
+        ("sw1", "Gi 0/1"): "Po1",
+        ("sw1", "Gi 0/2"): "Po1",
+        ("sw2", "Gi 0/1"): "Po1",
+        ("sw2", "Gi 0/2"): "Po1",
+    }
+
+    parallel = analyze_redundancy(build_edges(links))
+    assert [parallel.edges[e].link_ids for e in parallel.bridges] == [["l3"]]
+
+    collapsed = analyze_redundancy(build_edges(links, members))
+    bridges = sorted((collapsed.edges[e].link_ids, collapsed.edges[e].port_channels) for e in collapsed.bridges)
+    assert bridges == [(["l1", "l2"], ["sw1:Po1", "sw2:Po1"]), (["l3"], [])]
+    assert collapsed.articulation_points == [("sw2", 1)]
+
+
+def test_matches_brute_force_on_random_graphs() -> None:
+    rng = random.Random(5)
+    for _ in range(30):
+        nodes = [f"n{idx}" for idx in range(12)]
+        pairs = [tuple(rng.sample(nodes, 2)) for _ in range(rng.randint(8, 20))]
+        report = analyze_redundancy(build_edges(_links(*pairs)), nodes)
+        base = _pieces(nodes, pairs)
+
+        expected_points = []
+        for node in nodes:
+            rest = [other for other in nodes if other != node]
+            kept = [pair for pair in pairs if node not in pair]
+            extra = _pieces(rest, kept) - (base - (1 if not any(node in pair for pair in pairs) else 0))
+            if extra > 0:
+                expected_points.append((node, extra))
+        expected_bridges = {
+            f"l{idx}" for idx in range(len(pairs)) if _pieces(nodes, pairs[:idx] + pairs[idx + 1:]) > base
+        }
+
+        assert sorted(report.articulation_points) == sorted(expected_points)
+        assert {report.edges[e].link_ids[0] for e in report.bridges} == expected_bridges
+        assert sum(len(component) for component in report.components) == len(pairs)
+
+
+def test_redundancy_scales_to_50k_links() -> None:
+    rng = random.Random(9)
+    devices = 20_000
+    pairs = [(f"d{idx}", f"d{idx + 1}") for idx in range(devices - 1)]
+    pairs += [(f"d{rng.randrange(devices)}", f"d{rng.randrange(devices)}") for _ in range(30_000)]
+    edges = build_edges(_links(*pairs))
+
+    started = time.perf_counter()
+    report = analyze_redundancy(edges)
+    elapsed = time.perf_counter() - started
+
+    assert sum(len(component) for component in report.components) == len(edges)
+    assert elapsed < 1.0
+
+
+def _link(project_id, from_device_id, from_port, to_device_id, to_port) -> L1Link:
+    return L1Link(
+        project_id=project_id,
+        from_device_id=from_device_id,
+        from_port=from_port,
+        to_device_id=to_device_id,
+        to_port=to_port,
+    )
+
+
+@pytest.mark.asyncio
+async def test_redundancy_endpoint_is_cached_by_revision(tmp_path) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'redundancy.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with async_session() as session:
+        user = User(email="redundancy@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Redundancy Project", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        area = Area(project_id=project.id, name="Core", grid_row=1, grid_col=1)
+        session.add(area)
+        await session.commit()
+        core = Device(project_id=project.id, area_id=area.id, name="CORE-1", device_type="Switch")
+        dist = Device(project_id=project.id, area_id=area.id, name="DIST-1", device_type="Switch")
+        access = Device(project_id=project.id, area_id=area.id, name="ACC-1", device_type="Switch")
+        session.add_all([core, dist, access])
+        await session.commit()
+        for port in ("Gi 0/1", "Gi 0/2"):
+            session.add(_link(project.id, core.id, port, dist.id, port))
+        session.add(_link(project.id, dist.id, "Gi 0/3", access.id, "Gi 0/1"))
+        session.add(
+            PortChannel(
+                project_id=project.id,
+                device_id=core.id,
+                name="Po1",
+                channel_number=1,
+                members_json=json.dumps(["Gi 0/1", "Gi 0/2"]),
+            )
+        )
+        await session.commit()
+
+        collapsed = await get_link_redundancy(project.id, current_user=user, db=session)
+        assert collapsed.collapse_port_channels is True
+        assert [point.device_name for point in collapsed.articulation_points] == ["DIST-1"]
+        assert sorted(len(bridge.link_ids) for bridge in collapsed.bridges) == [1, 2]
+        assert collapsed.checked == {"devices": 3, "links": 3, "edges": 2}
+
+        parallel = await get_link_redundancy(project.id, current_user=user, db=session, collapse_port_channels=False)
+        assert [len(bridge.link_ids) for bridge in parallel.bridges] == [1]
+
+        queries: list[str] = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany) -> None:
+            if statement.lstrip().upper().startswith("SELECT") and "l1_links" in statement:
+                queries.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _record)
+        cached = await get_link_redundancy(project.id, current_user=user, db=session)
+        assert cached.revision == collapsed.revision
+        assert queries == []
+
+        session.add(_link(project.id, core.id, "Gi 0/9", access.id, "Gi 0/9"))
+        await session.commit()
+        ring = await get_link_redundancy(project.id, current_user=user, db=session)
+        event.remove(engine.sync_engine, "before_cursor_execute", _record)
+
+        assert len(queries) == 1
+        assert ring.revision > collapsed.revision
+        assert ring.articulation_points == []
+        assert ring.bridges == []
+        assert len(ring.biconnected_components) == 1
+
+    await engine.dispose()
@@ -0,0 +1,131 @@
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints.rule_checks import check_project_rules as check_project_rules_endpoint
+from app.db.base import Base
+from app.db.models import AdminConfig, Area, Device, DevicePort, L1Link, Project, User
+from app.services.rule_check import RuleCheckParams, check_project_rules
+
+
+def _rules(report) -> list[tuple[str, str, list[str]]]:
+    return sorted((finding.rule, finding.severity, finding.entity_ids) for finding in report.findings)
+
+
+def test_rules_report_overlap_gap_padding_and_links() -> None:
+    areas = [
+        ("a1", "Core", 0.0, 0.0, 10.0, 4.0),
+        ("a2", "Server", 9.5, 0.0, 4.0, 4.0),  # chồng a1
+        ("a3", "DMZ", None, None, 3.0, 1.5),
+    ]
+    devices = [
+        ("d1", "SW-1", 1.0, 1.0, 1.0, 0.5, "a1"),
+        ("d2", "SW-2", 1.5, 1.2, 1.0, 0.5, "a1"),  # chồng d1
+        ("d3", "SW-3", 3.0, 1.0, 1.0, 0.5, "a1"),  # cách d2 0.5: ok
+        ("d4", "SW-4", 4.1, 1.0, 1.0, 0.5, "a1"),  # cách d3 0.1 < device_gap
+        ("d5", "SW-5", 0.05, 3.0, 1.0, 0.5, "a1"),  # sát biên trái area
+        ("d6", "SW-6", 6.0, 3.0, 1.0, 0.5, "a1"),
+        ("d7", "SW-7", 8.0, 3.0, 1.0, 0.5, "a1"),
+        ("d8", "SW-8", None, None, 1.0, 0.5, "a1"),
+    ]
+    links = [
+        ("l1", "d5", "Gi 0/1", "d7", "Gi 0/1"),  # đi xuyên d6
+        ("l2", "d1", "Gi 0/9", "missing", "Gi 0/1"),
+    ]
+    ports = {("d5", "Gi 0/1"), ("d7", "Gi 0/1")}
+
+    report = check_project_rules(areas, devices, links, ports)
+
+    assert _rules(report) == [
+        ("RB-001", "ERROR", ["l2"]),
+        ("RB-001", "ERROR", ["l2", "d1"]),
+        ("RB-101", "ERROR", ["d1", "d2"]),
+        ("RB-102", "ERROR", ["a1", "a2"]),
+        ("RB-103", "ERROR", ["d5", "a1"]),
+        ("RB-104", "WARN", ["l1", "d6"]),
+        ("RB-141", "WARN", ["d3", "d4"]),
+        ("RB-301", "INFO", ["a3"]),
+        ("RB-301", "INFO", ["d8"]),
+    ]
+    assert report.summary == {"ERROR": 5, "WARN": 2, "INFO": 2}
+    assert report.export_blocked
+
+    loose = check_project_rules(areas[:1], devices[2:4], [], set(), RuleCheckParams(device_gap=0.05))
+    assert loose.findings == [] and not loose.export_blocked
+
+
+def test_rule_check_params_from_admin_config() -> None:
+    params = RuleCheckParams.from_config({"validation": {"layout_checks": {"device_gap": "0.4", "label_gap": "x"}}})
+    assert params.device_gap == 0.4 and params.label_gap == 0.05
+    assert RuleCheckParams.from_config({}) == RuleCheckParams()
+
+
+def test_rule_check_scales_to_10k_devices() -> None:
+    columns = 100
+    areas = [("a1", "Core", -1.0, -1.0, columns * 1.6 + 2, 100 * 1.0 + 2)]
+    devices = [
+        (f"d{index}", f"SW-{index}", (index % columns) * 1.6, (index // columns) * 1.0, 1.2, 0.5, "a1")
+        for index in range(10_000)
+    ]
+    links = [(f"l{index}", f"d{index}", "Gi 0/1", f"d{index + 1}", "Gi 0/2") for index in range(0, 9_999, 2)]
+    ports = {(device[0], port) for device in devices for port in ("Gi 0/1", "Gi 0/2")}
+
+    started = time.perf_counter()
+    report = check_project_rules(areas, devices, links, ports)
+    elapsed = time.perf_counter() - started
+
+    assert report.findings == []
+    assert elapsed < 1.0
+
+
+@pytest.mark.asyncio
+async def test_rule_check_endpoint_loads_project(tmp_path) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'rule_check.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with async_session() as session:
+        user = User(email="rules@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Rules", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        area = Area(
+            project_id=project.id, name="Core", grid_row=1, grid_col=1, position_x=0, position_y=0, width=6, height=3
+        )
+        session.add(area)
+        await session.commit()
+        first = Device(project_id=project.id, area_id=area.id, name="SW-1", position_x=1.0, position_y=1.0)
+        second = Device(project_id=project.id, area_id=area.id, name="SW-2", position_x=2.3, position_y=1.0)
+        session.add_all([first, second])
+        await session.commit()
+        session.add_all(
+            [
+                DevicePort(project_id=project.id, device_id=first.id, name="Gi 0/1"),
+                L1Link(
+                    project_id=project.id,
+                    from_device_id=first.id,
+                    from_port="Gi 0/1",
+                    to_device_id=second.id,
+                    to_port="Gi 0/1",
+                ),
+                AdminConfig(config_key="global", config_json='{"validation": {"layout_checks": {"device_gap": 0.05}}}'),
+            ]
+        )
+        await session.commit()
+
+        response = await check_project_rules_endpoint(project.id, user, session)
+
+    assert response.checked == {"areas": 1, "devices": 2, "links": 1}
+    assert [(finding.rule, finding.severity) for finding in response.findings] == [("RB-001", "ERROR")]
+    assert response.export_blocked and response.summary["ERROR"] == 1
+
+    await engine.dispose()
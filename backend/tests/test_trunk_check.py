@@ -0,0 +1,165 @@
+import json
+import time
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.v1.endpoints.l2_assignments import check_trunk_consistency, create_assignment
+from app.db.base import Base
+from app.db.models import Area, Device, InterfaceL2Assignment, L1Link, L2Segment, Project, User
+from app.schemas.l2_assignment import InterfaceL2AssignmentCreate
+from app.services.trunk_check import build_l2_ports, check_trunk_consistency as check_links
+from app.services.vlan_bitset import (
+    ALL_VLANS,
+    bitmap_from_json,
+    bitmap_from_vlans,
+    format_ranges,
+    popcount,
+    stack_bitmaps,
+    vlans_from_bitmap,
+)
+
+
+def test_bitmap_round_trip_and_set_operations() -> None:
+    bitmap = bitmap_from_vlans([1, 2, 3, 10, 4094, 5000])
+    assert len(bitmap) == 512
+    assert vlans_from_bitmap(bitmap) == [1, 2, 3, 10, 4094]
+    assert format_ranges(vlans_from_bitmap(bitmap)) == "1-3,10,4094"
+    assert bitmap_from_json("[10, 20]") == bitmap_from_vlans([10, 20])
+    assert bitmap_from_json("not json") is None
+    assert bitmap_from_vlans(None) is None
+
+    rows = stack_bitmaps([bitmap, None, bitmap_from_vlans([])])
+    assert popcount(rows).tolist() == [5, 4094, 0]
+    assert popcount(rows[:1] & rows[1:2]).tolist() == [5]
+    assert rows[1].tobytes() == ALL_VLANS
+
+
+def _row(device_id, interface, mode, native=None, vlan=10, allowed=None):
+    return device_id, interface, mode, native, vlan, bitmap_from_vlans(allowed), None
+
+
+def test_trunk_consistency_rules() -> None:
+    ports = build_l2_ports(
+        [
+            _row("a", "Gi 0/1", "trunk", allowed=[10, 20, 30]),
+            _row("b", "Gi 0/1", "trunk", allowed=[10, 20, 30]),
+            _row("a", "Gi 0/2", "trunk", native=99, allowed=[10, 20]),
+            _row("c", "Gi 0/2", "trunk", native=1, allowed=[10, 20, 40]),
+            _row("a", "Gi 0/3", "trunk"),
+            _row("d", "Gi 0/3", "access", vlan=10),
+            _row("e", "Gi 0/4", "access", vlan=10),
+            _row("f", "Gi 0/4", "access", vlan=20),
+            # Trunk không giới hạn 2 đầu: khớp.
+            _row("g", "Gi 0/5", "trunk"),
+            ("h", "Gi 0/5", "trunk", None, 10, None, None),
+        ]
+    )
+    links = [
+        ("l1", "a", "Gi 0/1", "b", "Gi 0/1"),
+        ("l2", "a", "Gi 0/2", "c", "Gi 0/2"),
+        ("l3", "a", "Gi 0/3", "d", "Gi 0/3"),
+        ("l4", "e", "Gi 0/4", "f", "Gi 0/4"),
+        ("l5", "g", "Gi 0/5", "h", "Gi 0/5"),
+        ("l6", "a", "Gi 9/9", "b", "Gi 9/9"),
+    ]
+    report = check_links(ports, links, {"a": "SW-A", "c": "SW-C"})
+    found = sorted((finding.rule, finding.entity_ids[0]) for finding in report.findings)
+
+    assert found == [("RB-501", "l3"), ("RB-502", "l2"), ("RB-503", "l2"), ("RB-504", "l4")]
+    allowed = next(finding for finding in report.findings if finding.rule == "RB-502")
+    assert "SW-A:Gi 0/2 - SW-C:Gi 0/2" in allowed.message
+    assert "chỉ đầu A: -" in allowed.message and "chỉ đầu B: 40" in allowed.message
+    assert report.checked == {"l2_assignments": 10, "l2_links": 5}
+
+
+def test_trunk_check_scales_to_large_projects() -> None:
+    rng = np.random.default_rng(7)
+    count = 20_000
+    rows = []
+    links = []
+    for idx in range(count):
+        allowed = rng.choice(np.arange(1, 4095), size=50, replace=False).tolist()
+        rows.append(_row(f"s{idx}", "Gi 0/1", "trunk", allowed=allowed))
+        rows.append(_row(f"t{idx}", "Gi 0/1", "trunk", allowed=allowed if idx % 2 else allowed[:-1]))
+        links.append((f"l{idx}", f"s{idx}", "Gi 0/1", f"t{idx}", "Gi 0/1"))
+
+    started = time.perf_counter()
+    report = check_links(build_l2_ports(rows), links, {})
+    elapsed = time.perf_counter() - started
+
+    assert len(report.findings) == count // 2
+    assert elapsed < 2.0
+
+
+@pytest.mark.asyncio
+async def test_trunk_check_endpoint_reads_bitmaps(tmp_path) -> None:
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'trunk.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text("PRAGMA foreign_keys=ON"))
+        await conn.run_sync(Base.metadata.create_all)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with async_session() as session:
+        user = User(email="trunk@example.com", hashed_password="hash", is_active=True)
+        session.add(user)
+        await session.commit()
+        project = Project(name="Trunk Project", owner_id=user.id)
+        session.add(project)
+        await session.commit()
+        area = Area(project_id=project.id, name="Core", grid_row=1, grid_col=1)
+        session.add(area)
+        await session.commit()
+        sw1 = Device(project_id=project.id, area_id=area.id, name="DIST-SW-1", device_type="Switch")
+        sw2 = Device(project_id=project.id, area_id=area.id, name="DIST-SW-2", device_type="Switch")
+        segment = L2Segment(project_id=project.id, name="Users", vlan_id=10)
+        session.add_all([sw1, sw2, segment])
+        await session.commit()
+        session.add(
+            L1Link(
+                project_id=project.id,
+                from_device_id=sw1.id,
+                from_port="Gi 0/1",
+                to_device_id=sw2.id,
+                to_port="Gi 0/1",
+            )
+        )
+        # Bản ghi cũ chỉ có JSON (chưa backfill bitmap) vẫn được đọc.
+        session.add(
+            InterfaceL2Assignment(
+                project_id=project.id,
+                device_id=sw2.id,
+                interface_name="Gi 0/1",
+                l2_segment_id=segment.id,
+                port_mode="trunk",
+                allowed_vlans_json=json.dumps([10, 20]),
+            )
+        )
+        await session.commit()
+
+        created = await create_assignment(
+            project.id,
+            InterfaceL2AssignmentCreate(
+                device_name="DIST-SW-1",
+                interface_name="Gi 0/1",
+                l2_segment_id=segment.id,
+                port_mode="trunk",
+                allowed_vlans=[10, 20, 30],
+            ),
+            db=session,
+            current_user=user,
+        )
+        assert created.allowed_vlans == [10, 20, 30]
+        stored = await session.get(InterfaceL2Assignment, created.id)
+        assert stored.allowed_vlans_bitmap == bitmap_from_vlans([10, 20, 30])
+
+        report = await check_trunk_consistency(project.id, db=session, current_user=user)
+        assert [finding.rule for finding in report.findings] == ["RB-502"]
+        assert "chỉ đầu A: 30" in report.findings[0].message
+
+    await engine.dispose()
@@ -0,0 +1,138 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from app.services import ws_broker
+from app.services.ws_broker import LocalBroker, UnixSocketBroker, create_broker
+from app.services.ws_codec import encode_json, resync_message
+from app.services.ws_manager import ConnectionManager
+
+
+async def _wait_for(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+
+
+def test_create_broker_from_config(tmp_path) -> None:
+    assert type(create_broker("local")) is LocalBroker
+    broker = create_broker(f"unix:{tmp_path}")
+    assert isinstance(broker, UnixSocketBroker) and broker.directory == tmp_path
+    with pytest.raises(ValueError):
+        create_broker("redis://localhost")
+
+
+@pytest.mark.asyncio
+async def test_unix_broker_fans_out_across_managers(tmp_path, fake_websocket) -> None:
+    bus = tmp_path / "ws_bus"
+    workers = [ConnectionManager(queue_size=256, broker=UnixSocketBroker(str(bus))) for _ in range(3)]
+    for manager in workers:
+        await manager.start()
+
+    # Socket còn sót của process đã chết: bị dọn khi publish.
+    stale_path = bus / "99999-dead.sock"
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    stale.bind(str(stale_path))
+    stale.close()
+
+    viewers = []
+    for manager in workers:
+        ws = fake_websocket()
+        await manager.connect("p1", ws)
+        viewers.append(ws)
+    other_project = fake_websocket()
+    await workers[2].connect("p2", other_project)
+
+    started = time.perf_counter()
+    assert await workers[0].broadcast("p1", {"event": "device.moved", "seq": 0}) == 1
+    await _wait_for(lambda: all(ws.sent for ws in viewers))
+    assert time.perf_counter() - started < 0.5
+    assert all(ws.sent == [{"event": "device.moved", "seq": 0}] for ws in viewers)
+    assert other_project.sent == []
+    assert not stale_path.exists()
+    assert workers[0].get_metrics()["broker"]["stale_peers"] == 1
+
+    # Burst lớn hơn hàng đợi datagram của kernel: backlog giữ thứ tự, không mất message.
+    for seq in range(1, 101):
+        await workers[1].broadcast("p1", {"seq": seq})
+    await _wait_for(lambda: all(len(ws.sent) == 101 for ws in viewers))
+    for ws in viewers:
+        assert [message["seq"] for message in ws.sent] == list(range(101))
+
+    for manager in workers:
+        await manager.stop()
+    assert list(bus.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_unix_broker_replaces_lost_messages_with_resync(tmp_path, fake_websocket, monkeypatch) -> None:
+    bus = tmp_path / "ws_bus"
+    sender, receiver = (ConnectionManager(queue_size=256, broker=UnixSocketBroker(str(bus))) for _ in range(2))
+    await sender.start()
+    await receiver.start()
+    local, remote = fake_websocket(), fake_websocket()
+    await sender.connect("p1", local)
+    await receiver.connect("p1", remote)
+
+    # Quá MAX_DATAGRAM_BYTES: process khác nhận resync thay vì mất message.
+    monkeypatch.setattr(ws_broker, "MAX_DATAGRAM_BYTES", 1024)
+    await sender.broadcast("p1", {"event": "layout.updated", "blob": "x" * 2048})
+    await _wait_for(lambda: remote.sent)
+    assert local.sent[0]["event"] == "layout.updated"
+    assert remote.sent == [resync_message("oversized")]
+    assert sender.get_metrics()["broker"]["oversized"] == 1
+
+    # Peer không đọc, backlog tràn: khi xả xong thì gửi resync cho project bị mất message.
+    monkeypatch.setattr(ws_broker, "PEER_BACKLOG", 4)
+    silent_path = bus / "88888-silent.sock"
+    silent = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    silent.bind(str(silent_path))
+    silent.setblocking(False)
+    try:
+        seq = 0
+        while not sender.get_metrics()["broker"].get("dropped") and seq < 5000:
+            await sender.broadcast("p2", {"seq": seq})
+            seq += 1
+        assert sender.get_metrics()["broker"].get("dropped")
+        received: list[bytes] = []
+
+        def _drain() -> bool:
+            while True:
+                try:
+                    received.append(silent.recv(65536))
+                except BlockingIOError:
+                    return any(b'"resync"' in payload for payload in received)
+
+        await _wait_for(_drain)
+        assert ws_broker.decode_envelope(received[-1]) == ("p2", encode_json(resync_message("dropped")))
+        assert sender.get_metrics()["broker"]["resyncs"] >= 1
+    finally:
+        silent.close()
+
+    await sender.stop()
+    await receiver.stop()
+
+
+@pytest.mark.asyncio
+async def test_unix_broker_caches_peers_until_directory_changes(tmp_path, fake_websocket) -> None:
+    bus = tmp_path / "ws_bus"
+    first = ConnectionManager(queue_size=256, broker=UnixSocketBroker(str(bus)))
+    await first.start()
+    for seq in range(50):
+        await first.broadcast("p1", {"seq": seq})
+    assert first.get_metrics()["broker"]["peer_scans"] == 1
+
+    # Process mới tạo socket làm mtime thư mục đổi: lần publish sau quét lại.
+    late = ConnectionManager(queue_size=256, broker=UnixSocketBroker(str(bus)))
+    await late.start()
+    ws = fake_websocket()
+    await late.connect("p1", ws)
+    await first.broadcast("p1", {"seq": 50})
+    await _wait_for(lambda: ws.sent)
+    assert ws.sent == [{"seq": 50}]
+    assert first.get_metrics()["broker"]["peer_scans"] == 2
+
+    await first.stop()
+    await late.stop()
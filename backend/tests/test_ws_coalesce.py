@@ -0,0 +1,106 @@
+import asyncio
+import json
+import struct
+import time
+
+import pytest
+
+from app.db.models import ExportJob
+from app.services.export_job import build_export_event
+from app.services.ws_codec import coalesce_messages, decode_packed, encode_json, encode_packed
+from app.services.ws_manager import ConnectionManager
+
+
+def _moved(device_id: str, x: float, y: float) -> dict:
+    return {"event": "device.moved", "data": {"devices": [{"id": device_id, "x": x, "y": y}]}}
+
+
+def test_coalesce_merges_adjacent_deltas_and_keeps_order() -> None:
+    job = ExportJob(id="j1", project_id="p1", export_type="pptx", status="processing", progress=10)
+    first_progress = build_export_event(job)
+    job.progress = 40
+    second_progress = build_export_event(job)
+    other = build_export_event(ExportJob(id="j2", project_id="p1", export_type="excel", status="pending", progress=0))
+    merged = coalesce_messages(
+        [
+            _moved("d1", 1.0, 1.0),
+            _moved("d2", 2.0, 2.0),
+            _moved("d1", 1.5, 1.0),
+            {"event": "link.deleted", "data": {"ids": ["l1"]}},
+            {"event": "link.deleted", "data": {"ids": ["l2", "l1"]}},
+            first_progress,
+            second_progress,
+            other,
+        ]
+    )
+    assert merged == {
+        "event": "batch",
+        "data": {
+            "events": [
+                {
+                    "event": "device.moved",
+                    "data": {"devices": [{"id": "d1", "x": 1.5, "y": 1.0}, {"id": "d2", "x": 2.0, "y": 2.0}]},
+                },
+                {"event": "link.deleted", "data": {"ids": ["l1", "l2"]}},
+                second_progress,
+                other,
+            ]
+        },
+    }
+    assert coalesce_messages([_moved("d1", 1.0, 2.0)]) == _moved("d1", 1.0, 2.0)
+    job.status = "completed"
+    assert coalesce_messages([second_progress, build_export_event(job)])["event"] == "export.completed"
+
+
+def test_packed_frame_round_trips_exactly() -> None:
+    devices = [
+        {"id": f"dev-{index:05d}", "area_id": "area-1", "x": index * 0.1, "y": 1234.567, "width": 1.2, "height": 0.5}
+        for index in range(2000)
+    ]
+    message = {
+        "event": "layout.applied",
+        "data": {
+            "view_mode": "L1",
+            "devices": devices,
+            "areas": [{"id": "area-1", "x": None, "y": 3, "width": 12.0, "$g": "giữ nguyên", "$$k": True}],
+        },
+    }
+    frame = encode_packed(message)
+    (length,) = struct.unpack_from("<I", frame)
+    # Phần float64 bắt đầu ở offset chia hết 8: cả frame cũng chia hết 8.
+    assert len(frame) % 8 == 0 and len(frame) > 4 + length
+    decoded = decode_packed(frame)
+    assert decoded == message
+    assert decoded["data"]["devices"][3]["x"] == 3 * 0.1
+    assert isinstance(decoded["data"]["areas"][0]["y"], int)
+    assert len(frame) < len(encode_json(message).encode("utf-8"))
+
+
+@pytest.mark.asyncio
+async def test_manager_coalesces_window_and_encodes_per_connection(fake_websocket) -> None:
+    manager = ConnectionManager(coalesce_window=0.03)
+    text_client = fake_websocket()
+    binary_client = fake_websocket()
+    await manager.connect("p1", text_client)
+    await manager.connect("p1", binary_client, encoding="packed")
+
+    started = time.perf_counter()
+    for index in range(500):
+        assert await manager.broadcast("p1", _moved(f"d{index % 50}", float(index), 0.0)) == 2
+    deadline = time.monotonic() + 2
+    while not (text_client.frames and binary_client.frames) and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+    assert time.perf_counter() - started < 0.5
+
+    assert len(text_client.frames) == 1 and len(binary_client.frames) == 1
+    expected = json.loads(text_client.frames[0])
+    assert expected["event"] == "device.moved" and len(expected["data"]["devices"]) == 50
+    assert expected["data"]["devices"][0] == {"id": "d0", "x": 450.0, "y": 0.0}
+    assert decode_packed(binary_client.frames[0]) == expected
+
+    metrics = manager.get_metrics()
+    assert metrics["broadcasts"] == 500 and metrics["frames"] == 1
+    assert metrics["messages_coalesced"] == 499
+
+    await manager.stop()
+    assert manager.connection_count() == 0
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.services.ws_manager import SLOW_CONSUMER_CLOSE_CODE, ConnectionManager
+
+
+def _queued(manager: ConnectionManager, websocket) -> list[dict]:
+    channel = manager._connections["p1"][websocket]
+    return [json.loads(text) for text in list(channel.queue._queue)]
+
+
+async def _drain(manager: ConnectionManager, sockets, count: int, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while any(len(ws.sent) < count for ws in sockets) and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_not_blocked_by_stalled_client(fake_websocket) -> None:
+    manager = ConnectionManager(queue_size=4, send_timeout=0.2, max_drops=100)
+    viewers = [fake_websocket() for _ in range(150)]
+    stalled = fake_websocket(delay=60)
+    for ws in [stalled, *viewers]:
+        await manager.connect("p1", ws)
+
+    started = time.perf_counter()
+    for seq in range(3):
+        assert await manager.broadcast("p1", {"event": "tick", "seq": seq}) == 151
+    # broadcast chỉ enqueue, không chờ socket.
+    assert time.perf_counter() - started < 0.5
+
+    await _drain(manager, viewers, 3)
+    assert all([msg["seq"] for msg in ws.sent] == [0, 1, 2] for ws in viewers)
+
+    # Client treo quá send_timeout bị ngắt, các client khác không bị ảnh hưởng.
+    await asyncio.sleep(0.3)
+    assert manager.connection_count("p1") == 150
+    assert stalled.closed_with == SLOW_CONSUMER_CLOSE_CODE
+    metrics = manager.get_metrics()
+    assert metrics["send_timeouts"] == 1 and metrics["slow_disconnects"] == 1
+    assert metrics["messages_sent"] == 450
+
+    for ws in viewers:
+        manager.disconnect("p1", ws)
+    assert manager.get_metrics()["connections"] == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_drops_oldest_then_disconnects(fake_websocket) -> None:
+    manager = ConnectionManager(queue_size=2, send_timeout=10, max_drops=3)
+    slow = fake_websocket(delay=0.5)
+    await manager.connect("p1", slow)
+
+    # Writer đang giữ message 0; hàng đợi chứa tối đa 2, message cũ bị bỏ.
+    await manager.broadcast("p1", {"seq": 0})
+    await asyncio.sleep(0)
+    for seq in range(1, 4):
+        await manager.broadcast("p1", {"seq": seq})
+    assert manager.get_metrics()["messages_dropped"] == 1
+    assert _queued(manager, slow) == [{"seq": 2}, {"seq": 3}]
+
+    for seq in range(4, 7):
+        await manager.broadcast("p1", {"seq": seq})
+    assert manager.connection_count("p1") == 0
+    await asyncio.sleep(0.01)
+    assert slow.closed_with == SLOW_CONSUMER_CLOSE_CODE
+    assert manager.get_metrics()["slow_disconnects"] == 1
+    assert await manager.broadcast("p1", {"seq": 7}) == 0
+
+
+@pytest.mark.asyncio
+async def test_dropped_messages_trigger_resync_before_next_frame(fake_websocket) -> None:
+    manager = ConnectionManager(queue_size=2, send_timeout=10, max_drops=10)
+    slow = fake_websocket(delay=0.05)
+    await manager.connect("p1", slow)
+
+    await manager.broadcast("p1", {"seq": 0})
+    await asyncio.sleep(0)
+    for seq in range(1, 5):
+        await manager.broadcast("p1", {"seq": seq})
+    await _drain(manager, [slow], 4)
+
+    # seq 1, 2 bị bỏ: client được báo tải lại state trước khi nhận tiếp delta.
+    assert slow.sent == [{"seq": 0}, {"event": "resync", "data": {"reason": "dropped"}}, {"seq": 3}, {"seq": 4}]
+    metrics = manager.get_metrics()
+    assert metrics["messages_dropped"] == 2 and metrics["resyncs"] == 1
+
+    await manager.broadcast("p1", {"seq": 5})
+    await _drain(manager, [slow], 5)
+    assert slow.sent[-1] == {"seq": 5}
+    assert manager.get_metrics()["resyncs"] == 1
+
+
+@pytest.mark.asyncio
+async def test_send_error_removes_only_broken_socket(fake_websocket) -> None:
+    manager = ConnectionManager(queue_size=8, send_timeout=1, max_drops=8)
+    broken = fake_websocket(fail=True)
+    healthy = fake_websocket()
+    await manager.connect("p1", broken)
+    await manager.connect("p1", healthy)
+
+    await manager.broadcast("p1", {"seq": 0})
+    await manager.send_json(healthy, {"seq": 1})
+    await _drain(manager, [healthy], 2)
+
+    assert healthy.sent == [{"seq": 0}, {"seq": 1}]
+    assert manager.connection_count("p1") == 1
+    assert manager.get_metrics()["send_errors"] == 1
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Benchmark render sơ đồ PPTX (batch XML) trên project tổng hợp 1k/5k device."""
+
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+BACKEND_ROOT = REPO_ROOT / "backend"
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.services.pptx_diagram import build_diagram_pages, render_diagram_pptx
+
+
+def build_snapshot(device_count: int, devices_per_area: int = 50) -> dict:
+    """Project giả lập: area dạng lưới, mỗi area 1 hàng core + các hàng access."""
+    areas = []
+    devices = []
+    links = []
+    area_count = math.ceil(device_count / devices_per_area)
+    area_cols = max(1, int(math.sqrt(area_count)))
+    per_row = 10
+    area_width = per_row * 1.8 + 1.0
+    area_height = math.ceil(devices_per_area / per_row) * 1.6 + 1.0
+    for area_idx in range(area_count):
+        area_x = (area_idx % area_cols) * (area_width + 1.0)
+        area_y = (area_idx // area_cols) * (area_height + 1.0)
+        area_id = f"area-{area_idx}"
+        areas.append({
+            "id": area_id,
+            "name": f"Area-{area_idx}",
+            "x": area_x,
+            "y": area_y,
+            "width": area_width,
+            "height": area_height,
+            "style": {},
+            "is_waypoint": False,
+        })
+        first = len(devices)
+        for local_idx in range(min(devices_per_area, device_count - first)):
+            device_id = f"dev-{first + local_idx}"
+            name = f"Core-{area_idx}" if local_idx == 0 else f"Access-{area_idx}-{local_idx}"
+            devices.append({
+                "id": device_id,
+                "area_id": area_id,
+                "name": name,
+                "device_type": "Switch",
+                "x": area_x + 0.5 + (local_idx % per_row) * 1.8,
+                "y": area_y + 0.5 + (local_idx // per_row) * 1.6,
+                "width": 1.2,
+                "height": 0.5,
+                "color_rgb": None,
+            })
+            if local_idx:
+                links.append({
+                    "id": f"link-{first + local_idx}",
+                    "from_device_id": f"dev-{first}",
+                    "from_port": f"Gi 0/{local_idx + 1}",
+                    "to_device_id": device_id,
+                    "to_port": "Gi 0/1",
+                    "purpose": "LAN",
+                    "line_style": "solid",
+                    "color_rgb": [39, 174, 96],
+                })
+        if area_idx:
+            links.append({
+                "id": f"uplink-{area_idx}",
+                "from_device_id": "dev-0",
+                "from_port": f"Te 1/{area_idx}",
+                "to_device_id": f"dev-{first}",
+                "to_port": "Te 1/1",
+                "purpose": "UPLINK",
+                "line_style": "solid",
+                "color_rgb": [230, 126, 34],
+            })
+    return {
+        "project_id": "bench",
+        "project_name": f"Bench {device_count}",
+        "areas": areas,
+        "devices": devices,
+        "ports": [],
+        "anchor_overrides": [],
+        "links": links,
+        "l2_assignments": [],
+        "l3_addresses": [],
+    }
+
+
+def render_with_add_shape(file_path: str, snapshot: dict) -> None:
+    """Baseline: python-pptx add_shape()/add_connector() cho từng shape."""
+    from pptx import Presentation
+    from pptx.dml.color import RGBColor
+    from pptx.enum.shapes import MSO_CONNECTOR, MSO_SHAPE
+    from pptx.util import Emu
+
+    pages, (width, height) = build_diagram_pages(snapshot, "l1_diagram", {})
+    presentation = Presentation()
+    presentation.slide_width = Emu(int(width * 914400))
+    presentation.slide_height = Emu(int(height * 914400))
+    for page in pages:
+        shapes = presentation.slides.add_slide(presentation.slide_layouts[6]).shapes
+        for shape in page.shapes:
+            x1, y1, x2, y2 = shape.bbox()
+            if shape.kind == "line":
+                connector = shapes.add_connector(
+                    MSO_CONNECTOR.STRAIGHT,
+                    Emu(int((shape.x - page.origin_x) * 914400)),
+                    Emu(int((shape.y - page.origin_y) * 914400)),
+                    Emu(int((shape.x + shape.w - page.origin_x) * 914400)),
+                    Emu(int((shape.y + shape.h - page.origin_y) * 914400)),
+                )
+                connector.line.color.rgb = RGBColor(*shape.style.line)
+                continue
+            item = shapes.add_shape(
+                MSO_SHAPE.RECTANGLE,
+                Emu(int((x1 - page.origin_x) * 914400)),
+                Emu(int((y1 - page.origin_y) * 914400)),
+                Emu(int((x2 - x1) * 914400)),
+                Emu(int((y2 - y1) * 914400)),
+            )
+            if shape.style.fill:
+                item.fill.solid()
+                item.fill.fore_color.rgb = RGBColor(*shape.style.fill)
+            if shape.text:
+                item.text_frame.text = shape.text
+    presentation.save(file_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--compare", action="store_true", help="Chạy thêm baseline add_shape() để so sánh")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for count in args.devices:
+            snapshot = build_snapshot(count)
+            started = time.perf_counter()
+            pages, _ = build_diagram_pages(snapshot, "l1_diagram", {})
+            model_s = time.perf_counter() - started
+            shape_count = sum(len(page.shapes) for page in pages)
+
+            file_path = str(Path(tmp_dir) / f"bench_{count}.pptx")
+            started = time.perf_counter()
+            slides = render_diagram_pptx(file_path, snapshot, "l1_diagram", {})
+            batch_s = time.perf_counter() - started
+            size_kb = Path(file_path).stat().st_size / 1024
+            print(
+                f"{count:>6} devices | {shape_count:>7} shapes | {slides:>3} slides | "
+                f"model {model_s:6.2f}s | batch render {batch_s:6.2f}s | {size_kb:8.0f} KB"
+            )
+            if args.compare:
+                started = time.perf_counter()
+                render_with_add_shape(str(Path(tmp_dir) / f"baseline_{count}.pptx"), snapshot)
+                print(f"{'':>6}          | add_shape baseline {time.perf_counter() - started:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Benchmark độ trễ export nhỏ: ProcessPool lạnh (import lười) so với pool nóng (forkserver preload)."""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+BACKEND_ROOT = REPO_ROOT / "backend"
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.workers.export_worker import create_export_executor, generate_export_file  # noqa: E402
+
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+from bench_export_diagram import build_snapshot  # noqa: E402
+
+
+def _run(executor: ProcessPoolExecutor, jobs: int, exports_dir: str, snapshot: dict) -> list[float]:
+    latencies = []
+    for index in range(jobs):
+        started = time.perf_counter()
+        executor.submit(
+            generate_export_file, "l1_diagram", "bench", {}, exports_dir, snapshot, job_id=f"job{index:04d}"
+        ).result()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=10)
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--max-tasks-per-child", type=int, default=5)
+    args = parser.parse_args()
+
+    snapshot = build_snapshot(args.devices)
+    with tempfile.TemporaryDirectory() as exports_dir:
+        # Process mới, import pptx/openpyxl lười ở job đầu (như pool cũ khi process cha chưa import).
+        cold = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        cold_ms = _run(cold, args.jobs, exports_dir, snapshot)
+        cold.shutdown()
+
+        started = time.perf_counter()
+        warm = create_export_executor(1, args.max_tasks_per_child)
+        warm.submit(int).result()  # khởi động forkserver + process con
+        startup_ms = (time.perf_counter() - started) * 1000
+        warm_ms = _run(warm, args.jobs, exports_dir, snapshot)
+        warm.shutdown()
+
+    print(f"cold pool : job đầu {cold_ms[0]:7.1f} ms, các job sau trung bình {sum(cold_ms[1:]) / max(1, len(cold_ms) - 1):6.1f} ms")
+    print(f"warm pool : khởi động {startup_ms:7.1f} ms (1 lần khi worker start)")
+    print(f"warm pool : job đầu {warm_ms[0]:7.1f} ms, các job sau trung bình {sum(warm_ms[1:]) / max(1, len(warm_ms) - 1):6.1f} ms")
+    print(f"warm pool : job chậm nhất (gồm recycle sau {args.max_tasks_per_child} job) {max(warm_ms):6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()